@@ -0,0 +1,188 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+""" Entry level access to index.json.
+
+index.json is always written as json.dumps(index, indent=4, sort_keys=True). ExtensionIndex parses
+the file once and keeps the serialized text of every extension, so saving after a few changes only
+serializes the extensions that changed and splices them between the untouched blocks. Any number of
+changes can be batched into a single write:
+
+    with ExtensionIndex.load(INDEX_PATH) as index:
+        for entry in entries:
+            index.set_entry(entry['metadata']['name'], entry)
+"""
+
+import json
+import os
+import re
+import tempfile
+
+INDENT = 4
+# extensions are the values of the 'extensions' key, which is itself nested in the top level object
+EXTENSION_INDENT = ' ' * INDENT * 2
+_EXTENSION_BLOCK_START = re.compile(r'^' + EXTENSION_INDENT + r'("(?:[^"\\]|\\.)*"): \[$')
+_EXTENSIONS_PLACEHOLDER = '\0extensions\0'
+
+
+def _catch_dup_keys(pairs):
+    seen = {}
+    for k, v in pairs:
+        if k in seen:
+            raise ValueError("duplicate key {}".format(k))
+        seen[k] = v
+    return seen
+
+
+def _serialize_extension(name, entries):
+    lines = json.dumps(entries, indent=INDENT, sort_keys=True).split('\n')
+    return '\n'.join([EXTENSION_INDENT + json.dumps(name) + ': ' + lines[0]] +
+                     [EXTENSION_INDENT + line for line in lines[1:]])
+
+
+def _entry_version(entry):
+    return entry.get('metadata', {}).get('version')
+
+
+class ExtensionIndex:
+
+    def __init__(self, data, text=None, path=None):
+        self.data = data
+        self.path = path
+        # serialized text of each extension's list of entries, indented as it appears in the file
+        self._blocks = {}
+        if text is not None:
+            self._blocks = self._split_blocks(text)
+            # only trust the original text if splicing it back together reproduces the file exactly
+            if self.dumps() != text:
+                self._blocks = {}
+
+    @classmethod
+    def loads(cls, text, path=None):
+        data = json.loads(text, object_pairs_hook=_catch_dup_keys)
+        return cls(data, text=text, path=path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.loads(f.read(), path=path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # saving on a clean exit batches every change made in the block into one write
+        if exc_type is None:
+            self.save()
+
+    @staticmethod
+    def _split_blocks(text):
+        blocks = {}
+        name, start = None, None
+        lines = text.split('\n')
+        for i, line in enumerate(lines):
+            if name is None:
+                match = _EXTENSION_BLOCK_START.match(line)
+                if match:
+                    name, start = json.loads(match.group(1)), i
+            elif line in (EXTENSION_INDENT + ']', EXTENSION_INDENT + '],'):
+                blocks[name] = '\n'.join(lines[start:i] + [EXTENSION_INDENT + ']'])
+                name = None
+        return blocks
+
+    @property
+    def extensions(self):
+        return self.data['extensions']
+
+    def extension_names(self):
+        return list(self.extensions.keys())
+
+    def get_entries(self, name):
+        # entries changed in place are not picked up by dumps(), pass a new entry to set_entry/replace_entry instead
+        return self.extensions.get(name, [])
+
+    def get_entry(self, name, version=None, filename=None):
+        for entry in self.get_entries(name):
+            if (version is None or _entry_version(entry) == version) and \
+                    (filename is None or entry.get('filename') == filename):
+                return entry
+        return None
+
+    def _changed(self, name):
+        self._blocks.pop(name, None)
+
+    def set_entry(self, name, entry):
+        """ Replace the entry for the same wheel file, or add it as a new version of the extension. """
+        entries = self.extensions.setdefault(name, [])
+        for i, existing in enumerate(entries):
+            if existing.get('filename') == entry.get('filename'):
+                entries[i] = entry
+                break
+        else:
+            entries.append(entry)
+        self._changed(name)
+
+    def replace_entry(self, name, entry, version=None):
+        """ Replace the entry of `version` (by default the version of `entry`) in place. """
+        version = version or _entry_version(entry)
+        entries = self.extensions.get(name)
+        if not entries:
+            raise ValueError('{} not found in index.json'.format(name))
+        for i, existing in enumerate(entries):
+            if _entry_version(existing) == version:
+                entries[i] = entry
+                self._changed(name)
+                return
+        raise ValueError('version {} of {} not found in index.json'.format(version, name))
+
+    def delete_entry(self, name, version=None, filename=None):
+        """ Delete the matching entries, and the extension itself once none are left. """
+        entries = self.extensions.get(name)
+        if entries is None:
+            raise ValueError('{} not found in index.json'.format(name))
+        remaining = [e for e in entries
+                     if not ((version is None or _entry_version(e) == version) and
+                             (filename is None or e.get('filename') == filename))]
+        if len(remaining) == len(entries):
+            return
+        if remaining:
+            self.extensions[name] = remaining
+        else:
+            del self.extensions[name]
+        self._changed(name)
+
+    def delete_extension(self, name):
+        del self.extensions[name]
+        self._changed(name)
+
+    def dumps(self):
+        extensions = self.extensions
+        blocks = []
+        for name in sorted(extensions):
+            block = self._blocks.get(name)
+            if block is None:
+                block = self._blocks[name] = _serialize_extension(name, extensions[name])
+            blocks.append(block)
+
+        top_level = dict(self.data)
+        top_level['extensions'] = _EXTENSIONS_PLACEHOLDER
+        text = json.dumps(top_level, indent=INDENT, sort_keys=True)
+        serialized_extensions = '{\n' + ',\n'.join(blocks) + '\n' + ' ' * INDENT + '}' if blocks else '{}'
+        return text.replace(json.dumps(_EXTENSIONS_PLACEHOLDER), serialized_extensions, 1)
+
+    def save(self, path=None):
+        path = path or self.path
+        text = self.dumps()
+        # write next to the target and swap it in so a failed run never leaves a truncated index
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.json.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+            if os.path.exists(path):
+                os.chmod(tmp_path, os.stat(path).st_mode)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
@@ -5,17 +5,28 @@
 # pylint: disable=line-too-long
 # pylint: disable=broad-except
 
+import base64
+import hashlib
 import os
 import re
 import json
+from concurrent.futures import ThreadPoolExecutor
 from subprocess import check_output
 
+from extension_index import ExtensionIndex
+
 DEFAULT_TARGET_INDEX_URL = os.getenv('AZURE_EXTENSION_TARGET_INDEX_URL')
 STORAGE_ACCOUNT_KEY = os.getenv('AZURE_EXTENSION_TARGET_STORAGE_ACCOUNT_KEY')
 STORAGE_ACCOUNT = os.getenv('AZURE_EXTENSION_TARGET_STORAGE_ACCOUNT')
 STORAGE_CONTAINER = os.getenv('AZURE_EXTENSION_TARGET_STORAGE_CONTAINER')
 COMMIT_NUM = os.getenv('AZURE_EXTENSION_COMMIT_NUM') or 1
 BLOB_PREFIX = os.getenv('AZURE_EXTENSION_BLOB_PREFIX')
+# alternative to the account name and key, e.g. to sync to a local Azurite instance
+STORAGE_CONNECTION_STRING = os.getenv('AZURE_EXTENSION_TARGET_STORAGE_CONNECTION_STRING')
+MAX_WORKERS = int(os.getenv('AZURE_EXTENSION_SYNC_MAX_WORKERS') or 8)
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# blob metadata recording the sha256 of the uploaded wheel
+SHA256_METADATA_KEY = 'sha256'
 
 
 def _get_updated_extension_filenames():
@@ -28,6 +39,7 @@ def _get_updated_extension_filenames():
 
 
 def download_file(url, file_path):
+    """ Download url to file_path, returning the (sha256 hex digest, base64 MD5) of the content. """
     import requests
     count = 3
     the_ex = None
@@ -44,61 +56,103 @@ def download_file(url, file_path):
         print(msg)
         raise Exception(msg)
 
+    sha256 = hashlib.sha256()
+    md5 = hashlib.md5()
     with open(file_path, 'wb') as f:
-        for chunk in response.iter_content(chunk_size=1024):
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
             if chunk:  # ignore keep-alive new chunks
+                sha256.update(chunk)
+                md5.update(chunk)
                 f.write(chunk)
+    return sha256.hexdigest(), base64.b64encode(md5.digest()).decode('utf-8')
+
+
+def _get_blob_name(whl_file):
+    return f'{BLOB_PREFIX}/{whl_file}' if BLOB_PREFIX else whl_file
+
 
+def _get_blob_inventory(client):
+    """ List the target container once, mapping blob name to (sha256 metadata, content MD5),
+    instead of asking the service whether each blob exists. """
+    inventory = {}
+    prefix = f'{BLOB_PREFIX}/' if BLOB_PREFIX else None
+    # 'metadata' is what Include.METADATA serializes to in the list blobs request
+    for blob in client.list_blobs(container_name=STORAGE_CONTAINER, prefix=prefix, include='metadata'):
+        inventory[blob.name] = ((blob.metadata or {}).get(SHA256_METADATA_KEY),
+                                blob.properties.content_settings.content_md5)
+    return inventory
 
-def _sync_wheel(ext, updated_indexes, failed_urls, client, overwrite, temp_dir):
+
+def _sync_wheel(ext, client, overwrite, temp_dir, inventory):
+    """ Copy one wheel to the target container and return its updated index entry, or None if the
+    wheel could not be downloaded. Wheels already in the container with the same content are not
+    uploaded again. """
     download_url = ext['downloadUrl']
     whl_file = download_url.split('/')[-1]
     whl_path = os.path.join(temp_dir, whl_file)
-    blob_name = f'{BLOB_PREFIX}/{whl_file}' if BLOB_PREFIX else whl_file
-    try:
-        download_file(download_url, whl_path)
-    except Exception:
-        failed_urls.append(download_url)
-        return
-    if not overwrite:
-        exists = client.exists(container_name=STORAGE_CONTAINER, blob_name=blob_name)
-        if exists:
-            print("Skipping '{}' as it already exists...".format(whl_file))
-            return
-    client.create_blob_from_path(container_name=STORAGE_CONTAINER, blob_name=blob_name,
-                                 file_path=os.path.abspath(whl_path))
+    blob_name = _get_blob_name(whl_file)
+    blob_sha256, blob_md5 = inventory.get(blob_name, (None, None))
+
+    if blob_name in inventory and (not overwrite or blob_sha256 == ext.get('sha256Digest')):
+        print("Skipping '{}' as it already exists...".format(whl_file))
+    else:
+        try:
+            sha256_digest, md5_digest = download_file(download_url, whl_path)
+        except Exception:
+            return None
+        if blob_md5 is not None and blob_md5 == md5_digest:
+            # uploaded before the sha256 was recorded, tag it so the next sync skips the download too
+            print("Skipping '{}' as it is unchanged...".format(whl_file))
+            client.set_blob_metadata(container_name=STORAGE_CONTAINER, blob_name=blob_name,
+                                     metadata={SHA256_METADATA_KEY: sha256_digest})
+        else:
+            client.create_blob_from_path(container_name=STORAGE_CONTAINER, blob_name=blob_name,
+                                         file_path=os.path.abspath(whl_path),
+                                         metadata={SHA256_METADATA_KEY: sha256_digest})
+        os.remove(whl_path)
     url = client.make_blob_url(container_name=STORAGE_CONTAINER, blob_name=blob_name)
-    updated_index = ext
+    updated_index = dict(ext)
     updated_index['downloadUrl'] = url
-    updated_indexes.append(updated_index)
+    return updated_index
+
+
+def _sync_wheels(exts, client, overwrite, temp_dir):
+    """ Sync wheels with a pool of workers that each download and upload. Returns the updated index
+    entries in the same order as exts, plus the urls that failed to download. """
+    inventory = _get_blob_inventory(client)
+
+    def sync(ext):
+        print('Uploading {}'.format(ext['filename']))
+        return _sync_wheel(ext, client, overwrite, temp_dir, inventory)
+
+    updated_indexes = []
+    failed_urls = []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for ext, updated_index in zip(exts, executor.map(sync, exts)):
+            if updated_index is None:
+                failed_urls.append(ext['downloadUrl'])
+            else:
+                updated_indexes.append(updated_index)
+    return updated_indexes, failed_urls
 
 
 def _update_target_extension_index(updated_indexes, deleted_ext_filenames, target_index_path):
     NAME_REGEX = r'^(.*?)-\d+.\d+.\d+'
-    with open(target_index_path, 'r') as infile:
-        curr_index = json.loads(infile.read())
-    for entry in updated_indexes:
-        filename = entry['filename']
-        extension_name = re.findall(NAME_REGEX, filename)[0].replace('_', '-')
-        if extension_name not in curr_index['extensions'].keys():
-            print("Adding '{}' to index...".format(filename))
-            curr_index['extensions'][extension_name] = [entry]
-        else:
-            print("Updating '{}' in index...".format(filename))
-            curr_entry = next((ext for ext in curr_index['extensions'][extension_name] if ext['filename'] == entry['filename']), None)
-            if curr_entry is not None:  # in case of overwrite
-                curr_entry = entry
+    # all the changes are batched into a single write of the target index
+    with ExtensionIndex.load(target_index_path) as index:
+        for entry in updated_indexes:
+            filename = entry['filename']
+            extension_name = re.findall(NAME_REGEX, filename)[0].replace('_', '-')
+            if not index.get_entries(extension_name):
+                print("Adding '{}' to index...".format(filename))
             else:
-                curr_index['extensions'][extension_name].append(entry)
-    for filename in deleted_ext_filenames:
-        extension_name = re.findall(NAME_REGEX, filename)[0].replace('_', '-')
-        print("Deleting '{}' in index...".format(filename))
-        curr_index['extensions'][extension_name] = [ext for ext in curr_index['extensions'][extension_name] if ext['filename'] != filename]
-        if not curr_index['extensions'][extension_name]:
-            del curr_index['extensions'][extension_name]
-
-    with open(os.path.join(target_index_path), 'w') as outfile:
-        outfile.write(json.dumps(curr_index, indent=4, sort_keys=True))
+                print("Updating '{}' in index...".format(filename))
+            # replaces the entry with the same filename in case of overwrite
+            index.set_entry(extension_name, entry)
+        for filename in deleted_ext_filenames:
+            extension_name = re.findall(NAME_REGEX, filename)[0].replace('_', '-')
+            print("Deleting '{}' in index...".format(filename))
+            index.delete_entry(extension_name, filename=filename)
 
 
 def main():
@@ -134,9 +188,11 @@ def main():
             open(target_index_path, 'w').write(json.dumps(initial_index, indent=4, sort_keys=True))
         else:
             raise
-    client = BlockBlobService(account_name=STORAGE_ACCOUNT, account_key=STORAGE_ACCOUNT_KEY)
-    updated_indexes = []
-    failed_urls = []
+    if STORAGE_CONNECTION_STRING:
+        client = BlockBlobService(connection_string=STORAGE_CONNECTION_STRING)
+    else:
+        client = BlockBlobService(account_name=STORAGE_ACCOUNT, account_key=STORAGE_ACCOUNT_KEY)
+    exts_to_sync = []
     if sync_all:
         print('Syncing all extensions...\n')
         # backup the old index.json
@@ -147,19 +203,17 @@ def main():
         initial_index = {"extensions": {}, "formatVersion": "1"}
         open(target_index_path, 'w').write(json.dumps(initial_index, indent=4, sort_keys=True))
         for extension_name in current_extensions.keys():
-            for ext in current_extensions[extension_name]:
-                print('Uploading {}'.format(ext['filename']))
-                _sync_wheel(ext, updated_indexes, failed_urls, client, True, temp_dir)
+            exts_to_sync.extend(current_extensions[extension_name])
     else:
         NAME_REGEX = r'^(.*?)-\d+.\d+.\d+'
         for filename in net_added_ext_filenames:
             extension_name = re.findall(NAME_REGEX, filename)[0].replace('_', '-')
-            print('Uploading {}'.format(filename))
             ext = current_extensions[extension_name][-1]
             if ext['filename'] != filename:
                 ext = next((ext for ext in current_extensions[extension_name] if ext['filename'] == filename), None)
             if ext is not None:
-                _sync_wheel(ext, updated_indexes, failed_urls, client, True, temp_dir)
+                exts_to_sync.append(ext)
+    updated_indexes, failed_urls = _sync_wheels(exts_to_sync, client, True, temp_dir)
 
     print("")
     _update_target_extension_index(updated_indexes, net_deleted_ext_filenames, target_index_path)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+""" Test that entry level updates of index.json serialize exactly like a full rewrite """
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from extension_index import ExtensionIndex
+
+
+def _entry(name, version):
+    filename = '{}-{}-py3-none-any.whl'.format(name.replace('-', '_'), version)
+    return {
+        'downloadUrl': 'https://example.com/' + filename,
+        'filename': filename,
+        'metadata': {'name': name, 'version': version, 'description': 'Line1\nLine2 "quoted" é'},
+        'sha256Digest': '0' * 64,
+    }
+
+
+def _full_rewrite(data):
+    return json.dumps(data, indent=4, sort_keys=True)
+
+
+class TestExtensionIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.data = {
+            'extensions': {
+                'alpha': [_entry('alpha', '0.1.0'), _entry('alpha', '0.2.0')],
+                'beta-ext': [_entry('beta-ext', '1.0.0')],
+                'gamma': [_entry('gamma', '2.0.0')],
+            },
+            'formatVersion': '1'
+        }
+        self.text = _full_rewrite(self.data)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'index.json')
+        with open(self.path, 'w') as f:
+            f.write(self.text)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_round_trip(self):
+        index = ExtensionIndex.loads(self.text)
+        self.assertEqual(len(index._blocks), 3)
+        self.assertEqual(index.dumps(), self.text)
+
+    def test_entry_updates(self):
+        index = ExtensionIndex.loads(self.text)
+
+        index.set_entry('beta-ext', _entry('beta-ext', '1.1.0'))
+        self.data['extensions']['beta-ext'].append(_entry('beta-ext', '1.1.0'))
+        self.assertEqual(index.dumps(), _full_rewrite(self.data))
+
+        replacement = dict(_entry('alpha', '0.3.0'))
+        index.replace_entry('alpha', replacement, version='0.1.0')
+        self.data['extensions']['alpha'][0] = replacement
+        self.assertEqual(index.dumps(), _full_rewrite(self.data))
+
+        index.set_entry('aaa', _entry('aaa', '0.0.1'))
+        self.data['extensions']['aaa'] = [_entry('aaa', '0.0.1')]
+        self.assertEqual(index.dumps(), _full_rewrite(self.data))
+
+        index.delete_entry('gamma', version='2.0.0')
+        del self.data['extensions']['gamma']
+        self.assertEqual(index.dumps(), _full_rewrite(self.data))
+
+        index.delete_entry('alpha', filename=_entry('alpha', '0.2.0')['filename'])
+        self.data['extensions']['alpha'].pop()
+        self.assertEqual(index.dumps(), _full_rewrite(self.data))
+
+        with self.assertRaises(ValueError):
+            index.replace_entry('alpha', _entry('alpha', '9.9.9'))
+
+    def test_batched_save(self):
+        with ExtensionIndex.load(self.path) as index:
+            for version in ('1.1.0', '1.2.0', '1.3.0'):
+                index.set_entry('beta-ext', _entry('beta-ext', version))
+                self.data['extensions']['beta-ext'].append(_entry('beta-ext', version))
+        with open(self.path) as f:
+            self.assertEqual(f.read(), _full_rewrite(self.data))
+
+    def test_non_canonical_input(self):
+        text = json.dumps(self.data)
+        index = ExtensionIndex.loads(text)
+        self.assertEqual(index.dumps(), self.text)
+
+    def test_duplicate_keys(self):
+        with self.assertRaises(ValueError):
+            ExtensionIndex.loads('{"extensions": {"a": [], "a": []}, "formatVersion": "1"}')
+
+    def test_empty_index(self):
+        data = {'extensions': {}, 'formatVersion': '1'}
+        index = ExtensionIndex.loads(_full_rewrite(data))
+        self.assertEqual(index.dumps(), _full_rewrite(data))
+        index.set_entry('alpha', _entry('alpha', '0.1.0'))
+        data['extensions']['alpha'] = [_entry('alpha', '0.1.0')]
+        self.assertEqual(index.dumps(), _full_rewrite(data))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,15 +14,13 @@ import hashlib
 import json
 import logging
 import os
-import shutil
-import tempfile
 import unittest
 
 from packaging import version
 from util import SRC_PATH
 from wheel.install import WHEEL_INFO_RE
 
-from util import get_ext_metadata, get_whl_from_url, get_index_data
+from util import get_ext_metadata, get_index_data, get_wheel_cache
 
 
 logger = logging.getLogger(__name__)
@@ -35,7 +33,8 @@ logger.addHandler(ch)
 def get_sha256sum(a_file):
     sha256 = hashlib.sha256()
     with open(a_file, 'rb') as f:
-        sha256.update(f.read())
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
     return sha256.hexdigest()
 
 
@@ -58,12 +57,15 @@ class TestIndex(unittest.TestCase):
     def setUpClass(cls):
         cls.longMessage = True
         cls.index = get_index_data()
-        cls.whl_cache_dir = tempfile.mkdtemp()
-        cls.whl_cache = {}
-
-    @classmethod
-    def tearDownClass(cls):
-        shutil.rmtree(cls.whl_cache_dir)
+        # only test the latest version
+        cls.latest = {ext_name: max(exts, key=lambda ext: version.parse(ext['metadata']['version']))
+                      for ext_name, exts in cls.index['extensions'].items()}
+        cls.whls = {}
+        if os.getenv('CI'):
+            # download every latest wheel up front and concurrently. Wheels already in the
+            # persistent cache are matched by the sha256 in the index and not downloaded again
+            cls.whls = get_wheel_cache().fetch_all(
+                (item['downloadUrl'], item['sha256Digest']) for item in cls.latest.values())
 
     def test_format_version(self):
         self.assertEqual(self.index['formatVersion'], '1')
@@ -130,11 +132,9 @@ class TestIndex(unittest.TestCase):
 
     @unittest.skipUnless(os.getenv('CI'), 'Skipped as not running on CI')
     def test_checksums(self):
-        for exts in self.index['extensions'].values():
-            # only test the latest version
-            item = max(exts, key=lambda ext: version.parse(ext['metadata']['version']))
-            ext_file = get_whl_from_url(item['downloadUrl'], item['filename'],
-                                        self.whl_cache_dir, self.whl_cache)
+        for item in self.latest.values():
+            # hash the wheel itself, a wheel found in the cache only carries the digest it was looked up by
+            ext_file, _ = self.whls[item['downloadUrl']]
             print(ext_file)
             computed_hash = get_sha256sum(ext_file)
             self.assertEqual(computed_hash, item['sha256Digest'],
@@ -158,19 +158,14 @@ class TestIndex(unittest.TestCase):
             'log-analytics': '0.2.1'
         }
 
-        extensions_dir = tempfile.mkdtemp()
-        for ext_name, exts in self.index['extensions'].items():
-            # only test the latest version
-            item = max(exts, key=lambda ext: version.parse(ext['metadata']['version']))
-            ext_dir = tempfile.mkdtemp(dir=extensions_dir)
-            ext_file = get_whl_from_url(item['downloadUrl'], item['filename'],
-                                        self.whl_cache_dir, self.whl_cache)
+        for ext_name, item in self.latest.items():
+            ext_file, _ = self.whls[item['downloadUrl']]
 
             print(ext_file)
 
             ext_version = item['metadata']['version']
             try:
-                metadata = get_ext_metadata(ext_dir, ext_file, ext_name)    # check file exists
+                metadata = get_ext_metadata(ext_file, ext_name)    # check file exists
             except ValueError as ex:
                 if ext_name in skipable_extension_thresholds:
                     threshold_version = skipable_extension_thresholds[ext_name]
@@ -210,8 +205,6 @@ class TestIndex(unittest.TestCase):
                                  "{}".format(item['filename'], json.dumps(metadata, indent=2, sort_keys=True,
                                                                           separators=(',', ': '))))
 
-        shutil.rmtree(extensions_dir)
-
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+""" Test syncing wheels to blob storage. Runs against an in-memory container by default, or against
+a local Azurite instance when AZURE_EXTENSION_TEST_STORAGE_CONNECTION_STRING is set, e.g. to
+'UseDevelopmentStorage=true'. """
+
+import base64
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+import sync_extensions
+
+TEST_CONNECTION_STRING = os.getenv('AZURE_EXTENSION_TEST_STORAGE_CONNECTION_STRING')
+
+
+class InMemoryBlockBlobService:
+    """ The subset of BlockBlobService used by sync_extensions. """
+
+    def __init__(self):
+        self.blobs = {}
+        self.uploads = 0
+
+    def list_blobs(self, container_name, prefix=None, include=None):
+        for name, (content, metadata) in sorted(self.blobs.items()):
+            if not prefix or name.startswith(prefix):
+                md5 = base64.b64encode(hashlib.md5(content).digest()).decode('utf-8')
+                yield SimpleNamespace(name=name, metadata=dict(metadata) if include else None,
+                                      properties=SimpleNamespace(content_settings=SimpleNamespace(content_md5=md5)))
+
+    def create_blob_from_path(self, container_name, blob_name, file_path, metadata=None):
+        with open(file_path, 'rb') as f:
+            self.blobs[blob_name] = (f.read(), metadata or {})
+        self.uploads += 1
+
+    def set_blob_metadata(self, container_name, blob_name, metadata=None):
+        self.blobs[blob_name] = (self.blobs[blob_name][0], metadata or {})
+
+    def make_blob_url(self, container_name, blob_name):
+        return 'https://target.blob.core.windows.net/{}/{}'.format(container_name, blob_name)
+
+
+def _wheel(name, content):
+    filename = '{}-1.0.0-py3-none-any.whl'.format(name)
+    return {
+        'downloadUrl': 'https://source.example.com/' + filename,
+        'filename': filename,
+        'sha256Digest': hashlib.sha256(content).hexdigest(),
+    }
+
+
+class TestSyncWheels(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.contents = {'ext{}'.format(i): 'wheel {}'.format(i).encode('utf-8') for i in range(20)}
+        self.exts = [_wheel(name, content) for name, content in self.contents.items()]
+        self.downloads = []
+
+        def download_file(url, file_path):
+            self.downloads.append(url)
+            content = self.contents[url.split('/')[-1].split('-')[0]]
+            with open(file_path, 'wb') as f:
+                f.write(content)
+            return (hashlib.sha256(content).hexdigest(),
+                    base64.b64encode(hashlib.md5(content).digest()).decode('utf-8'))
+
+        patches = [mock.patch.object(sync_extensions, 'download_file', download_file),
+                   mock.patch.object(sync_extensions, 'STORAGE_CONTAINER', 'extensions')]
+        if TEST_CONNECTION_STRING:
+            from azure.storage.blob import BlockBlobService
+            self.client = BlockBlobService(connection_string=TEST_CONNECTION_STRING)
+            container = 'sync-test-{}'.format(uuid.uuid4().hex[:8])
+            self.client.create_container(container)
+            self.addCleanup(self.client.delete_container, container)
+            patches[1] = mock.patch.object(sync_extensions, 'STORAGE_CONTAINER', container)
+        else:
+            self.client = InMemoryBlockBlobService()
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_sync_keeps_order(self):
+        updated_indexes, failed_urls = sync_extensions._sync_wheels(self.exts, self.client, True, self.temp_dir)
+        self.assertEqual(failed_urls, [])
+        self.assertEqual([e['filename'] for e in updated_indexes], [e['filename'] for e in self.exts])
+        self.assertTrue(all(e['downloadUrl'].endswith(e['filename']) for e in updated_indexes))
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_skip_by_digest(self):
+        sync_extensions._sync_wheels(self.exts, self.client, True, self.temp_dir)
+        self.downloads.clear()
+
+        changed = dict(self.exts[0])
+        self.contents['ext0'] = b'rebuilt wheel'
+        changed['sha256Digest'] = hashlib.sha256(b'rebuilt wheel').hexdigest()
+        updated_indexes, _ = sync_extensions._sync_wheels([changed] + self.exts[1:], self.client, True,
+                                                          self.temp_dir)
+        # only the wheel whose sha256 changed is downloaded again
+        self.assertEqual(self.downloads, [changed['downloadUrl']])
+        self.assertEqual(len(updated_indexes), len(self.exts))
+
+    def test_skip_by_md5_without_metadata(self):
+        if TEST_CONNECTION_STRING:
+            self.skipTest('only the in-memory container can hold blobs uploaded without metadata')
+        for ext in self.exts:
+            self.client.blobs[ext['filename']] = (self.contents[ext['filename'].split('-')[0]], {})
+
+        sync_extensions._sync_wheels(self.exts, self.client, True, self.temp_dir)
+        self.assertEqual(self.client.uploads, 0)
+        self.assertTrue(all(metadata.get('sha256') for _, metadata in self.client.blobs.values()))
+
+    def test_failed_download(self):
+        missing = _wheel('missing', b'')
+        updated_indexes, failed_urls = sync_extensions._sync_wheels([missing] + self.exts[:2], self.client, True,
+                                                                    self.temp_dir)
+        self.assertEqual(failed_urls, [missing['downloadUrl']])
+        self.assertEqual(len(updated_indexes), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
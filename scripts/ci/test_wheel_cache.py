@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+""" Test the content-addressed wheel cache and reading metadata from a wheel without extracting it """
+
+import functools
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import zipfile
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+
+from util import WheelCache, get_ext_metadata
+
+WHL_NAME = 'my_ext-0.1.0-py3-none-any.whl'
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    requests_served = 0
+
+    def do_GET(self):
+        _QuietHandler.requests_served += 1
+        super().do_GET()
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class TestWheelCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.serve_dir = tempfile.mkdtemp()
+        cls.whl_path = os.path.join(cls.serve_dir, WHL_NAME)
+        with zipfile.ZipFile(cls.whl_path, 'w') as zf:
+            zf.writestr('azext_my_ext/__init__.py', '')
+            zf.writestr('azext_my_ext/azext_metadata.json', json.dumps({'azext.minCliCoreVersion': '2.0.0'}))
+            zf.writestr('my_ext-0.1.0.dist-info/metadata.json', json.dumps({'name': 'my-ext', 'version': '0.1.0'}))
+            zf.writestr('other-1.0.dist-info/metadata.json', json.dumps({'name': 'other'}))
+        with open(cls.whl_path, 'rb') as f:
+            cls.digest = hashlib.sha256(f.read()).hexdigest()
+
+        handler = functools.partial(_QuietHandler, directory=cls.serve_dir)
+        cls.server = HTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = 'http://127.0.0.1:{}/{}'.format(cls.server.server_port, WHL_NAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        shutil.rmtree(cls.serve_dir)
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_fetch_hashes_while_downloading(self):
+        path, digest = WheelCache(self.cache_dir).fetch(self.url)
+        self.assertEqual(digest, self.digest)
+        self.assertEqual(os.path.basename(path), '{}.whl'.format(self.digest))
+
+    def test_cache_hit_by_digest(self):
+        WheelCache(self.cache_dir).fetch(self.url)
+        served = _QuietHandler.requests_served
+        results = WheelCache(self.cache_dir).fetch_all([(self.url, self.digest)])
+        self.assertEqual(results[self.url][1], self.digest)
+        self.assertEqual(_QuietHandler.requests_served, served)
+
+    def test_metadata_without_extraction(self):
+        metadata = get_ext_metadata(self.whl_path, 'my-ext')
+        self.assertEqual(metadata, {'azext.minCliCoreVersion': '2.0.0', 'name': 'my-ext', 'version': '0.1.0'})
+        self.assertEqual(os.listdir(self.serve_dir), [WHL_NAME])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,65 +3,61 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
-import hashlib
-import json
 import re
 import sys
-import tempfile
 
-from util import get_ext_metadata, get_whl_from_url
+from extension_index import ExtensionIndex
+from util import get_ext_metadata, get_wheel_cache
 
 NAME_REGEX = r'.*/([^/]*)-\d+.\d+.\d+'
 
 
-def get_sha256sum(a_file):
-    sha256 = hashlib.sha256()
-    with open(a_file, 'rb') as f:
-        sha256.update(f.read())
-    return sha256.hexdigest()
-
-
-def main():
-
-    # Get extension WHL from URL
-    whl_path = None
-    try:
-        whl_path = sys.argv[1]
-    except IndexError:
-        pass
+def get_extension_name(whl_path):
     if not whl_path or not whl_path.endswith('.whl') or not whl_path.startswith('https:'):
-        raise ValueError('incorrect usage: update_script <URL TO WHL FILE>')
+        raise ValueError('incorrect usage: update_script <URL TO WHL FILE> [<URL TO WHL FILE> ...]')
 
     # Extract the extension name
     try:
         extension_name = re.findall(NAME_REGEX, whl_path)[0]
-        extension_name = extension_name.replace('_', '-')
+        return extension_name.replace('_', '-')
     except IndexError:
         raise ValueError('unable to parse extension name')
 
-    extensions_dir = tempfile.mkdtemp()
-    ext_dir = tempfile.mkdtemp(dir=extensions_dir)
-    whl_cache_dir = tempfile.mkdtemp()
-    whl_cache = {}
-    ext_file = get_whl_from_url(whl_path, extension_name, whl_cache_dir, whl_cache)
 
-    with open('./src/index.json', 'r') as infile:
-        curr_index = json.loads(infile.read())
+def update_entry(index, whl_path):
+    extension_name = get_extension_name(whl_path)
 
-    try:
-        entry = curr_index['extensions'][extension_name]
-    except IndexError:
+    # the sha256 is computed while the wheel is downloaded
+    ext_file, sha256_digest = get_wheel_cache().fetch(whl_path)
+
+    entries = index.get_entries(extension_name)
+    if not entries:
         raise ValueError('{} not found in index.json'.format(extension_name))
 
-    entry[0]['downloadUrl'] = whl_path
-    entry[0]['sha256Digest'] = get_sha256sum(ext_file)
-    entry[0]['filename'] = whl_path.split('/')[-1]
-    entry[0]['metadata'] = get_ext_metadata(ext_dir, ext_file, extension_name)
+    entry = dict(entries[0])
+    entry['downloadUrl'] = whl_path
+    entry['sha256Digest'] = sha256_digest
+    entry['filename'] = whl_path.split('/')[-1]
+    entry['metadata'] = get_ext_metadata(ext_file, extension_name)
+
+    index.replace_entry(extension_name, entry, version=entries[0]['metadata']['version'])
+
+
+def main():
 
-    # update index and write back to file
-    curr_index['extensions'][extension_name] = entry
-    with open('./src/index.json', 'w') as outfile:
-        outfile.write(json.dumps(curr_index, indent=4, sort_keys=True))
+    # Get extension WHL from URL, any number of wheels can be updated in one run
+    whl_paths = sys.argv[1:]
+    if not whl_paths:
+        raise ValueError('incorrect usage: update_script <URL TO WHL FILE> [<URL TO WHL FILE> ...]')
+    for whl_path in whl_paths:
+        get_extension_name(whl_path)
+    # download all the wheels at once, update_entry then picks them up from the cache
+    get_wheel_cache().fetch_all((whl_path, None) for whl_path in whl_paths)
+
+    # update index and write back to file once all the wheels are in
+    with ExtensionIndex.load('./src/index.json') as index:
+        for whl_path in whl_paths:
+            update_entry(index, whl_path)
 
 
 if __name__ == '__main__':
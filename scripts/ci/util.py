@@ -3,15 +3,27 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import hashlib
 import logging
 import os
 import re
 import shlex
+import shutil
 import json
+import tempfile
+import threading
+import time
 import zipfile
 
+from concurrent.futures import ThreadPoolExecutor
+
 from subprocess import check_output
 
+try:
+    from extension_index import ExtensionIndex
+except ImportError:  # imported as ci.util
+    from ci.extension_index import ExtensionIndex
+
 logger = logging.getLogger(__name__)
 
 # copy from wheel==0.30.0
@@ -29,77 +41,146 @@ def get_repo_root():
     return current_dir
 
 
-def _get_extension_modname(ext_dir):
+def _get_extension_modname(names):
     # Modification of https://github.com/Azure/azure-cli/blob/dev/src/azure-cli-core/azure/cli/core/extension.py#L153
     EXTENSIONS_MOD_PREFIX = 'azext_'
-    pos_mods = [n for n in os.listdir(ext_dir)
-                if n.startswith(EXTENSIONS_MOD_PREFIX) and os.path.isdir(os.path.join(ext_dir, n))]
+    # top level directories of the wheel, read from the zip central directory
+    top_level_dirs = {n.split('/', 1)[0] for n in names if '/' in n}
+    pos_mods = sorted(n for n in top_level_dirs if n.startswith(EXTENSIONS_MOD_PREFIX))
     if len(pos_mods) != 1:
         raise AssertionError("Expected 1 module to load starting with "
                              "'{}': got {}".format(EXTENSIONS_MOD_PREFIX, pos_mods))
     return pos_mods[0]
 
 
-def _get_azext_metadata(ext_dir):
+def _get_azext_metadata(zip_ref):
     # Modification of https://github.com/Azure/azure-cli/blob/dev/src/azure-cli-core/azure/cli/core/extension.py#L109
     AZEXT_METADATA_FILENAME = 'azext_metadata.json'
     azext_metadata = None
-    ext_modname = _get_extension_modname(ext_dir=ext_dir)
-    azext_metadata_filepath = os.path.join(ext_dir, ext_modname, AZEXT_METADATA_FILENAME)
-    if os.path.isfile(azext_metadata_filepath):
-        with open(azext_metadata_filepath) as f:
-            azext_metadata = json.load(f)
+    names = zip_ref.namelist()
+    ext_modname = _get_extension_modname(names)
+    azext_metadata_filepath = '{}/{}'.format(ext_modname, AZEXT_METADATA_FILENAME)
+    if azext_metadata_filepath in names:
+        azext_metadata = json.loads(zip_ref.read(azext_metadata_filepath).decode('utf-8'))
     return azext_metadata
 
 
-def get_ext_metadata(ext_dir, ext_file, ext_name):
+def get_ext_metadata(ext_file, ext_name):
     # Modification of https://github.com/Azure/azure-cli/blob/dev/src/azure-cli-core/azure/cli/core/extension.py#L89
+    # The two metadata files are read straight out of the wheel, nothing is extracted to disk.
     WHL_METADATA_FILENAME = 'metadata.json'
-    zip_ref = zipfile.ZipFile(ext_file, 'r')
-    zip_ref.extractall(ext_dir)
-    zip_ref.close()
     metadata = {}
-    dist_info_dirs = [f for f in os.listdir(ext_dir) if f.endswith('.dist-info')]
+    with zipfile.ZipFile(ext_file, 'r') as zip_ref:
+        names = zip_ref.namelist()
+        dist_info_dirs = sorted({n.split('/', 1)[0] for n in names
+                                 if '/' in n and n.split('/', 1)[0].endswith('.dist-info')})
 
-    azext_metadata = _get_azext_metadata(ext_dir)
+        azext_metadata = _get_azext_metadata(zip_ref)
 
-    if not azext_metadata:
-        raise ValueError('azext_metadata.json for Extension "{}" Metadata is missing'.format(ext_name))
+        if not azext_metadata:
+            raise ValueError('azext_metadata.json for Extension "{}" Metadata is missing'.format(ext_name))
 
-    metadata.update(azext_metadata)
+        metadata.update(azext_metadata)
 
-    for dist_info_dirname in dist_info_dirs:
-        parsed_dist_info_dir = WHEEL_INFO_RE(dist_info_dirname)
-        if parsed_dist_info_dir and parsed_dist_info_dir.groupdict().get('name') == ext_name.replace('-', '_'):
-            whl_metadata_filepath = os.path.join(ext_dir, dist_info_dirname, WHL_METADATA_FILENAME)
-            if os.path.isfile(whl_metadata_filepath):
-                with open(whl_metadata_filepath) as f:
-                    metadata.update(json.load(f))
+        for dist_info_dirname in dist_info_dirs:
+            parsed_dist_info_dir = WHEEL_INFO_RE(dist_info_dirname)
+            if parsed_dist_info_dir and parsed_dist_info_dir.groupdict().get('name') == ext_name.replace('-', '_'):
+                whl_metadata_filepath = '{}/{}'.format(dist_info_dirname, WHL_METADATA_FILENAME)
+                if whl_metadata_filepath in names:
+                    metadata.update(json.loads(zip_ref.read(whl_metadata_filepath).decode('utf-8')))
     return metadata
 
 
-def get_whl_from_url(url, filename, tmp_dir, whl_cache=None):
+# Wheels are immutable once published, so they are cached on disk by their sha256 and reused across runs.
+WHEEL_CACHE_DIR = os.environ.get('AZURE_EXTENSION_WHEEL_CACHE_DIR') or \
+    os.path.join(os.path.expanduser('~'), '.cache', 'azure-cli-extensions', 'wheels')
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class WheelCache:
+    """ Content-addressed wheel cache. fetch() returns (path, sha256) where the digest is computed
+    while the wheel is streamed to disk, so it never has to be read back to be verified. """
+
+    def __init__(self, cache_dir=WHEEL_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._fetched = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, sha256_digest):
+        return os.path.join(self.cache_dir, '{}.whl'.format(sha256_digest))
+
+    def fetch(self, url, sha256_digest=None):
+        with self._lock:
+            if url in self._fetched:
+                return self._fetched[url]
+        if sha256_digest and os.path.isfile(self.path_for(sha256_digest)):
+            result = (self.path_for(sha256_digest), sha256_digest)
+        else:
+            result = self._download(url)
+        with self._lock:
+            self._fetched[url] = result
+        return result
+
+    def fetch_all(self, urls_and_digests, max_workers=8):
+        """ Fetch [(url, sha256_digest), ...] concurrently, returning {url: (path, sha256)}. """
+        urls_and_digests = list(urls_and_digests)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(lambda item: self.fetch(*item), urls_and_digests)
+            return {url: result for (url, _), result in zip(urls_and_digests, results)}
+
+    def _download(self, url):
+        import requests
+        TRIES = 3
+        for try_number in range(TRIES):
+            try:
+                r = requests.get(url, stream=True)
+                assert r.status_code == 200, "Request to {} failed with {}".format(url, r.status_code)
+                break
+            except (requests.exceptions.ConnectionError, requests.exceptions.HTTPError):
+                if try_number == TRIES - 1:
+                    raise
+                time.sleep(0.5)
+
+        sha256 = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.whl.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if chunk:  # ignore keep-alive new chunks
+                        sha256.update(chunk)
+                        f.write(chunk)
+            digest = sha256.hexdigest()
+            os.replace(tmp_path, self.path_for(digest))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return self.path_for(digest), digest
+
+
+_wheel_cache = None
+
+
+def get_wheel_cache():
+    global _wheel_cache  # pylint: disable=global-statement
+    if _wheel_cache is None:
+        _wheel_cache = WheelCache()
+    return _wheel_cache
+
+
+def get_whl_from_url(url, filename, tmp_dir, whl_cache=None, sha256_digest=None):
     if not whl_cache:
         whl_cache = {}
     if url in whl_cache:
         return whl_cache[url]
-    import requests
-    TRIES = 3
-    for try_number in range(TRIES):
-        try:
-            r = requests.get(url, stream=True)
-            assert r.status_code == 200, "Request to {} failed with {}".format(url, r.status_code)
-            break
-        except (requests.exceptions.ConnectionError, requests.exceptions.HTTPError) as err:
-            import time
-            time.sleep(0.5)
-            continue
+    cached_file, _ = get_wheel_cache().fetch(url, sha256_digest)
 
+    # callers such as pip need the wheel under its real filename
     ext_file = os.path.join(tmp_dir, filename)
-    with open(ext_file, 'wb') as f:
-        for chunk in r.iter_content(chunk_size=1024):
-            if chunk:  # ignore keep-alive new chunks
-                f.write(chunk)
+    try:
+        os.link(cached_file, ext_file)
+    except OSError:
+        shutil.copyfile(cached_file, ext_file)
     whl_cache[url] = ext_file
     return ext_file
 
@@ -108,21 +189,21 @@ SRC_PATH = os.path.join(get_repo_root(), 'src')
 INDEX_PATH = os.path.join(SRC_PATH, 'index.json')
 
 
-def _catch_dup_keys(pairs):
-    seen = {}
-    for k, v in pairs:
-        if k in seen:
-            raise ValueError("duplicate key {}".format(k))
-        seen[k] = v
-    return seen
+_index_cache = {}
+
+
+def get_index(path=INDEX_PATH):
+    # index.json is parsed (and checked for duplicate keys) once per process
+    if path not in _index_cache:
+        try:
+            _index_cache[path] = ExtensionIndex.load(path)
+        except ValueError as err:
+            raise AssertionError("Invalid JSON in {}: {}".format(path, err))
+    return _index_cache[path]
 
 
 def get_index_data():
-    try:
-        with open(INDEX_PATH) as f:
-            return json.load(f, object_pairs_hook=_catch_dup_keys)
-    except ValueError as err:
-        raise AssertionError("Invalid JSON in {}: {}".format(INDEX_PATH, err))
+    return get_index().data
 
 
 def diff_code(start, end):
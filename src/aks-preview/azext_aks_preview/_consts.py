@@ -192,6 +192,8 @@ ADDONS_DESCRIPTIONS = {
 # credential format
 CONST_CREDENTIAL_FORMAT_AZURE = "azure"
 CONST_CREDENTIAL_FORMAT_EXEC = "exec"
+# number of clusters whose credentials are fetched at once by get-credentials-all
+CONST_GET_CREDENTIALS_MAX_WORKERS = 16
 
 # refer https://docs.microsoft.com/en-us/rest/api/storageservices/
 # naming-and-referencing-containers--blobs--and-metadata#container-names
@@ -2201,6 +2201,46 @@ examples:
     crafted: true
 """
 
+helps['aks get-credentials-all'] = """
+type: command
+short-summary: Get access credentials for many managed Kubernetes clusters at once.
+long-summary: The credentials of the clusters are fetched concurrently and merged into the Kubernetes configuration file in a single write. The last cluster listed becomes the current context.
+parameters:
+  - name: --resource-group -g
+    type: string
+    short-summary: Only get the credentials of the clusters in this resource group. Defaults to every cluster of the subscription.
+  - name: --names
+    type: string
+    short-summary: Space-separated names of the clusters to get the credentials of. Defaults to all of them.
+  - name: --admin -a
+    type: bool
+    short-summary: "Get cluster administrator credentials.  Default: cluster user credentials."
+  - name: --user -u
+    type: string
+    short-summary: "Get credentials for the user. Only valid when --admin is False.  Default: cluster user credentials."
+  - name: --file -f
+    type: string
+    short-summary: Kubernetes configuration file to update. Use "-" to print YAML to stdout instead.
+  - name: --overwrite-existing
+    type: bool
+    short-summary: Overwrite any existing cluster entry with the same name.
+  - name: --public-fqdn
+    type: bool
+    short-summary: Get private cluster credential with server address to be public fqdn.
+  - name: --format
+    type: string
+    short-summary: Specify the format of the returned credential. Available values are ["exec", "azure"].
+                  Only take effect when requesting clusterUser credential of AAD clusters.
+  - name: --aks-custom-headers
+    type: string
+    short-summary: Send custom headers. When specified, format should be Key1=Value1,Key2=Value2
+examples:
+  - name: Get access credentials for every managed Kubernetes cluster in a resource group.
+    text: az aks get-credentials-all --resource-group MyResourceGroup
+  - name: Get access credentials for some managed Kubernetes clusters of the subscription, overwriting existing entries.
+    text: az aks get-credentials-all --names MyManagedCluster1 MyManagedCluster2 --overwrite-existing
+"""
+
 helps['aks rotate-certs'] = """
     type: command
     short-summary: Rotate certificates and keys on a managed Kubernetes cluster
@@ -28,6 +28,10 @@ logger = get_logger(__name__)
 # type variables
 ManagedCluster = TypeVar("ManagedCluster")
 
+# the C implementations are much faster on large kubeconfig files, but are only there if PyYAML was built with libyaml
+_YamlSafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YamlSafeDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 
 def which(binary):
     path_var = os.getenv('PATH')
@@ -49,9 +53,20 @@ def print_or_merge_credentials(path, kubeconfig, overwrite_existing, context_nam
     """Merge an unencrypted kubeconfig into the file at the specified path, or print it to
     stdout if the path is "-".
     """
-    # Special case for printing to stdout
+    merge_credentials(path, [(kubeconfig, context_name)], overwrite_existing)
+
+
+def merge_credentials(path, kubeconfigs, overwrite_existing):
+    """Merge any number of unencrypted (kubeconfig, context_name) into the file at the specified path,
+    or print them to stdout if the path is "-". The file is read and written once whatever the number
+    of kubeconfigs.
+    """
+    # Special case for printing to stdout, as YAML documents separated by "---"
     if path == "-":
-        print(kubeconfig)
+        for index, (kubeconfig, _) in enumerate(kubeconfigs):
+            if index:
+                print("---")
+            print(kubeconfig)
         return
 
     # ensure that at least an empty ~/.kube/config exists
@@ -66,26 +81,27 @@ def print_or_merge_credentials(path, kubeconfig, overwrite_existing, context_nam
         with os.fdopen(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600), 'wt'):
             pass
 
-    # merge the new kubeconfig into the existing one
-    fd, temp_path = tempfile.mkstemp()
-    additional_file = os.fdopen(fd, 'w+t')
-    try:
-        additional_file.write(kubeconfig)
-        additional_file.flush()
-        _merge_kubernetes_configurations(
-            path, temp_path, overwrite_existing, context_name)
-    except yaml.YAMLError as ex:
-        logger.warning(
-            'Failed to merge credentials to kube config file: %s', ex)
-    finally:
-        additional_file.close()
-        os.remove(temp_path)
+    # merge the new kubeconfigs into the existing one
+    additions = []
+    for kubeconfig, context_name in kubeconfigs:
+        try:
+            additions.append((yaml.load(kubeconfig, Loader=_YamlSafeLoader), context_name))
+        except yaml.YAMLError as ex:
+            logger.warning(
+                'Failed to merge credentials to kube config file: %s', ex)
+    if additions:
+        _merge_kubernetes_configuration_objects(path, additions, overwrite_existing)
 
 
 def _merge_kubernetes_configurations(existing_file, addition_file, replace, context_name=None):
-    existing = _load_kubernetes_configuration(existing_file)
     addition = _load_kubernetes_configuration(addition_file)
+    if addition is None:
+        raise CLIError(
+            'failed to load additional configuration from {}'.format(addition_file))
+    _merge_kubernetes_configuration_objects(existing_file, [(addition, context_name)], replace)
+
 
+def _prepare_kubernetes_configuration(addition, context_name=None):
     if context_name is not None:
         addition['contexts'][0]['name'] = context_name
         addition['contexts'][0]['context']['cluster'] = context_name
@@ -102,17 +118,25 @@ def _merge_kubernetes_configurations(existing_file, addition_file, replace, cont
         except (KeyError, TypeError):
             continue
 
-    if addition is None:
-        raise CLIError(
-            'failed to load additional configuration from {}'.format(addition_file))
 
-    if existing is None:
-        existing = addition
-    else:
-        _handle_merge(existing, addition, 'clusters', replace)
-        _handle_merge(existing, addition, 'users', replace)
-        _handle_merge(existing, addition, 'contexts', replace)
-        existing['current-context'] = addition['current-context']
+def _merge_kubernetes_configuration_objects(existing_file, additions, replace):
+    existing = _load_kubernetes_configuration(existing_file)
+    # index of each key of the existing file, kept up to date as the additions are merged
+    indexes = {}
+    for addition, context_name in additions:
+        if addition is None:
+            raise CLIError('failed to load additional configuration')
+        _prepare_kubernetes_configuration(addition, context_name)
+
+        if existing is None:
+            existing = addition
+        else:
+            _handle_merge(existing, addition, 'clusters', replace, indexes)
+            _handle_merge(existing, addition, 'users', replace, indexes)
+            _handle_merge(existing, addition, 'contexts', replace, indexes)
+            existing['current-context'] = addition['current-context']
+    for key, index in indexes.items():
+        existing[key] = index.items()
 
     # check that ~/.kube/config is only read- and writable by its owner
     if platform.system() != "Windows" and not os.path.islink(existing_file):
@@ -124,19 +148,22 @@ def _merge_kubernetes_configurations(existing_file, addition_file, replace, cont
                 existing_file_perms,
             )
 
-    with open(existing_file, 'w+') as stream:
-        yaml.safe_dump(existing, stream, default_flow_style=False)
+    _write_kubernetes_configuration(existing_file, existing)
 
-    current_context = addition.get('current-context', 'UNKNOWN')
-    msg = 'Merged "{}" as current context in {}'.format(
-        current_context, existing_file)
+    current_context = additions[-1][0].get('current-context', 'UNKNOWN')
+    if len(additions) == 1:
+        msg = 'Merged "{}" as current context in {}'.format(
+            current_context, existing_file)
+    else:
+        msg = 'Merged {} kubeconfigs in {}, "{}" is the current context'.format(
+            len(additions), existing_file, current_context)
     logger.warning(msg)
 
 
 def _load_kubernetes_configuration(filename):
     try:
         with open(filename) as stream:
-            return yaml.safe_load(stream)
+            return yaml.load(stream, Loader=_YamlSafeLoader)
     except (IOError, OSError) as ex:
         if getattr(ex, 'errno', 0) == errno.ENOENT:
             raise CLIError('{} does not exist'.format(filename))
@@ -145,7 +172,51 @@ def _load_kubernetes_configuration(filename):
         raise CLIError('Error parsing {} ({})'.format(filename, str(ex)))
 
 
-def _handle_merge(existing, addition, key, replace):
+def _write_kubernetes_configuration(filename, config):
+    # write next to the file, following a symlink, and swap it in so that a failure never leaves a truncated file
+    target = os.path.realpath(filename)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix='.kubeconfig-')
+    try:
+        with os.fdopen(fd, 'w') as stream:
+            yaml.dump(config, stream, Dumper=_YamlSafeDumper, default_flow_style=False)
+        if platform.system() != "Windows":
+            os.chmod(temp_path, stat.S_IMODE(os.stat(target).st_mode))
+        os.replace(temp_path, target)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+class _NamedItemIndex:
+    """Items of a kubeconfig key (clusters, users or contexts) with their position by name, so merging
+    many additions does not scan the whole list for each one."""
+
+    def __init__(self, items):
+        self._items = list(items)
+        self._positions = {}
+        for position, item in enumerate(self._items):
+            name = item.get('name') if isinstance(item, dict) else None
+            if name:
+                self._positions.setdefault(name, []).append(position)
+
+    def find(self, name):
+        return [self._items[position] for position in self._positions.get(name, [])]
+
+    def remove(self, name):
+        for position in self._positions.pop(name, []):
+            self._items[position] = None
+
+    def append(self, item):
+        name = item.get('name') if isinstance(item, dict) else None
+        if name:
+            self._positions.setdefault(name, []).append(len(self._items))
+        self._items.append(item)
+
+    def items(self):
+        return [item for item in self._items if item is not None]
+
+
+def _handle_merge(existing, addition, key, replace, indexes=None):
     if not addition.get(key, False):
         return
     if key not in existing:
@@ -155,30 +226,37 @@ def _handle_merge(existing, addition, key, replace):
                 key
             )
         )
-    if not existing.get(key):
-        existing[key] = addition[key]
-        return
+    # merging many additions shares the indexes, and only writes the items back into existing at the end
+    shared_indexes = indexes is not None
+    if not shared_indexes:
+        indexes = {}
+    if key not in indexes:
+        if not existing.get(key):
+            existing[key] = addition[key]
+            return
+        indexes[key] = _NamedItemIndex(existing[key])
+    index = indexes[key]
 
     for i in addition[key]:
-        for j in existing[key]:
-            if not i.get('name', False) or not j.get('name', False):
-                continue
-            if i['name'] == j['name']:
-                if replace or i == j:
-                    existing[key].remove(j)
+        name = i.get('name', False)
+        if name and index.find(name):
+            if replace or all(i == j for j in index.find(name)):
+                index.remove(name)
+            else:
+                msg = 'A different object named {} already exists in your kubeconfig file.\nOverwrite?'
+                overwrite = False
+                try:
+                    overwrite = prompt_y_n(msg.format(name))
+                except NoTTYException:
+                    pass
+                if overwrite:
+                    index.remove(name)
                 else:
-                    msg = 'A different object named {} already exists in your kubeconfig file.\nOverwrite?'
-                    overwrite = False
-                    try:
-                        overwrite = prompt_y_n(msg.format(i['name']))
-                    except NoTTYException:
-                        pass
-                    if overwrite:
-                        existing[key].remove(j)
-                    else:
-                        msg = 'A different object named {} already exists in {} in your kubeconfig file.'
-                        raise CLIError(msg.format(i['name'], key))
-        existing[key].append(i)
+                    msg = 'A different object named {} already exists in {} in your kubeconfig file.'
+                    raise CLIError(msg.format(name, key))
+        index.append(i)
+    if not shared_indexes:
+        existing[key] = index.items()
 
 
 def _fuzzy_match(query, arr):
@@ -818,6 +818,19 @@ def load_arguments(self, _):
         c.argument('public_fqdn', default=False, action='store_true')
         c.argument('credential_format', options_list=['--format'], arg_type=get_enum_type(credential_formats))
 
+    with self.argument_context('aks get-credentials-all') as c:
+        c.argument('resource_group_name', required=False,
+                   help='Only get the credentials of the clusters in this resource group. Defaults to every cluster of the subscription.')
+        c.argument('names', options_list=['--names'], nargs='+',
+                   help='Space-separated names of the clusters to get the credentials of. Defaults to all of them.')
+        c.argument('admin', options_list=['--admin', '-a'], default=False)
+        c.argument('user', options_list=[
+                   '--user', '-u'], default='clusterUser', validator=validate_user)
+        c.argument('path', options_list=['--file', '-f'], type=file_type, completer=FilesCompleter(),
+                   default=os.path.join(os.path.expanduser('~'), '.kube', 'config'))
+        c.argument('public_fqdn', default=False, action='store_true')
+        c.argument('credential_format', options_list=['--format'], arg_type=get_enum_type(credential_formats))
+
     with self.argument_context('aks pod-identity') as c:
         c.argument('cluster_name', help='The cluster name.')
         c.argument('aks_custom_headers', help='Send custom headers. When specified, format should be Key1=Value1,Key2=Value2.')
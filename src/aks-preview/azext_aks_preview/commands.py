@@ -144,6 +144,7 @@ def load_command_table(self, _):
         g.custom_command('enable-addons', 'aks_enable_addons', supports_no_wait=True)
         g.custom_command('disable-addons', 'aks_disable_addons', supports_no_wait=True)
         g.custom_command('get-credentials', 'aks_get_credentials')
+        g.custom_command('get-credentials-all', 'aks_get_credentials_all')
         g.custom_command('rotate-certs', 'aks_rotate_certs', supports_no_wait=True,
                          confirmation='Kubernetes will be unavailable during certificate rotation process.\n' +
                          'Are you sure you want to perform this operation?')
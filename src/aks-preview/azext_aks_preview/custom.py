@@ -16,6 +16,8 @@ import threading
 import time
 import uuid
 import webbrowser
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
 from azext_aks_preview._client_factory import (
     CUSTOM_MGMT_AKS_PREVIEW,
@@ -30,6 +32,7 @@ from azext_aks_preview._consts import (
     CONST_ACC_SGX_QUOTE_HELPER_ENABLED,
     CONST_AZURE_KEYVAULT_SECRETS_PROVIDER_ADDON_NAME,
     CONST_CONFCOM_ADDON_NAME,
+    CONST_GET_CREDENTIALS_MAX_WORKERS,
     CONST_INGRESS_APPGW_ADDON_NAME,
     CONST_INGRESS_APPGW_APPLICATION_GATEWAY_ID,
     CONST_INGRESS_APPGW_APPLICATION_GATEWAY_NAME,
@@ -57,6 +60,7 @@ from azext_aks_preview._consts import (
 from azext_aks_preview._helpers import (
     get_cluster_snapshot_by_snapshot_id,
     get_nodepool_snapshot_by_snapshot_id,
+    merge_credentials,
     print_or_merge_credentials,
 )
 from azext_aks_preview._podidentity import (
@@ -849,27 +853,111 @@ def aks_get_credentials(
     aks_custom_headers=None,
 ):
     headers = get_aks_custom_headers(aks_custom_headers)
-    credentialResults = None
-    serverType = None
-    if public_fqdn:
-        serverType = 'public'
     if credential_format:
         credential_format = credential_format.lower()
         if admin:
             raise InvalidArgumentValueError("--format can only be specified when requesting clusterUser credential.")
+    credentialResults = _list_cluster_credentials(
+        client, resource_group_name, name, admin, user, public_fqdn, credential_format, headers)
+    path = _get_kubeconfig_path(path)
+
+    if not credentialResults:
+        raise CLIError("No Kubernetes credentials found.")
+    try:
+        kubeconfig = credentialResults.kubeconfigs[0].value.decode(
+            encoding='UTF-8')
+        print_or_merge_credentials(
+            path, kubeconfig, overwrite_existing, context_name)
+    except (IndexError, ValueError):
+        raise CLIError("Fail to find kubeconfig file.")
+
+
+def aks_get_credentials_all(
+    cmd,  # pylint: disable=unused-argument
+    client,
+    resource_group_name=None,
+    names=None,
+    admin=False,
+    user="clusterUser",
+    path=os.path.join(os.path.expanduser("~"), ".kube", "config"),
+    overwrite_existing=False,
+    public_fqdn=False,
+    credential_format=None,
+    aks_custom_headers=None,
+):
+    from msrestazure.tools import parse_resource_id
+
+    headers = get_aks_custom_headers(aks_custom_headers)
+    if credential_format:
+        credential_format = credential_format.lower()
+        if admin:
+            raise InvalidArgumentValueError("--format can only be specified when requesting clusterUser credential.")
+    if resource_group_name:
+        managed_clusters = client.list_by_resource_group(resource_group_name)
+    else:
+        managed_clusters = client.list()
+    clusters = [(parse_resource_id(mc.id)["resource_group"], mc.name) for mc in managed_clusters]
+    if names:
+        wanted = {n.lower() for n in names}
+        clusters = [c for c in clusters if c[1].lower() in wanted]
+        missing = wanted - {c[1].lower() for c in clusters}
+        if missing:
+            raise CLIError("Managed cluster(s) not found: {}".format(", ".join(sorted(missing))))
+    if not clusters:
+        raise CLIError("No managed cluster found.")
+    path = _get_kubeconfig_path(path)
+
+    def _get_kubeconfig(cluster):
+        credentialResults = _list_cluster_credentials(
+            client, cluster[0], cluster[1], admin, user, public_fqdn, credential_format, headers)
+        try:
+            return credentialResults.kubeconfigs[0].value.decode(encoding='UTF-8')
+        except (AttributeError, IndexError, ValueError) as ex:
+            raise CLIError("Fail to find kubeconfig file.") from ex
+
+    # the kubeconfig of a cluster names its context after the cluster only, so clusters of the same name in
+    # different resource groups get a context named after their resource group too
+    name_counts = Counter(cluster_name.lower() for _, cluster_name in clusters)
+
+    kubeconfigs = []
+    failures = []
+    with ThreadPoolExecutor(max_workers=min(CONST_GET_CREDENTIALS_MAX_WORKERS, len(clusters))) as executor:
+        futures = [(cluster, executor.submit(_get_kubeconfig, cluster)) for cluster in clusters]
+        # merge in the order of the list, so the last cluster listed ends up as the current context
+        for (cluster_rg, cluster_name), future in futures:
+            context_name = None
+            if name_counts[cluster_name.lower()] > 1:
+                context_name = "{}-{}".format(cluster_rg, cluster_name)
+            try:
+                kubeconfigs.append((future.result(), context_name))
+            except Exception as ex:  # pylint: disable=broad-except
+                logger.warning("Failed to get the credentials of %s in %s: %s", cluster_name, cluster_rg, ex)
+                failures.append(cluster_name)
+
+    if kubeconfigs:
+        merge_credentials(path, kubeconfigs, overwrite_existing)
+    if failures:
+        raise CLIError("Failed to get the credentials of {} of {} managed clusters: {}".format(
+            len(failures), len(clusters), ", ".join(failures)))
+
+
+def _list_cluster_credentials(client, resource_group_name, name, admin, user, public_fqdn, credential_format, headers):
+    serverType = None
+    if public_fqdn:
+        serverType = 'public'
     if admin:
-        credentialResults = client.list_cluster_admin_credentials(
+        return client.list_cluster_admin_credentials(
             resource_group_name, name, serverType, headers=headers)
-    else:
-        if user.lower() == 'clusteruser':
-            credentialResults = client.list_cluster_user_credentials(
-                resource_group_name, name, serverType, credential_format, headers=headers)
-        elif user.lower() == 'clustermonitoringuser':
-            credentialResults = client.list_cluster_monitoring_user_credentials(
-                resource_group_name, name, serverType, headers=headers)
-        else:
-            raise InvalidArgumentValueError("The value of option --user is invalid.")
+    if user.lower() == 'clusteruser':
+        return client.list_cluster_user_credentials(
+            resource_group_name, name, serverType, credential_format, headers=headers)
+    if user.lower() == 'clustermonitoringuser':
+        return client.list_cluster_monitoring_user_credentials(
+            resource_group_name, name, serverType, headers=headers)
+    raise InvalidArgumentValueError("The value of option --user is invalid.")
 
+
+def _get_kubeconfig_path(path):
     # Check if KUBECONFIG environmental variable is set
     # If path is different than default then that means -f/--file is passed
     # in which case we ignore the KUBECONFIG variable
@@ -881,16 +969,7 @@ def aks_get_credentials(
             path = kubeconfig_path
         else:
             logger.warning("Invalid path '%s' defined in KUBECONFIG.", kubeconfig_path)
-
-    if not credentialResults:
-        raise CLIError("No Kubernetes credentials found.")
-    try:
-        kubeconfig = credentialResults.kubeconfigs[0].value.decode(
-            encoding='UTF-8')
-        print_or_merge_credentials(
-            path, kubeconfig, overwrite_existing, context_name)
-    except (IndexError, ValueError):
-        raise CLIError("Fail to find kubeconfig file.")
+    return path
 
 
 def aks_scale(cmd,  # pylint: disable=unused-argument
@@ -3,11 +3,19 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import io
+import os
+import shutil
+import tempfile
 import unittest
 from unittest.mock import Mock, patch
 
+import yaml
+from azext_aks_preview import _helpers
 from azext_aks_preview._helpers import (
     _fuzzy_match,
+    _handle_merge,
+    merge_credentials,
     get_cluster_snapshot,
     get_cluster_snapshot_by_snapshot_id,
     get_nodepool_snapshot,
@@ -19,6 +27,22 @@ from azure.cli.core.azclierror import (
     ResourceNotFoundError,
 )
 from azure.core.exceptions import AzureError, HttpResponseError
+from knack.util import CLIError
+
+
+def _kubeconfig(name, server="https://server", admin=False, resource_group=None):
+    user = "{}_{}".format("clusterAdmin" if admin else "clusterUser", name)
+    if resource_group:
+        user = "{}_{}_{}".format("clusterAdmin" if admin else "clusterUser", resource_group, name)
+    return yaml.safe_dump({
+        "apiVersion": "v1",
+        "kind": "Config",
+        "clusters": [{"name": name, "cluster": {"server": server}}],
+        "users": [{"name": user, "user": {"token": "token"}}],
+        "contexts": [{"name": name, "context": {"cluster": name, "user": user}}],
+        "current-context": name,
+        "preferences": {},
+    })
 
 
 class TestFuzzyMatch(unittest.TestCase):
@@ -111,5 +135,87 @@ class GetManagedClusterSnapShotTestCase(unittest.TestCase):
             get_cluster_snapshot("mock_cli_ctx", "test_sub", "mock_rg", "mock_snapshot_name")
 
 
+class MergeCredentialsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "config")
+
+    def _load(self):
+        with open(self.path) as f:
+            return yaml.safe_load(f)
+
+    def test_merge_many_clusters_in_one_write(self):
+        merge_credentials(self.path, [(_kubeconfig("c0"), None)], False)
+        kubeconfigs = [(_kubeconfig("c{}".format(i)), None) for i in range(50)]
+        with patch.object(_helpers, "_write_kubernetes_configuration",
+                          wraps=_helpers._write_kubernetes_configuration) as write:
+            merge_credentials(self.path, kubeconfigs + [(_kubeconfig("c7", admin=True), None)], False)
+        self.assertEqual(write.call_count, 1)
+
+        config = self._load()
+        # an identical entry is replaced, so the cluster of the admin credentials moves to the end
+        self.assertEqual([c["name"] for c in config["clusters"]], ["c{}".format(i) for i in range(50) if i != 7] + ["c7"])
+        self.assertEqual(len(config["users"]), 51)
+        self.assertEqual(config["contexts"][-1]["name"], "c7-admin")
+        self.assertEqual(config["current-context"], "c7-admin")
+
+    def test_conflicts(self):
+        merge_credentials(self.path, [(_kubeconfig("c1"), "ctx")], False)
+        changed = _kubeconfig("c1", server="https://other")
+        with self.assertRaises(CLIError):
+            merge_credentials(self.path, [(changed, "ctx")], False)
+        self.assertEqual(self._load()["clusters"][0]["cluster"]["server"], "https://server")
+
+        merge_credentials(self.path, [(changed, "ctx")], True)
+        config = self._load()
+        self.assertEqual(config["clusters"], [{"name": "ctx", "cluster": {"server": "https://other"}}])
+        self.assertEqual(config["current-context"], "ctx")
+
+    @unittest.skipIf(os.name == "nt", "file modes are not enforced on Windows")
+    def test_file_mode_is_kept(self):
+        merge_credentials(self.path, [(_kubeconfig("c1"), None)], False)
+        os.chmod(self.path, 0o640)
+        merge_credentials(self.path, [(_kubeconfig("c2"), None)], False)
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o640)
+        self.assertEqual(os.listdir(self.directory), ["config"])
+
+    def test_handle_merge_same_object(self):
+        existing = {"users": [{"name": "a", "user": {}}, {"name": "b", "user": {}}]}
+        _handle_merge(existing, {"users": [{"name": "a", "user": {}}, {"user": {}}]}, "users", False)
+        self.assertEqual(existing["users"], [{"name": "b", "user": {}}, {"name": "a", "user": {}}, {"user": {}}])
+
+    def test_print_to_stdout(self):
+        with patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            merge_credentials("-", [(_kubeconfig("c1"), None), (_kubeconfig("c2"), None)], False)
+        documents = list(yaml.safe_load_all(stdout.getvalue()))
+        self.assertEqual([d["clusters"][0]["name"] for d in documents], ["c1", "c2"])
+
+
+    def test_get_credentials_all_of_clusters_with_the_same_name(self):
+        from azext_aks_preview.custom import aks_get_credentials_all
+
+        clusters = [("rg1", "aks"), ("rg2", "aks"), ("rg2", "other")]
+        client = Mock()
+        client.list.return_value = [
+            Mock(id="/subscriptions/sub/resourceGroups/{}/providers/Microsoft.ContainerService/managedClusters/{}"
+                 .format(rg, name)) for rg, name in clusters]
+        for mc, (_, name) in zip(client.list.return_value, clusters):
+            mc.name = name
+        kubeconfigs = {cluster: _kubeconfig(cluster[1], server="https://" + cluster[0], resource_group=cluster[0])
+                       for cluster in clusters}
+
+        def list_credentials(client, resource_group_name, name, *_):
+            return Mock(kubeconfigs=[Mock(value=kubeconfigs[(resource_group_name, name)].encode())])
+
+        with patch("azext_aks_preview.custom._list_cluster_credentials", side_effect=list_credentials):
+            aks_get_credentials_all(None, client, path=self.path)
+        config = self._load()
+        self.assertEqual([c["name"] for c in config["contexts"]], ["rg1-aks", "rg2-aks", "other"])
+        self.assertEqual([c["cluster"]["server"] for c in config["clusters"]],
+                         ["https://rg1", "https://rg2", "https://rg2"])
+        self.assertEqual(config["current-context"], "other")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -13,6 +13,8 @@ ALIAS_HASH_FILE_NAME = 'alias.sha1'
 COLLIDED_ALIAS_FILE_NAME = 'collided_alias'
 ALIAS_TAB_COMP_TABLE_FILE_NAME = 'alias_tab_completion'
 GLOBAL_ALIAS_TAB_COMP_TABLE_PATH = os.path.join(GLOBAL_CONFIG_DIR, ALIAS_TAB_COMP_TABLE_FILE_NAME)
+ALIAS_RESERVED_COMMANDS_FILE_NAME = 'alias_reserved_commands'
+GLOBAL_ALIAS_RESERVED_COMMANDS_PATH = os.path.join(GLOBAL_CONFIG_DIR, ALIAS_RESERVED_COMMANDS_FILE_NAME)
 COLLISION_CHECK_LEVEL_DEPTH = 5
 
 INSUFFICIENT_POS_ARG_ERROR = 'alias: "{}" takes exactly {} positional argument{} ({} given)'
@@ -4,7 +4,6 @@
 # --------------------------------------------------------------------------------------------
 
 import os
-import re
 import json
 import shlex
 import hashlib
@@ -12,7 +11,6 @@ from collections import defaultdict
 
 from knack.log import get_logger
 
-import azext_alias
 from azext_alias import telemetry
 from azext_alias._const import (
     GLOBAL_CONFIG_DIR,
@@ -29,6 +27,7 @@ from azext_alias.util import (
     is_alias_command,
     cache_reserved_commands,
     get_config_parser,
+    get_reserved_words,
     build_tab_completion_table
 )
 
@@ -48,6 +47,10 @@ class AliasManager(object):
         self.collided_alias = defaultdict(list)
         self.alias_config_str = ''
         self.alias_config_hash = ''
+        # True when the alias hash and the collided aliases have to be written after the transformation
+        self.alias_config_changed = False
+        # Map of the aliases and of their first word to their full name, built on the first lookup
+        self.full_aliases = None
         self.load_alias_table()
         self.load_alias_hash()
 
@@ -120,11 +123,13 @@ class AliasManager(object):
         """
         if self.parse_error():
             # Write an empty hash so next run will check the config file against the entire command table again
-            AliasManager.write_alias_config_hash(empty_hash=True)
+            if self.alias_config_hash:
+                AliasManager.write_alias_config_hash(empty_hash=True)
             return args
 
         # Only load the entire command table if it detects changes in the alias config
         if self.detect_alias_config_change():
+            self.alias_config_changed = True
             self.load_full_command_table()
             self.collided_alias = AliasManager.build_collision_table(self.alias_table.sections())
             build_tab_completion_table(self.alias_table)
@@ -177,10 +182,15 @@ class AliasManager(object):
         Returns:
             The full alias (with the placeholders, if any).
         """
-        if query in self.alias_table.sections():
-            return query
+        if self.full_aliases is None:
+            sections = self.alias_table.sections()
+            self.full_aliases = {}
+            # The first alias starting with a word is the one used for that word
+            for section in sections:
+                self.full_aliases.setdefault(section.split()[0], section)
+            self.full_aliases.update((section, section) for section in sections)
 
-        return next((section for section in self.alias_table.sections() if section.split()[0] == query), '')
+        return self.full_aliases.get(query, '')
 
     def load_full_command_table(self):
         """
@@ -193,6 +203,7 @@ class AliasManager(object):
     def post_transform(self, args):
         """
         Inject environment variables, and write hash to alias hash file after transforming alias to commands.
+        Nothing is written when the alias configuration has not changed since the last run.
 
         Args:
             args: A list of args to post-transform.
@@ -208,8 +219,9 @@ class AliasManager(object):
             else:
                 post_transform_commands.append(os.path.expandvars(arg))
 
-        AliasManager.write_alias_config_hash(self.alias_config_hash)
-        AliasManager.write_collided_alias(self.collided_alias)
+        if self.alias_config_changed:
+            AliasManager.write_alias_config_hash(self.alias_config_hash)
+            AliasManager.write_collided_alias(self.collided_alias)
 
         return post_transform_commands
 
@@ -246,14 +258,13 @@ class AliasManager(object):
             levels: the amount of levels we tranverse through the command table tree.
         """
         collided_alias = defaultdict(list)
+        reserved_words = get_reserved_words(levels)
         for alias in aliases:
             # Only care about the first word in the alias because alias
             # cannot have spaces (unless they have positional arguments)
             word = alias.split()[0]
-            for level in range(1, levels + 1):
-                collision_regex = r'^{}{}($|\s)'.format(r'([a-z\-]*\s)' * (level - 1), word.lower())
-                if list(filter(re.compile(collision_regex).match, azext_alias.cached_reserved_commands)) \
-                        and level not in collided_alias[word]:
+            for level, level_words in enumerate(reserved_words, 1):
+                if word.lower() in level_words and level not in collided_alias[word]:
                     collided_alias[word].append(level)
 
         telemetry.set_collided_aliases(list(collided_alias.keys()))
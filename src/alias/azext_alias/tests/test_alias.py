@@ -180,6 +180,27 @@ class TestAlias(unittest.TestCase):
         alias_manager.alias_config_str = ''
         self.assertTrue(alias_manager.detect_alias_config_change())
 
+    def test_get_full_alias(self):
+        alias_manager = self.get_alias_manager()
+        self.assertEqual('cp {{ arg_1 }} {{ arg_2 }}', alias_manager.get_full_alias('cp'))
+        self.assertEqual('pos-arg-1 {{ 0 }} {{ 1 }}', alias_manager.get_full_alias('pos-arg-1 {{ 0 }} {{ 1 }}'))
+        self.assertEqual('ac', alias_manager.get_full_alias('ac'))
+        self.assertEqual('', alias_manager.get_full_alias('account'))
+
+    def test_no_write_when_alias_config_unchanged(self):
+        alias_manager = self.get_alias_manager()
+        alias_manager.transform(['ac', 'list'])
+        azext_alias.alias.AliasManager.write_alias_config_hash.assert_not_called()
+        azext_alias.alias.AliasManager.write_collided_alias.assert_not_called()
+
+        alias_manager = self.get_alias_manager()
+        alias_manager.alias_config_hash = ''
+        with patch('azext_alias.alias.build_tab_completion_table') as build_tab_completion_table:
+            alias_manager.transform(['ac', 'list'])
+        build_tab_completion_table.assert_called_once_with(alias_manager.alias_table)
+        azext_alias.alias.AliasManager.write_alias_config_hash.assert_called_once_with(alias_manager.alias_config_hash)
+        azext_alias.alias.AliasManager.write_collided_alias.assert_called_once_with(alias_manager.collided_alias)
+
     """
     Helper functions
     """
@@ -11,8 +11,11 @@ import tempfile
 import unittest
 from unittest import mock
 
-from azext_alias.util import remove_pos_arg_placeholders, build_tab_completion_table, get_config_parser
-from azext_alias._const import ALIAS_TAB_COMP_TABLE_FILE_NAME
+import azext_alias
+from azext_alias.util import (remove_pos_arg_placeholders, build_tab_completion_table, get_config_parser,
+                              build_reserved_command_trie, walk_reserved_command_trie, get_reserved_words,
+                              cache_reserved_commands)
+from azext_alias._const import ALIAS_TAB_COMP_TABLE_FILE_NAME, ALIAS_RESERVED_COMMANDS_FILE_NAME
 from azext_alias.tests._const import TEST_RESERVED_COMMANDS
 
 
@@ -22,6 +25,7 @@ class TestUtil(unittest.TestCase):
         self.mock_config_dir = tempfile.mkdtemp()
         self.patchers = []
         self.patchers.append(mock.patch('azext_alias.util.GLOBAL_ALIAS_TAB_COMP_TABLE_PATH', os.path.join(self.mock_config_dir, ALIAS_TAB_COMP_TABLE_FILE_NAME)))
+        self.patchers.append(mock.patch('azext_alias.util.GLOBAL_ALIAS_RESERVED_COMMANDS_PATH', os.path.join(self.mock_config_dir, ALIAS_RESERVED_COMMANDS_FILE_NAME)))
         self.patchers.append(mock.patch('azext_alias.cached_reserved_commands', TEST_RESERVED_COMMANDS))
         for patcher in self.patchers:
             patcher.start()
@@ -61,6 +65,40 @@ class TestUtil(unittest.TestCase):
             'account list-locations': ['']
         }, tab_completion_table)
 
+    def test_reserved_command_trie(self):
+        commands = TEST_RESERVED_COMMANDS + ['storage account', 'storage account list']
+        trie = build_reserved_command_trie(commands)
+        self.assertDictEqual({'create': {'': {}}, 'list': {'': {}}, '': {}}, trie['storage']['account'])
+        self.assertEqual(sorted(commands), sorted(walk_reserved_command_trie(trie)))
+
+    def test_get_reserved_words(self):
+        self.assertEqual([{'account', 'network', 'storage', 'group'}, {'list-locations', 'dns', 'account', 'delete'}],
+                         get_reserved_words(levels=2))
+        self.assertEqual({'create'}, get_reserved_words()[2])
+        self.assertEqual(set(), get_reserved_words()[4])
+        # The words are computed again for other reserved commands
+        with mock.patch('azext_alias.cached_reserved_commands', ['vm create']):
+            self.assertEqual([{'vm'}, {'create'}], get_reserved_words(levels=2))
+
+    def test_cache_reserved_commands(self):
+        load_cmd_tbl_func = mock.Mock(return_value={command: None for command in TEST_RESERVED_COMMANDS})
+        with mock.patch('azext_alias.cached_reserved_commands', []), \
+                mock.patch('azext_alias.util.get_command_table_stamp', return_value=['2.0.0', []]):
+            cache_reserved_commands(load_cmd_tbl_func)
+            self.assertEqual(TEST_RESERVED_COMMANDS, azext_alias.cached_reserved_commands)
+            self.assertEqual(1, load_cmd_tbl_func.call_count)
+
+            # The reserved commands persisted are used as long as the command table does not change
+            azext_alias.cached_reserved_commands = []
+            cache_reserved_commands(load_cmd_tbl_func)
+            self.assertEqual(sorted(TEST_RESERVED_COMMANDS), sorted(azext_alias.cached_reserved_commands))
+            self.assertEqual(1, load_cmd_tbl_func.call_count)
+
+        with mock.patch('azext_alias.cached_reserved_commands', []), \
+                mock.patch('azext_alias.util.get_command_table_stamp', return_value=['2.0.0', [['ext', 1.0]]]):
+            cache_reserved_commands(load_cmd_tbl_func)
+            self.assertEqual(2, load_cmd_tbl_func.call_count)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -5,10 +5,12 @@
 
 # pylint: disable=wrong-import-order,import-error,relative-import
 
+import os
 import re
 import sys
 import json
 import shlex
+import tempfile
 from collections import defaultdict
 from six.moves import configparser
 from six.moves.urllib.parse import urlparse
@@ -17,7 +19,18 @@ from six.moves.urllib.request import urlretrieve
 from knack.util import CLIError
 
 import azext_alias
-from azext_alias._const import COLLISION_CHECK_LEVEL_DEPTH, GLOBAL_ALIAS_TAB_COMP_TABLE_PATH, ALIAS_FILE_URL_ERROR
+from azext_alias._const import (
+    COLLISION_CHECK_LEVEL_DEPTH,
+    GLOBAL_ALIAS_TAB_COMP_TABLE_PATH,
+    GLOBAL_ALIAS_RESERVED_COMMANDS_PATH,
+    ALIAS_FILE_URL_ERROR
+)
+
+# Marks the end of a command in the reserved command trie, no command word is empty
+COMMAND_END = ''
+
+# The reserved commands the reserved words were last computed from, and these words
+_reserved_words_cache = {}
 
 
 def get_config_parser():
@@ -76,7 +89,137 @@ def cache_reserved_commands(load_cmd_tbl_func):
         load_cmd_tbl_func: The function to load the entire command table.
     """
     if not azext_alias.cached_reserved_commands:
-        azext_alias.cached_reserved_commands = list(load_cmd_tbl_func([]).keys())
+        stamp = get_command_table_stamp()
+        reserved_commands = load_reserved_commands(stamp)
+        if reserved_commands is None:
+            reserved_commands = list(load_cmd_tbl_func([]).keys())
+            if reserved_commands:
+                write_reserved_commands(reserved_commands, stamp)
+        azext_alias.cached_reserved_commands = reserved_commands
+
+
+def get_command_table_stamp():
+    """
+    Identify the installed command table by the version of the CLI and the installed extensions,
+    so that the reserved commands are loaded again from the command table when either changes.
+
+    Returns:
+        A JSON serializable stamp of the command table.
+    """
+    from azure.cli.core import __version__ as core_version
+    from azure.cli.core.extension import EXTENSIONS_DIR, DEV_EXTENSION_SOURCES
+
+    stamp = [core_version]
+    for extension_dir in [EXTENSIONS_DIR] + list(DEV_EXTENSION_SOURCES):
+        try:
+            # An extension is replaced by a new directory when it is updated
+            stamp.append([[name, os.stat(os.path.join(extension_dir, name)).st_mtime]
+                          for name in sorted(os.listdir(extension_dir))])
+        except OSError:
+            stamp.append(None)
+    return stamp
+
+
+def build_reserved_command_trie(reserved_commands):
+    """
+    Build a trie of the reserved commands, where each level of the trie is a level of the command tree.
+
+    For example, ['account list', 'storage account list'] is stored as:
+    {
+        "account": {"list": {"": {}}},
+        "storage": {"account": {"list": {"": {}}}}
+    }
+
+    Args:
+        reserved_commands: The commands of the command table.
+
+    Returns:
+        The reserved command trie.
+    """
+    trie = {}
+    for command in reserved_commands:
+        node = trie
+        for word in command.split():
+            node = node.setdefault(word, {})
+        node[COMMAND_END] = {}
+    return trie
+
+
+def walk_reserved_command_trie(trie, prefix=''):
+    """
+    Yield the commands stored in a reserved command trie.
+    """
+    for word, children in trie.items():
+        if word == COMMAND_END:
+            yield prefix
+        else:
+            for command in walk_reserved_command_trie(children, prefix + ' ' + word if prefix else word):
+                yield command
+
+
+def load_reserved_commands(stamp):
+    """
+    Load the reserved commands persisted for a command table.
+
+    Args:
+        stamp: The stamp of the current command table.
+
+    Returns:
+        The reserved commands, or None if they were not persisted for this command table.
+    """
+    try:
+        with open(GLOBAL_ALIAS_RESERVED_COMMANDS_PATH, 'r') as reserved_commands_file:
+            persisted = json.loads(reserved_commands_file.read())
+        if persisted['stamp'] == stamp:
+            return list(walk_reserved_command_trie(persisted['trie']))
+    except (IOError, OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+    return None
+
+
+def write_reserved_commands(reserved_commands, stamp):
+    """
+    Persist the reserved commands as a trie, replacing the file at once so that concurrent runs
+    never read a partial file.
+    """
+    persisted = json.dumps({'stamp': stamp, 'trie': build_reserved_command_trie(reserved_commands)})
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(GLOBAL_ALIAS_RESERVED_COMMANDS_PATH),
+                                     prefix=os.path.basename(GLOBAL_ALIAS_RESERVED_COMMANDS_PATH))
+    try:
+        with os.fdopen(fd, 'w') as reserved_commands_file:
+            reserved_commands_file.write(persisted)
+        os.replace(temp_path, GLOBAL_ALIAS_RESERVED_COMMANDS_PATH)
+    except (IOError, OSError):
+        # The reserved commands are loaded from the command table again next time
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def get_reserved_words(levels=COLLISION_CHECK_LEVEL_DEPTH):
+    """
+    Get the reserved words at each level of the command tree, computed once for the cached reserved commands.
+
+    For example, with ['account list', 'storage account list'] and levels=2:
+    [{'account', 'storage'}, {'list', 'account'}]
+
+    Args:
+        levels: the amount of levels we tranverse through the command table tree.
+
+    Returns:
+        A list of sets, the words of level 1 being the first.
+    """
+    reserved_commands = azext_alias.cached_reserved_commands
+    cached = _reserved_words_cache.get(levels)
+    if cached and cached[0] is reserved_commands and cached[1] == len(reserved_commands):
+        return cached[2]
+
+    reserved_words = []
+    nodes = [build_reserved_command_trie(reserved_commands)]
+    for _ in range(levels):
+        reserved_words.append({word for node in nodes for word in node if word != COMMAND_END})
+        nodes = [children for node in nodes for children in node.values() if children]
+    _reserved_words_cache[levels] = (reserved_commands, len(reserved_commands), reserved_words)
+    return reserved_words
 
 
 def remove_pos_arg_placeholders(alias_command):
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Benchmark for the cost the alias hook adds to every az command.
+
+Builds a synthetic command table from a fixed seed and an alias configuration file where some aliases are
+reserved command words, in a temporary configuration directory. Then times, for the previous implementation
+and the current one:
+
+    collision table   building the collided aliases against the whole command table, which happens when the
+                      alias configuration changed
+    hook              transforming the arguments of a command when the alias configuration did not change,
+                      which is what happens before every az command; the alias hash and collided alias files
+                      written are counted
+    reserved commands loading the reserved commands persisted as a trie, instead of loading the command table
+
+    python benchmarks/bench_hook.py
+    python benchmarks/bench_hook.py --commands 20000 --aliases 500 --json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from unittest import mock
+
+CONFIG_DIR = tempfile.mkdtemp()
+# The paths of the alias files are resolved from the configuration directory when azext_alias is imported
+os.environ["AZURE_CONFIG_DIR"] = CONFIG_DIR
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+import azext_alias  # noqa: E402
+from azext_alias import telemetry  # noqa: E402
+from azext_alias._const import COLLISION_CHECK_LEVEL_DEPTH  # noqa: E402
+from azext_alias.alias import AliasManager, GLOBAL_ALIAS_PATH, GLOBAL_ALIAS_HASH_PATH  # noqa: E402
+from azext_alias.util import cache_reserved_commands, is_alias_command  # noqa: E402
+
+VERBS = ["create", "delete", "show", "list", "update", "wait", "start", "stop", "list-locations", "show-status"]
+NOUNS = ["account", "dns", "vnet", "subnet", "disk", "image", "identity", "secret", "key", "certificate", "rule",
+         "policy", "endpoint", "replica", "slot", "backup"]
+
+
+def make_command_table(commands, seed):
+    """`commands` commands in groups nested up to 4 levels, sharing nouns between groups."""
+    rng = random.Random(seed)
+    # Group names without digits, the previous implementation did not detect collisions under such groups
+    top_level = ["group-" + "".join(chr(ord("a") + int(digit)) for digit in str(i))
+                 for i in range(max(1, commands // 50))] + ["account", "network", "storage"]
+    table = {}
+    while len(table) < commands:
+        group = [rng.choice(top_level)] + rng.sample(NOUNS, rng.randrange(4))
+        table[" ".join(group + [rng.choice(VERBS)])] = None
+    return table
+
+
+def make_alias_config(aliases, seed):
+    """`aliases` aliases, one in ten being a reserved command word and one in ten taking positional arguments."""
+    rng = random.Random(seed)
+    sections = {}
+    for i in range(aliases):
+        command = "{} {}".format(rng.choice(["network", "storage", "account"]), rng.choice(VERBS))
+        if i % 10 == 0:
+            sections.setdefault(rng.choice(NOUNS + VERBS), command)
+        elif i % 10 == 1:
+            sections["alias{} {{{{ arg_1 }}}}".format(i)] = command + " -g {{ arg_1 }}"
+        else:
+            sections["alias{}".format(i)] = command
+    return "\n".join("[{}]\ncommand = {}\n".format(name, command) for name, command in sections.items())
+
+
+def legacy_build_collision_table(aliases, levels=COLLISION_CHECK_LEVEL_DEPTH):
+    collided_alias = defaultdict(list)
+    for alias in aliases:
+        word = alias.split()[0]
+        for level in range(1, levels + 1):
+            collision_regex = r'^{}{}($|\s)'.format(r'([a-z\-]*\s)' * (level - 1), word.lower())
+            if list(filter(re.compile(collision_regex).match, azext_alias.cached_reserved_commands)) \
+                    and level not in collided_alias[word]:
+                collided_alias[word].append(level)
+    return collided_alias
+
+
+def legacy_get_full_alias(self, query):
+    if query in self.alias_table.sections():
+        return query
+    return next((section for section in self.alias_table.sections() if section.split()[0] == query), '')
+
+
+def legacy_post_transform(self, args):
+    args = args[1:] if args and args[0] == 'az' else args
+    post_transform_commands = []
+    for i, arg in enumerate(args):
+        if is_alias_command(['create'], args) and i > 0 and args[i - 1] in ['-c', '--command']:
+            post_transform_commands.append(arg)
+        else:
+            post_transform_commands.append(os.path.expandvars(arg))
+    AliasManager.write_alias_config_hash(self.alias_config_hash)
+    AliasManager.write_collided_alias(self.collided_alias)
+    return post_transform_commands
+
+
+def best_of(repeat, func):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def time_hook(invocations, command_lines):
+    """Seconds per command and files written per command of the alias hook, with the current configuration."""
+    writes = []
+    write_hash, write_collided = AliasManager.write_alias_config_hash, AliasManager.write_collided_alias
+
+    def count(write):
+        return lambda *args, **kwargs: writes.append(write(*args, **kwargs))
+
+    with mock.patch.object(AliasManager, "write_alias_config_hash", staticmethod(count(write_hash))), \
+            mock.patch.object(AliasManager, "write_collided_alias", staticmethod(count(write_collided))):
+        start = time.perf_counter()
+        for i in range(invocations):
+            AliasManager().transform(list(command_lines[i % len(command_lines)]))
+        seconds = time.perf_counter() - start
+    return {"seconds per command": seconds / invocations, "files written per command": len(writes) / invocations}
+
+
+def build_collision_table(build, aliases, reserved_commands):
+    # A new list of reserved commands, so that nothing computed from them is reused between runs
+    azext_alias.cached_reserved_commands = list(reserved_commands)
+    return build(aliases)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commands", type=int, default=10000, help="number of commands in the synthetic table")
+    parser.add_argument("--aliases", type=int, default=200, help="number of aliases configured")
+    parser.add_argument("--invocations", type=int, default=200, help="number of commands the hook transforms")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic table and aliases")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs timed, the fastest is kept")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    command_table = make_command_table(args.commands, args.seed)
+    alias_config = make_alias_config(args.aliases, args.seed)
+    with open(GLOBAL_ALIAS_PATH, "w") as alias_file:
+        alias_file.write(alias_config)
+    load_cmd_tbl_func = lambda _: command_table  # noqa: E731
+    # Aliases used in the middle and at the end of the configuration, and a command without alias
+    command_lines = [["alias{}".format(args.aliases // 2 + 2), "-o", "table"],
+                     ["alias{}".format(args.aliases - 1), "--query", "[].name"],
+                     ["network", "dns", "list", "-g", "MyResourceGroup"]]
+    results = {"commands": args.commands, "aliases": args.aliases}
+
+    with mock.patch.object(telemetry, "set_collided_aliases"):
+        cache_reserved_commands(load_cmd_tbl_func)
+        aliases = AliasManager().alias_table.sections()
+        if dict(legacy_build_collision_table(aliases)) != dict(AliasManager.build_collision_table(aliases)):
+            raise SystemExit("The collided aliases are not the ones of the previous implementation")
+        results["collision table"] = {
+            "legacy seconds": best_of(args.repeat, lambda: build_collision_table(
+                legacy_build_collision_table, aliases, command_table)),
+            "seconds": best_of(args.repeat, lambda: build_collision_table(
+                AliasManager.build_collision_table, aliases, command_table))}
+
+    # The first command after the alias configuration changed writes the alias hash and the collided aliases
+    AliasManager(load_cmd_tbl_func=load_cmd_tbl_func).transform(list(command_lines[0]))
+    with open(GLOBAL_ALIAS_HASH_PATH) as hash_file:
+        if hash_file.read() != hashlib.sha1(alias_config.encode("utf-8")).hexdigest():
+            raise SystemExit("The alias hash was not written")
+
+    with mock.patch.object(AliasManager, "get_full_alias", legacy_get_full_alias), \
+            mock.patch.object(AliasManager, "post_transform", legacy_post_transform):
+        legacy = [time_hook(args.invocations, command_lines) for _ in range(args.repeat)]
+    current = [time_hook(args.invocations, command_lines) for _ in range(args.repeat)]
+    results["hook legacy"] = min(legacy, key=lambda run: run["seconds per command"])
+    results["hook"] = min(current, key=lambda run: run["seconds per command"])
+
+    def load_persisted():
+        azext_alias.cached_reserved_commands = []
+        cache_reserved_commands(lambda _: {})
+    results["reserved commands"] = {"persisted seconds": best_of(args.repeat, load_persisted)}
+    if len(azext_alias.cached_reserved_commands) != len(command_table):
+        raise SystemExit("The reserved commands persisted are not the ones of the command table")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print("{} commands, {} aliases".format(args.commands, args.aliases))
+        print("collision table   legacy {:>8.2f} ms   current {:>8.2f} ms".format(
+            results["collision table"]["legacy seconds"] * 1000, results["collision table"]["seconds"] * 1000))
+        print("hook per command  legacy {:>8.3f} ms   current {:>8.3f} ms".format(
+            results["hook legacy"]["seconds per command"] * 1000, results["hook"]["seconds per command"] * 1000))
+        print("files written     legacy {:>8.1f}      current {:>8.1f}".format(
+            results["hook legacy"]["files written per command"], results["hook"]["files written per command"]))
+        print("reserved commands loaded from the persisted trie in {:.2f} ms".format(
+            results["reserved commands"]["persisted seconds"] * 1000))
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        shutil.rmtree(CONFIG_DIR)
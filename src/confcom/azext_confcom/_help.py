@@ -81,6 +81,10 @@ helps[
           type: boolean
           short-summary: 'When enabled, the generated security policy is printed to the command line instead of injected into the input ARM Template'
 
+        - name: --max-workers
+          type: int
+          short-summary: 'Maximum number of images to pull and compute layer hashes for at the same time. Defaults to 4. Lower this value if the system runs out of memory while hashing large images'
+
     examples:
         - name: Input an ARM Template file to inject a base64 encoded Confidential Container Security Policy into the ARM Template
           text: az confcom acipolicygen --template-file "./template.json"
@@ -90,4 +94,47 @@ helps[
           text: az confcom acipolicygen --template-file "./template.json" -s "./output-file.txt" --print-policy
         - name: Input an ARM Template file and use a tar file as the image source instead of the Docker daemon
           text: az confcom acipolicygen --template-file "./template.json" --tar "./image.tar"
+        - name: Input an ARM Template file and pull and hash up to 8 images at the same time
+          text: az confcom acipolicygen --template-file "./template.json" --max-workers 8
+"""
+
+helps[
+    "confcom cache"
+] = """
+    type: group
+    short-summary: Commands to manage the local cache of dmverity layer hashes.
+    long-summary: Layer hashes computed during policy generation are cached by image ID in the Azure CLI configuration directory, so regenerating a policy for an unchanged image does not hash its layers again.
+"""
+
+helps[
+    "confcom cache list"
+] = """
+    type: command
+    short-summary: List the images in the layer hash cache, most recently used first.
+
+    examples:
+        - name: List the cached images
+          text: az confcom cache list -o table
+"""
+
+helps[
+    "confcom cache prune"
+] = """
+    type: command
+    short-summary: Remove images from the layer hash cache. If no option is given, the whole cache is cleared.
+
+    parameters:
+        - name: --max-size
+          type: int
+          short-summary: 'Evict the least recently used images until the cache is at most this many megabytes'
+
+        - name: --older-than
+          type: int
+          short-summary: 'Remove images that have not been used for this many days'
+
+    examples:
+        - name: Clear the layer hash cache
+          text: az confcom cache prune
+        - name: Remove images not used in the last 30 days
+          text: az confcom cache prune --older-than 30
 """
@@ -121,3 +121,26 @@ def load_arguments(self, _):
             required=False,
             help="Print the generated policy in the terminal",
         )
+        c.argument(
+            "max_workers",
+            options_list=("--max-workers",),
+            required=False,
+            type=int,
+            help="Maximum number of images to pull and hash at the same time",
+        )
+
+    with self.argument_context("confcom cache prune") as c:
+        c.argument(
+            "max_size",
+            options_list=("--max-size",),
+            required=False,
+            type=int,
+            help="Evict the least recently used images until the cache is at most this many megabytes",
+        )
+        c.argument(
+            "older_than",
+            options_list=("--older-than",),
+            required=False,
+            type=int,
+            help="Remove images that have not been used for this many days",
+        )
@@ -9,5 +9,9 @@ def load_command_table(self, _):
     with self.command_group("confcom") as g:
         g.custom_command("acipolicygen", "acipolicygen_confcom")
 
+    with self.command_group("confcom cache") as g:
+        g.custom_command("list", "list_layer_cache_confcom")
+        g.custom_command("prune", "prune_layer_cache_confcom")
+
     with self.command_group("confcom"):
         pass
@@ -8,10 +8,12 @@ import sys
 
 from pkg_resources import parse_version
 from knack.log import get_logger
+from azext_confcom import config
 from azext_confcom.config import DEFAULT_REGO_FRAGMENTS
 from azext_confcom import os_util
 from azext_confcom.template_util import pretty_print_func, print_func, str_to_sha256
 from azext_confcom.init_checks import run_initial_docker_checks
+from azext_confcom.layer_cache import LayerHashCache
 from azext_confcom.template_util import inject_policy_into_template, print_existing_policy_from_arm_template
 from azext_confcom import security_policy
 from azext_confcom.security_policy import OutputType
@@ -37,6 +39,7 @@ def acipolicygen_confcom(
     print_policy_to_terminal: bool = False,
     disable_stdio: bool = False,
     print_existing_policy: bool = False,
+    max_workers: int = config.DEFAULT_MAX_WORKERS,
 ):
 
     if sum(map(bool, [input_path, arm_template, image_name])) != 1:
@@ -51,6 +54,8 @@ def acipolicygen_confcom(
         )
     elif save_to_file and arm_template and not (print_policy_to_terminal or outraw or outraw_pretty_print):
         error_out("Must print policy to terminal when saving to file")
+    elif max_workers is not None and max_workers < 1:
+        error_out("--max-workers must be a positive integer")
 
     if print_existing_policy:
         print_existing_policy_from_arm_template(arm_template, arm_template_parameters)
@@ -108,7 +113,7 @@ def acipolicygen_confcom(
 
     for count, policy in enumerate(container_group_policies):
         policy.populate_policy_content_for_all_images(
-            individual_image=bool(image_name), tar_mapping=tar_mapping
+            individual_image=bool(image_name), tar_mapping=tar_mapping, max_workers=max_workers
         )
 
         if validate_sidecar:
@@ -140,6 +145,24 @@ def acipolicygen_confcom(
     sys.exit(exit_code)
 
 
+def list_layer_cache_confcom():
+    return LayerHashCache().list()
+
+
+def prune_layer_cache_confcom(max_size: int = None, older_than: int = None):
+    if max_size is not None and max_size < 0:
+        error_out("--max-size must not be negative")
+    if older_than is not None and older_than < 0:
+        error_out("--older-than must not be negative")
+
+    pruned = LayerHashCache().prune(
+        max_size=max_size * 1024 * 1024 if max_size is not None else None,
+        older_than=older_than * 24 * 60 * 60 if older_than is not None else None,
+    )
+    logger.warning("Removed %d image(s) from the layer hash cache", len(pruned))
+    return pruned
+
+
 def update_confcom(cmd, instance, tags=None):
     with cmd.update_context(instance) as c:
         c.set_param("tags", tags)
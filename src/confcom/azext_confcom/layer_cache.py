@@ -0,0 +1,163 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import List, Dict, Any
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+# bump this whenever the format of the cache file or of the stored layer hashes changes.
+# a cache written with a different version is thrown away instead of being trusted
+LAYER_CACHE_VERSION = 1
+LAYER_CACHE_FILE_NAME = "layer_cache.json"
+# default upper bound on the size of the cache file before the least recently used images are evicted
+DEFAULT_LAYER_CACHE_MAX_SIZE = 10 * 1024 * 1024
+
+
+def get_default_cache_dir() -> str:
+    config_dir = os.getenv("AZURE_CONFIG_DIR") or os.path.expanduser(os.path.join("~", ".azure"))
+    return os.path.join(config_dir, "confcom")
+
+
+class LayerHashCache:
+    """Persistent cache of dmverity layer hashes.
+
+    Entries are keyed by the image ID, which is the digest of the image config. The config
+    lists the digests of every layer, so a re-pushed tag gets a new image ID and can never
+    be answered with the layer hashes of the image it replaced."""
+
+    def __init__(self, cache_dir: str = None, max_size: int = DEFAULT_LAYER_CACHE_MAX_SIZE) -> None:
+        self.cache_dir = cache_dir or get_default_cache_dir()
+        self.cache_path = os.path.join(self.cache_dir, LAYER_CACHE_FILE_NAME)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = self._read()
+        self._dirty = False
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            logger.warning("Layer hash cache at %s is unreadable and will be rebuilt", self.cache_path)
+            return {}
+
+        if not isinstance(raw, dict) or raw.get("version") != LAYER_CACHE_VERSION:
+            return {}
+        entries = raw.get("images")
+        return entries if isinstance(entries, dict) else {}
+
+    def _write(self) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # write to a temp file and swap it in so concurrent runs never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".layer_cache", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": LAYER_CACHE_VERSION, "images": self._entries}, f, sort_keys=True)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning("Unable to save layer hash cache to %s: %s", self.cache_path, e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def _entry_size(image_id: str, entry: Dict[str, Any]) -> int:
+        return len(image_id) + len(json.dumps(entry))
+
+    def get(self, image_id: str) -> List[str]:
+        if not image_id:
+            return None
+        with self._lock:
+            entry = self._entries.get(image_id)
+            if not entry:
+                return None
+            entry["last_used"] = time.time()
+            self._dirty = True
+            return list(entry["layers"])
+
+    def put(self, image_id: str, image_name: str, layers: List[str]) -> None:
+        if not image_id or not layers:
+            return
+        with self._lock:
+            self._entries[image_id] = {
+                "image": image_name,
+                "layers": list(layers),
+                "last_used": time.time(),
+            }
+            self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            # merge with whatever other runs have written since we loaded the cache,
+            # keeping the most recent use of each image
+            merged = self._read()
+            for image_id, entry in self._entries.items():
+                existing = merged.get(image_id)
+                if not existing or existing.get("last_used", 0) <= entry.get("last_used", 0):
+                    merged[image_id] = entry
+            self._entries = merged
+            self._evict(self.max_size)
+            self._write()
+            self._dirty = False
+
+    def _evict(self, max_size: int) -> List[str]:
+        evicted = []
+        size = sum(self._entry_size(k, v) for k, v in self._entries.items())
+        # least recently used first
+        for image_id, entry in sorted(self._entries.items(), key=lambda item: item[1].get("last_used", 0)):
+            if size <= max_size:
+                break
+            size -= self._entry_size(image_id, entry)
+            evicted.append(image_id)
+        for image_id in evicted:
+            del self._entries[image_id]
+        return evicted
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "imageId": image_id,
+                    "image": entry.get("image"),
+                    "layers": len(entry.get("layers", [])),
+                    "lastUsed": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(entry.get("last_used", 0))),
+                    "size": self._entry_size(image_id, entry),
+                }
+                for image_id, entry in sorted(
+                    self._entries.items(), key=lambda item: item[1].get("last_used", 0), reverse=True
+                )
+            ]
+
+    def prune(self, max_size: int = None, older_than: float = None) -> List[str]:
+        """Remove entries unused for more than `older_than` seconds, then evict the least
+        recently used entries until the cache fits in `max_size` bytes. With neither given,
+        the whole cache is cleared. Returns the image IDs that were removed."""
+        with self._lock:
+            self._entries = self._read()
+            if max_size is None and older_than is None:
+                pruned = list(self._entries)
+                self._entries = {}
+            else:
+                pruned = []
+                if older_than is not None:
+                    cutoff = time.time() - older_than
+                    pruned = [k for k, v in self._entries.items() if v.get("last_used", 0) < cutoff]
+                    for image_id in pruned:
+                        del self._entries[image_id]
+                if max_size is not None:
+                    pruned += self._evict(max_size)
+            if pruned:
+                self._write()
+            self._dirty = False
+            return pruned
@@ -7,7 +7,10 @@ import base64
 import binascii
 import json
 import os
-from tarfile import TarFile
+from typing import Tuple
+from hashlib import sha256
+import tarfile
+import threading
 from azext_confcom.errors import (
     eprint,
 )
@@ -87,47 +90,98 @@ def load_tar_mapping_from_file(path: str) -> dict:
     return raw_json
 
 
-def map_image_from_tar(image_name: str, tar: TarFile, tar_location: str):
-    tar_dir = os.path.dirname(tar_location)
-    # grab all files in the folder and only take the one that's named with hex values and a json extension
-    members = tar.getmembers()
-    info_file_name = [
-        file
-        for file in members
-        if file.name.endswith(".json") and not file.name.startswith("manifest")
-    ]
-    info_file = None
-    # if there's more than one image in the tarball, we need to do some more logic
-    if len(info_file_name) > 0:
-        # extract just the manifest file and see if any of the RepoTags match the image_name we're searching for
-        # the manifest.json should have a list of all the image tags
-        # and what json files they map to to get env vars, startup cmd, etc.
-        tar.extract("manifest.json", path=tar_dir)
-        manifest_path = os.path.join(tar_dir, "manifest.json")
-        manifest = load_json_from_file(manifest_path)
-        # if we match a RepoTag to the image, stop searching
-        for image in manifest:
-            if image_name in image.get("RepoTags"):
-                info_file = [
-                    item for item in info_file_name if item.name == image.get("Config")
-                ][0]
-                break
-        # remove the extracted manifest file to clean up
-        os.remove(manifest_path)
-    else:
-        eprint(f"Tarball at {tar_location} contains no images")
-
-    if not info_file:
-        return None
-    tar.extract(info_file.name, path=tar_dir)
-
-    # get the path of the json file and read it in
-    image_info_file_path = os.path.join(tar_dir, info_file.name)
-    image_info_raw = load_json_from_file(image_info_file_path)
-    # delete the extracted json file to clean up
-    os.remove(image_info_file_path)
-    image_info = image_info_raw.get("config")
-    # importing the constant from config.py gives a circular dependency error
-    image_info["Architecture"] = image_info_raw.get("architecture")
-
-    return image_info
+class TarImageIndex:
+    """Index of a tarball made by `docker save`, built with a single pass over the archive.
+
+    Member headers and the parsed manifest are kept so image config blobs can be read
+    directly from their offset, without scanning the archive or extracting to disk again."""
+
+    # members at most this size are kept in memory when the archive is compressed and can't be seeked into
+    MAX_BUFFERED_MEMBER_SIZE = 1024 * 1024
+
+    def __init__(self, tar_location: str) -> None:
+        self.tar_location = tar_location
+        self.members = {}
+        self._buffered = {}
+        self._compressed = False
+        try:
+            tar = tarfile.open(tar_location, "r:")
+        except tarfile.ReadError:
+            self._compressed = True
+            tar = tarfile.open(tar_location, "r:*")
+        with tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                name = self._normalize(member.name)
+                self.members[name] = member
+                # offsets are into the decompressed stream, so buffer the small members
+                # (manifest and configs) while we're passing over them
+                if self._compressed and member.size <= self.MAX_BUFFERED_MEMBER_SIZE:
+                    self._buffered[name] = tar.extractfile(member).read()
+
+        self.manifest = []
+        if "manifest.json" in self.members:
+            self.manifest = load_json_from_str(self.read_member("manifest.json").decode("utf-8")) or []
+
+        # map each tag to the config it points at so lookups don't search the manifest
+        self.tags = {}
+        for image in self.manifest:
+            for repo_tag in image.get("RepoTags") or []:
+                self.tags.setdefault(repo_tag, image.get("Config"))
+
+    @staticmethod
+    def _normalize(name: str) -> str:
+        return name[2:] if name.startswith("./") else name
+
+    def read_member(self, name: str) -> bytes:
+        name = self._normalize(name)
+        if name in self._buffered:
+            return self._buffered[name]
+        member = self.members[name]
+        if self._compressed:
+            with tarfile.open(self.tar_location, "r:*") as tar:
+                return tar.extractfile(member).read()
+        # open a new handle per read so the index can be shared between threads
+        with open(self.tar_location, "rb") as f:
+            f.seek(member.offset_data)
+            return f.read(member.size)
+
+    def get_image_info(self, image_name: str) -> Tuple[dict, str]:
+        if not self.manifest:
+            eprint(f"Tarball at {self.tar_location} contains no images")
+
+        config_name = self.tags.get(image_name)
+        if not config_name or self._normalize(config_name) not in self.members:
+            return None, None
+
+        image_info_bytes = self.read_member(config_name)
+        image_info_raw = load_json_from_str(image_info_bytes.decode("utf-8"))
+        # the image ID is the digest of the config file, same as what the docker daemon reports
+        image_id = "sha256:" + sha256(image_info_bytes).hexdigest()
+        image_info = image_info_raw.get("config")
+        # importing the constant from config.py gives a circular dependency error
+        image_info["Architecture"] = image_info_raw.get("architecture")
+
+        return image_info, image_id
+
+
+# tarballs are indexed once and shared across all images in the policy run
+_tar_indexes = {}
+_tar_indexes_lock = threading.Lock()
+
+
+def get_tar_index(tar_location: str) -> TarImageIndex:
+    path = os.path.realpath(tar_location)
+    stat_result = os.stat(path)
+    key = (path, stat_result.st_size, stat_result.st_mtime_ns)
+    with _tar_indexes_lock:
+        index = _tar_indexes.get(key)
+        if index is None:
+            index = TarImageIndex(tar_location)
+            _tar_indexes[key] = index
+    return index
+
+
+def map_image_from_tar(image_name: str, tar_location: str) -> Tuple[dict, str]:
+    return get_tar_index(tar_location).get_image_info(image_name)
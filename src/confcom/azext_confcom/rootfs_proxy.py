@@ -9,11 +9,13 @@ from typing import List
 import os
 import sys
 import stat
+import threading
 from pathlib import Path
 import platform
 import requests
 from knack.log import get_logger
 from azext_confcom.errors import eprint
+from azext_confcom.layer_cache import LayerHashCache
 
 
 host_os = platform.system()
@@ -24,6 +26,12 @@ logger = get_logger(__name__)
 class SecurityPolicyProxy:  # pylint: disable=too-few-public-methods
     # static variable to cache layer hashes between container groups
     layer_cache = {}
+    # images can be hashed from several workers at once, so make sure
+    # each image is only handed to dmverity-vhd a single time
+    _layer_cache_lock = threading.Lock()
+    _image_locks = {}
+    # on-disk cache keyed by image ID so layer hashes survive between runs
+    persistent_layer_cache = None
 
     @staticmethod
     def download_binaries():
@@ -87,14 +95,42 @@ class SecurityPolicyProxy:  # pylint: disable=too-few-public-methods
             st = os.stat(self.policy_bin)
             os.chmod(self.policy_bin, st.st_mode | stat.S_IXUSR)
 
+    @classmethod
+    def get_persistent_layer_cache(cls) -> LayerHashCache:
+        with cls._layer_cache_lock:
+            if cls.persistent_layer_cache is None:
+                cls.persistent_layer_cache = LayerHashCache()
+        return cls.persistent_layer_cache
+
+    @classmethod
+    def save_layer_cache(cls) -> None:
+        if cls.persistent_layer_cache is not None:
+            cls.persistent_layer_cache.save()
+
     def get_policy_image_layers(
-        self, image: str, tag: str, tar_location: str = ""
+        self, image: str, tag: str, tar_location: str = "", image_id: str = None
     ) -> List[str]:
         image_name = f"{image}:{tag}"
+        with self._layer_cache_lock:
+            image_lock = self._image_locks.setdefault(image_name, threading.Lock())
+
+        with image_lock:
+            return self._get_policy_image_layers(image_name, tar_location, image_id)
+
+    def _get_policy_image_layers(self, image_name: str, tar_location: str, image_id: str = None) -> List[str]:
         # populate layer info
         if self.layer_cache.get(image_name):
             return self.layer_cache.get(image_name)
 
+        # the image ID is the digest of the image config, so a hit here is for the exact same layers
+        # even if the tag has since been pushed again
+        if image_id:
+            output = self.get_persistent_layer_cache().get(image_id)
+            if output:
+                logger.info("Using cached layer hashes for %s (%s)", image_name, image_id)
+                self.layer_cache[image_name] = output
+                return output
+
         policy_bin_str = str(self.policy_bin)
 
         arg_list = [
@@ -137,4 +173,6 @@ class SecurityPolicyProxy:  # pylint: disable=too-few-public-methods
 
         # cache output layers
         self.layer_cache[image_name] = output
+        if image_id:
+            self.get_persistent_layer_cache().put(image_id, image_name, output)
         return output
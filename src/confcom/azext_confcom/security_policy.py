@@ -6,6 +6,7 @@
 import json
 import warnings
 import copy
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, List, Dict, Tuple
 from enum import Enum, auto
 import docker
@@ -350,18 +351,14 @@ class AciPolicy:  # pylint: disable=too-many-instance-attributes
             return pretty_print_func(policy)
         return print_func(policy)
 
-    # pylint: disable=R0914, R0915
     def populate_policy_content_for_all_images(
-        self, individual_image=False, tar_mapping=None
+        self, individual_image=False, tar_mapping=None, max_workers=config.DEFAULT_MAX_WORKERS
     ) -> None:
         # suppress warning which will break the progress bar
         warnings.filterwarnings(
             action="ignore", message="unclosed", category=ResourceWarning
         )
 
-        tar_location = ""
-        if isinstance(tar_mapping, str):
-            tar_location = tar_mapping
         proxy = self._get_rootfs_proxy()
         container_images = self.get_images()
 
@@ -376,109 +373,139 @@ class AciPolicy:  # pylint: disable=too-many-instance-attributes
             colour="green",
             leave=True,
         ) as progress:
-            # make a message queue so we don't interrupt the printing of the
-            # progress bar
-            message_queue = []
-            # populate regular container images(s)
-            for image in container_images:
-                image.parse_all_parameters_and_variables(AciPolicy.all_params, AciPolicy.all_vars)
-                image_name = f"{image.base}:{image.tag}"
-                image_info, tar = get_image_info(progress, message_queue, tar_mapping, image)
-
-                # verify and populate the working directory property
-                if not image.get_working_dir() and image_info:
-                    workingDir = image_info.get("WorkingDir")
-                    image.set_working_dir(
-                        workingDir if workingDir else config.DEFAULT_WORKING_DIR
+            # make a message queue per image so we don't interrupt the printing of the
+            # progress bar and the messages come out in template order regardless of
+            # which worker finishes first
+            message_queues = [[] for _ in container_images]
+            # pulling images and computing layer hashes are I/O and subprocess bound,
+            # so populate the images with a bounded pool of workers. each worker only
+            # mutates its own image so the generated policy stays deterministic
+            with ThreadPoolExecutor(max_workers=max(1, max_workers or 1)) as executor:
+                futures = [
+                    executor.submit(
+                        self._populate_policy_content_for_image,
+                        image,
+                        proxy,
+                        progress,
+                        message_queue,
+                        individual_image,
+                        tar_mapping,
                     )
-
-                if (
-                    isinstance(image, UserContainerImage) or individual_image
-                ) and image_info:
-                    # verify and populate the startup command
-                    if not image.get_command():
-                        # precondition: image_info exists. this is shown by the
-                        # "and image_info" earlier
-                        command = image_info.get("Cmd")
-
-                        # since we don't have an entrypoint field,
-                        # it needs to be added to the front of the command
-                        # array
-                        entrypoint = image_info.get("Entrypoint")
-                        if entrypoint and command:
-                            command = entrypoint + command
-                        elif entrypoint and not command:
-                            command = entrypoint
-                        image.set_command(command)
-
-                    # merge envs for user container image
-                    envs = image_info.get("Env")
-                    env_names = [
-                        env_var[
-                            config.POLICY_FIELD_CONTAINERS_ELEMENTS_ENVS_RULE
-                        ].split("=")[0]
-                        for env_var in image.get_environment_rules()
-                    ]
-
-                    for env in envs:
-                        name, value = env.split("=", 1)
-                        # when user set environment variables conflict with the ones read from image, always
-                        # keep user set environment variables
-                        if name not in env_names:
-                            image.get_environment_rules().append(
-                                {
-                                    config.POLICY_FIELD_CONTAINERS_ELEMENTS_ENVS_RULE: f"{name}={value}",
-                                    config.POLICY_FIELD_CONTAINERS_ELEMENTS_ENVS_STRATEGY: "string",
-                                    config.POLICY_FIELD_CONTAINERS_ELEMENTS_REQUIRED: False,
-                                }
-                            )
-
-                    # merge signals for user container image
-                    signals = image_info.get("StopSignal")
-                    if signals:
-                        image.set_signals(signals)
-
-                    if (deepdiff.DeepDiff(image.get_user(), config.DEFAULT_USER, ignore_order=True) == {}
-                            and image_info.get("User") != ""):
-                        # valid values are in the form "user", "user:group", "uid", "uid:gid", "user:gid", "uid:group"
-                        # where each entry is either a string or an unsigned integer
-                        # "" means any user (use default)
-                        # TO-DO figure out why groups is a list
-                        user = copy.deepcopy(config.DEFAULT_USER)
-                        parts = image_info.get("User").split(":", 1)
-
-                        strategy = ["name", "name"]
-                        if parts[0].isdigit():
-                            strategy[0] = "id"
-                        user[config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_USER_IDNAME] = {
-                            config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_PATTERN: parts[0],
-                            config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_STRATEGY: strategy[0]
-                        }
-                        if len(parts) == 2:
-                            # group also specified
-                            if parts[1].isdigit():
-                                strategy[1] = "id"
-                            user[config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_GROUP_IDNAMES][0] = {
-                                config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_PATTERN: parts[1],
-                                config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_STRATEGY: strategy[1]
-                            }
-                        image.set_user(user)
-
-                # populate tar location
-                if isinstance(tar_mapping, dict):
-                    tar_location = get_tar_location_from_mapping(tar_mapping, image_name)
-                # populate layer info
-                image.set_layers(proxy.get_policy_image_layers(
-                    image.base, image.tag, tar_location=tar_location if tar else ""
-                ))
-
-                progress.update()
+                    for image, message_queue in zip(container_images, message_queues)
+                ]
+                # re-raise the first failure (including eprint's SystemExit) in template order
+                for future in futures:
+                    future.result()
+            # persist newly computed layer hashes for the next run
+            proxy.save_layer_cache()
             progress.close()
             self.close()
 
             # unload the message queue
-            for message in message_queue:
-                logger.warning(message)
+            for message_queue in message_queues:
+                for message in message_queue:
+                    logger.warning(message)
+
+    # pylint: disable=R0914, R0915
+    def _populate_policy_content_for_image(
+        self, image, proxy, progress, message_queue, individual_image=False, tar_mapping=None
+    ) -> None:
+        tar_location = ""
+        if isinstance(tar_mapping, str):
+            tar_location = tar_mapping
+
+        image.parse_all_parameters_and_variables(AciPolicy.all_params, AciPolicy.all_vars)
+        image_name = f"{image.base}:{image.tag}"
+        image_info, tar, image_id = get_image_info(progress, message_queue, tar_mapping, image)
+
+        # verify and populate the working directory property
+        if not image.get_working_dir() and image_info:
+            workingDir = image_info.get("WorkingDir")
+            image.set_working_dir(
+                workingDir if workingDir else config.DEFAULT_WORKING_DIR
+            )
+
+        if (
+            isinstance(image, UserContainerImage) or individual_image
+        ) and image_info:
+            # verify and populate the startup command
+            if not image.get_command():
+                # precondition: image_info exists. this is shown by the
+                # "and image_info" earlier
+                command = image_info.get("Cmd")
+
+                # since we don't have an entrypoint field,
+                # it needs to be added to the front of the command
+                # array
+                entrypoint = image_info.get("Entrypoint")
+                if entrypoint and command:
+                    command = entrypoint + command
+                elif entrypoint and not command:
+                    command = entrypoint
+                image.set_command(command)
+
+            # merge envs for user container image
+            envs = image_info.get("Env")
+            env_names = [
+                env_var[
+                    config.POLICY_FIELD_CONTAINERS_ELEMENTS_ENVS_RULE
+                ].split("=")[0]
+                for env_var in image.get_environment_rules()
+            ]
+
+            for env in envs:
+                name, value = env.split("=", 1)
+                # when user set environment variables conflict with the ones read from image, always
+                # keep user set environment variables
+                if name not in env_names:
+                    image.get_environment_rules().append(
+                        {
+                            config.POLICY_FIELD_CONTAINERS_ELEMENTS_ENVS_RULE: f"{name}={value}",
+                            config.POLICY_FIELD_CONTAINERS_ELEMENTS_ENVS_STRATEGY: "string",
+                            config.POLICY_FIELD_CONTAINERS_ELEMENTS_REQUIRED: False,
+                        }
+                    )
+
+            # merge signals for user container image
+            signals = image_info.get("StopSignal")
+            if signals:
+                image.set_signals(signals)
+
+            if (deepdiff.DeepDiff(image.get_user(), config.DEFAULT_USER, ignore_order=True) == {}
+                    and image_info.get("User") != ""):
+                # valid values are in the form "user", "user:group", "uid", "uid:gid", "user:gid", "uid:group"
+                # where each entry is either a string or an unsigned integer
+                # "" means any user (use default)
+                # TO-DO figure out why groups is a list
+                user = copy.deepcopy(config.DEFAULT_USER)
+                parts = image_info.get("User").split(":", 1)
+
+                strategy = ["name", "name"]
+                if parts[0].isdigit():
+                    strategy[0] = "id"
+                user[config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_USER_IDNAME] = {
+                    config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_PATTERN: parts[0],
+                    config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_STRATEGY: strategy[0]
+                }
+                if len(parts) == 2:
+                    # group also specified
+                    if parts[1].isdigit():
+                        strategy[1] = "id"
+                    user[config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_GROUP_IDNAMES][0] = {
+                        config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_PATTERN: parts[1],
+                        config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_STRATEGY: strategy[1]
+                    }
+                image.set_user(user)
+
+        # populate tar location
+        if isinstance(tar_mapping, dict):
+            tar_location = get_tar_location_from_mapping(tar_mapping, image_name)
+        # populate layer info
+        image.set_layers(proxy.get_policy_image_layers(
+            image.base, image.tag, tar_location=tar_location if tar else "", image_id=image_id
+        ))
+
+        progress.update()
 
     def get_images(self) -> List[ContainerImage]:
         return self._images
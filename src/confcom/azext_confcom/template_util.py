@@ -6,7 +6,6 @@
 import re
 import json
 import copy
-import tarfile
 from typing import Any, Tuple, Dict, List
 from hashlib import sha256
 import deepdiff
@@ -62,6 +61,7 @@ def image_has_hash(image: str) -> bool:
 
 def get_image_info(progress, message_queue, tar_mapping, image):
     image_info = None
+    image_id = None
     raw_image = None
     tar = False
     if not image.base:
@@ -79,14 +79,13 @@ def get_image_info(progress, message_queue, tar_mapping, image):
         tar_location = get_tar_location_from_mapping(tar_mapping, image_name)
         # if we have a tar location, we can try to get the image info
         if tar_location:
-            with tarfile.open(tar_location) as tar:
-                # get all the info out of the tarfile
-                image_info = os_util.map_image_from_tar(
-                    image_name, tar, tar_location
-                )
-                if image_info is not None:
-                    tar = True
-                    message_queue.append(f"{image_name} read from local tar file")
+            # get all the info out of the tarfile
+            image_info, image_id = os_util.map_image_from_tar(
+                image_name, tar_location
+            )
+            if image_info is not None:
+                tar = True
+                message_queue.append(f"{image_name} read from local tar file")
 
     # see if we have the image locally so we can have a
     # 'clean-room'
@@ -95,6 +94,7 @@ def get_image_info(progress, message_queue, tar_mapping, image):
             client = DockerClient().get_client()
             raw_image = client.images.get(image_name)
             image_info = raw_image.attrs.get("Config")
+            image_id = raw_image.id
             message_queue.append(
                 f"Using local version of {image_name}. It may differ from the remote image"
             )
@@ -115,6 +115,7 @@ def get_image_info(progress, message_queue, tar_mapping, image):
             if not raw_image:
                 raw_image = client.images.pull(image_name)
                 image_info = raw_image.attrs.get("Config")
+                image_id = raw_image.id
         except (docker.errors.ImageNotFound, docker.errors.NotFound):
             progress.close()
             eprint(
@@ -148,7 +149,7 @@ def get_image_info(progress, message_queue, tar_mapping, image):
             + f"Only {config.ACI_FIELD_CONTAINERS_ARCHITECTURE_VALUE} is supported by Confidential ACI"
         )
 
-    return image_info, tar
+    return image_info, tar, image_id
 
 
 def get_tar_location_from_mapping(tar_mapping: Any, image_name: str) -> str:
@@ -0,0 +1,75 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from azext_confcom.layer_cache import LayerHashCache, LAYER_CACHE_FILE_NAME
+
+
+class LayerHashCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_persisted_between_instances(self):
+        cache = LayerHashCache(cache_dir=self.cache_dir)
+        cache.put("sha256:aaaa", "alpine:3.16", ["hash1", "hash2"])
+        cache.save()
+
+        new_cache = LayerHashCache(cache_dir=self.cache_dir)
+        self.assertEqual(new_cache.get("sha256:aaaa"), ["hash1", "hash2"])
+        # a re-pushed tag has a different image ID and must not hit
+        self.assertIsNone(new_cache.get("sha256:bbbb"))
+
+    def test_version_mismatch_discards_cache(self):
+        with open(os.path.join(self.cache_dir, LAYER_CACHE_FILE_NAME), "w", encoding="utf-8") as f:
+            json.dump({"version": -1, "images": {"sha256:aaaa": {"layers": ["hash1"]}}}, f)
+
+        cache = LayerHashCache(cache_dir=self.cache_dir)
+        self.assertIsNone(cache.get("sha256:aaaa"))
+
+    def test_lru_eviction(self):
+        cache = LayerHashCache(cache_dir=self.cache_dir, max_size=400)
+        for i in range(5):
+            cache.put(f"sha256:{i}", f"image:{i}", [f"{i}" * 64])
+        # touch the oldest image so it becomes the most recently used
+        cache.get("sha256:0")
+        cache.save()
+
+        ids = [entry["imageId"] for entry in LayerHashCache(cache_dir=self.cache_dir).list()]
+        self.assertEqual(ids[0], "sha256:0")
+        self.assertNotIn("sha256:1", ids)
+        self.assertLess(len(ids), 5)
+
+    def test_merge_concurrent_writers(self):
+        first = LayerHashCache(cache_dir=self.cache_dir)
+        second = LayerHashCache(cache_dir=self.cache_dir)
+        first.put("sha256:aaaa", "alpine:3.16", ["hash1"])
+        second.put("sha256:bbbb", "alpine:3.17", ["hash2"])
+        first.save()
+        second.save()
+
+        cache = LayerHashCache(cache_dir=self.cache_dir)
+        self.assertEqual(cache.get("sha256:aaaa"), ["hash1"])
+        self.assertEqual(cache.get("sha256:bbbb"), ["hash2"])
+
+    def test_prune(self):
+        cache = LayerHashCache(cache_dir=self.cache_dir)
+        cache.put("sha256:aaaa", "alpine:3.16", ["hash1"])
+        cache.save()
+
+        self.assertEqual(cache.prune(older_than=60), [])
+        self.assertEqual(cache.prune(older_than=-60), ["sha256:aaaa"])
+
+        cache.put("sha256:bbbb", "alpine:3.17", ["hash2"])
+        cache.save()
+        self.assertEqual(cache.prune(), ["sha256:bbbb"])
+        self.assertEqual(LayerHashCache(cache_dir=self.cache_dir).list(), [])
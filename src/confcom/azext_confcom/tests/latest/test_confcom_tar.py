@@ -3,11 +3,15 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import io
 import os
+import tarfile
+import tempfile
 import unittest
 import deepdiff
 import json
 import docker
+from hashlib import sha256
 
 from azext_confcom.security_policy import (
     OutputType,
@@ -18,6 +22,7 @@ from azext_confcom.errors import (
 )
 import azext_confcom.config as config
 from azext_confcom.template_util import DockerClient
+from azext_confcom.os_util import TarImageIndex, get_tar_index
 
 def create_tar_file(image_path: str) -> None:
     if not os.path.isfile(image_path):
@@ -685,3 +690,44 @@ class PolicyGeneratingArmParametersCleanRoomTarFile(unittest.TestCase):
             raise AccContainerError("getting image should fail")
         except FileNotFoundError:
             pass
+
+
+class TarImageIndexTest(unittest.TestCase):
+    config_blob = json.dumps(
+        {"architecture": "amd64", "config": {"Env": ["PATH=/usr/bin"], "Cmd": ["sh"]}}
+    ).encode("utf-8")
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        config_name = sha256(cls.config_blob).hexdigest() + ".json"
+        manifest = json.dumps(
+            [{"Config": config_name, "RepoTags": ["fake:1.0", "fake:latest"], "Layers": []}]
+        ).encode("utf-8")
+
+        cls.tar_path = os.path.join(cls.tmp_dir.name, "image.tar")
+        cls.tar_gz_path = os.path.join(cls.tmp_dir.name, "image.tar.gz")
+        for path, mode in ((cls.tar_path, "w"), (cls.tar_gz_path, "w:gz")):
+            with tarfile.open(path, mode) as tar:
+                for name, data in ((config_name, cls.config_blob), ("manifest.json", manifest)):
+                    info = tarfile.TarInfo(name)
+                    info.size = len(data)
+                    tar.addfile(info, io.BytesIO(data))
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.tmp_dir.cleanup()
+
+    def test_tar_index_image_info(self):
+        for path in (self.tar_path, self.tar_gz_path):
+            index = TarImageIndex(path)
+            image_info, image_id = index.get_image_info("fake:1.0")
+            self.assertEqual(image_info["Cmd"], ["sh"])
+            self.assertEqual(image_info["Architecture"], "amd64")
+            self.assertEqual(image_id, "sha256:" + sha256(self.config_blob).hexdigest())
+            self.assertEqual(index.get_image_info("missing:1.0"), (None, None))
+        # no temp files are left behind next to the tarball
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["image.tar", "image.tar.gz"])
+
+    def test_tar_index_shared(self):
+        self.assertIs(get_tar_index(self.tar_path), get_tar_index(self.tar_path))
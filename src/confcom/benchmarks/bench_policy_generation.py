@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Offline benchmark for confcom policy generation.
+
+Builds synthetic ARM templates with a growing number of containers, environment variables and
+parameter references, then times each stage of the policy pipeline and records its peak memory.
+Image info is stubbed and dmverity-vhd is replaced by a small script, so neither docker nor the
+network is needed. Memory is traced with tracemalloc, which slows every stage by a similar factor,
+so compare timings between runs of this script rather than against the CLI.
+
+    python benchmarks/bench_policy_generation.py
+    python benchmarks/bench_policy_generation.py --containers 1 10 100 --env-vars 50 --json
+"""
+
+import argparse
+import copy
+import json
+import os
+import stat
+import sys
+import tempfile
+import time
+import tracemalloc
+from hashlib import sha256
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from azext_confcom import security_policy  # noqa: E402
+from azext_confcom.layer_cache import LayerHashCache  # noqa: E402
+from azext_confcom.rootfs_proxy import SecurityPolicyProxy  # noqa: E402
+from azext_confcom.security_policy import OutputType, load_policy_from_arm_template_str  # noqa: E402
+from azext_confcom.template_util import parse_template  # noqa: E402
+
+DEFAULT_CONTAINER_COUNTS = [1, 10, 50, 100, 250, 500]
+IMAGE_COUNT = 10
+LAYERS_PER_IMAGE = 8
+
+STUB_DMVERITY_VHD = f"""#!{sys.executable}
+import hashlib, sys
+image = sys.argv[-1]
+for i in range({LAYERS_PER_IMAGE}):
+    print(f"Layer {{i}} root hash: " + hashlib.sha256(f"{{image}}{{i}}".encode()).hexdigest())
+"""
+
+
+def make_template(containers: int, env_vars: int):
+    """ARM template with `containers` containers spread over IMAGE_COUNT images. Every container
+    has `env_vars` environment variables, half of which reference a template parameter."""
+    parameters = {}
+    parameter_values = {}
+    container_list = []
+    for c in range(containers):
+        env = []
+        for e in range(env_vars):
+            if e % 2:
+                name = f"param{c}x{e}"
+                parameters[name] = {"type": "string"}
+                parameter_values[name] = {"value": f"value-{c}-{e}"}
+                env.append({"name": f"ENV_{e}", "value": f"[parameters('{name}')]"})
+            else:
+                env.append({"name": f"ENV_{e}", "value": f"value-{c}-{e}"})
+        container_list.append({
+            "name": f"container{c}",
+            "properties": {
+                "image": f"[variables('image{c % IMAGE_COUNT}')]",
+                "command": ["/bin/sh", "-c", f"echo {c}"],
+                "environmentVariables": env,
+                "volumeMounts": [{"name": "azurefile", "mountPath": f"/mount/{c}"}],
+                "resources": {"requests": {"cpu": 1, "memoryInGb": 1.5}},
+            },
+        })
+
+    template = {
+        "$schema": "https://schema.management.azure.com/schemas/2019-04-01/deploymentTemplate.json#",
+        "contentVersion": "1.0.0.0",
+        "parameters": parameters,
+        "variables": {f"image{i}": f"benchmark.azurecr.io/image{i}:1.0" for i in range(IMAGE_COUNT)},
+        "resources": [{
+            "type": "Microsoft.ContainerInstance/containerGroups",
+            "apiVersion": "2023-05-01",
+            "name": "benchmark",
+            "location": "[resourceGroup().location]",
+            "properties": {
+                "confidentialComputeProperties": {"ccePolicy": ""},
+                "containers": container_list,
+                "sku": "Confidential",
+                "osType": "Linux",
+                "volumes": [{"name": "azurefile", "azureFile": {"shareName": "share"}}],
+            },
+        }],
+    }
+    parameter_file = {
+        "$schema": "https://schema.management.azure.com/schemas/2019-04-01/deploymentParameters.json#",
+        "contentVersion": "1.0.0.0",
+        "parameters": parameter_values,
+    }
+    return template, parameter_file
+
+
+def stub_image_info(_progress, _message_queue, _tar_mapping, image):
+    image_info = {
+        "Env": [f"IMAGE_ENV_{i}=value" for i in range(10)] + ["PATH=/usr/local/bin:/usr/bin"],
+        "Cmd": ["/bin/sh"],
+        "Entrypoint": None,
+        "WorkingDir": "/app",
+        "User": "",
+        "StopSignal": None,
+        "Architecture": "amd64",
+    }
+    image_id = "sha256:" + sha256(f"{image.base}:{image.tag}".encode("utf-8")).hexdigest()
+    return image_info, False, image_id
+
+
+class StubSecurityPolicyProxy(SecurityPolicyProxy):  # pylint: disable=too-few-public-methods
+    stub_bin = None
+
+    def __init__(self):  # pylint: disable=super-init-not-called
+        self.policy_bin = self.stub_bin
+
+
+def measure(func, *args, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run(containers: int, env_vars: int, cache_dir: str):
+    template, parameter_file = make_template(containers, env_vars)
+    template_str, parameter_str = json.dumps(template), json.dumps(parameter_file)
+    stages = {}
+
+    def record(name, func, *args, **kwargs):
+        result, elapsed, peak = measure(func, *args, **kwargs)
+        stages[name] = {"seconds": elapsed, "peak_bytes": peak}
+        return result
+
+    params = {
+        name: dict(definition, **parameter_file["parameters"][name])
+        for name, definition in template["parameters"].items()
+    }
+    record(
+        "parse_template", parse_template,
+        params, template["variables"], copy.deepcopy(template["resources"][0]),
+    )
+    policies = record(
+        "load_policy_from_arm_template_str", load_policy_from_arm_template_str,
+        template_str, parameter_str, approve_wildcards=True,
+    )
+    policy = policies[0]
+
+    # start every run cold: no layer hashes in memory or on disk
+    SecurityPolicyProxy.layer_cache = {}
+    StubSecurityPolicyProxy.persistent_layer_cache = LayerHashCache(cache_dir=cache_dir)
+    StubSecurityPolicyProxy.persistent_layer_cache.prune()
+    with open(os.devnull, "w", encoding="utf-8") as devnull, \
+            mock.patch("sys.stderr", devnull), \
+            mock.patch.object(security_policy, "get_image_info", stub_image_info), \
+            mock.patch.object(policy, "_get_rootfs_proxy", StubSecurityPolicyProxy):
+        record("populate_policy_content_for_all_images", policy.populate_policy_content_for_all_images)
+
+    record("_policy_serialization", policy._policy_serialization)  # pylint: disable=protected-access
+    record("get_serialized_output", policy.get_serialized_output, OutputType.DEFAULT)
+    record("get_serialized_output (pretty)", policy.get_serialized_output, OutputType.PRETTY_PRINT)
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--containers", type=int, nargs="+", default=DEFAULT_CONTAINER_COUNTS,
+                        help="number of containers in each synthetic template")
+    parser.add_argument("--env-vars", type=int, default=20,
+                        help="environment variables per container, half of them parameter references")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stub_bin = os.path.join(tmp_dir, "dmverity-vhd")
+        with open(stub_bin, "w", encoding="utf-8") as f:
+            f.write(STUB_DMVERITY_VHD)
+        os.chmod(stub_bin, os.stat(stub_bin).st_mode | stat.S_IXUSR)
+        StubSecurityPolicyProxy.stub_bin = stub_bin
+
+        for containers in args.containers:
+            stages = run(containers, args.env_vars, os.path.join(tmp_dir, "cache"))
+            results.append({"containers": containers, "env_vars": args.env_vars, "stages": stages})
+            if not args.json:
+                for stage, value in stages.items():
+                    print(f"{containers:>5} containers  {stage:<40} "
+                          f"{value['seconds'] * 1000:>10.2f} ms  {value['peak_bytes'] / 1024:>10.1f} KiB")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,16 @@ import tarfile
 import os
 import re
 import codecs
+import hashlib
+import json
+import shutil
+import stat
+import struct
+import tempfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from io import open
 import requests
 from knack.log import get_logger
@@ -18,6 +28,15 @@ from azure.cli.command_modules.acr._constants import TASK_VALID_VSTS_URLS
 
 logger = get_logger(__name__)
 
+# how much of the tar stream is compressed at once by one thread
+SOURCE_CHUNK_SIZE = 4 * 1024 * 1024
+# gzip member header with no file name, no mtime and an unknown OS, so the archive only depends on its content
+_GZIP_MEMBER_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+SOURCE_CACHE_VERSION = 1
+SOURCE_UPLOAD_CACHE_TTL = 60 * 60  # how many seconds an uploaded source archive is reused for
+SOURCE_CACHE_MAX_ENTRIES = 8  # how many source directories an archive is kept for
+_HASH_BLOCK_SIZE = 1024 * 1024
+
 
 def upload_source_code(cmd, client,
                        registry_name,
@@ -25,11 +44,32 @@ def upload_source_code(cmd, client,
                        source_location,
                        tar_file_path,
                        docker_file_path,
-                       docker_file_in_tar):
-    _pack_source_code(source_location,
-                      tar_file_path,
-                      docker_file_path,
-                      docker_file_in_tar)
+                       docker_file_in_tar,
+                       reuse_upload=True):
+    """Upload the archived source code to the registry. Returns the relative path of the upload, and whether it
+    is the upload of the same source made earlier, which the registry may have discarded since."""
+    cache = get_source_upload_cache(cmd, source_location, docker_file_path)
+    entries = _collect_source_entries(source_location, docker_file_path)
+    digest = cache.update(entries, docker_file_path, docker_file_in_tar)
+
+    relative_path = cache.get_upload(registry_name, digest) if reuse_upload else None
+    if relative_path:
+        logger.warning("Source code is unchanged since it was last uploaded to registry %s, skipping upload.",
+                       registry_name)
+        cache.save()
+        return relative_path, True
+
+    cached_archive_path = cache.get_archive(digest)
+    if cached_archive_path:
+        logger.info("Source code is unchanged, reusing archive '%s'.", cached_archive_path)
+        tar_file_path = cached_archive_path
+    else:
+        _pack_source_code(source_location,
+                          tar_file_path,
+                          docker_file_path,
+                          docker_file_in_tar,
+                          entries=entries)
+        cache.put_archive(digest, tar_file_path)
 
     size = os.path.getsize(tar_file_path)
     unit = 'GiB'
@@ -59,56 +99,252 @@ def upload_source_code(cmd, client,
         BlobClient.upload_blob(data=data, blob_type="BlockBlob", overwrite=True)
     logger.info("Sending context ({0:.3f} {1}) to registry: {2}...".format(
         size, unit, registry_name))
-    return relative_path
-
-
-def _pack_source_code(source_location, tar_file_path, docker_file_path, docker_file_in_tar):
-    logger.info("Packing source code into tar to upload...")
-
-    original_docker_file_name = os.path.basename(docker_file_path.replace("\\", os.sep))
+    cache.put_upload(registry_name, digest, relative_path)
+    cache.save()
+    return relative_path, False
+
+
+def get_docker_file_in_tar(docker_file_path):
+    """Name the Dockerfile is added to the archive under. It is derived from the content of the Dockerfile,
+    rather than random, so that packing the same source twice gives the same archive."""
+    # NOTE: os.path.basename is unable to parse "\" in the file path
+    original_docker_file_name = os.path.basename(docker_file_path.replace("\\", "/"))
+    return '{}_{}'.format(_hash_file(docker_file_path)[:32], original_docker_file_name)
+
+
+def _hash_file(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+class SourceUploadCache():
+    """Remembers the last archive packed from a source directory and where it was uploaded.
+
+    The manifest lists every file that goes into the archive with its size, mtime and sha256. Files whose
+    size and mtime did not change are not read again, so checking an unchanged tree costs one stat per
+    file. The digest of the tree covers the names, modes and content of everything in the archive, and
+    the archive is reproducible, so an unchanged digest means the last archive can be reused as is. The
+    upload of that archive is only trusted for `ttl` seconds, as the registry does not keep it forever.
+    Archives are only kept for the `max_entries` source directories used last."""
+
+    def __init__(self, cache_dir, source_location, docker_file_path, ttl=SOURCE_UPLOAD_CACHE_TTL,
+                 max_entries=SOURCE_CACHE_MAX_ENTRIES):
+        docker_file_key = os.path.abspath(docker_file_path) if docker_file_path else ""
+        key = "{}\0{}".format(os.path.abspath(source_location), docker_file_key)
+        self.root_dir = cache_dir
+        self.cache_dir = os.path.join(cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest()[:32])
+        self.manifest_path = os.path.join(self.cache_dir, "manifest.json")
+        self.archive_path = os.path.join(self.cache_dir, "source.tar.gz")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._manifest = self._read()
+
+    def _read(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            raw = None
+        if not isinstance(raw, dict) or raw.get("version") != SOURCE_CACHE_VERSION:
+            raw = {"version": SOURCE_CACHE_VERSION}
+        raw.setdefault("files", {})
+        raw.setdefault("uploads", {})
+        return raw
+
+    def update(self, entries, docker_file_path=None, docker_file_in_tar=None):
+        """Refresh the manifest from the (path, arcname) entries of the archive and return the digest of the tree."""
+        known_files = self._manifest["files"]
+        files = {}
+        tree = hashlib.sha256("{}\n".format(SOURCE_CACHE_VERSION).encode("utf-8"))
+        if docker_file_path:
+            entries = list(entries) + [(docker_file_path, docker_file_in_tar)]
+        for path, arcname in entries:
+            st = os.lstat(path)
+            if stat.S_ISREG(st.st_mode):
+                known = known_files.get(path)
+                if known and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+                    sha256 = known[2]
+                else:
+                    sha256 = _hash_file(path)
+                files[path] = [st.st_size, st.st_mtime_ns, sha256]
+                item = ["f", arcname, stat.S_IMODE(st.st_mode), sha256]
+            elif stat.S_ISLNK(st.st_mode):
+                item = ["l", arcname, os.readlink(path)]
+            else:
+                item = ["d", arcname, stat.S_IMODE(st.st_mode)]
+            tree.update(json.dumps(item).encode("ascii") + b"\n")
+        self._manifest["files"] = files
+        return tree.hexdigest()
+
+    def get_archive(self, digest):
+        if self._manifest.get("digest") == digest and os.path.isfile(self.archive_path):
+            return self.archive_path
+        return None
+
+    def put_archive(self, digest, tar_file_path):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            os.close(fd)
+            shutil.copyfile(tar_file_path, tmp_path)
+            os.replace(tmp_path, self.archive_path)
+        except OSError as e:
+            logger.debug("Unable to cache source archive in %s: %s", self.cache_dir, e)
+            return
+        self._manifest["digest"] = digest
+        # uploads of a previous archive are of no use anymore
+        self._manifest["uploads"] = {}
+        self._prune()
+
+    def _prune(self):
+        """Remove the caches of the other source directories but the ones used last."""
+        used = []
+        try:
+            names = os.listdir(self.root_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.root_dir, name)
+            if path == self.cache_dir or not os.path.isdir(path):
+                continue
+            # the manifest is saved each time the source directory is used
+            manifest_path = os.path.join(path, "manifest.json")
+            try:
+                used.append((os.path.getmtime(manifest_path if os.path.exists(manifest_path) else path), path))
+            except OSError:
+                continue
+        used.sort(reverse=True)
+        for _, path in used[max(self.max_entries - 1, 0):]:
+            logger.debug("Removing source cache %s", path)
+            shutil.rmtree(path, ignore_errors=True)
+
+    def get_upload(self, registry_name, digest):
+        upload = self._manifest["uploads"].get(registry_name.lower())
+        if upload and upload.get("digest") == digest and time.time() - upload.get("uploaded", 0) < self.ttl:
+            return upload["relativePath"]
+        return None
+
+    def put_upload(self, registry_name, digest, relative_path):
+        if relative_path and self._manifest.get("digest") == digest:
+            self._manifest["uploads"][registry_name.lower()] = {"digest": digest, "relativePath": relative_path,
+                                                                "uploaded": time.time()}
+
+    def save(self):
+        tmp_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write next to the manifest and swap it in so a concurrent run never reads a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._manifest, f)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            logger.debug("Unable to save source manifest to %s: %s", self.manifest_path, e)
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def get_source_upload_cache(cmd, source_location, docker_file_path):
+    cache_dir = os.path.join(cmd.cli_ctx.config.config_dir, "containerapp", "source_cache")
+    ttl = cmd.cli_ctx.config.getint("containerapp", "source_upload_cache_ttl", fallback=SOURCE_UPLOAD_CACHE_TTL)
+    max_entries = cmd.cli_ctx.config.getint("containerapp", "source_cache_max_entries",
+                                            fallback=SOURCE_CACHE_MAX_ENTRIES)
+    return SourceUploadCache(cache_dir, source_location, docker_file_path, ttl=ttl, max_entries=max_entries)
+
+
+def _collect_source_entries(source_location, docker_file_path):
+    """(path, arcname) of everything from `source_location` that goes into the archive, in archive order.
+    Directories are listed in sorted order so the archive does not depend on the order the file system
+    returns them in."""
+    original_docker_file_name = os.path.basename(docker_file_path.replace("\\", os.sep)) \
+        if docker_file_path else "Dockerfile"
     ignore_list, ignore_list_size = _load_dockerignore_file(source_location, original_docker_file_name)
+    matcher = DockerIgnoreMatcher(ignore_list) if ignore_list is not None else None
     common_vcs_ignore_list = {'.git', '.gitignore', '.bzr', 'bzrignore', '.hg', '.hgignore', '.svn'}
 
-    def _ignore_check(tarinfo, parent_ignored, parent_matching_rule_index):
+    def _ignore_check(name, parent_ignored, parent_matching_rule_index):
         # ignore common vcs dir or file
-        if tarinfo.name in common_vcs_ignore_list:
-            logger.info("Excluding '%s' based on default ignore rules", tarinfo.name)
+        if name in common_vcs_ignore_list:
+            logger.info("Excluding '%s' based on default ignore rules", name)
             return True, parent_matching_rule_index
 
-        if ignore_list is None:
+        if matcher is None:
             # if .dockerignore doesn't exists, inherit from parent
             # eg, it will ignore the files under .git folder.
             return parent_ignored, parent_matching_rule_index
 
-        for index, item in enumerate(ignore_list):
-            # stop checking the remaining rules whose priorities are lower than the parent matching rule
-            # at this point, current item should just inherit from parent
-            if index >= parent_matching_rule_index:
-                break
-            if re.match(item.pattern, tarinfo.name):
-                logger.debug(".dockerignore: rule '%s' matches '%s'.",
-                             item.rule, tarinfo.name)
-                return item.ignore, index
-
-        logger.debug(".dockerignore: no rule for '%s'. parent ignore '%s'",
-                     tarinfo.name, parent_ignored)
+        # only the rules whose priorities are higher than the parent matching rule are checked,
+        # otherwise the item just inherits from parent
+        index = matcher.match(name, parent_matching_rule_index)
+        if index is not None:
+            item = ignore_list[index]
+            logger.debug(".dockerignore: rule '%s' matches '%s'.", item.rule, name)
+            return item.ignore, index
+
+        logger.debug(".dockerignore: no rule for '%s'. parent ignore '%s'", name, parent_ignored)
         # inherit from parent
         return parent_ignored, parent_matching_rule_index
 
-    with tarfile.open(tar_file_path, "w:gz") as tar:
-        # need to set arcname to empty string as the archive root path
-        _archive_file_recursively(tar,
-                                  source_location,
-                                  arcname="",
-                                  parent_ignored=False,
-                                  parent_matching_rule_index=ignore_list_size,
-                                  ignore_check=_ignore_check)
+    def _can_skip_children(name, ignored, matching_rule_index):
+        # the children of an ignored dir can still be included by a '!' rule, so the dir is only
+        # skipped when no such rule could match anything below it
+        if not ignored:
+            return False
+        return matcher is None or not matcher.may_include_under(name, matching_rule_index)
+
+    entries = []
+    # need to set arcname to empty string as the archive root path
+    root_ignored, root_matching_rule_index = _ignore_check("", False, ignore_list_size)
+    if not root_ignored:
+        entries.append((source_location, ""))
+    if not _can_skip_children("", root_ignored, root_matching_rule_index):
+        _collect_directory(entries,
+                           source_location,
+                           arcname="",
+                           parent_ignored=root_ignored,
+                           parent_matching_rule_index=root_matching_rule_index,
+                           ignore_check=_ignore_check,
+                           can_skip_children=_can_skip_children)
+    return entries
+
+
+def _normalize_tarinfo(tarinfo):
+    # only the name, mode and content of an entry are kept, so identical trees give identical archives
+    tarinfo.mtime = 0
+    tarinfo.uid = tarinfo.gid = 0
+    tarinfo.uname = tarinfo.gname = ""
+    return tarinfo
+
+
+def _pack_source_code(source_location, tar_file_path, docker_file_path, docker_file_in_tar, entries=None):
+    logger.info("Packing source code into tar to upload...")
+
+    if entries is None:
+        entries = _collect_source_entries(source_location, docker_file_path)
+
+    with open(tar_file_path, "wb") as tar_file, \
+            _ParallelGzipWriter(tar_file) as gzip_writer, \
+            tarfile.open(fileobj=gzip_writer, mode="w|") as tar:
+        for path, arcname in entries:
+            # create a TarInfo object from the file and append the tar header and data to the archive
+            tarinfo = tar.gettarinfo(path, arcname)
+            if tarinfo is None:
+                raise CLIInternalError("tarfile: unsupported type {}".format(path))
+            _normalize_tarinfo(tarinfo)
+            if tarinfo.isreg():
+                with open(path, "rb") as f:
+                    tar.addfile(tarinfo, f)
+            else:
+                tar.addfile(tarinfo)
 
         # Add the Dockerfile if it's specified.
         # In the case of run, there will be no Dockerfile.
         if docker_file_path:
-            docker_file_tarinfo = tar.gettarinfo(
-                docker_file_path, docker_file_in_tar)
+            docker_file_tarinfo = _normalize_tarinfo(tar.gettarinfo(
+                docker_file_path, docker_file_in_tar))
             with open(docker_file_path, "rb") as f:
                 tar.addfile(docker_file_tarinfo, f)
 
@@ -128,21 +364,147 @@ class IgnoreRule:  # pylint: disable=too-few-public-methods
                 rule = rule[1:]  # remove beginning '/'
 
         self.pattern = "^"
+        # pattern of each path segment, None for '**' which matches any number of segments
+        self.segment_patterns = []
         tokens = rule.split('/')
         token_length = len(tokens)
         for index, token in enumerate(tokens, 1):
             # ** matches any number of directories
             if token == "**":
                 self.pattern += ".*"  # treat **/ as **
+                self.segment_patterns.append(None)
             else:
                 # * matches any sequence of non-seperator characters
                 # ? matches any single non-seperator character
                 # . matches dot character
-                self.pattern += token.replace(
+                segment_pattern = token.replace(
                     "*", "[^/]*").replace("?", "[^/]").replace(".", "\\.")
+                self.pattern += segment_pattern
+                self.segment_patterns.append(segment_pattern)
                 if index < token_length:
                     self.pattern += "/"  # add back / if it's not the last
         self.pattern += "$"
+        self.regex = re.compile(self.pattern)
+
+    def may_match_under(self, dir_segments):
+        """Whether the rule could match any path below the dir made of `dir_segments`. Errs on the side of True."""
+        for index, segment in enumerate(dir_segments):
+            if index >= len(self.segment_patterns):
+                # the rule only matches paths shorter than the children of the dir
+                return False
+            segment_pattern = self.segment_patterns[index]
+            if segment_pattern is None:
+                return True
+            try:
+                if not re.fullmatch(segment_pattern, segment):
+                    return False
+            except re.error:
+                return True
+        return len(self.segment_patterns) > len(dir_segments)
+
+
+class DockerIgnoreMatcher:
+    """Matches paths against the rules of a .dockerignore file, highest priority first.
+
+    Checking a path against the rules whose priority is higher than `limit` is a single search of one
+    compiled alternation of those rules, built once per limit, instead of one regex match per rule."""
+
+    def __init__(self, ignore_list):
+        self.ignore_list = ignore_list
+        self._regexes = {}
+        # indexes of the '!' rules, the only ones that can include something below an ignored dir
+        self._exceptions = [index for index, item in enumerate(ignore_list) if not item.ignore]
+
+    def _get_regex(self, limit):
+        if limit not in self._regexes:
+            alternatives = ["(?P<r{}>{})".format(index, item.pattern)
+                            for index, item in enumerate(self.ignore_list[:limit])]
+            try:
+                regex = re.compile("|".join(alternatives)) if alternatives else False
+            except re.error:
+                # a rule that does not compose with the others, match the rules one by one
+                regex = None
+            self._regexes[limit] = regex
+        return self._regexes[limit]
+
+    def match(self, name, limit):
+        """Index of the highest priority rule among the first `limit` ones that matches `name`, or None."""
+        regex = self._get_regex(limit)
+        if regex is None:
+            for index, item in enumerate(self.ignore_list[:limit]):
+                if item.regex.match(name):
+                    return index
+            return None
+        if regex is False:
+            return None
+        m = regex.match(name)
+        # alternatives are tried in order, so the first one that matches is the highest priority rule
+        return int(m.lastgroup[1:]) if m else None
+
+    def may_include_under(self, dir_name, limit):
+        """Whether a '!' rule among the first `limit` ones could match anything below `dir_name`."""
+        segments = dir_name.split("/") if dir_name else []
+        return any(self.ignore_list[index].may_match_under(segments)
+                   for index in self._exceptions if index < limit)
+
+
+class _ParallelGzipWriter:  # pylint: disable=too-many-instance-attributes
+    """Write-only file object that gzips what is written to it on several threads.
+
+    The stream is cut into chunks that are compressed independently, each into its own gzip member.
+    Concatenated gzip members form a valid gzip file. Chunks are written out in order, and only a few
+    are in flight at once so memory stays flat whatever the size of the source. Chunks always have the
+    same size and members carry no timestamp, so the same stream always gives the same bytes."""
+
+    def __init__(self, fileobj, chunk_size=SOURCE_CHUNK_SIZE, max_workers=None, compresslevel=9):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.compresslevel = compresslevel
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._pending = deque()
+        self._buffer = []
+        self._buffered = 0
+
+    def _compress(self, data):
+        compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+        return _GZIP_MEMBER_HEADER + compressor.compress(data) + compressor.flush() + \
+            struct.pack("<II", zlib.crc32(data), len(data) & 0xffffffff)
+
+    def _submit(self, data):
+        if not data:
+            return
+        self._pending.append(self._executor.submit(self._compress, data))
+        while len(self._pending) > self.max_workers * 2:
+            self.fileobj.write(self._pending.popleft().result())
+
+    def write(self, data):
+        self._buffer.append(bytes(data))
+        self._buffered += len(data)
+        if self._buffered >= self.chunk_size:
+            buffered = b"".join(self._buffer)
+            # cut the stream at fixed offsets so the output does not depend on how it was written
+            cut = len(buffered) - len(buffered) % self.chunk_size
+            for offset in range(0, cut, self.chunk_size):
+                self._submit(buffered[offset:offset + self.chunk_size])
+            self._buffer = [buffered[cut:]]
+            self._buffered = len(buffered) - cut
+        return len(data)
+
+    def close(self):
+        try:
+            self._submit(b"".join(self._buffer))
+            self._buffer, self._buffered = [], 0
+            while self._pending:
+                self.fileobj.write(self._pending.popleft().result())
+        finally:
+            self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
 
 def _load_dockerignore_file(source_location, original_docker_file_name):
@@ -181,31 +543,28 @@ def _load_dockerignore_file(source_location, original_docker_file_name):
     return ignore_list, len(ignore_list)
 
 
-def _archive_file_recursively(tar, name, arcname, parent_ignored, parent_matching_rule_index, ignore_check):
-    # create a TarInfo object from the file
-    tarinfo = tar.gettarinfo(name, arcname)
+def _collect_directory(entries, name, arcname, parent_ignored, parent_matching_rule_index, ignore_check,
+                       can_skip_children):
+    with os.scandir(name) as it:
+        dir_entries = sorted(it, key=lambda entry: entry.name)
 
-    if tarinfo is None:
-        raise CLIInternalError("tarfile: unsupported type {}".format(name))
+    for entry in dir_entries:
+        child_arcname = os.path.join(arcname, entry.name)
+        # same as the name gettarinfo gives the entry
+        child_name = child_arcname.replace(os.sep, "/")
 
-    # check if the file/dir is ignored
-    ignored, matching_rule_index = ignore_check(
-        tarinfo, parent_ignored, parent_matching_rule_index)
+        # check if the file/dir is ignored
+        ignored, matching_rule_index = ignore_check(child_name, parent_ignored, parent_matching_rule_index)
 
-    if not ignored:
-        # append the tar header and data to the archive
-        if tarinfo.isreg():
-            with open(name, "rb") as f:
-                tar.addfile(tarinfo, f)
-        else:
-            tar.addfile(tarinfo)
+        if not ignored:
+            entries.append((entry.path, child_arcname))
 
-    # even the dir is ignored, its child items can still be included, so continue to scan
-    if tarinfo.isdir():
-        for f in os.listdir(name):
-            _archive_file_recursively(tar, os.path.join(name, f), os.path.join(arcname, f),
-                                      parent_ignored=ignored, parent_matching_rule_index=matching_rule_index,
-                                      ignore_check=ignore_check)
+        # even the dir is ignored, its child items can still be included, so continue to scan
+        # unless no rule can include any of them
+        if entry.is_dir(follow_symlinks=False) and not can_skip_children(child_name, ignored, matching_rule_index):
+            _collect_directory(entries, entry.path, child_arcname,
+                               parent_ignored=ignored, parent_matching_rule_index=matching_rule_index,
+                               ignore_check=ignore_check, can_skip_children=can_skip_children)
 
 
 def check_remote_source_code(source_location):
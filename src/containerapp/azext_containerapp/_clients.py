@@ -5,6 +5,7 @@
 # pylint: disable=line-too-long, super-with-arguments, too-many-instance-attributes, consider-using-f-string, no-else-return, no-self-use
 
 import json
+import random
 import time
 import sys
 
@@ -19,6 +20,8 @@ CURRENT_API_VERSION = "2023-05-01"
 PREVIEW_API_VERSION = "2023-05-02-preview"
 POLLING_TIMEOUT = 600  # how many seconds before exiting
 POLLING_SECONDS = 2  # how many seconds between requests
+POLLING_MAX_SECONDS = 30  # upper bound on the delay between requests, also applied to Retry-After
+POLLING_BACKOFF_FACTOR = 1.5  # how much the delay between requests grows after each request
 POLLING_TIMEOUT_FOR_MANAGED_CERTIFICATE = 1500  # how many seconds before exiting
 POLLING_INTERVAL_FOR_MANAGED_CERTIFICATE = 4  # how many seconds between requests
 HEADER_AZURE_ASYNC_OPERATION = "azure-asyncoperation"
@@ -42,27 +45,112 @@ class PollingAnimation():
         sys.stderr.write("\r\033[K")
 
 
-def poll(cmd, request_url, poll_if_status):  # pylint: disable=inconsistent-return-statements
-    try:
-        start = time.time()
-        end = time.time() + POLLING_TIMEOUT
+class LongRunningOperationPoller():
+    """Waits on one or more long running operations from a single loop.
+
+    Every operation is polled on its own schedule: the delay starts at `initial_delay` and grows
+    exponentially with jitter up to `max_delay`. A Retry-After header on the last response
+    replaces the backoff for that operation, still capped at `max_delay`. Operations are only
+    polled when they are due, so waiting on N operations costs one loop instead of N."""
+
+    def __init__(self, cmd, timeout=POLLING_TIMEOUT, initial_delay=POLLING_SECONDS, max_delay=POLLING_MAX_SECONDS):
+        self.cmd = cmd
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self._operations = {}
+
+    def add(self, key, request_url, is_done, last_response=None):
+        """Track the operation at `request_url` until `is_done(response)` is true. `is_done` may raise
+        to fail the operation. When `last_response` is given, the first poll is scheduled from it
+        instead of being sent right away."""
+        operation = {"url": request_url, "is_done": is_done, "attempt": 0, "response": last_response, "due": time.time()}
+        if last_response is not None:
+            operation["due"] += self._next_delay(operation)
+        self._operations[key] = operation
+
+    def _next_delay(self, operation):
+        retry_after = _extract_retry_after(operation["response"]) if operation["response"] is not None else None
+        if retry_after is not None:
+            delay = min(retry_after, self.max_delay)
+        else:
+            # equal jitter: never less than half of the backoff, so the delay still grows
+            backoff = min(self.max_delay, self.initial_delay * (POLLING_BACKOFF_FACTOR ** operation["attempt"]))
+            delay = backoff / 2 + random.uniform(0, backoff / 2)
+        operation["attempt"] += 1
+        return delay
+
+    def run(self):
+        """Poll until every operation is done or the timeout expires. Returns the last response of
+        each operation by key; operations still running at the timeout return their latest response."""
+        end = time.time() + self.timeout
+        pending = dict(self._operations)
         animation = PollingAnimation()
+        try:
+            while pending:
+                next_due = min(operation["due"] for operation in pending.values())
+                now = time.time()
+                if next_due > now:
+                    if next_due >= end:
+                        break
+                    time.sleep(next_due - now)
+                # always poll the earliest operation after sleeping, even if the clock did not move
+                due = [key for key, operation in pending.items() if operation["due"] <= max(next_due, time.time())]
+                for key in due:
+                    operation = pending[key]
+                    animation.tick()
+                    operation["response"] = send_raw_request(self.cmd.cli_ctx, "GET", operation["url"])
+                    if operation["is_done"](operation["response"]):
+                        del pending[key]
+                    else:
+                        operation["due"] = time.time() + self._next_delay(operation)
+                if time.time() >= end:
+                    break
+        finally:
+            animation.flush()
+        return {key: operation["response"] for key, operation in self._operations.items()}
+
+    def wait(self, request_url, is_done, last_response=None):
+        self._operations = {}
+        self.add(request_url, request_url, is_done, last_response=last_response)
+        return self.run()[request_url]
+
+
+def _is_provisioning_done(response):
+    if response.status_code not in [200, 201]:
+        return True
+    provisioning_state = (response.json().get("properties") or {}).get("provisioningState")
+    return provisioning_state is None or provisioning_state.lower() in ["succeeded", "failed", "canceled"]
+
+
+def _is_operation_status_done(response):
+    from azure.core.exceptions import HttpResponseError
+    from ._utils import safe_get
 
-        animation.tick()
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-
-        while r.status_code in [200, 201] and start < end:
-            time.sleep(POLLING_SECONDS)
-            animation.tick()
-
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            r2 = r.json()
+    if response.status_code not in [200]:
+        return True
+    response_body = json.loads(response.text)
+    status = safe_get(response_body, "status")
+    if not status:
+        raise AzureResponseError("Http response body lack of necessary property: status")
+    if status.lower() in ["failed", "canceled"]:
+        message = json.dumps(response_body["error"]) if "error" in response_body else "Operation failed or canceled"
+        raise HttpResponseError(
+            response=response,
+            message=message
+        )
+    return status.lower() in ["succeeded"]
 
-            if "properties" not in r2 or "provisioningState" not in r2["properties"] or r2["properties"]["provisioningState"].lower() in ["succeeded", "failed", "canceled"]:
-                break
-            start = time.time()
 
+def poll(cmd, request_url, poll_if_status):  # pylint: disable=inconsistent-return-statements
+    animation = PollingAnimation()
+    try:
+        animation.tick()
+        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
         animation.flush()
+
+        if r.status_code in [200, 201]:
+            r = LongRunningOperationPoller(cmd).wait(request_url, _is_provisioning_done, last_response=r)
         return r.json()
     except Exception as e:  # pylint: disable=broad-except
         animation.flush()
@@ -74,38 +162,16 @@ def poll(cmd, request_url, poll_if_status):  # pylint: disable=inconsistent-retu
 
 
 def poll_status(cmd, request_url):  # pylint: disable=inconsistent-return-statements
-    from azure.core.exceptions import HttpResponseError
-    from ._utils import safe_get
-
     if not request_url:
         raise AzureResponseError(f"Http response lack of necessary header: '{HEADER_AZURE_ASYNC_OPERATION}'")
 
-    start = time.time()
-    end = time.time() + POLLING_TIMEOUT
     animation = PollingAnimation()
-
     animation.tick()
     r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-
-    while r.status_code in [200] and start < end:
-        time.sleep(_extract_delay(r))
-        animation.tick()
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        response_body = json.loads(r.text)
-        status = safe_get(response_body, "status")
-        if not status:
-            raise AzureResponseError("Http response body lack of necessary property: status")
-        if response_body["status"].lower() in ["failed", "canceled"]:
-            message = json.dumps(response_body["error"]) if "error" in response_body else "Operation failed or canceled"
-            raise HttpResponseError(
-                response=r,
-                message=message
-            )
-        if response_body["status"].lower() in ["succeeded"]:
-            break
-        start = time.time()
-
     animation.flush()
+
+    if r.status_code in [200]:
+        LongRunningOperationPoller(cmd).wait(request_url, _is_operation_status_done, last_response=r)
     return
 
 
@@ -113,25 +179,27 @@ def poll_results(cmd, request_url):  # pylint: disable=inconsistent-return-state
     if not request_url:
         raise AzureResponseError(f"Http response lack of necessary header: '{HEADER_LOCATION}'")
 
-    start = time.time()
-    end = time.time() + POLLING_TIMEOUT
     animation = PollingAnimation()
-
     animation.tick()
     r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-
-    while r.status_code in [202] and start < end:
-        time.sleep(_extract_delay(r))
-        animation.tick()
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        start = time.time()
-
     animation.flush()
+
+    if r.status_code in [202]:
+        r = LongRunningOperationPoller(cmd).wait(request_url, lambda response: response.status_code not in [202], last_response=r)
     if r.text:
         return json.loads(r.text)
 
 
-def _extract_delay(response):
+def wait_for_provisioning(cmd, request_urls, timeout=POLLING_TIMEOUT):
+    """Wait until every resource in `request_urls` (a dict of key to resource URL) reaches a terminal
+    provisioning state. Returns the last resource body of each key."""
+    poller = LongRunningOperationPoller(cmd, timeout=timeout)
+    for key, request_url in request_urls.items():
+        poller.add(key, request_url, _is_provisioning_done)
+    return {key: r.json() for key, r in poller.run().items()}
+
+
+def _extract_retry_after(response):
     try:
         retry_after = response.headers.get("retry-after")
         if retry_after:
@@ -143,7 +211,31 @@ def _extract_delay(response):
                 return parsed_retry_after / 1000.0
     except ValueError:
         pass
-    return POLLING_SECONDS
+    return None
+
+
+def _iter_pages(cmd, request_url):
+    """Yield each page of a list operation, following nextLink. The next page is fetched in the background
+    while the caller works through the current one, so at most two pages are held in memory at once."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    j = send_raw_request(cmd.cli_ctx, "GET", request_url).json()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        while True:
+            next_link = j.get("nextLink")
+            next_page = executor.submit(send_raw_request, cmd.cli_ctx, "GET", next_link) if next_link else None
+            yield j
+            if next_page is None:
+                return
+            j = next_page.result().json()
+
+
+def iter_list_results(cmd, request_url, formatter=lambda x: x, predicate=None):
+    """Yield the formatted items of every page as soon as the page arrives, skipping the ones `predicate` rejects."""
+    for page in _iter_pages(cmd, request_url):
+        for item in page.get("value", []):
+            if predicate is None or predicate(item):
+                yield formatter(item)
 
 
 class ContainerAppClient():
@@ -244,9 +336,7 @@ class ContainerAppClient():
         return r.json()
 
     @classmethod
-    def list_by_subscription(cls, cmd, formatter=lambda x: x):
-        app_list = []
-
+    def iter_by_subscription(cls, cmd, formatter=lambda x: x, predicate=None):
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         sub_id = get_subscription_id(cmd.cli_ctx)
         request_url = "{}/subscriptions/{}/providers/Microsoft.App/containerApps?api-version={}".format(
@@ -254,26 +344,14 @@ class ContainerAppClient():
             sub_id,
             cls.api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            app_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for app in j["value"]:
-                formatted = formatter(app)
-                app_list.append(formatted)
-
-        return app_list
+        return iter_list_results(cmd, request_url, formatter, predicate)
 
     @classmethod
-    def list_by_resource_group(cls, cmd, resource_group_name, formatter=lambda x: x):
-        app_list = []
+    def list_by_subscription(cls, cmd, formatter=lambda x: x):
+        return list(cls.iter_by_subscription(cmd, formatter))
 
+    @classmethod
+    def iter_by_resource_group(cls, cmd, resource_group_name, formatter=lambda x: x, predicate=None):
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         sub_id = get_subscription_id(cmd.cli_ctx)
         url_fmt = "{}/subscriptions/{}/resourceGroups/{}/providers/Microsoft.App/containerApps?api-version={}"
@@ -283,21 +361,11 @@ class ContainerAppClient():
             resource_group_name,
             cls.api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            app_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for app in j["value"]:
-                formatted = formatter(app)
-                app_list.append(formatted)
+        return iter_list_results(cmd, request_url, formatter, predicate)
 
-        return app_list
+    @classmethod
+    def list_by_resource_group(cls, cmd, resource_group_name, formatter=lambda x: x):
+        return list(cls.iter_by_resource_group(cmd, resource_group_name, formatter))
 
     @classmethod
     def list_secrets(cls, cmd, resource_group_name, name):
@@ -316,10 +384,7 @@ class ContainerAppClient():
         return r.json()
 
     @classmethod
-    def list_revisions(cls, cmd, resource_group_name, name, formatter=lambda x: x):
-
-        revisions_list = []
-
+    def iter_revisions(cls, cmd, resource_group_name, name, formatter=lambda x: x, predicate=None):
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         sub_id = get_subscription_id(cmd.cli_ctx)
         url_fmt = "{}/subscriptions/{}/resourceGroups/{}/providers/Microsoft.App/containerApps/{}/revisions?api-version={}"
@@ -330,21 +395,11 @@ class ContainerAppClient():
             name,
             cls.api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            revisions_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for app in j["value"]:
-                formatted = formatter(app)
-                revisions_list.append(formatted)
+        return iter_list_results(cmd, request_url, formatter, predicate)
 
-        return revisions_list
+    @classmethod
+    def list_revisions(cls, cmd, resource_group_name, name, formatter=lambda x: x):
+        return list(cls.iter_revisions(cmd, resource_group_name, name, formatter))
 
     @classmethod
     def show_revision(cls, cmd, resource_group_name, container_app_name, name):
@@ -411,9 +466,7 @@ class ContainerAppClient():
         return r.json()
 
     @classmethod
-    def list_replicas(cls, cmd, resource_group_name, container_app_name, revision_name):
-        replica_list = []
-
+    def iter_replicas(cls, cmd, resource_group_name, container_app_name, revision_name):
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         sub_id = get_subscription_id(cmd.cli_ctx)
         url_fmt = "{}/subscriptions/{}/resourceGroups/{}/providers/Microsoft.App/containerApps/{}/revisions/{}/replicas?api-version={}"
@@ -425,19 +478,11 @@ class ContainerAppClient():
             revision_name,
             cls.api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for replica in j["value"]:
-            replica_list.append(replica)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for replica in j["value"]:
-                replica_list.append(replica)
+        return iter_list_results(cmd, request_url)
 
-        return replica_list
+    @classmethod
+    def list_replicas(cls, cmd, resource_group_name, container_app_name, revision_name):
+        return list(cls.iter_replicas(cmd, resource_group_name, container_app_name, revision_name))
 
     @classmethod
     def get_replica(cls, cmd, resource_group_name, container_app_name, revision_name, replica_name):
@@ -589,9 +634,7 @@ class ManagedEnvironmentClient():
         return r.json()
 
     @classmethod
-    def list_by_subscription(cls, cmd, formatter=lambda x: x):
-        env_list = []
-
+    def iter_by_subscription(cls, cmd, formatter=lambda x: x, predicate=None):
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         sub_id = get_subscription_id(cmd.cli_ctx)
         request_url = "{}/subscriptions/{}/providers/Microsoft.App/managedEnvironments?api-version={}".format(
@@ -599,26 +642,14 @@ class ManagedEnvironmentClient():
             sub_id,
             cls.api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for env in j["value"]:
-            formatted = formatter(env)
-            env_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for env in j["value"]:
-                formatted = formatter(env)
-                env_list.append(formatted)
-
-        return env_list
+        return iter_list_results(cmd, request_url, formatter, predicate)
 
     @classmethod
-    def list_by_resource_group(cls, cmd, resource_group_name, formatter=lambda x: x):
-        env_list = []
+    def list_by_subscription(cls, cmd, formatter=lambda x: x):
+        return list(cls.iter_by_subscription(cmd, formatter))
 
+    @classmethod
+    def iter_by_resource_group(cls, cmd, resource_group_name, formatter=lambda x: x, predicate=None):
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         sub_id = get_subscription_id(cmd.cli_ctx)
         url_fmt = "{}/subscriptions/{}/resourceGroups/{}/providers/Microsoft.App/managedEnvironments?api-version={}"
@@ -628,21 +659,11 @@ class ManagedEnvironmentClient():
             resource_group_name,
             cls.api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for env in j["value"]:
-            formatted = formatter(env)
-            env_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for env in j["value"]:
-                formatted = formatter(env)
-                env_list.append(formatted)
+        return iter_list_results(cmd, request_url, formatter, predicate)
 
-        return env_list
+    @classmethod
+    def list_by_resource_group(cls, cmd, resource_group_name, formatter=lambda x: x):
+        return list(cls.iter_by_resource_group(cmd, resource_group_name, formatter))
 
     @classmethod
     def show_certificate(cls, cmd, resource_group_name, name, certificate_name):
@@ -0,0 +1,126 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+# pylint: disable=broad-except
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from azure.cli.core.azclierror import ValidationError
+from knack.log import get_logger
+
+from ._constants import COMPOSE_MAX_PARALLEL
+
+logger = get_logger(__name__)
+
+STEP_SUCCEEDED = "Succeeded"
+STEP_FAILED = "Failed"
+STEP_SKIPPED = "Skipped"
+
+
+class ComposeStep():  # pylint: disable=too-few-public-methods
+    def __init__(self, name, func, depends_on):
+        self.name = name
+        self.func = func
+        self.depends_on = list(depends_on)
+        self.status = None
+        self.result = None
+        self.error = None
+        self.seconds = None
+
+
+class ComposeScheduler():
+    """Runs the steps of a compose file, such as building the image of a service or creating its container
+    app, each as soon as every step it depends on has succeeded, with at most `max_parallel` at once.
+
+    A step that fails does not stop the others: only the steps that depend on it, directly or not, are
+    skipped. Steps that are ready at the same time start in the order they were added."""
+
+    def __init__(self, max_parallel=COMPOSE_MAX_PARALLEL):
+        if max_parallel < 1:
+            raise ValidationError("The number of services to provision in parallel must be at least 1.")
+        self.max_parallel = max_parallel
+        self.steps = {}
+
+    def add(self, name, func, depends_on=None):
+        self.steps[name] = ComposeStep(name, func, depends_on or [])
+        return self.steps[name]
+
+    def _get_dependents(self):
+        dependents = {name: [] for name in self.steps}
+        for step in self.steps.values():
+            for dependency in step.depends_on:
+                if dependency not in self.steps:
+                    raise ValidationError("'{}' depends on '{}', which is not defined.".format(step.name, dependency))
+                dependents[dependency].append(step.name)
+        return dependents
+
+    def _check_acyclic(self, dependents):
+        remaining = {name: len(step.depends_on) for name, step in self.steps.items()}
+        ready = [name for name, count in remaining.items() if count == 0]
+        while ready:
+            for dependent in dependents[ready.pop()]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+        cycle = [name for name, count in remaining.items() if count > 0]
+        if cycle:
+            raise ValidationError("Circular dependency between: {}.".format(", ".join(cycle)))
+
+    def _skip_dependents(self, name, dependents):
+        for dependent in dependents[name]:
+            step = self.steps[dependent]
+            if step.status is None:
+                step.status = STEP_SKIPPED
+                step.error = "'{}' did not succeed".format(name)
+                self._skip_dependents(dependent, dependents)
+
+    def _run_step(self, step):
+        start = time.perf_counter()
+        try:
+            step.result = step.func()
+            step.status = STEP_SUCCEEDED
+        except Exception as e:
+            step.error = e
+            step.status = STEP_FAILED
+        finally:
+            step.seconds = time.perf_counter() - start
+        return step
+
+    def run(self):
+        dependents = self._get_dependents()
+        self._check_acyclic(dependents)
+
+        order = list(self.steps)
+        remaining = {name: len(step.depends_on) for name, step in self.steps.items()}
+        ready = [name for name in order if remaining[name] == 0]
+        running = set()
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+            while ready or running:
+                while ready and len(running) < self.max_parallel:
+                    running.add(executor.submit(self._run_step, self.steps[ready.pop(0)]))
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = future.result()
+                    if step.status == STEP_FAILED:
+                        logger.error("%s failed after %.1fs: %s", step.name, step.seconds, step.error)
+                        self._skip_dependents(step.name, dependents)
+                        continue
+                    logger.info("%s succeeded after %.1fs", step.name, step.seconds)
+                    for dependent in dependents[step.name]:
+                        remaining[dependent] -= 1
+                        if remaining[dependent] == 0 and self.steps[dependent].status is None:
+                            ready.append(dependent)
+                    ready.sort(key=order.index)
+        return self.steps
+
+    def failed_steps(self):
+        return [step for step in self.steps.values() if step.status == STEP_FAILED]
+
+    def log_summary(self):
+        lines = []
+        for step in self.steps.values():
+            seconds = "{:>8.1f}s".format(step.seconds) if step.seconds is not None else " " * 9
+            lines.append("  {:<50} {:<10} {}".format(step.name, step.status, seconds))
+        logger.warning("Provisioning summary:\n%s", "\n".join(lines))
@@ -86,4 +86,6 @@ DEFAULT_PORT = 8080  # used for no dockerfile scenario; not the hello world imag
 
 HELLO_WORLD_IMAGE = "mcr.microsoft.com/k8se/quickstart:latest"
 
+COMPOSE_MAX_PARALLEL = 1  # how many services of a compose file are built or created at once by default
+
 LOGS_STRING = '[{"category":"ContainerAppConsoleLogs","categoryGroup":null,"enabled":true,"retentionPolicy":{"days":0,"enabled":false}},{"category":"ContainerAppSystemLogs","categoryGroup":null,"enabled":true,"retentionPolicy":{"days":0,"enabled":false}}]'  # pylint: disable=line-too-long
@@ -128,6 +128,21 @@ helps['containerapp list-usages'] = """
           az containerapp list-usages -l eastus
 """
 
+helps['containerapp wait'] = """
+    type: command
+    short-summary: Wait for several container apps to finish provisioning.
+    long-summary: All of the container apps are polled from a single loop, backing off between requests, so waiting on many apps created with --no-wait does not take longer than waiting on the slowest one. Fails if any of them did not provision successfully.
+    examples:
+    - name: Create several container apps without waiting, then wait for all of them.
+      text: |
+          az containerapp create -n MyContainerapp1 -g MyResourceGroup --environment MyEnvironment --image MyImage --no-wait
+          az containerapp create -n MyContainerapp2 -g MyResourceGroup --environment MyEnvironment --image MyImage --no-wait
+          az containerapp wait -g MyResourceGroup --names MyContainerapp1 MyContainerapp2
+    - name: Wait for container apps by resource ID.
+      text: |
+          az containerapp wait --ids $(az containerapp list -g MyResourceGroup --query "[].id" -o tsv)
+"""
+
 helps['containerapp env list-usages'] = """
     type: command
     short-summary: List usages of quotas for specific managed environment.
@@ -817,6 +832,16 @@ helps['containerapp job stop'] = """
       text: az containerapp job stop -n MyContainerAppJob -g MyResourceGroup --execution-name-list MyContainerAppJob-66v9xh0,MyContainerAppJob-66v9xh1
 """
 
+helps['containerapp job wait'] = """
+    type: command
+    short-summary: Wait for several Container Apps Jobs to finish provisioning.
+    long-summary: All of the jobs are polled from a single loop, backing off between requests. Fails if any of them did not provision successfully.
+    examples:
+    - name: Wait for jobs created with --no-wait.
+      text: |
+          az containerapp job wait -g MyResourceGroup --names MyContainerAppJob1 MyContainerAppJob2
+"""
+
 # Container App Job Secret Commands
 helps['containerapp job secret'] = """
     type: group
@@ -1692,6 +1717,7 @@ helps['containerapp compose'] = """
 helps['containerapp compose create'] = """
     type: command
     short-summary: Create one or more Container Apps in a new or existing Container App Environment from a Compose specification.
+    long-summary: Services are built and created one at a time, or in parallel with --max-parallel. A service is created once the services listed in its depends_on have been created, and a service that fails to build or to be created only stops the services that depend on it.
     examples:
     - name: Create a container app by implicitly passing in a Compose configuration file from current directory.
       text: |
@@ -1702,6 +1728,11 @@ helps['containerapp compose create'] = """
           az containerapp compose create -g MyResourceGroup \\
               --environment MyContainerappEnv \\
               --compose-file-path "path/to/docker-compose.yml"
+    - name: Create the container apps of a Compose configuration file, building or creating at most 8 services at the same time.
+      text: |
+          az containerapp compose create -g MyResourceGroup \\
+              --environment MyContainerappEnv \\
+              --max-parallel 8
 """
 
 # Patch commands
@@ -1713,6 +1744,7 @@ helps['containerapp patch'] = """
 helps['containerapp patch list'] = """
    type: command
    short-summary: List container apps that can be patched. Patching is only available for the apps built using the source to cloud feature. See https://aka.ms/aca-local-source-to-cloud
+   long-summary: Each distinct image is inspected once. Inspections are cached in the Azure CLI configuration directory; images pinned to a digest are cached indefinitely and tagged images for an hour, which can be changed with 'az config set containerapp.patch_inspect_cache_ttl=<seconds>'.
    examples:
     - name: List patchable container apps in the current subscription.
       text: |
@@ -454,6 +454,7 @@ def load_arguments(self, _):
         c.argument('environment', options_list=['--environment', '-e'], help='Name or resource id of the Container App environment.')
         c.argument('compose_file_path', options_list=['--compose-file-path', '-f'], help='Path to a Docker Compose file with the configuration to import to Azure Container Apps.')
         c.argument('transport_mapping', options_list=['--transport-mapping', c.deprecate(target='--transport', redirect='--transport-mapping')], action='append', nargs='+', help="Transport options per Container App instance (servicename=transportsetting).")
+        c.argument('max_parallel', type=int, is_preview=True, help="Maximum number of services built or created at the same time, 1 by default. A service is only created once the services it depends on have been created.")
 
     with self.argument_context('containerapp env workload-profile') as c:
         c.argument('env_name', options_list=['--name', '-n'], help="The name of the Container App environment")
@@ -494,6 +495,13 @@ def load_arguments(self, _):
         c.argument('max_executions', type=int, help="Maximum number of job executions that are created for a trigger")
         c.argument('polling_interval', type=int, help="Interval to check each event source in seconds.")
 
+    for scope, resource in [('containerapp wait', 'container apps'), ('containerapp job wait', 'Container Apps Jobs')]:
+        with self.argument_context(scope) as c:
+            c.argument('resource_group_name', arg_type=resource_group_name_type, id_part=None)
+            c.argument('names', nargs='+', help=f"Space-separated names of the {resource} in --resource-group to wait for.")
+            c.argument('ids', nargs='+', help=f"Space-separated resource IDs of the {resource} to wait for.")
+            c.argument('timeout', type=int, help="Maximum number of seconds to wait for all of them. Defaults to 600.")
+
     with self.argument_context('containerapp job create') as c:
         c.argument('system_assigned', options_list=['--mi-system-assigned', c.deprecate(target='--system-assigned', redirect='--mi-system-assigned', hide=True)], help='Boolean indicating whether to assign system-assigned identity.', action='store_true')
         c.argument('trigger_type', help='Trigger type. Schedule | Event | Manual')
@@ -0,0 +1,174 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+# pylint: disable=line-too-long, broad-except
+
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+PATCH_INSPECT_CACHE_FILE_NAME = "patch_inspect_cache.json"
+PATCH_INSPECT_CACHE_VERSION = 1
+PATCH_INSPECT_CACHE_TTL = 60 * 60  # how many seconds the inspection of a tagged image is trusted
+PATCH_INSPECT_MAX_WORKERS = 10
+PATCH_APPLY_MAX_WORKERS = 8
+PATCH_APPLY_MAX_WORKERS_PER_ENVIRONMENT = 2  # how many container apps of one environment are updated at once
+# remote_info of an image that could not be inspected
+INSPECT_FAILED = 401
+
+
+class PatchPhaseTimer():
+    """Records how long each phase of a patch command takes, to be logged as a summary at the end."""
+
+    def __init__(self):
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def log_summary(self):
+        if not self.phases:
+            return
+        total = sum(seconds for _, seconds in self.phases)
+        lines = ["  {:<50} {:>8.1f}s".format(name, seconds) for name, seconds in self.phases]
+        logger.warning("Time spent per phase:\n%s\n  %s %8.1fs", "\n".join(lines), "{:<50}".format("Total"), total)
+
+
+def get_image_inspection_key(image_name):
+    # an image pinned to a digest is the same image whatever tag is written next to it
+    if "@sha256:" in image_name:
+        repository, digest = image_name.split("@", 1)
+        if ":" in repository.rsplit("/", 1)[-1]:
+            repository = repository.rsplit(":", 1)[0]
+        return repository + "@" + digest
+    return image_name
+
+
+class ImageInspectionCache():
+    """On-disk cache of `pack inspect-image` results keyed by image reference.
+
+    Images pinned to a digest never change, so their inspection never expires. A tag may be pushed
+    again at any time, so the inspection of a tagged image is only trusted for `ttl` seconds."""
+
+    def __init__(self, cache_dir, ttl=PATCH_INSPECT_CACHE_TTL):
+        self.cache_path = os.path.join(cache_dir, PATCH_INSPECT_CACHE_FILE_NAME)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = self._read()
+        self._dirty = False
+
+    def _read(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(raw, dict) or raw.get("version") != PATCH_INSPECT_CACHE_VERSION:
+            return {}
+        return raw.get("images") or {}
+
+    def _is_fresh(self, key, entry):
+        return "@sha256:" in key or time.time() - entry.get("inspected", 0) < self.ttl
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._is_fresh(key, entry):
+                return entry["result"]
+            return None
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = {"result": result, "inspected": time.time()}
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = {k: v for k, v in self._entries.items() if self._is_fresh(k, v)}
+            tmp_path = None
+            try:
+                os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+                # write next to the cache and swap it in so a concurrent run never reads a partial file
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.cache_path), suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"version": PATCH_INSPECT_CACHE_VERSION, "images": entries}, f)
+                os.replace(tmp_path, self.cache_path)
+                self._dirty = False
+            except OSError as e:
+                logger.debug("Unable to save image inspection cache to %s: %s", self.cache_path, e)
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+
+def get_image_inspection_cache(cmd):
+    cache_dir = os.path.join(cmd.cli_ctx.config.config_dir, "containerapp")
+    ttl = cmd.cli_ctx.config.getint("containerapp", "patch_inspect_cache_ttl", fallback=PATCH_INSPECT_CACHE_TTL)
+    return ImageInspectionCache(cache_dir, ttl=ttl)
+
+
+def inspect_image(pack_exec_path, image_name):
+    if (image_name.find("run-dotnet") != -1) and (image_name.find("cbl-mariner") != -1):
+        return {
+            "remote_info":
+            {
+                "run_images":
+                [{
+                    "name": "mcr.microsoft.com/oryx/builder:" + image_name.split(":")[-1]
+                }]
+            },
+            "image_name": image_name
+        }
+    img_info = subprocess.run([pack_exec_path, "inspect-image", image_name, "--output", "json"], stderr=subprocess.PIPE, stdout=subprocess.PIPE, check=False)
+    if img_info.stderr.find(b"status code 401 Unauthorized") != -1 or img_info.stderr.find(b"unable to find image") != -1:
+        return dict(remote_info=INSPECT_FAILED, image_name=image_name)
+    try:
+        return json.loads(img_info.stdout)
+    except ValueError:
+        logger.debug("Failed to inspect %s: %s", image_name, img_info.stderr.decode(errors="replace"))
+        return dict(remote_info=INSPECT_FAILED, image_name=image_name)
+
+
+def inspect_images(pack_exec_path, image_names, cache=None, max_workers=PATCH_INSPECT_MAX_WORKERS):
+    """Inspect every distinct image once, reusing cached inspections. Returns the inspection of each
+    image name and how many of them came from the cache."""
+    keys = {}
+    for image_name in image_names:
+        keys.setdefault(get_image_inspection_key(image_name), image_name)
+
+    inspections = {}
+    to_inspect = []
+    for key, image_name in keys.items():
+        cached = cache.get(key) if cache else None
+        if cached is not None:
+            inspections[key] = cached
+        else:
+            to_inspect.append((key, image_name))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [(key, executor.submit(inspect_image, pack_exec_path, image_name)) for key, image_name in to_inspect]
+        for key, future in futures:
+            inspections[key] = future.result()
+            # a failed inspection is usually a missing registry login, which may be fixed before the next run
+            if cache and inspections[key]["remote_info"] != INSPECT_FAILED:
+                cache.put(key, inspections[key])
+    if cache:
+        cache.save()
+
+    return {image_name: inspections[get_image_inspection_key(image_name)] for image_name in image_names}, len(keys) - len(to_inspect)
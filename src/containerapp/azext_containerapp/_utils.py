@@ -42,7 +42,7 @@ from knack.log import get_logger
 from msrestazure.tools import parse_resource_id, is_valid_resource_id, resource_id
 
 from ._clients import ContainerAppClient, ManagedEnvironmentClient, WorkloadProfileClient, ContainerAppsJobClient, \
-    ConnectedEnvCertificateClient
+    ConnectedEnvCertificateClient, wait_for_provisioning
 from ._client_factory import handle_raw_exception, providers_client_factory, cf_resource_groups, \
     log_analytics_client_factory, log_analytics_shared_key_client_factory, custom_location_client_factory, \
     k8s_extension_client_factory
@@ -1400,10 +1400,11 @@ def queue_acr_build(cmd, registry_rg, registry_name, img_name, src_dir, dockerfi
     import os
     import uuid
     import tempfile
-    from ._archive_utils import upload_source_code
+    from ._archive_utils import upload_source_code, get_docker_file_in_tar
     from azure.cli.command_modules.acr._stream_utils import stream_logs
     from azure.cli.command_modules.acr._client_factory import cf_acr_registries_tasks
     from azure.cli.core.commands import LongRunningOperation
+    from azure.core.exceptions import HttpResponseError
 
     # client_registries = get_acr_service_client(cmd.cli_ctx).registries
     client_registries = cf_acr_registries_tasks(cmd.cli_ctx)
@@ -1415,42 +1416,52 @@ def queue_acr_build(cmd, registry_rg, registry_name, img_name, src_dir, dockerfi
     if not os.path.isfile(docker_file_path):
         raise ValidationError("Unable to find '{}'.".format(docker_file_path))
 
-    # NOTE: os.path.basename is unable to parse "\" in the file path
-    original_docker_file_name = os.path.basename(docker_file_path.replace("\\", "/"))
-    docker_file_in_tar = '{}_{}'.format(uuid.uuid4().hex, original_docker_file_name)
+    docker_file_in_tar = get_docker_file_in_tar(docker_file_path)
     tar_file_path = os.path.join(tempfile.gettempdir(), 'build_archive_{}.tar.gz'.format(uuid.uuid4().hex))
 
-    source_location = upload_source_code(cmd, client_registries, registry_name, registry_rg, src_dir, tar_file_path, docker_file_path, docker_file_in_tar)
-
-    # For local source, the docker file is added separately into tar as the new file name (docker_file_in_tar)
-    # So we need to update the docker_file_path
-    docker_file_path = docker_file_in_tar
-
-    OS, Architecture = cmd.get_models('OS', 'Architecture', resource_type=ResourceType.MGMT_CONTAINERREGISTRY, operation_group='runs')
-    # Default platform values
-    platform_os = OS.linux.value
-    platform_arch = Architecture.amd64.value
-    platform_variant = None
-
-    DockerBuildRequest, PlatformProperties = cmd.get_models('DockerBuildRequest', 'PlatformProperties',
-                                                            resource_type=ResourceType.MGMT_CONTAINERREGISTRY, operation_group='runs')
-    docker_build_request = DockerBuildRequest(
-        image_names=[img_name],
-        is_push_enabled=True,
-        source_location=source_location,
-        platform=PlatformProperties(
-            os=platform_os,
-            architecture=platform_arch,
-            variant=platform_variant
-        ),
-        docker_file_path=docker_file_path,
-        timeout=None,
-        arguments=[])
-
-    queued_build = LongRunningOperation(cmd.cli_ctx)(client_registries.begin_schedule_run(
-        resource_group_name=registry_rg,
-        registry_name=registry_name,
-        run_request=docker_build_request))
+    def schedule_build(source_location):
+        # For local source, the docker file is added separately into tar as the new file name (docker_file_in_tar)
+        # So it is the docker_file_path of the build
+        OS, Architecture = cmd.get_models('OS', 'Architecture', resource_type=ResourceType.MGMT_CONTAINERREGISTRY, operation_group='runs')
+        # Default platform values
+        platform_os = OS.linux.value
+        platform_arch = Architecture.amd64.value
+        platform_variant = None
+
+        DockerBuildRequest, PlatformProperties = cmd.get_models('DockerBuildRequest', 'PlatformProperties',
+                                                                resource_type=ResourceType.MGMT_CONTAINERREGISTRY, operation_group='runs')
+        docker_build_request = DockerBuildRequest(
+            image_names=[img_name],
+            is_push_enabled=True,
+            source_location=source_location,
+            platform=PlatformProperties(
+                os=platform_os,
+                architecture=platform_arch,
+                variant=platform_variant
+            ),
+            docker_file_path=docker_file_in_tar,
+            timeout=None,
+            arguments=[])
+
+        return LongRunningOperation(cmd.cli_ctx)(client_registries.begin_schedule_run(
+            resource_group_name=registry_rg,
+            registry_name=registry_name,
+            run_request=docker_build_request))
+
+    source_location, reused_upload = upload_source_code(cmd, client_registries, registry_name, registry_rg, src_dir,
+                                                        tar_file_path, docker_file_path, docker_file_in_tar)
+    try:
+        queued_build = schedule_build(source_location)
+    except HttpResponseError as e:
+        # the registry rejects a run whose source it no longer has, before anything is built
+        if not reused_upload or e.status_code not in (400, 404):
+            raise
+        logger.warning("Registry %s rejected the source code uploaded earlier, uploading the source code again.",
+                       registry_name)
+        source_location, _ = upload_source_code(cmd, client_registries, registry_name, registry_rg, src_dir,
+                                                tar_file_path, docker_file_path, docker_file_in_tar,
+                                                reuse_upload=False)
+        queued_build = schedule_build(source_location)
 
     run_id = queued_build.run_id
     logger.info("Queued a build with ID: %s", run_id)
@@ -2150,3 +2161,43 @@ def validate_custom_location(cmd, custom_location=None):
     if not extension_existing:
         raise ValidationError('There is no Microsoft.App.Environment extension found associated with custom location {}'.format(custom_location))
     return r.location
+
+
+def wait_for_provisioning_states(cmd, resource_type, api_version, resource_group_name=None, names=None, ids=None, timeout=None):
+    """Wait for every container app or job given by name or resource ID to finish provisioning, polling all of
+    them from a single loop. Raises if any of them failed or is still provisioning when the timeout expires."""
+    if not names and not ids:
+        raise RequiredArgumentMissingError('Please specify --names or --ids.')
+    if names and not resource_group_name:
+        raise RequiredArgumentMissingError('Please specify --resource-group together with --names.')
+
+    sub_id = get_subscription_id(cmd.cli_ctx)
+    resource_ids = [resource_id(subscription=sub_id, resource_group=resource_group_name, namespace=CONTAINER_APPS_RP,
+                                type=resource_type, name=name) for name in names or []]
+    for r_id in ids or []:
+        if not is_valid_resource_id(r_id):
+            raise ValidationError('{} is not a valid Azure resource ID.'.format(r_id))
+        resource_ids.append(r_id)
+
+    management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager.strip('/')
+    request_urls = {r_id: "{}{}?api-version={}".format(management_hostname, r_id, api_version)
+                    for r_id in dict.fromkeys(resource_ids)}
+    kwargs = {"timeout": timeout} if timeout is not None else {}
+    results = wait_for_provisioning(cmd, request_urls, **kwargs)
+
+    states = []
+    for r_id, resource in results.items():
+        parsed = parse_resource_id(r_id)
+        states.append({
+            "id": r_id,
+            "name": parsed["name"],
+            "resourceGroup": parsed["resource_group"],
+            "provisioningState": safe_get(resource, "properties", "provisioningState")
+        })
+
+    unfinished = [s for s in states if (s["provisioningState"] or "").lower() != "succeeded"]
+    if unfinished:
+        for state in unfinished:
+            logger.warning("%s is in provisioning state %s", state["id"], state["provisioningState"])
+        raise CLIError("{} of {} resources did not finish provisioning successfully.".format(len(unfinished), len(states)))
+    return states
@@ -171,7 +171,6 @@ def _set_ssh_defaults(cmd, namespace):
     app = ContainerAppClient.show(cmd, namespace.resource_group_name, namespace.name)
     if not app:
         raise ResourceNotFoundError("Could not find a container app")
-    replicas = []
     if not namespace.revision:
         namespace.revision = app.get("properties", {}).get("latestRevisionName")
         if not namespace.revision:
@@ -182,13 +181,14 @@ def _set_ssh_defaults(cmd, namespace):
             ping_container_app(app)  # needed to get an alive replica
         except Exception as e:  # pylint: disable=broad-except
             logger.warning("Failed to ping container app with error '%s' \nPlease ensure there is an alive replica. ", str(e))
-        replicas = ContainerAppClient.list_replicas(cmd=cmd,
-                                                    resource_group_name=namespace.resource_group_name,
-                                                    container_app_name=namespace.name,
-                                                    revision_name=namespace.revision)
-        if not replicas:
+        # only the first replica is needed, so do not collect every page
+        replica = next(ContainerAppClient.iter_replicas(cmd=cmd,
+                                                        resource_group_name=namespace.resource_group_name,
+                                                        container_app_name=namespace.name,
+                                                        revision_name=namespace.revision), None)
+        if not replica:
             raise ResourceNotFoundError("Could not find a replica for this app")
-        namespace.replica = replicas[0]["name"]
+        namespace.replica = replica["name"]
     if not namespace.container:
         revision = ContainerAppClient.show_revision(cmd, resource_group_name=namespace.resource_group_name,
                                                     container_app_name=namespace.name,
@@ -28,6 +28,7 @@ def load_command_table(self, _):
         g.custom_command('browse', 'open_containerapp_in_browser')
         g.custom_show_command('show-custom-domain-verification-id', 'show_custom_domain_verification_id', is_preview=True)
         g.custom_command('list-usages', 'list_usages', table_transformer=transform_usages_output, is_preview=True)
+        g.custom_command('wait', 'wait_containerapp', is_preview=True)
 
     with self.command_group('containerapp replica') as g:
         g.custom_show_command('show', 'get_replica')  # TODO implement the table transformer
@@ -55,6 +56,7 @@ def load_command_table(self, _):
         g.custom_command('update', 'update_containerappsjob', supports_no_wait=True, exception_handler=ex_handler_factory())
         g.custom_command('start', 'start_containerappsjob', supports_no_wait=True, exception_handler=ex_handler_factory())
         g.custom_command('stop', 'stop_containerappsjob', supports_no_wait=True, exception_handler=ex_handler_factory())
+        g.custom_command('wait', 'wait_containerappsjob', is_preview=True)
 
     with self.command_group('containerapp job execution') as g:
         g.custom_show_command('list', 'listexecution_containerappsjob', table_transformer=transform_job_execution_list_output)
@@ -81,21 +81,32 @@ class BaseContainerAppDecorator(BaseResource):
     def __init__(self, cmd: AzCliCommand, client: Any, raw_parameters: Dict, models: str):
         super().__init__(cmd, client, raw_parameters, models)
 
-    def list(self):
-        containerapps = super().list()
+    def list(self, predicate=None):
+        # the list API has no filter on the environment, so apps are filtered page by page as they
+        # arrive instead of collecting every app in the subscription first
+        predicates = [predicate] if predicate else []
         managed_env = self.get_argument_managed_env()
         if managed_env:
-            env_name = parse_resource_id(managed_env)["name"].lower()
-            if "resource_group" in parse_resource_id(managed_env):
-                self.get_environment_client().show(self.cmd, parse_resource_id(managed_env)["resource_group"],
-                                                   parse_resource_id(managed_env)["name"])
-                containerapps = [c for c in containerapps if
-                                 c["properties"]["environmentId"].lower() == managed_env.lower()]
+            parsed_env = parse_resource_id(managed_env)
+            env_name = parsed_env["name"].lower()
+            if "resource_group" in parsed_env:
+                # make sure the environment exists before paging through the apps
+                self.get_environment_client().show(self.cmd, parsed_env["resource_group"], parsed_env["name"])
+                predicates.append(lambda c: c["properties"]["environmentId"].lower() == managed_env.lower())
             else:
-                containerapps = [c for c in containerapps if
-                                 parse_resource_id(c["properties"]["environmentId"])["name"].lower() == env_name]
+                predicates.append(lambda c: parse_resource_id(c["properties"]["environmentId"])["name"].lower() == env_name)
 
-        return containerapps
+        def matches(containerapp):
+            return all(p(containerapp) for p in predicates)
+
+        try:
+            if self.get_argument_resource_group_name() is None:
+                containerapps = self.client.iter_by_subscription(cmd=self.cmd, predicate=matches)
+            else:
+                containerapps = self.client.iter_by_resource_group(cmd=self.cmd, resource_group_name=self.get_argument_resource_group_name(), predicate=matches)
+            return list(containerapps)
+        except CLIError as e:
+            handle_raw_exception(e)
 
     def show(self):
         try:
@@ -1594,13 +1605,12 @@ class ContainerAppPreviewListDecorator(BaseContainerAppDecorator):
     ):
         super().__init__(cmd, client, raw_parameters, models)
 
-    def list(self):
-        containerapps = super().list()
+    def list(self, predicate=None):
         if self.get_argument_environment_type() == CONNECTED_ENVIRONMENT_TYPE:
-            containerapps = [c for c in containerapps if CONNECTED_ENVIRONMENT_RESOURCE_TYPE in c["properties"]["environmentId"]]
+            return super().list(lambda c: CONNECTED_ENVIRONMENT_RESOURCE_TYPE in c["properties"]["environmentId"])
         if self.get_argument_environment_type() == MANAGED_ENVIRONMENT_TYPE:
-            containerapps = [c for c in containerapps if MANAGED_ENVIRONMENT_RESOURCE_TYPE in c["properties"]["environmentId"]]
-        return containerapps
+            return super().list(lambda c: MANAGED_ENVIRONMENT_RESOURCE_TYPE in c["properties"]["environmentId"])
+        return super().list()
 
     def get_environment_client(self):
         env = self.get_argument_managed_env()
@@ -7,6 +7,7 @@
 import threading
 import sys
 import time
+import functools
 from urllib.parse import urlparse
 import json
 import re
@@ -58,6 +59,8 @@ from ._clients import (
     ConnectedEnvStorageClient, ConnectedEnvCertificateClient
 )
 from ._dev_service_utils import DevServiceUtils
+from ._patch_utils import (PatchPhaseTimer, get_image_inspection_cache, inspect_images, INSPECT_FAILED,
+                           PATCH_APPLY_MAX_WORKERS, PATCH_APPLY_MAX_WORKERS_PER_ENVIRONMENT)
 from ._github_oauth import get_github_access_token
 from ._models import (
     Ingress as IngressModel,
@@ -99,7 +102,7 @@ from ._utils import (_validate_subscription_registered,
                      ensure_workload_profile_supported,
                      get_current_mariner_tags, patchable_check, get_pack_exec_path, is_docker_running, trigger_workflow,
                      AppType,
-                     format_location, connected_env_check_cert_name_availability)
+                     format_location, connected_env_check_cert_name_availability, wait_for_provisioning_states)
 from ._ssh_utils import (SSH_DEFAULT_ENCODING, WebSocketConnection, read_ssh, get_stdin_writer, SSH_CTRL_C_MSG,
                          SSH_BACKUP_ENCODING)
 from ._constants import (MAXIMUM_SECRET_LENGTH, MICROSOFT_SECRET_SETTING_NAME, FACEBOOK_SECRET_SETTING_NAME, GITHUB_SECRET_SETTING_NAME,
@@ -108,7 +111,8 @@ from ._constants import (MAXIMUM_SECRET_LENGTH, MICROSOFT_SECRET_SETTING_NAME, F
                          MANAGED_CERTIFICATE_RT, PRIVATE_CERTIFICATE_RT, PENDING_STATUS, SUCCEEDED_STATUS, DEV_POSTGRES_IMAGE, DEV_POSTGRES_SERVICE_TYPE,
                          DEV_POSTGRES_CONTAINER_NAME, DEV_REDIS_IMAGE, DEV_REDIS_SERVICE_TYPE, DEV_REDIS_CONTAINER_NAME, DEV_KAFKA_CONTAINER_NAME,
                          DEV_KAFKA_IMAGE, DEV_KAFKA_SERVICE_TYPE, DEV_MARIADB_CONTAINER_NAME, DEV_MARIADB_IMAGE, DEV_MARIADB_SERVICE_TYPE, DEV_QDRANT_IMAGE,
-                         DEV_QDRANT_CONTAINER_NAME, DEV_QDRANT_SERVICE_TYPE, DEV_SERVICE_LIST, CONTAINER_APPS_SDK_MODELS, BLOB_STORAGE_TOKEN_STORE_SECRET_SETTING_NAME)
+                         DEV_QDRANT_CONTAINER_NAME, DEV_QDRANT_SERVICE_TYPE, DEV_SERVICE_LIST, CONTAINER_APPS_SDK_MODELS, BLOB_STORAGE_TOKEN_STORE_SECRET_SETTING_NAME,
+                         COMPOSE_MAX_PARALLEL)
 
 logger = get_logger(__name__)
 
@@ -634,6 +638,11 @@ def show_containerapp(cmd, name, resource_group_name, show_secrets=False):
     return containerapp_base_decorator.show()
 
 
+def wait_containerapp(cmd, resource_group_name=None, names=None, ids=None, timeout=None):
+    _validate_subscription_registered(cmd, CONTAINER_APPS_RP)
+    return wait_for_provisioning_states(cmd, "containerApps", ContainerAppClient.api_version, resource_group_name, names, ids, timeout)
+
+
 def list_containerapp(cmd, resource_group_name=None, managed_env=None, environment_type="all"):
     raw_parameters = locals()
     containerapp_list_decorator = ContainerAppPreviewListDecorator(
@@ -880,6 +889,11 @@ def list_containerappsjob(cmd, resource_group_name=None):
     return containerapp_job_decorator.list()
 
 
+def wait_containerappsjob(cmd, resource_group_name=None, names=None, ids=None, timeout=None):
+    _validate_subscription_registered(cmd, CONTAINER_APPS_RP)
+    return wait_for_provisioning_states(cmd, "jobs", ContainerAppsJobClient.api_version, resource_group_name, names, ids, timeout)
+
+
 def delete_containerappsjob(cmd, name, resource_group_name, no_wait=False):
     raw_parameters = locals()
     containerapp_job_decorator = ContainerAppJobDecorator(
@@ -2032,10 +2046,8 @@ def delete_github_action(cmd, name, resource_group_name, token=None, login_with_
 
 def list_revisions(cmd, name, resource_group_name, all=False):  # pylint: disable=redefined-builtin
     try:
-        revision_list = ContainerAppClient.list_revisions(cmd=cmd, resource_group_name=resource_group_name, name=name)
-        if all:
-            return revision_list
-        return [r for r in revision_list if r["properties"]["active"]]
+        predicate = None if all else lambda r: r["properties"]["active"]
+        return list(ContainerAppClient.iter_revisions(cmd=cmd, resource_group_name=resource_group_name, name=name, predicate=predicate))
     except CLIError as e:
         handle_raw_exception(e)
 
@@ -3372,10 +3384,10 @@ def count_replicas(cmd, resource_group_name, name, revision=None):
         handle_raw_exception(e)
 
     try:
-        count = len(ContainerAppClient.list_replicas(cmd=cmd,
-                                                     resource_group_name=resource_group_name,
-                                                     container_app_name=name,
-                                                     revision_name=revision))
+        count = sum(1 for _ in ContainerAppClient.iter_replicas(cmd=cmd,
+                                                                resource_group_name=resource_group_name,
+                                                                container_app_name=name,
+                                                                revision_name=revision))
         return count
     except Exception as e:
         handle_raw_exception(e)
@@ -4729,9 +4741,12 @@ def create_containerapps_from_compose(cmd,  # pylint: disable=R0914
                                       registry_pass=None,
                                       transport_mapping=None,
                                       location=None,
-                                      tags=None):
+                                      tags=None,
+                                      max_parallel=COMPOSE_MAX_PARALLEL):
     from pycomposefile import ComposeFile
 
+    from ._compose_scheduler import ComposeScheduler
+
     from ._compose_utils import (create_containerapps_compose_environment,
                                  build_containerapp_from_compose_service,
                                  check_supported_platform,
@@ -4764,10 +4779,61 @@ def create_containerapps_from_compose(cmd,  # pylint: disable=R0914
                                                                        env_rg,
                                                                        tags=tags)
 
+    def _build(service_name, context, dockerfile, image, target_port, ingress_type, registry, registry_username,
+               registry_password, environment):
+        logger.warning("Build configuration defined for service %s.", service_name)
+        logger.warning("The build will be performed by Azure Container Registry.")
+        # the image and registry settings the container app is created with
+        return build_containerapp_from_compose_service(cmd,
+                                                       service_name,
+                                                       context,
+                                                       dockerfile,
+                                                       resource_group_name,
+                                                       managed_env,
+                                                       location,
+                                                       image,
+                                                       target_port,
+                                                       ingress_type,
+                                                       registry,
+                                                       registry_username,
+                                                       registry_password,
+                                                       environment)
+
+    def _create(service_name, service, image_settings, build_step, ingress_type, target_port, transport_setting,
+                startup_command, startup_args, cpu, memory, environment, secret_vars, replicas):
+        logger.info(  # pylint: disable=W1203
+            f"Creating the Container Apps instance for {service_name} under {resource_group_name} in {location}.")
+        # the service runs the image of its build if it has one
+        if build_step is not None:
+            image_settings = build_step.result
+        image, registry, registry_username, registry_password = image_settings
+        return create_containerapp(cmd,
+                                   service_name,
+                                   resource_group_name,
+                                   image=image,
+                                   container_name=service.container_name,
+                                   managed_env=managed_environment["id"],
+                                   ingress=ingress_type,
+                                   target_port=target_port,
+                                   registry_server=registry,
+                                   registry_user=registry_username,
+                                   registry_pass=registry_password,
+                                   transport=transport_setting,
+                                   startup_command=startup_command,
+                                   args=startup_args,
+                                   cpu=cpu,
+                                   memory=memory,
+                                   env_vars=environment,
+                                   secrets=secret_vars,
+                                   min_replicas=replicas,
+                                   max_replicas=replicas, )
+
     compose_yaml = load_yaml_file(compose_file_path)
     parsed_compose_file = ComposeFile(compose_yaml)
     logger.info(parsed_compose_file)
-    containerapps_from_compose = []
+    scheduler = ComposeScheduler(max_parallel=max_parallel)
+    created_steps = []
+    first_build_step = None
     # Using the key to iterate to get the service name
     # pylint: disable=C0201,C0206
     for service_name in parsed_compose_file.ordered_services.keys():
@@ -4776,10 +4842,7 @@ def create_containerapps_from_compose(cmd,  # pylint: disable=R0914
             message = "Unsupported platform found. "
             message += "Azure Container Apps only supports linux/amd64 container images."
             raise InvalidArgumentValueError(message)
-        image = service.image
         warn_about_unsupported_elements(service)
-        logger.info(  # pylint: disable=W1203
-            f"Creating the Container Apps instance for {service_name} under {resource_group_name} in {location}.")
         ingress_type, target_port = resolve_ingress_and_target_port(service)
         registry, registry_username, registry_password = resolve_registry_from_cli_args(registry_server, registry_user, registry_pass)  # pylint: disable=C0301
         transport_setting = resolve_transport_from_cli_args(service_name, transport_mapping)
@@ -4795,51 +4858,44 @@ def create_containerapps_from_compose(cmd,  # pylint: disable=R0914
             environment.extend(secret_env_ref)
         elif secret_env_ref is not None:
             environment = secret_env_ref
+
+        create_depends_on = ["create " + str(dependency) for dependency in service.depends_on or []]
+        build_step = None
         if service.build is not None:
-            logger.warning("Build configuration defined for this service.")
-            logger.warning("The build will be performed by Azure Container Registry.")
             context = service.build.context
             dockerfile = "Dockerfile"
             if service.build.dockerfile is not None:
                 dockerfile = service.build.dockerfile
-            image, registry, registry_username, registry_password = build_containerapp_from_compose_service(
-                cmd,
-                service_name,
-                context,
-                dockerfile,
-                resource_group_name,
-                managed_env,
-                location,
-                image,
-                target_port,
-                ingress_type,
-                registry,
-                registry_username,
-                registry_password,
-                environment)
-        containerapps_from_compose.append(
-            create_containerapp(cmd,
-                                service_name,
-                                resource_group_name,
-                                image=image,
-                                container_name=service.container_name,
-                                managed_env=managed_environment["id"],
-                                ingress=ingress_type,
-                                target_port=target_port,
-                                registry_server=registry,
-                                registry_user=registry_username,
-                                registry_pass=registry_password,
-                                transport=transport_setting,
-                                startup_command=startup_command,
-                                args=startup_args,
-                                cpu=cpu,
-                                memory=memory,
-                                env_vars=environment,
-                                secrets=secret_vars,
-                                min_replicas=replicas,
-                                max_replicas=replicas, )
-        )
-    return containerapps_from_compose
+
+            build_depends_on = []
+            # without a registry, the first build finds or creates one, which the other builds then pick up
+            if registry is None and first_build_step is not None:
+                build_depends_on.append(first_build_step.name)
+            build_step = scheduler.add("build " + service_name,
+                                       functools.partial(_build, service_name, context, dockerfile, service.image,
+                                                         target_port, ingress_type, registry, registry_username,
+                                                         registry_password, environment),
+                                       depends_on=build_depends_on)
+            first_build_step = first_build_step or build_step
+            create_depends_on.append(build_step.name)
+
+        created_steps.append(scheduler.add(
+            "create " + service_name,
+            functools.partial(_create, service_name, service, [service.image, registry, registry_username,
+                                                                registry_password], build_step, ingress_type,
+                              target_port, transport_setting, startup_command, startup_args, cpu, memory,
+                              environment, secret_vars, replicas),
+            depends_on=create_depends_on))
+
+    scheduler.run()
+    scheduler.log_summary()
+    failed_steps = scheduler.failed_steps()
+    if len(failed_steps) == 1:
+        raise failed_steps[0].error
+    if failed_steps:
+        raise CLIError("Failed to provision the compose file:\n{}".format(
+            "\n".join("{}: {}".format(step.name, step.error) for step in failed_steps)))
+    return [step.result for step in created_steps]
 
 
 def list_supported_workload_profiles(cmd, location):
@@ -4920,6 +4976,13 @@ def delete_workload_profile(cmd, resource_group_name, env_name, workload_profile
 
 
 def patch_list(cmd, resource_group_name=None, managed_env=None, show_all=False):
+    timer = PatchPhaseTimer()
+    results = _patch_list(cmd, resource_group_name, managed_env, show_all, timer)
+    timer.log_summary()
+    return results
+
+
+def _patch_list(cmd, resource_group_name, managed_env, show_all, timer):
     if is_docker_running() is False:
         logger.error("Please install or start Docker and try again.")
         return
@@ -4927,7 +4990,8 @@ def patch_list(cmd, resource_group_name=None, managed_env=None, show_all=False):
     if pack_exec_path is None:
         return
     logger.warning("Listing container apps...")
-    ca_list = list_containerapp(cmd, resource_group_name, managed_env)
+    with timer.phase("Listing container apps"):
+        ca_list = list_containerapp(cmd, resource_group_name, managed_env)
     imgs = []
     if ca_list:
         for ca in ca_list:
@@ -4945,16 +5009,27 @@ def patch_list(cmd, resource_group_name=None, managed_env=None, show_all=False):
                     targetContainerAppEnvironmentName=managed_env_name,
                     targetResourceGroup=resource_group_name)
                 imgs.append(result)
-    # Inspect the images
-    results = []
-    inspect_results = []
-    # Multi-worker
+    # Inspect each distinct image once, many containers usually share the same image
     logger.warning("Inspecting container apps images...")
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        [executor.submit(patch_get_image_inspection, pack_exec_path, img, inspect_results) for img in imgs]
+    image_names = [img["imageName"] for img in imgs]
+    with timer.phase("Inspecting {} images of {} containers".format(len(set(image_names)), len(imgs))):
+        inspections, cached_count = inspect_images(pack_exec_path, image_names, cache=get_image_inspection_cache(cmd))
+    logger.info("%s image inspections were reused from the cache", cached_count)
+    inspect_results = []
+    for img in imgs:
+        inspect_result = dict(inspections[img["imageName"]])
+        inspect_result.update({
+            "image_name": img["imageName"],
+            "targetContainerName": img["targetContainerName"],
+            "targetContainerAppName": img["targetContainerAppName"],
+            "targetContainerAppEnvironmentName": img["targetContainerAppEnvironmentName"],
+            "targetResourceGroup": img["targetResourceGroup"]
+        })
+        inspect_results.append(inspect_result)
 
     # Get the current tags of Dotnet Mariners
-    oryx_run_img_tags = get_current_mariner_tags()
+    with timer.phase("Fetching the latest run image tags"):
+        oryx_run_img_tags = get_current_mariner_tags()
     failed_reason = "Failed to inspect the image. Please make sure that you are authenticated to the container registry and that the image exists."
     not_based_mariner_reason = "Image not based on Mariner"
     mcr_check_reason = "Image not from mcr.microsoft.com/oryx/builder"
@@ -4962,7 +5037,7 @@ def patch_list(cmd, resource_group_name=None, managed_env=None, show_all=False):
     # Start checking if the images are based on Mariner
     logger.warning("Checking for patches...")
     for inspect_result in inspect_results:
-        if inspect_result["remote_info"] == 401:
+        if inspect_result["remote_info"] == INSPECT_FAILED:
             results.append(dict(
                 targetContainerName=inspect_result["targetContainerName"],
                 targetContainerAppName=inspect_result["targetContainerAppName"],
@@ -5025,139 +5100,169 @@ def patch_list(cmd, resource_group_name=None, managed_env=None, show_all=False):
     return results
 
 
-def patch_get_image_inspection(pack_exec_path, img, info_list):
-    if (img["imageName"].find("run-dotnet") != -1) and (img["imageName"].find("cbl-mariner") != -1):
-        inspect_result = {
-            "remote_info":
-            {
-                "run_images":
-                [{
-                    "name": "mcr.microsoft.com/oryx/builder:" + img["imageName"].split(":")[-1]
-                }]
-            },
-            "image_name": img["imageName"],
-            "targetContainerName": img["targetContainerName"],
-            "targetContainerAppName": img["targetContainerAppName"],
-            "targetContainerAppEnvironmentName": img["targetContainerAppEnvironmentName"],
-            "targetResourceGroup": img["targetResourceGroup"]
-        }
-    else:
-        with subprocess.Popen(pack_exec_path + " inspect-image " + img["imageName"] + " --output json", shell=True, stderr=subprocess.PIPE, stdout=subprocess.PIPE) as img_info:
-            img_info_out, img_info_err = img_info.communicate()
-            if img_info_err.find(b"status code 401 Unauthorized") != -1 or img_info_err.find(b"unable to find image") != -1:
-                inspect_result = dict(remote_info=401, image_name=img["imageName"])
-            else:
-                inspect_result = json.loads(img_info_out)
-            inspect_result.update({
-                "targetContainerName": img["targetContainerName"],
-                "targetContainerAppName": img["targetContainerAppName"],
-                "targetContainerAppEnvironmentName": img["targetContainerAppEnvironmentName"],
-                "targetResourceGroup": img["targetResourceGroup"]
-            })
-    info_list.append(inspect_result)
-
-
 def patch_interactive(cmd, resource_group_name=None, managed_env=None, show_all=False):
     if is_docker_running() is False:
         logger.error("Please install or start Docker and try again.")
         return
-    patchable_check_results = patch_list(cmd, resource_group_name, managed_env, show_all=show_all)
-    pack_exec_path = get_pack_exec_path()
-    if pack_exec_path is None:
-        return
-    if patchable_check_results is None:
-        return
-    patchable_check_results_json = json.dumps(patchable_check_results, indent=2)
-    without_unpatchable_results = []
-    without_unpatchable_results = [result for result in patchable_check_results if result["id"] is not None]
-    if without_unpatchable_results == [] and (patchable_check_results is None or show_all is False):
-        return
-    logger.warning(patchable_check_results_json)
-    if without_unpatchable_results == []:
-        return
-    user_input = input("Do you want to apply all the patches or specify by id? (y/n/id)\n")
-    patch_apply_handle_input(cmd, patchable_check_results, user_input, pack_exec_path)
+    timer = PatchPhaseTimer()
+    try:
+        patchable_check_results = _patch_list(cmd, resource_group_name, managed_env, show_all, timer)
+        pack_exec_path = get_pack_exec_path()
+        if pack_exec_path is None:
+            return
+        if patchable_check_results is None:
+            return
+        patchable_check_results_json = json.dumps(patchable_check_results, indent=2)
+        without_unpatchable_results = []
+        without_unpatchable_results = [result for result in patchable_check_results if result["id"] is not None]
+        if without_unpatchable_results == [] and (patchable_check_results is None or show_all is False):
+            return
+        logger.warning(patchable_check_results_json)
+        if without_unpatchable_results == []:
+            return
+        user_input = input("Do you want to apply all the patches or specify by id? (y/n/id)\n")
+        patch_apply_handle_input(cmd, patchable_check_results, user_input, pack_exec_path, timer)
+    finally:
+        timer.log_summary()
 
 
 def patch_apply(cmd, resource_group_name=None, managed_env=None, show_all=False):
     if is_docker_running() is False:
         logger.error("Please install or start Docker and try again.")
         return
-    patchable_check_results = patch_list(cmd, resource_group_name, managed_env, show_all=show_all)
-    pack_exec_path = get_pack_exec_path()
-    if pack_exec_path is None:
-        return
-    if patchable_check_results is None:
-        return
-    patchable_check_results_json = json.dumps(patchable_check_results, indent=2)
-    without_unpatchable_results = []
-    without_unpatchable_results = [result for result in patchable_check_results if result["id"] is not None]
-    if without_unpatchable_results == [] and (patchable_check_results is None or show_all is False):
-        return
-    logger.warning(patchable_check_results_json)
-    if without_unpatchable_results == []:
-        return
-    patch_apply_handle_input(cmd, patchable_check_results, "y", pack_exec_path)
-
-
-def patch_apply_handle_input(cmd, patch_check_list, method, pack_exec_path):
+    timer = PatchPhaseTimer()
+    try:
+        patchable_check_results = _patch_list(cmd, resource_group_name, managed_env, show_all, timer)
+        pack_exec_path = get_pack_exec_path()
+        if pack_exec_path is None:
+            return
+        if patchable_check_results is None:
+            return
+        patchable_check_results_json = json.dumps(patchable_check_results, indent=2)
+        without_unpatchable_results = []
+        without_unpatchable_results = [result for result in patchable_check_results if result["id"] is not None]
+        if without_unpatchable_results == [] and (patchable_check_results is None or show_all is False):
+            return
+        logger.warning(patchable_check_results_json)
+        if without_unpatchable_results == []:
+            return
+        patch_apply_handle_input(cmd, patchable_check_results, "y", pack_exec_path, timer)
+    finally:
+        timer.log_summary()
+
+
+def patch_apply_handle_input(cmd, patch_check_list, method, pack_exec_path, timer=None):
     input_method = method.strip().lower()
+    timer = timer or PatchPhaseTimer()
     # Track number of times patches were applied successfully.
     patch_apply_count = 0
-    if input_method == "y":
-        telemetry_record_method = "y"
-        for patch_check in patch_check_list:
-            if patch_check["id"] and patch_check["newRunImage"]:
-                patch_cli_call(cmd,
-                               patch_check["targetResourceGroup"],
-                               patch_check["targetContainerAppName"],
-                               patch_check["targetContainerName"],
-                               patch_check["targetImageName"],
-                               patch_check["newRunImage"],
-                               pack_exec_path)
-                # Increment patch_apply_count with every successful patch.
-                patch_apply_count += 1
-    elif input_method == "n":
-        telemetry_record_method = "n"
-        logger.warning("No patch applied.")
-        return
-    else:
-        # Check if method is an existing id in the list
-        for patch_check in patch_check_list:
-            if patch_check["id"] == input_method:
-                patch_cli_call(cmd,
-                               patch_check["targetResourceGroup"],
-                               patch_check["targetContainerAppName"],
-                               patch_check["targetContainerName"],
-                               patch_check["targetImageName"],
-                               patch_check["newRunImage"],
-                               pack_exec_path)
-                patch_apply_count += 1
-                telemetry_record_method = input_method
-                break
+    errors = []
+    telemetry_record_method = "invalid"
+    try:
+        if input_method == "y":
+            telemetry_record_method = "y"
+            patch_apply_count, errors = patch_apply_all(cmd,
+                                                        [patch_check for patch_check in patch_check_list if patch_check["id"] and patch_check["newRunImage"]],
+                                                        pack_exec_path,
+                                                        timer)
+        elif input_method == "n":
+            telemetry_record_method = "n"
+            logger.warning("No patch applied.")
+            return
         else:
-            telemetry_record_method = "invalid"
-            logger.error("Invalid patch method or id.")
-    patch_apply_properties = {
-        'Context.Default.AzureCLI.PatchUserResponse': telemetry_record_method,
-        'Context.Default.AzureCLI.PatchApplyCount': patch_apply_count
-    }
-    telemetry_core.add_extension_event('containerapp', patch_apply_properties)
+            # Check if method is an existing id in the list
+            for patch_check in patch_check_list:
+                if patch_check["id"] == input_method:
+                    patch_apply_count, errors = patch_apply_all(cmd, [patch_check], pack_exec_path, timer)
+                    telemetry_record_method = input_method
+                    break
+            else:
+                logger.error("Invalid patch method or id.")
+        if errors:
+            raise errors[0]
+    finally:
+        # the patches applied before a failure are counted too
+        patch_apply_properties = {
+            'Context.Default.AzureCLI.PatchUserResponse': telemetry_record_method,
+            'Context.Default.AzureCLI.PatchApplyCount': patch_apply_count
+        }
+        telemetry_core.add_extension_event('containerapp', patch_apply_properties)
     return
 
 
-def patch_cli_call(cmd, resource_group, container_app_name, container_name, target_image_name, new_run_image, pack_exec_path):
+def patch_apply_all(cmd, patch_checks, pack_exec_path, timer):
+    """Apply the patches concurrently and return how many were applied along with the errors raised.
+
+    Every distinct image is rebased and published once, however many containers run it. Container apps are
+    then updated in parallel, at most PATCH_APPLY_MAX_WORKERS_PER_ENVIRONMENT at a time per environment, and
+    the containers of one app one after the other so its revisions are not created concurrently."""
+    errors = []
+
+    rebases = {}
+    for patch_check in patch_checks:
+        rebases.setdefault((patch_check["targetImageName"], patch_check["newRunImage"]), []).append(patch_check)
+    new_images = {}
+    with timer.phase("Rebasing and publishing {} images".format(len(rebases))):
+        with ThreadPoolExecutor(max_workers=min(PATCH_APPLY_MAX_WORKERS, len(rebases) or 1)) as executor:
+            futures = [(key, executor.submit(patch_rebase_and_publish, key[0], key[1], pack_exec_path)) for key in rebases]
+            for key, future in futures:
+                try:
+                    new_images[key] = future.result()
+                except Exception as e:
+                    errors.append(e)
+
+    apps = {}
+    for patch_check in patch_checks:
+        if (patch_check["targetImageName"], patch_check["newRunImage"]) in new_images:
+            app_key = (patch_check["targetResourceGroup"], patch_check["targetContainerAppName"])
+            apps.setdefault(app_key, []).append(patch_check)
+    environment_limits = {}
+    for patch_check in patch_checks:
+        environment_limits.setdefault((patch_check["targetResourceGroup"], patch_check["targetContainerAppEnvironmentName"]),
+                                      threading.BoundedSemaphore(PATCH_APPLY_MAX_WORKERS_PER_ENVIRONMENT))
+
+    def update_app(app_patch_checks):
+        applied = 0
+        first = app_patch_checks[0]
+        with environment_limits[(first["targetResourceGroup"], first["targetContainerAppEnvironmentName"])]:
+            for patch_check in app_patch_checks:
+                patch_update_revision(cmd,
+                                      patch_check["targetResourceGroup"],
+                                      patch_check["targetContainerAppName"],
+                                      patch_check["targetContainerName"],
+                                      new_images[(patch_check["targetImageName"], patch_check["newRunImage"])])
+                applied += 1
+        return applied
+
+    patch_apply_count = 0
+    with timer.phase("Creating revisions for {} container apps".format(len(apps))):
+        with ThreadPoolExecutor(max_workers=min(PATCH_APPLY_MAX_WORKERS, len(apps) or 1)) as executor:
+            futures = [executor.submit(update_app, app_patch_checks) for app_patch_checks in apps.values()]
+            for future in futures:
+                try:
+                    patch_apply_count += future.result()
+                except Exception as e:
+                    errors.append(e)
+
+    return patch_apply_count, errors
+
+
+def patch_rebase_and_publish(target_image_name, new_run_image, pack_exec_path):
     try:
-        logger.warning("Applying patch for container app: " + container_app_name + " container: " + container_name)
-        subprocess.run(f"{pack_exec_path} rebase -q {target_image_name} --run-image {new_run_image}", shell=True, check=True)
+        logger.warning("Rebasing image: " + target_image_name + " on run image: " + new_run_image)
+        subprocess.run([pack_exec_path, "rebase", "-q", target_image_name, "--run-image", new_run_image], check=True)
         new_target_image_name = target_image_name.split(":")[0] + ":" + new_run_image.split(":")[1]
-        subprocess.run(f"docker tag {target_image_name} {new_target_image_name}", shell=True, check=True)
+        subprocess.run(["docker", "tag", target_image_name, new_target_image_name], check=True)
         logger.debug(f"Publishing {new_target_image_name} to registry...")
-        subprocess.run(f"docker push -q {new_target_image_name}", shell=True, check=True)
+        subprocess.run(["docker", "push", "-q", new_target_image_name], check=True)
         logger.warning("Patch applied and published successfully.\nNew image: " + new_target_image_name)
+        return new_target_image_name
     except Exception:
         logger.error("Error: Failed to apply patch and publish. Check if registry is logged in and has write access.")
         raise
+
+
+def patch_update_revision(cmd, resource_group, container_app_name, container_name, new_target_image_name):
     try:
         logger.warning("Patching container app: " + container_app_name + " container: " + container_name)
         logger.info("Creating new revision with image: " + new_target_image_name)
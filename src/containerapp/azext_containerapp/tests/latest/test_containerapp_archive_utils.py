@@ -0,0 +1,189 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import gzip
+import io
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from azure.core.exceptions import HttpResponseError
+from knack.util import CLIError
+
+from ..._archive_utils import (IgnoreRule, DockerIgnoreMatcher, SourceUploadCache, _ParallelGzipWriter,
+                               _pack_source_code, _collect_source_entries)
+
+
+RULES = ["node_modules", "**/*.log", "build", "!build/keep/**", "docs", "!docs/*.md", "*.tmp"]
+PATHS = ["node_modules", "node_modules/a/b.js", "src/app.log", "app.log", "build", "build/keep", "build/keep/a.txt",
+         "build/out.js", "docs", "docs/readme.md", "docs/img/a.png", "x.tmp", "src/x.tmp", "src/app.js"]
+
+
+class ContainerappArchiveUtilsTests(unittest.TestCase):
+    def setUp(self):
+        # the rule at the end of .dockerignore has the highest priority
+        self.ignore_list = [IgnoreRule(rule) for rule in reversed(RULES)]
+        self.matcher = DockerIgnoreMatcher(self.ignore_list)
+
+    def test_matcher_picks_the_highest_priority_rule(self):
+        for limit in range(len(self.ignore_list) + 1):
+            for path in PATHS:
+                expected = next((index for index, item in enumerate(self.ignore_list[:limit])
+                                 if re.match(item.pattern, path)), None)
+                self.assertEqual(self.matcher.match(path, limit), expected, (path, limit))
+
+    def test_subtrees_without_exceptions_are_pruned(self):
+        limit = len(self.ignore_list)
+        self.assertFalse(self.matcher.may_include_under("node_modules", limit))
+        self.assertFalse(self.matcher.may_include_under("build/out", limit))
+        self.assertTrue(self.matcher.may_include_under("build", limit))
+        self.assertTrue(self.matcher.may_include_under("build/keep/deep", limit))
+        self.assertTrue(self.matcher.may_include_under("docs", limit))
+        # docs/*.md can only match files directly in docs
+        self.assertFalse(self.matcher.may_include_under("docs/img", limit))
+
+    def test_parallel_gzip_round_trip(self):
+        data = os.urandom(1024 * 1024) + b"a" * (3 * 1024 * 1024 + 17)
+        out = io.BytesIO()
+        with _ParallelGzipWriter(out, chunk_size=256 * 1024, max_workers=4) as writer:
+            for i in range(0, len(data), 100000):
+                writer.write(data[i:i + 100000])
+        self.assertEqual(gzip.decompress(out.getvalue()), data)
+
+    def _make_source(self):
+        source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source)
+        for path in ["src/app.js", "src/app.log", "node_modules/a/b.js", "build/out.js", "build/keep/a.txt",
+                     "docs/readme.md", "docs/img/a.png", ".git/HEAD", "Dockerfile"]:
+            os.makedirs(os.path.join(source, os.path.dirname(path)), exist_ok=True)
+            with open(os.path.join(source, path), "w") as f:
+                f.write(path)
+        with open(os.path.join(source, ".dockerignore"), "w") as f:
+            f.write("\n".join(RULES))
+        return source
+
+    def test_pack_source_code(self):
+        source = self._make_source()
+        tar_file_path = os.path.join(source, "..", os.path.basename(source) + ".tar.gz")
+        self.addCleanup(os.remove, tar_file_path)
+        _pack_source_code(source, tar_file_path, os.path.join(source, "Dockerfile"), "Dockerfile")
+        with tarfile.open(tar_file_path, "r:gz") as tar:
+            files = sorted(m.name for m in tar.getmembers() if m.isfile())
+        self.assertEqual(files, [".dockerignore", "Dockerfile", "Dockerfile", "build/keep/a.txt", "docs/readme.md", "src/app.js"])
+
+    def test_archive_is_reproducible(self):
+        source = self._make_source()
+        archives = []
+        tar_file_path = os.path.join(source, "..", os.path.basename(source) + ".tar.gz")
+        self.addCleanup(os.remove, tar_file_path)
+        for _ in range(2):
+            _pack_source_code(source, tar_file_path, os.path.join(source, "Dockerfile"), "Dockerfile")
+            with open(tar_file_path, "rb") as f:
+                archives.append(f.read())
+            # only the content of the tree matters, not when it was written
+            os.utime(os.path.join(source, "src", "app.js"), (time.time() - 3600, time.time() - 3600))
+        self.assertEqual(archives[0], archives[1])
+
+    def test_source_upload_cache(self):
+        source = self._make_source()
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        docker_file_path = os.path.join(source, "Dockerfile")
+        tar_file_path = os.path.join(cache_dir, "archive.tar.gz")
+        _pack_source_code(source, tar_file_path, docker_file_path, "Dockerfile")
+
+        def digest_of_tree():
+            cache = SourceUploadCache(cache_dir, source, docker_file_path)
+            return cache, cache.update(_collect_source_entries(source, docker_file_path), docker_file_path, "Dockerfile")
+
+        cache, digest = digest_of_tree()
+        self.assertIsNone(cache.get_archive(digest))
+        cache.put_archive(digest, tar_file_path)
+        cache.put_upload("MyRegistry", digest, "source/archive.tar.gz")
+        cache.save()
+
+        cache, unchanged_digest = digest_of_tree()
+        self.assertEqual(unchanged_digest, digest)
+        self.assertEqual(cache.get_archive(digest), cache.archive_path)
+        self.assertEqual(cache.get_upload("myregistry", digest), "source/archive.tar.gz")
+        self.assertIsNone(cache.get_upload("otherregistry", digest))
+
+        # an ignored file does not change the archive, an included one does
+        with open(os.path.join(source, "node_modules", "a", "b.js"), "w") as f:
+            f.write("changed")
+        self.assertEqual(digest_of_tree()[1], digest)
+        with open(os.path.join(source, "src", "app.js"), "w") as f:
+            f.write("changed")
+        cache, changed_digest = digest_of_tree()
+        self.assertNotEqual(changed_digest, digest)
+        self.assertIsNone(cache.get_archive(changed_digest))
+        self.assertIsNone(cache.get_upload("myregistry", changed_digest))
+
+    def test_source_cache_keeps_the_directories_used_last(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        tar_file_path = os.path.join(cache_dir, "archive.tar.gz")
+        with open(tar_file_path, "wb") as f:
+            f.write(b"archive")
+        caches = []
+        for i in range(4):
+            cache = SourceUploadCache(cache_dir, "source{}".format(i), None, max_entries=2)
+            cache.put_archive("digest", tar_file_path)
+            cache.save()
+            os.utime(cache.manifest_path, (i, i))
+            caches.append(cache)
+        self.assertEqual(sorted(os.listdir(cache_dir)),
+                         sorted(["archive.tar.gz", os.path.basename(caches[2].cache_dir),
+                                 os.path.basename(caches[3].cache_dir)]))
+
+    def _queue_build(self, uploads, schedule_errors, stream_error=None):
+        from ..._utils import queue_acr_build
+        source = self._make_source()
+        scheduled = []
+
+        def schedule(_):
+            scheduled.append(None)
+            if schedule_errors:
+                raise schedule_errors.pop(0)
+            return mock.MagicMock()
+
+        cmd = mock.MagicMock()
+        cmd.get_models.side_effect = lambda *names, **_: [mock.MagicMock() for _ in names]
+        with mock.patch("azext_containerapp._archive_utils.upload_source_code", side_effect=uploads) as upload, \
+                mock.patch("azure.cli.command_modules.acr._client_factory.cf_acr_registries_tasks"), \
+                mock.patch("azure.cli.command_modules.acr._client_factory.cf_acr_runs"), \
+                mock.patch("azure.cli.command_modules.acr._stream_utils.stream_logs",
+                           side_effect=stream_error) as stream_logs, \
+                mock.patch("azure.cli.core.commands.LongRunningOperation") as lro:
+            lro.return_value.side_effect = schedule
+            try:
+                queue_acr_build(cmd, "rg", "registry", "image", source)
+            finally:
+                self.uploads = upload.call_args_list
+                self.scheduled = len(scheduled)
+                self.streamed = stream_logs.call_count
+
+    def test_build_uploads_again_when_the_reused_upload_is_rejected(self):
+        self._queue_build([("source/earlier.tar.gz", True), ("source/again.tar.gz", False)],
+                          [HttpResponseError(response=mock.MagicMock(status_code=404))])
+        self.assertEqual(self.scheduled, 2)
+        self.assertEqual(self.streamed, 1)
+        self.assertEqual(self.uploads[1][1], {"reuse_upload": False})
+
+    def test_failed_build_is_not_run_again(self):
+        with self.assertRaises(CLIError):
+            self._queue_build([("source/earlier.tar.gz", True)], [], stream_error=CLIError("Run failed"))
+        self.assertEqual((self.scheduled, self.streamed, len(self.uploads)), (1, 1, 1))
+
+        # a run rejected for another reason than its source is not scheduled again either
+        with self.assertRaises(HttpResponseError):
+            self._queue_build([("source/earlier.tar.gz", True)],
+                              [HttpResponseError(response=mock.MagicMock(status_code=403))])
+        self.assertEqual((self.scheduled, self.streamed, len(self.uploads)), (1, 0, 1))
@@ -0,0 +1,91 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import time
+import unittest
+
+from azure.cli.core.azclierror import ValidationError
+
+from ..._compose_scheduler import ComposeScheduler, STEP_SUCCEEDED, STEP_FAILED, STEP_SKIPPED
+
+
+class ContainerappComposeSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.started = []
+        self.finished = []
+        self.running = 0
+        self.max_running = 0
+
+    def step(self, name, seconds=0.05, error=None):
+        def _run():
+            with self.lock:
+                self.started.append(name)
+                self.running += 1
+                self.max_running = max(self.max_running, self.running)
+            time.sleep(seconds)
+            with self.lock:
+                self.running -= 1
+                self.finished.append(name)
+            if error:
+                raise error
+            return name
+        return _run
+
+    def test_dependencies_are_created_first(self):
+        scheduler = ComposeScheduler(max_parallel=4)
+        scheduler.add("build web", self.step("build web", 0.1))
+        scheduler.add("create db", self.step("create db"))
+        scheduler.add("create cache", self.step("create cache"))
+        scheduler.add("create web", self.step("create web"), depends_on=["build web", "create db", "create cache"])
+        steps = scheduler.run()
+
+        self.assertTrue(all(step.status == STEP_SUCCEEDED for step in steps.values()))
+        self.assertEqual(steps["create web"].result, "create web")
+        self.assertEqual(self.started[-1], "create web")
+        # the build runs while the other services are created
+        self.assertEqual(self.max_running, 3)
+
+    def test_parallelism_is_limited(self):
+        scheduler = ComposeScheduler(max_parallel=2)
+        for i in range(6):
+            scheduler.add("create app{}".format(i), self.step("create app{}".format(i)))
+        scheduler.run()
+        self.assertEqual(self.max_running, 2)
+        # ready steps start in the order they were added
+        self.assertEqual(self.started, ["create app{}".format(i) for i in range(6)])
+
+    def test_failure_only_skips_dependents(self):
+        scheduler = ComposeScheduler(max_parallel=4)
+        scheduler.add("create db", self.step("create db", error=ValueError("quota exceeded")))
+        scheduler.add("create api", self.step("create api"), depends_on=["create db"])
+        scheduler.add("create web", self.step("create web"), depends_on=["create api"])
+        scheduler.add("create worker", self.step("create worker", 0.1))
+        steps = scheduler.run()
+
+        self.assertEqual(steps["create db"].status, STEP_FAILED)
+        self.assertIsInstance(steps["create db"].error, ValueError)
+        self.assertEqual(steps["create api"].status, STEP_SKIPPED)
+        self.assertEqual(steps["create web"].status, STEP_SKIPPED)
+        self.assertEqual(steps["create worker"].status, STEP_SUCCEEDED)
+        self.assertEqual(scheduler.failed_steps(), [steps["create db"]])
+        self.assertNotIn("create api", self.started)
+
+    def test_invalid_graphs(self):
+        scheduler = ComposeScheduler()
+        scheduler.add("create a", self.step("create a"), depends_on=["create b"])
+        scheduler.add("create b", self.step("create b"), depends_on=["create a"])
+        with self.assertRaises(ValidationError):
+            scheduler.run()
+
+        scheduler = ComposeScheduler()
+        scheduler.add("create a", self.step("create a"), depends_on=["create missing"])
+        with self.assertRaises(ValidationError):
+            scheduler.run()
+        self.assertEqual(self.started, [])
+
+        with self.assertRaises(ValidationError):
+            ComposeScheduler(max_parallel=0)
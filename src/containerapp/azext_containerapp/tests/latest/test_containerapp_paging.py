@@ -0,0 +1,66 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import unittest
+from unittest import mock
+
+from ..._clients import ContainerAppClient, iter_list_results
+
+
+class FakeResponse():
+    def __init__(self, body):
+        self.text = json.dumps(body)
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def pages(count, per_page):
+    responses = {}
+    for p in range(count):
+        body = {"value": [{"name": "app{}".format(p * per_page + i), "index": p * per_page + i} for i in range(per_page)]}
+        if p < count - 1:
+            body["nextLink"] = "https://page{}".format(p + 1)
+        responses["https://page{}".format(p)] = FakeResponse(body)
+    return responses
+
+
+class ContainerappPagingTests(unittest.TestCase):
+    def setUp(self):
+        self.cmd = mock.MagicMock()
+        self.cmd.cli_ctx.cloud.endpoints.resource_manager = "https://management.azure.com/"
+
+    def test_items_in_order_with_predicate_and_formatter(self):
+        responses = pages(5, 3)
+        with mock.patch("azext_containerapp._clients.send_raw_request", side_effect=lambda _c, _m, url: responses[url]):
+            items = list(iter_list_results(self.cmd, "https://page0", formatter=lambda x: x["name"],
+                                           predicate=lambda x: x["index"] % 2 == 0))
+        self.assertEqual(items, ["app{}".format(i) for i in range(0, 15, 2)])
+
+    def test_first_item_before_last_page(self):
+        responses = pages(4, 2)
+        requested = []
+
+        def send(_cli_ctx, _method, url):
+            requested.append(url)
+            return responses[url]
+
+        with mock.patch("azext_containerapp._clients.send_raw_request", side_effect=send):
+            results = iter_list_results(self.cmd, "https://page0")
+            self.assertEqual(next(results)["name"], "app0")
+            # only the first page and the prefetched second page have been requested
+            self.assertLessEqual(len(requested), 2)
+            self.assertEqual(len(list(results)), 7)
+        self.assertEqual(len(requested), 4)
+
+    def test_list_by_subscription(self):
+        responses = pages(2, 2)
+        first_url = "https://management.azure.com/subscriptions/sub/providers/Microsoft.App/containerApps?api-version={}".format(ContainerAppClient.api_version)
+        responses[first_url] = responses.pop("https://page0")
+        with mock.patch("azext_containerapp._clients.get_subscription_id", return_value="sub"), \
+                mock.patch("azext_containerapp._clients.send_raw_request", side_effect=lambda _c, _m, url: responses[url]):
+            apps = ContainerAppClient.list_by_subscription(self.cmd, formatter=lambda x: x["name"])
+        self.assertEqual(apps, ["app0", "app1", "app2", "app3"])
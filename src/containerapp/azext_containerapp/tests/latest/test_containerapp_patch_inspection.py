@@ -0,0 +1,59 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from ..._patch_utils import ImageInspectionCache, inspect_images, get_image_inspection_key, INSPECT_FAILED
+
+
+def fake_inspect(_pack_exec_path, image_name):
+    if "private" in image_name:
+        return dict(remote_info=INSPECT_FAILED, image_name=image_name)
+    return {"image_name": image_name, "remote_info": {"run_images": [{"name": "mcr.microsoft.com/oryx/builder:" + image_name}]}}
+
+
+class ContainerappPatchInspectionTests(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_digest_key(self):
+        digest = "@sha256:" + "a" * 64
+        self.assertEqual(get_image_inspection_key("myacr.azurecr.io/app:v1" + digest), "myacr.azurecr.io/app" + digest)
+        self.assertEqual(get_image_inspection_key("myacr.azurecr.io:5000/app" + digest), "myacr.azurecr.io:5000/app" + digest)
+        self.assertEqual(get_image_inspection_key("myacr.azurecr.io/app:v1"), "myacr.azurecr.io/app:v1")
+
+    def test_each_image_inspected_once_and_cached(self):
+        images = ["acr/app:v1"] * 50 + ["acr/app:v2"] * 20 + ["acr/private:v1"] * 5
+        with mock.patch("azext_containerapp._patch_utils.inspect_image", side_effect=fake_inspect) as inspect:
+            results, cached = inspect_images("pack", images, cache=ImageInspectionCache(self.cache_dir))
+        self.assertEqual(inspect.call_count, 3)
+        self.assertEqual(cached, 0)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results["acr/private:v1"]["remote_info"], INSPECT_FAILED)
+
+        # a new run reuses the successful inspections but retries the failed one
+        with mock.patch("azext_containerapp._patch_utils.inspect_image", side_effect=fake_inspect) as inspect:
+            results, cached = inspect_images("pack", images, cache=ImageInspectionCache(self.cache_dir))
+        self.assertEqual(inspect.call_count, 1)
+        self.assertEqual(cached, 2)
+
+    def test_tagged_images_expire(self):
+        digest_image = "acr/app@sha256:" + "b" * 64
+        cache = ImageInspectionCache(self.cache_dir, ttl=60)
+        cache.put("acr/app:v1", fake_inspect("pack", "acr/app:v1"))
+        cache.put(digest_image, fake_inspect("pack", digest_image))
+        cache.save()
+
+        with mock.patch("time.time", return_value=time.time() + 120):
+            cache = ImageInspectionCache(self.cache_dir, ttl=60)
+            self.assertIsNone(cache.get("acr/app:v1"))
+            self.assertIsNotNone(cache.get(digest_image))
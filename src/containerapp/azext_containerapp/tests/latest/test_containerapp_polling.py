@@ -0,0 +1,76 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import unittest
+from unittest import mock
+
+from ..._clients import LongRunningOperationPoller, poll_results, wait_for_provisioning, POLLING_MAX_SECONDS
+
+
+class FakeResponse():
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self.text = json.dumps(body) if body is not None else ""
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def provisioning(state):
+    return FakeResponse(200, {"properties": {"provisioningState": state}})
+
+
+class ContainerappPollingTests(unittest.TestCase):
+    def setUp(self):
+        self.cmd = mock.MagicMock()
+        self.sleeps = []
+        patcher = mock.patch("time.sleep", side_effect=self.sleeps.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(mock.patch.stopall)
+        mock.patch("sys.stderr").start()
+
+    def test_backoff_grows_and_is_capped(self):
+        poller = LongRunningOperationPoller(self.cmd, initial_delay=2, max_delay=10)
+        operation = {"response": None, "attempt": 0}
+        delays = [poller._next_delay(operation) for _ in range(10)]
+        self.assertTrue(1 <= delays[0] <= 2)
+        self.assertTrue(all(d <= 10 for d in delays))
+        self.assertTrue(delays[-1] >= 5)
+
+    def test_retry_after_is_honored_up_to_cap(self):
+        poller = LongRunningOperationPoller(self.cmd)
+        operation = {"response": FakeResponse(202, headers={"retry-after": "7"}), "attempt": 0}
+        self.assertEqual(poller._next_delay(operation), 7)
+        operation = {"response": FakeResponse(202, headers={"retry-after": "3600"}), "attempt": 0}
+        self.assertEqual(poller._next_delay(operation), POLLING_MAX_SECONDS)
+
+    def test_poll_results(self):
+        responses = [FakeResponse(202), FakeResponse(202), FakeResponse(200, {"name": "app"})]
+        with mock.patch("azext_containerapp._clients.send_raw_request", side_effect=responses) as send:
+            self.assertEqual(poll_results(self.cmd, "https://operation"), {"name": "app"})
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(len(self.sleeps), 2)
+
+    def test_wait_for_many_in_one_loop(self):
+        states = {
+            "app1": iter([provisioning("InProgress"), provisioning("Succeeded")]),
+            "app2": iter([provisioning("Succeeded")]),
+            "app3": iter([provisioning("InProgress"), provisioning("InProgress"), provisioning("Failed")]),
+        }
+
+        def send(_cli_ctx, _method, url):
+            return next(states[url])
+
+        with mock.patch("azext_containerapp._clients.send_raw_request", side_effect=send) as sent:
+            results = wait_for_provisioning(self.cmd, {name: name for name in states})
+
+        self.assertEqual({k: v["properties"]["provisioningState"] for k, v in results.items()},
+                         {"app1": "Succeeded", "app2": "Succeeded", "app3": "Failed"})
+        self.assertEqual(sent.call_count, 6)
+        # all apps are requested up front without sleeping, then only the ones still in progress are polled again
+        self.assertLessEqual(len(self.sleeps), 3)
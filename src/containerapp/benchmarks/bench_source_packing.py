@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Benchmark for packing source code for `containerapp up --source`.
+
+Builds a synthetic source tree from a fixed seed: application sources, a large ignored node_modules,
+build output with a '!' exception and a .git directory. The tree is packed with the current
+_pack_source_code and with the previous implementation, which walked every file, matched each path
+against each rule with an uncompiled regex and gzipped on a single thread. Both archives must
+contain the same members. It also times how long a repeat deploy takes to find out that the tree is
+unchanged, with a cold and a warm source manifest.
+
+    python benchmarks/bench_source_packing.py
+    python benchmarks/bench_source_packing.py --files 200000 --json
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tarfile
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from azext_containerapp._archive_utils import (  # noqa: E402
+    SourceUploadCache, _collect_source_entries, _pack_source_code, _load_dockerignore_file)
+
+DOCKERIGNORE = """# dependencies and build output
+node_modules
+build
+!build/keep/**
+**/*.log
+.git
+"""
+
+
+def make_tree(root, files, seed):
+    """Spread `files` files over src (20%), node_modules (70%), build (8%) and .git (2%)."""
+    rng = random.Random(seed)
+    layout = [("src", 0.2, 4), ("node_modules", 0.7, 5), ("build", 0.08, 3), (".git/objects", 0.02, 2)]
+    for top, share, depth in layout:
+        for i in range(int(files * share)):
+            parts = [top] + ["d{}".format(rng.randrange(8)) for _ in range(rng.randrange(depth))]
+            if top == "build" and i % 10 == 0:
+                parts = ["build", "keep"] + parts[1:]
+            directory = os.path.join(root, *parts)
+            os.makedirs(directory, exist_ok=True)
+            extension = ".log" if i % 25 == 0 else ".js"
+            with open(os.path.join(directory, "f{}{}".format(i, extension)), "wb") as f:
+                f.write(rng.randbytes(rng.randrange(64, 4096)) if i % 3 == 0 else b"const x = %d;\n" % i * rng.randrange(1, 64))
+    with open(os.path.join(root, ".dockerignore"), "w", encoding="utf-8") as f:
+        f.write(DOCKERIGNORE)
+    with open(os.path.join(root, "Dockerfile"), "w", encoding="utf-8") as f:
+        f.write("FROM node:18\nCOPY . .\n")
+
+
+def legacy_pack_source_code(source_location, tar_file_path, docker_file_path, docker_file_in_tar):
+    ignore_list, ignore_list_size = _load_dockerignore_file(source_location, "Dockerfile")
+    common_vcs_ignore_list = {'.git', '.gitignore', '.bzr', 'bzrignore', '.hg', '.hgignore', '.svn'}
+
+    def ignore_check(tarinfo, parent_ignored, parent_matching_rule_index):
+        if tarinfo.name in common_vcs_ignore_list:
+            return True, parent_matching_rule_index
+        if ignore_list is None:
+            return parent_ignored, parent_matching_rule_index
+        for index, item in enumerate(ignore_list):
+            if index >= parent_matching_rule_index:
+                break
+            if re.match(item.pattern, tarinfo.name):
+                return item.ignore, index
+        return parent_ignored, parent_matching_rule_index
+
+    def archive(tar, name, arcname, parent_ignored, parent_matching_rule_index):
+        tarinfo = tar.gettarinfo(name, arcname)
+        ignored, matching_rule_index = ignore_check(tarinfo, parent_ignored, parent_matching_rule_index)
+        if not ignored:
+            if tarinfo.isreg():
+                with open(name, "rb") as f:
+                    tar.addfile(tarinfo, f)
+            else:
+                tar.addfile(tarinfo)
+        if tarinfo.isdir():
+            for f in os.listdir(name):
+                archive(tar, os.path.join(name, f), os.path.join(arcname, f), ignored, matching_rule_index)
+
+    with tarfile.open(tar_file_path, "w:gz") as tar:
+        archive(tar, source_location, "", False, ignore_list_size)
+        docker_file_tarinfo = tar.gettarinfo(docker_file_path, docker_file_in_tar)
+        with open(docker_file_path, "rb") as f:
+            tar.addfile(docker_file_tarinfo, f)
+
+
+def members(tar_file_path):
+    with tarfile.open(tar_file_path, "r:gz") as tar:
+        return sorted(m.name for m in tar.getmembers())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=20000, help="number of files in the synthetic tree")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic tree")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = os.path.join(tmp_dir, "source")
+        make_tree(source, args.files, args.seed)
+
+        docker_file_path = os.path.join(source, "Dockerfile")
+        results = {"files": args.files}
+        archives = {}
+        for name, pack in [("legacy", legacy_pack_source_code), ("current", _pack_source_code)]:
+            archives[name] = os.path.join(tmp_dir, name + ".tar.gz")
+            start = time.perf_counter()
+            pack(source, archives[name], docker_file_path, "Dockerfile")
+            results[name] = {"seconds": time.perf_counter() - start, "bytes": os.path.getsize(archives[name])}
+
+        if members(archives["legacy"]) != members(archives["current"]):
+            raise SystemExit("The archives do not contain the same members")
+
+        cache_dir = os.path.join(tmp_dir, "cache")
+        for name in ("cold manifest", "warm manifest"):
+            start = time.perf_counter()
+            cache = SourceUploadCache(cache_dir, source, docker_file_path)
+            digest = cache.update(_collect_source_entries(source, docker_file_path), docker_file_path, "Dockerfile")
+            if cache.get_archive(digest) is None:
+                cache.put_archive(digest, archives["current"])
+            cache.save()
+            results[name] = {"seconds": time.perf_counter() - start}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name in ("legacy", "current"):
+            print("{:<14} {:>8.2f} s {:>12} bytes".format(name, results[name]["seconds"], results[name]["bytes"]))
+        for name in ("cold manifest", "warm manifest"):
+            print("{:<14} {:>8.2f} s".format(name, results[name]["seconds"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,8 @@ from knack.help import REQUIRED_TAG
 from knack.help_files import helps
 from knack.log import get_logger
 
+from .command_index import write_command_index
+
 
 logger = get_logger(__name__)
 
@@ -126,8 +128,12 @@ class FreshTable(object):
 
         # dump into the cache file
         command_file = shell_ctx.config.get_help_files()
-        with open(os.path.join(get_cache_dir(shell_ctx), command_file), 'w') as help_file:
-            json.dump(cmd_table_data, help_file, default=lambda x: x.target or '', skipkeys=True)
+        help_path = os.path.join(get_cache_dir(shell_ctx), command_file)
+        help_dump = json.dumps(cmd_table_data, default=lambda x: x.target or '', skipkeys=True)
+        with open(help_path, 'w') as help_file:
+            help_file.write(help_dump)
+        # the index the shell starts from holds exactly what was dumped
+        write_command_index(help_path, json.loads(help_dump))
 
 
 def load_help_files(data):
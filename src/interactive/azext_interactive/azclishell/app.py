@@ -49,6 +49,7 @@ from .key_bindings import InteractiveKeyBindings
 from .layout import LayoutManager
 from .progress import progress_view
 from . import telemetry
+from .local_search import SCENARIO_CORPUS_FILE
 from .recommendation import Recommender, _show_details_for_e2e_scenario, gen_command_in_scenario
 from .scenario_suggest import ScenarioAutoSuggest
 from .threads import LoadCommandTableThread
@@ -111,6 +112,7 @@ class AzInteractiveShell(object):
         self.config = Configuration(cli_ctx.config, style=style)
         self.config.set_style(style)
         self.style = style_factory(self.config.get_style())
+        gathered_commands = None
         try:
             gathered_commands = GatherCommands(self.config)
             self.completer = completer or AzCompleter(self, gathered_commands)
@@ -145,8 +147,11 @@ class AzInteractiveShell(object):
         self.final_sleep = final_sleep
         self.command_table_thread = None
         self.recommender = Recommender(
-            self.cli_ctx, os.path.join(self.config.get_config_dir(), self.config.get_recommend_path()))
+            self.cli_ctx, os.path.join(self.config.get_config_dir(), self.config.get_recommend_path()),
+            os.path.join(self.config.get_config_dir(), 'cache', SCENARIO_CORPUS_FILE))
         self.recommender.set_on_prepared_callback(self.redraw_scenario_recommendation_info)
+        if gathered_commands:
+            self.recommender.update_commands(gathered_commands.command_index)
 
         # try to consolidate state information here...
         # Used by key bindings and layout
@@ -233,6 +238,7 @@ class AzInteractiveShell(object):
         self.completer.initialize_command_table_attributes()
         if not self.lexer:
             self.lexer = get_az_lexer(command_info)
+        self.recommender.update_commands(command_info.command_index)
         self._cli = None
 
     def redraw_scenario_recommendation_info(self):
@@ -671,7 +677,8 @@ class AzInteractiveShell(object):
         self.recommender.cur_thread = SearchThread(self.recommender.cli_ctx, keywords,
                                                    self.recommender.recommendation_path,
                                                    self.recommender.executing_command,
-                                                   self.recommender.on_prepared_callback)
+                                                   self.recommender.on_prepared_callback,
+                                                   self.recommender.local_search, self.recommender.online)
         self.recommender.cur_thread.start()
         # Wait for the search thread to finish
         while self.recommender.cur_thread.is_alive():
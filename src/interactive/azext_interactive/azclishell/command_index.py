@@ -0,0 +1,429 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+A compact on-disk index of the command table dumped by interactive, so that the shell can start without parsing
+the whole JSON help dump.
+
+The index is a single little-endian file that is memory mapped and read in place:
+
+    header          magic, version, stat of the help dump it was built from, section counts
+    string offsets  (strings + 1) uint32, the strings themselves follow as one UTF-8 blob
+    nodes           the trie of command words, in breadth first order so that the children of a node are
+                    contiguous: word, first child, child count, is entry, help, first param, param count,
+                    first example, example count
+    params          first alias, alias count, required, help
+    aliases         string ids of the options of the params
+    examples        name, text
+    completable     string ids of the distinct command words
+    param options   string ids of the distinct options of the params
+
+Every string is stored once and referenced by its id, -1 standing for None.
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+from collections import deque
+from collections.abc import Mapping
+
+from knack.log import get_logger
+
+from .command_tree import CommandBranch
+
+
+logger = get_logger(__name__)
+
+COMMAND_INDEX_VERSION = 1
+COMMAND_INDEX_EXTENSION = '.idx'
+
+_MAGIC = b'AZCI'
+_HEADER = struct.Struct('<4sIqq9I')
+_NODE = struct.Struct('<9i')
+_PARAM = struct.Struct('<4i')
+_EXAMPLE = struct.Struct('<2i')
+_ID = struct.Struct('<i')
+_OFFSET = struct.Struct('<I')
+_SUPPRESS = '==SUPPRESS=='
+
+
+def get_index_path(help_path):
+    """ the index is kept next to the help dump it is built from """
+    return os.path.splitext(help_path)[0] + COMMAND_INDEX_EXTENSION
+
+
+def _source_stamp(help_path):
+    stat = os.stat(help_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class _StringTable:
+    """ numbers the strings of the index in the order they are first seen """
+
+    def __init__(self):
+        self._ids = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def intern(self, value):
+        if value is None:
+            return -1
+        if value not in self._ids:
+            self._ids[value] = len(self._ids)
+        return self._ids[value]
+
+    def pack(self):
+        """ the offsets of the strings followed by the blob of their UTF-8 bytes """
+        blob = bytearray()
+        offsets = [0]
+        for value in self._ids:
+            blob += value.encode('utf-8')
+            offsets.append(len(blob))
+        return b''.join(_OFFSET.pack(offset) for offset in offsets) + blob
+
+
+def _build_trie(data):
+    """ the trie of the command words, each node being [word, children by word, entry] """
+    root = [None, {}, None]
+    completable = {}
+    completable_param = {}
+    for command, entry in data.items():
+        node = root
+        for word in command.split():
+            completable[word] = None
+            if word not in node[1]:
+                node[1][word] = [word, {}, None]
+            node = node[1][word]
+        node[2] = entry
+        for param in (entry.get('parameters') or {}).values():
+            if _SUPPRESS not in param['help']:
+                completable_param.update(dict.fromkeys(param['name']))
+    return root, completable, completable_param
+
+
+def _add_entry(record, entry, strings, sections):
+    """ fills the help, params and examples of the command of `record` """
+    params, aliases, examples = sections
+    record[3] = 1
+    record[4] = strings.intern(entry['help'])
+    for param in (entry.get('parameters') or {}).values():
+        if _SUPPRESS in param['help']:
+            continue
+        params.append((len(aliases), len(param['name']), strings.intern(param['required']),
+                       strings.intern(param['help'])))
+        aliases.extend(strings.intern(name) for name in param['name'])
+    record[6] = len(params) - record[5]
+    if 'examples' in entry:
+        record[7] = len(examples)
+        record[8] = len(entry['examples'])
+        examples.extend((strings.intern(name), strings.intern(text)) for name, text in entry['examples'])
+
+
+def _flatten_trie(root, strings):
+    """ lays the trie out in breadth first order, returns its nodes and the params, aliases and examples """
+    nodes = []
+    params, aliases, examples = sections = [], [], []
+    queue = deque([root])
+    next_child = 1
+    while queue:
+        word, children, entry = queue.popleft()
+        record = [strings.intern(word), next_child, len(children), 0, -1, len(params), 0, -1, 0]
+        next_child += len(children)
+        queue.extend(children.values())
+        if entry is not None:
+            _add_entry(record, entry, strings, sections)
+        nodes.append(record)
+    return nodes, params, aliases, examples
+
+
+def build_command_index(data, stamp=(0, 0)):
+    """ builds the index of the command table data dumped by `FreshTable`, returns its bytes """
+    strings = _StringTable()
+    root, completable, completable_param = _build_trie(data)
+    nodes, params, aliases, examples = _flatten_trie(root, strings)
+    completable_ids = [strings.intern(word) for word in list(completable) + list(completable_param)]
+    entries = sum(1 for record in nodes if record[3])
+    commands_with_params = sum(1 for record in nodes if record[6])
+
+    out = bytearray(_HEADER.pack(_MAGIC, COMMAND_INDEX_VERSION, stamp[0], stamp[1], len(strings), len(nodes),
+                                 len(params), len(aliases), len(examples), len(completable), len(completable_param),
+                                 entries, commands_with_params))
+    out += strings.pack()
+    for record in nodes:
+        out += _NODE.pack(*record)
+    for record in params:
+        out += _PARAM.pack(*record)
+    for alias in aliases:
+        out += _ID.pack(alias)
+    for name, text in examples:
+        out += _EXAMPLE.pack(name, text)
+    for string_id in completable_ids:
+        out += _ID.pack(string_id)
+    return bytes(out)
+
+
+def write_command_index(help_path, data):
+    """ writes the index of the help dump at `help_path`, which must already be written """
+    content = build_command_index(data, _source_stamp(help_path))
+    index_path = get_index_path(help_path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(index_path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as index_file:
+            index_file.write(content)
+        os.replace(tmp_path, index_path)
+    except OSError as ex:
+        # e.g. the index is still mapped by a running shell on Windows, it is rebuilt at the next start
+        logger.debug('Failed to write the command index %s: %s', index_path, ex)
+        os.remove(tmp_path)
+    return content
+
+
+def load_command_index(help_path):
+    """
+    opens the index of the help dump at `help_path`, or builds it from the help dump when it is missing or
+    outdated
+    """
+    index_path = get_index_path(help_path)
+    try:
+        with open(index_path, 'rb') as index_file:
+            buffer = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        index = CommandIndex(buffer)
+        if index.stamp == _source_stamp(help_path):
+            return index
+        logger.debug('The command index %s is outdated', index_path)
+    except (OSError, ValueError, struct.error) as ex:
+        logger.debug('Failed to open the command index %s: %s', index_path, ex)
+
+    with open(help_path, 'r', encoding='utf-8') as help_file:
+        data = json.load(help_file)
+    return CommandIndex(write_command_index(help_path, data))
+
+
+class CommandIndex:  # pylint: disable=too-many-instance-attributes
+    """ reads the index built by `build_command_index` from a buffer, without copying it """
+
+    def __init__(self, buffer):
+        if len(buffer) < _HEADER.size:
+            raise ValueError('Truncated command index')
+        (magic, version, size, mtime, string_count, node_count, param_count, alias_count, example_count,
+         completable_count, completable_param_count, entries, commands_with_params) = _HEADER.unpack_from(buffer)
+        if magic != _MAGIC or version != COMMAND_INDEX_VERSION:
+            raise ValueError('Unsupported command index version {}'.format(version))
+        self.stamp = (size, mtime)
+        self.entry_count = entries
+        self.commands_with_params = commands_with_params
+        self._buffer = memoryview(buffer)
+        self._strings = {}
+
+        offset = _HEADER.size
+        self._offsets = offset
+        self._blob = offset + (string_count + 1) * _OFFSET.size
+        offset = self._blob + _OFFSET.unpack_from(buffer, self._offsets + string_count * _OFFSET.size)[0]
+        self._nodes = offset
+        offset += node_count * _NODE.size
+        self._params = offset
+        offset += param_count * _PARAM.size
+        self._aliases = offset
+        offset += alias_count * _ID.size
+        self._examples = offset
+        offset += example_count * _EXAMPLE.size
+        self._completable = (offset, completable_count)
+        offset += completable_count * _ID.size
+        self._completable_param = (offset, completable_param_count)
+        offset += completable_param_count * _ID.size
+        if offset != len(buffer):
+            raise ValueError('Truncated command index')
+
+    def string(self, string_id):
+        if string_id < 0:
+            return None
+        value = self._strings.get(string_id)
+        if value is None:
+            start, end = struct.unpack_from('<2I', self._buffer, self._offsets + string_id * _OFFSET.size)
+            value = str(self._buffer[self._blob + start:self._blob + end], 'utf-8')
+            self._strings[string_id] = value
+        return value
+
+    def _ids(self, section):
+        offset, count = section
+        return [self.string(_ID.unpack_from(self._buffer, offset + i * _ID.size)[0]) for i in range(count)]
+
+    @property
+    def completable(self):
+        """ the distinct command words """
+        return self._ids(self._completable)
+
+    @property
+    def completable_param(self):
+        """ the distinct options of the parameters that are not suppressed """
+        return self._ids(self._completable_param)
+
+    def node(self, node_id):
+        """ returns (word, first child, child count, is entry, help, first param, param count, first example,
+        example count) of a node of the trie, the root being 0 """
+        return _NODE.unpack_from(self._buffer, self._nodes + node_id * _NODE.size)
+
+    def children(self, node_id):
+        """ returns the (word, node id) of the children of a node """
+        _, first, count = self.node(node_id)[:3]
+        return [(self.string(self.node(child)[0]), child) for child in range(first, first + count)]
+
+    def params(self, node):
+        """ returns the (options, required, help) of the parameters of a node """
+        result = []
+        for i in range(node[5], node[5] + node[6]):
+            first, count, required, description = _PARAM.unpack_from(self._buffer, self._params + i * _PARAM.size)
+            options = [self.string(_ID.unpack_from(self._buffer, self._aliases + (first + j) * _ID.size)[0])
+                       for j in range(count)]
+            result.append((options, self.string(required), self.string(description)))
+        return result
+
+    def examples(self, node):
+        """ returns the [name, text] of the examples of a node """
+        return [[self.string(part) for part in _EXAMPLE.unpack_from(self._buffer, self._examples + i * _EXAMPLE.size)]
+                for i in range(node[7], node[7] + node[8])]
+
+    def walk(self):
+        """ yields the (command, node) of every entry of the command table """
+        stack = [(0, '')]
+        while stack:
+            node_id, command = stack.pop()
+            node = self.node(node_id)
+            if node[3]:
+                yield command, node
+            for word, child in reversed(self.children(node_id)):
+                stack.append((child, command + ' ' + word if command else word))
+
+    def commands(self):
+        """ yields the (command, description, examples) of the commands, leaving out the groups """
+        for command, node in self.walk():
+            # only commands are dumped with examples, even if they have none
+            if node[7] >= 0:
+                yield command, self.string(node[4]), self.examples(node)
+
+
+class IndexedCommandBranch(CommandBranch):
+    """ a branch of the command tree whose children are read from the index the first time they are needed """
+
+    def __init__(self, data, index, node_id):
+        CommandBranch.__init__(self, data)
+        self._index = index
+        self._node_id = node_id
+        self._children = None
+
+    @property
+    def children(self):
+        if self._children is None:
+            self._children = {word: IndexedCommandBranch(word, self._index, child)
+                              for word, child in self._index.children(self._node_id)}
+        return self._children
+
+    @children.setter
+    def children(self, value):
+        self._children = value
+
+
+def get_command_branches(index):
+    """ returns the top level branches of the command tree of an index, which are read as they are needed """
+    return [IndexedCommandBranch(word, index, child) for word, child in index.children(0)]
+
+
+class _IndexMapping(Mapping):  # pylint: disable=abstract-method
+    """ a read only mapping from the commands of an index to a value read from their node, each subclass reading it """
+
+    def __init__(self, index, tree):
+        self._index = index
+        self._tree = tree
+
+    def _find(self, command):
+        tree = self._tree
+        for word in command.split():
+            if not tree.has_child(word):
+                return None
+            tree = tree.get_child(word)
+        if not isinstance(tree, IndexedCommandBranch):
+            return None
+        return self._index.node(tree._node_id)  # pylint: disable=protected-access
+
+    def __iter__(self):
+        return (command for command, node in self._index.walk() if self._has(node))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def _has(self, node):
+        return node[3]
+
+    def _node(self, command):
+        node = self._find(command)
+        if node is None or not self._has(node):
+            raise KeyError(command)
+        return node
+
+
+class CommandDescriptions(_IndexMapping):
+    """ the descriptions of the commands and groups """
+
+    def __len__(self):
+        return self._index.entry_count
+
+    def __getitem__(self, command):
+        return self._index.string(self._node(command)[4])
+
+
+class CommandExamples(_IndexMapping):
+    """ the [name, text] of the examples of the commands """
+
+    def _has(self, node):
+        return node[3] and node[7] >= 0
+
+    def __getitem__(self, command):
+        return self._index.examples(self._node(command))
+
+
+class CommandParamInfo(_IndexMapping):
+    """ from a command to the options of its parameters, each option to the set of the options of its parameter """
+
+    def __len__(self):
+        return self._index.commands_with_params
+
+    def _has(self, node):
+        return node[3] and node[6]
+
+    def __getitem__(self, command):
+        result = {}
+        for options, _, _ in self._index.params(self._node(command)):
+            aliases = set(options)
+            for option in options:
+                result[option] = aliases
+        return result
+
+
+class ParamDescriptions(_IndexMapping):
+    """ from '<command> <option>' to the description of the parameter """
+
+    def __iter__(self):
+        for command, node in self._index.walk():
+            for options, _, _ in self._index.params(node):
+                for option in options:
+                    yield command + ' ' + option
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __getitem__(self, key):
+        command, _, option = key.rpartition(' ')
+        node = self._find(command)
+        description = None
+        if node is not None and node[3]:
+            for options, required, help_text in self._index.params(node):
+                if option in options:
+                    description = required + ' ' + help_text
+        if description is None:
+            raise KeyError(key)
+        return description
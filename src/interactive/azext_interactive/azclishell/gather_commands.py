@@ -5,9 +5,12 @@
 
 import math
 import os
-import json
+from collections import ChainMap
+from collections.abc import MutableMapping
 from knack.log import get_logger
 
+from .command_index import (load_command_index, get_command_branches, CommandDescriptions, CommandExamples,
+                            CommandParamInfo, ParamDescriptions)
 from .command_tree import CommandBranch, CommandHead
 from .util import get_window_dim
 
@@ -68,6 +71,51 @@ def add_new_lines(long_phrase, line_min=None, tolerance=TOLERANCE):
     return long_phrase.strip()
 
 
+def _wrap_description(description, line_min):
+    return add_new_lines(description, line_min=line_min)
+
+
+def _wrap_examples(examples, line_min):
+    return [[add_new_lines(name, line_min=line_min), add_new_lines(text, line_min=line_min)]
+            for name, text in examples]
+
+
+class WrappedDescriptions(MutableMapping):
+    """ descriptions that are wrapped to the width of the window the first time they are read """
+
+    def __init__(self, descriptions, initial=None, wrap=_wrap_description):
+        self._descriptions = ChainMap(initial if initial is not None else {}, descriptions)
+        self._wrap = wrap
+        self._wrapped = {}
+        self._line_min = None
+
+    def __getitem__(self, key):
+        line_min = int(_get_window_columns()) - 2 * TOLERANCE
+        if line_min != self._line_min:
+            self._wrapped.clear()
+            self._line_min = line_min
+        if key not in self._wrapped:
+            self._wrapped[key] = self._wrap(self._descriptions[key], line_min)
+        return self._wrapped[key]
+
+    def __setitem__(self, key, value):
+        self._descriptions[key] = value
+        self._wrapped.pop(key, None)
+
+    def __delitem__(self, key):
+        del self._descriptions[key]
+        self._wrapped.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self._descriptions
+
+    def __iter__(self):
+        return iter(self._descriptions)
+
+    def __len__(self):
+        return len(self._descriptions)
+
+
 # pylint: disable=too-many-instance-attributes
 class GatherCommands(object):
     """ grabs all the cached commands from files """
@@ -85,6 +133,7 @@ class GatherCommands(object):
         self.param_descript = {}
         self.completer = None
         self.command_param_info = {}
+        self.command_index = None
 
         self.global_param_descriptions = GLOBAL_PARAM_DESCRIPTIONS
         self.output_choices = OUTPUT_CHOICES
@@ -114,60 +163,21 @@ class GatherCommands(object):
         """ gathers from the files in a way that is convienent to use """
         command_file = config.get_help_files()
         cache_path = os.path.join(config.get_config_dir(), 'cache')
-        cols = _get_window_columns()
 
-        with open(os.path.join(cache_path, command_file), 'r') as help_file:
-            data = json.load(help_file)
+        # the index is built once when the command table is dumped, descriptions are only read and wrapped
+        # when they are displayed
+        index = load_command_index(os.path.join(cache_path, command_file))
+        self.command_index = index
         self.add_exit()
-        commands = data.keys()
-
-        for command in commands:
-            branch = self.command_tree
-            for word in command.split():
-                if word not in self.completable:
-                    self.completable.append(word)
-                if not branch.has_child(word):
-                    branch.add_child(CommandBranch(word))
-                branch = branch.get_child(word)
-
-            description = data[command]['help']
-            self.descrip[command] = add_new_lines(description, line_min=int(cols) - 2 * TOLERANCE)
-
-            if 'examples' in data[command]:
-                examples = []
-                for example in data[command]['examples']:
-                    examples.append([
-                        add_new_lines(example[0], line_min=int(cols) - 2 * TOLERANCE),
-                        add_new_lines(example[1], line_min=int(cols) - 2 * TOLERANCE)])
-                self.command_example[command] = examples
-
-            command_params = data[command].get('parameters', {})
-            for param in command_params:
-                if '==SUPPRESS==' not in command_params[param]['help']:
-                    param_aliases = set()
-
-                    for par in command_params[param]['name']:
-                        param_aliases.add(par)
-
-                        self.param_descript[command + " " + par] = \
-                            add_new_lines(
-                                command_params[param]['required'] +
-                                " " + command_params[param]['help'],
-                                line_min=int(cols) - 2 * TOLERANCE)
-                        if par not in self.completable_param:
-                            self.completable_param.append(par)
-
-                    param_doubles = self.command_param_info.get(command, {})
-                    for alias in param_aliases:
-                        param_doubles[alias] = param_aliases
-                    self.command_param_info[command] = param_doubles
+        for branch in get_command_branches(index):
+            self.command_tree.add_child(branch)
+        self.completable.extend(index.completable)
+        self.descrip = WrappedDescriptions(CommandDescriptions(index, self.command_tree), self.descrip)
+        self.command_example = WrappedDescriptions(CommandExamples(index, self.command_tree), wrap=_wrap_examples)
+        self.param_descript = WrappedDescriptions(ParamDescriptions(index, self.command_tree))
+        self.command_param_info = CommandParamInfo(index, self.command_tree)
+        self.completable_param = index.completable_param
 
     def get_all_subcommands(self):
         """ returns all the subcommands """
-        subcommands = []
-        for command in self.descrip:
-            for word in command.split():
-                for kid in self.command_tree.children:
-                    if word != kid and word not in subcommands:
-                        subcommands.append(word)
-        return subcommands
+        return list(dict.fromkeys(word for command in self.descrip for word in command.split()))
@@ -0,0 +1,339 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Offline search over the commands of the command index and a corpus of E2E scenarios, for when the recommendation
+service cannot be reached. Documents are ranked with BM25 over weighted fields, a word of the query also matches
+the words it is a prefix of, and the words one typo away when nothing matches it exactly.
+"""
+
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+from bisect import bisect_left
+
+from knack.log import get_logger
+
+
+logger = get_logger(__name__)
+
+SEARCH_SOURCE = 'local'
+SCENARIO_CORPUS_FILE = 'scenarios.json'
+SCENARIO_CORPUS_MAX = 1000
+HIGHLIGHT_MARKER = ('<em>', '</em>')
+
+# how much a word counts in each field of a document
+FIELD_WEIGHTS = {'name': 3.0, 'commands': 2.0, 'description': 1.0, 'examples': 0.5}
+# how much a word of the query counts when it is only the prefix of a word, or a word with a typo
+PREFIX_MATCH = 0.7
+FUZZY_MATCH = 0.5
+MAX_PREFIX_MATCHES = 50
+BM25_K1 = 1.2
+BM25_B = 0.75
+STOP_WORDS = frozenset(['a', 'an', 'and', 'az', 'for', 'in', 'of', 'on', 'the', 'to', 'with'])
+
+_WORD = re.compile(r'[A-Za-z0-9]+')
+
+
+def tokenize(text):
+    """ the lower case words of a text, `web-app` being `web` and `app` """
+    return [word.lower() for word in _WORD.findall(text)] if text else []
+
+
+def _deletions(term):
+    return {term[:i] + term[i + 1:] for i in range(len(term))} | {term}
+
+
+def highlight(text, terms):
+    """ marks the words of the text that are in terms, returns None if there is none """
+    if not text:
+        return None
+    marked = _WORD.sub(lambda m: HIGHLIGHT_MARKER[0] + m.group() + HIGHLIGHT_MARKER[1]
+                       if m.group().lower() in terms else m.group(), text)
+    return marked if marked != text else None
+
+
+class SearchIndex:
+    """ an inverted index of documents made of weighted fields, that can be updated one document at a time """
+
+    def __init__(self):
+        # key to (fingerprint, length, terms, payload)
+        self._documents = {}
+        # term to the weighted frequency of the term in each document
+        self._postings = {}
+        self._total_length = 0.0
+        self._vocabulary = None
+        self._neighbours = None
+
+    def __len__(self):
+        return len(self._documents)
+
+    def keys(self):
+        return list(self._documents)
+
+    def fingerprint(self, key):
+        document = self._documents.get(key)
+        return document[0] if document else None
+
+    def payload(self, key):
+        return self._documents[key][3]
+
+    def add(self, key, fields, payload=None, fingerprint=None):
+        """ indexes the {field: text} of a document, replacing the document with the same key """
+        self.remove(key)
+        frequencies = {}
+        length = 0.0
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for term in tokenize(text):
+                frequencies[term] = frequencies.get(term, 0.0) + weight
+                length += weight
+        for term, frequency in frequencies.items():
+            if term not in self._postings:
+                self._postings[term] = {}
+                self._vocabulary = self._neighbours = None
+            self._postings[term][key] = frequency
+        self._documents[key] = (fingerprint, length, tuple(frequencies), payload)
+        self._total_length += length
+
+    def remove(self, key):
+        document = self._documents.pop(key, None)
+        if document is None:
+            return
+        self._total_length -= document[1]
+        for term in document[2]:
+            postings = self._postings[term]
+            del postings[key]
+            if not postings:
+                del self._postings[term]
+                self._vocabulary = self._neighbours = None
+
+    def _expand(self, word):
+        """ returns the {term: weight} of the indexed terms a word of the query matches """
+        matches = {}
+        if word in self._postings:
+            matches[word] = 1.0
+        if len(word) >= 2:
+            if self._vocabulary is None:
+                self._vocabulary = sorted(self._postings)
+            start = bisect_left(self._vocabulary, word)
+            for term in self._vocabulary[start:start + MAX_PREFIX_MATCHES]:
+                if not term.startswith(word):
+                    break
+                matches.setdefault(term, PREFIX_MATCH)
+        if not matches and len(word) >= 4:
+            if self._neighbours is None:
+                self._neighbours = {}
+                for term in self._postings:
+                    for variant in _deletions(term):
+                        self._neighbours.setdefault(variant, []).append(term)
+            for variant in _deletions(word):
+                for term in self._neighbours.get(variant, []):
+                    matches.setdefault(term, FUZZY_MATCH)
+        return matches
+
+    def search(self, query, require_all=False, coverage_first=True, accept=None, top=5):
+        """
+        returns the (key, score, matched terms) of the best documents for a query. With `require_all` only the
+        documents matching every word of the query are returned, with `coverage_first` the documents matching more
+        words of the query come first.
+        """
+        words = list(dict.fromkeys(tokenize(query)))
+        words = [word for word in words if word not in STOP_WORDS] or words
+        if not words or not self._documents:
+            return []
+        count = len(self._documents)
+        average_length = self._total_length / count or 1.0
+        # key to [score, number of words matched, terms matched]
+        matched = {}
+        for word in words:
+            best = {}
+            for term, weight in self._expand(word).items():
+                postings = self._postings[term]
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, frequency in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._documents[key][1] / average_length)
+                    score = weight * idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                    best.setdefault(key, [0.0, set()])
+                    best[key][0] = max(best[key][0], score)
+                    best[key][1].add(term)
+            for key, (score, terms) in best.items():
+                result = matched.setdefault(key, [0.0, 0, set()])
+                result[0] += score
+                result[1] += 1
+                result[2] |= terms
+
+        results = [(key, score, words_matched, terms) for key, (score, words_matched, terms) in matched.items()
+                   if (not require_all or words_matched == len(words)) and (accept is None or accept(key))]
+        results.sort(key=lambda r: (-r[2] if coverage_first else 0, -r[1], r[0]))
+        return [(key, score, terms) for key, score, _, terms in results[:top]]
+
+
+def _first_sentence(text):
+    return text.strip().split('\n')[0].split('. ')[0].rstrip('.') if text else ''
+
+
+def _strip_az(command):
+    return command[3:] if command.startswith('az ') else command
+
+
+class LocalSearch:
+    """
+    Searches the commands of the command index and the scenarios of a corpus without network. The corpus is filled
+    with the scenarios returned by the recommendation service, it can also be provisioned in advance.
+    """
+
+    def __init__(self, corpus_path=None):
+        self.corpus_path = corpus_path
+        self._index = SearchIndex()
+        self._lock = threading.RLock()
+        # scenario name to the scenario, in the order they were added
+        self._scenarios = None
+        self._command_index = None
+
+    def update_commands(self, command_index):
+        """
+        sets the command index to search, its commands are indexed at the next search. Only the commands added or
+        changed since the last command index are indexed again, e.g. when an extension was installed.
+        """
+        with self._lock:
+            self._command_index = command_index
+
+    def _update_commands(self):
+        if self._command_index is None:
+            return
+        commands = {('command', command): (description, examples)
+                    for command, description, examples in self._command_index.commands()}
+        self._command_index = None
+        for key in self._index.keys():
+            if key[0] == 'command' and key not in commands:
+                self._index.remove(key)
+        for key, (description, examples) in commands.items():
+            fingerprint = hash((description, tuple(tuple(example) for example in examples)))
+            if self._index.fingerprint(key) == fingerprint:
+                continue
+            self._index.add(key, {
+                'name': key[1],
+                'description': description,
+                'examples': ' '.join(name + ' ' + text for name, text in examples)
+            }, payload=(description, examples), fingerprint=fingerprint)
+
+    def _load_scenarios(self):
+        if self._scenarios is not None:
+            return
+        self._scenarios = {}
+        scenarios = []
+        if self.corpus_path and os.path.exists(self.corpus_path):
+            try:
+                with open(self.corpus_path, 'r', encoding='utf-8') as corpus_file:
+                    scenarios = json.load(corpus_file)
+            except (OSError, ValueError) as ex:
+                logger.debug('Failed to load the scenario corpus %s: %s', self.corpus_path, ex)
+        self._add_scenarios(scenarios)
+
+    def _add_scenarios(self, scenarios):
+        for scenario in scenarios:
+            if not scenario.get('scenario') or not scenario.get('commandSet'):
+                continue
+            scenario = {key: value for key, value in scenario.items() if key not in ('score', 'highlights')}
+            scenario['commandSet'] = [dict(command) for command in scenario['commandSet']]
+            key = ('scenario', scenario['scenario'])
+            self._scenarios.pop(scenario['scenario'], None)
+            self._scenarios[scenario['scenario']] = scenario
+            self._index.add(key, {
+                'name': scenario['scenario'],
+                'description': ' '.join([scenario.get('description') or ''] +
+                                        [command.get('reason') or '' for command in scenario['commandSet']]),
+                'commands': ' '.join(command['command'] for command in scenario['commandSet'])
+            }, payload=scenario)
+        while len(self._scenarios) > SCENARIO_CORPUS_MAX:
+            name = next(iter(self._scenarios))
+            del self._scenarios[name]
+            self._index.remove(('scenario', name))
+
+    def add_scenarios(self, scenarios):
+        """ adds scenarios in the format of the search service to the corpus, and saves it """
+        with self._lock:
+            self._load_scenarios()
+            self._add_scenarios(scenarios)
+            content = json.dumps(list(self._scenarios.values()))
+        if not self.corpus_path:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.corpus_path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as corpus_file:
+                corpus_file.write(content)
+            os.replace(tmp_path, self.corpus_path)
+        except OSError as ex:
+            logger.debug('Failed to save the scenario corpus %s: %s', self.corpus_path, ex)
+
+    def search(self, keyword, kinds=('scenario', 'command'), require_all=False, coverage_first=True, top=5):
+        """ returns the best scenarios and commands for the keywords, in the format of the search service """
+        with self._lock:
+            self._load_scenarios()
+            self._update_commands()
+            found = self._index.search(keyword, require_all=require_all, coverage_first=coverage_first,
+                                       accept=lambda key: key[0] in kinds, top=top)
+            return [self._to_result(key, score, terms) for key, score, terms in found]
+
+    def _to_result(self, key, score, terms):
+        if key[0] == 'scenario':
+            result = dict(self._index.payload(key))
+            result['commandSet'] = [dict(command) for command in result['commandSet']]
+            result.setdefault('source', SEARCH_SOURCE)
+        else:
+            description, examples = self._index.payload(key)
+            # the arguments of the first example let the scenario show that example
+            arguments = [word for word in examples[0][1].split() if word.startswith('-')] if examples else []
+            result = {
+                'scenario': _first_sentence(description) or 'az ' + key[1],
+                'description': description or '',
+                'commandSet': [{'command': 'az ' + key[1], 'arguments': arguments, 'reason': description or ''}],
+                'source': SEARCH_SOURCE
+            }
+        highlights = {}
+        for field, texts in [('scenario', [result['scenario']]), ('description', [result.get('description')]),
+                             ('commandSet/command', [command['command'] for command in result['commandSet']])]:
+            marked = [text for text in (highlight(text, terms) for text in texts) if text]
+            if marked:
+                highlights[field] = marked
+        result['score'] = score
+        result['highlights'] = highlights
+        return result
+
+    def recommend(self, command, top=5):
+        """
+        returns the (command, reason) that follow a command in the scenarios of the corpus, then the commands of the
+        same group most related to it, and the (scenario, index of the commands left) of the scenarios it is part of
+        """
+        with self._lock:
+            self._load_scenarios()
+            self._update_commands()
+            followers = {}
+            scenarios = []
+            for scenario in reversed(list(self._scenarios.values())):
+                commands = [_strip_az(item['command']) for item in scenario['commandSet']]
+                if command not in commands:
+                    continue
+                position = commands.index(command) + 1
+                if position < len(commands):
+                    follower = followers.setdefault(commands[position],
+                                                    [0, scenario['commandSet'][position].get('reason') or ''])
+                    follower[0] += 1
+                    scenarios.append((scenario, list(range(position, len(commands)))))
+            next_commands = [(name, reason) for name, (_, reason) in
+                             sorted(followers.items(), key=lambda item: -item[1][0])][:top]
+
+            group = command.rsplit(' ', 1)[0] + ' ' if ' ' in command else None
+            if group and len(next_commands) < top:
+                known = {name for name, _ in next_commands} | {command}
+                related = self._index.search(command, accept=lambda key: key[0] == 'command' and
+                                             key[1].startswith(group) and key[1] not in known, top=top)
+                next_commands += [(key[1], self._index.payload(key)[0] or '')
+                                  for key, _, _ in related][:top - len(next_commands)]
+        return next_commands, scenarios[:top]
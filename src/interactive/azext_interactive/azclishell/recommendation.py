@@ -13,6 +13,7 @@ from azure.cli.core import telemetry
 from azure.cli.core import __version__ as version
 from azure.cli.core.style import print_styled_text, Style
 from prompt_toolkit.history import FileHistory
+from .local_search import LocalSearch, SEARCH_SOURCE
 from .scenario_search import SearchThread
 
 
@@ -28,10 +29,13 @@ class RecommendType(int, Enum):
 class RecommendThread(threading.Thread):
     """ Worker Thread to fetch recommendation online based on user's context """
 
-    def __init__(self, cli_ctx, recommendation_path, executing_command, on_prepared_callback):
+    def __init__(self, cli_ctx, recommendation_path, executing_command, on_prepared_callback, local_search=None,
+                 online=True):
         super().__init__()
         self.cli_ctx = cli_ctx
         self.on_prepared_callback = on_prepared_callback
+        self.local_search = local_search
+        self.online = online
         # The latest 25 commands are extracted for personalized analysis
         self.command_history = recommendation_path.get_cmd_history(25)
         if executing_command:
@@ -41,21 +45,28 @@ class RecommendThread(threading.Thread):
         self.api_version = None
 
     def run(self) -> None:
-        try:
-            self.result, self.api_version = get_recommend_from_api([json.dumps(cmd) for cmd in self.command_history],
-                                                                   RecommendType.All,
-                                                                   self.cli_ctx.config.getint('next', 'num_limit',
-                                                                                              fallback=5),
-                                                                   error_info=self.processed_exception)
-        except RecommendationError:
-            self.result = []
+        top_num = self.cli_ctx.config.getint('next', 'num_limit', fallback=5)
+        self.result = None
+        if self.online:
+            try:
+                self.result, self.api_version = get_recommend_from_api(
+                    [json.dumps(cmd) for cmd in self.command_history], RecommendType.All, top_num,
+                    error_info=self.processed_exception)
+                if self.local_search:
+                    self.local_search.add_scenarios(_to_search_scenarios(self.result))
+            except RecommendationError:
+                pass
+        if self.result is None:
+            self.result = get_local_recommendations(self.local_search, self.command_history,
+                                                    top_num) if self.local_search else []
         self.on_prepared_callback()
 
 
 class Recommender:
-    def __init__(self, cli_ctx, filename):
+    def __init__(self, cli_ctx, filename, scenario_corpus_path=None):
         self.cli_ctx = cli_ctx
         self.recommendation_path = RecommendPath(filename)
+        self.local_search = LocalSearch(scenario_corpus_path)
         self.cur_thread = None
         self.on_prepared_callback = lambda: None
         self.default_recommendations = {
@@ -71,6 +82,16 @@ class Recommender:
         """Whether recommender is enabled in global config"""
         return self.cli_ctx.config.getboolean("interactive", "enable_recommender", fallback=True)
 
+    @property
+    def online(self):
+        """Whether recommendations and searches are fetched from the recommendation service first"""
+        return self.cli_ctx.config.getboolean("interactive", "enable_online_recommender", fallback=True)
+
+    def update_commands(self, command_index):
+        """Search the commands of a new command index when the recommendation service is not used"""
+        if command_index is not None:
+            self.local_search.update_commands(command_index)
+
     def feedback_command(self, command):
         """Send user's command choice in recommendations to telemetry."""
         if self.cur_thread and not self.cur_thread.is_alive():
@@ -174,7 +195,7 @@ class Recommender:
     def _update(self):
         """Update recommendation result in new thread"""
         self.cur_thread = RecommendThread(self.cli_ctx, self.recommendation_path, self.executing_command,
-                                          self.on_prepared_callback)
+                                          self.on_prepared_callback, self.local_search, self.online)
         self.cur_thread.start()
 
     def _get_result(self, recommendation_type=RecommendType.Command):
@@ -284,6 +305,36 @@ def get_recommend_from_api(command_list, type, top_num=5, error_info=None):  # p
     return recommends, api_version
 
 
+def get_local_recommendations(local_search, command_history, top_num=5):
+    """recommend the next commands and scenarios from the scenario corpus and the command index, without network"""
+    if not command_history or not command_history[-1].get('command'):
+        return []
+    next_commands, scenarios = local_search.recommend(command_history[-1]['command'], top_num)
+    recommends = [{'command': command, 'reason': reason, 'source': SEARCH_SOURCE, 'type': RecommendType.Command}
+                  for command, reason in next_commands]
+    for scenario, execute_index in scenarios:
+        recommends.append({
+            'scenario': scenario['scenario'],
+            'nextCommandSet': [dict(command, command=re.sub(r'^az ', '', command['command']))
+                               for command in scenario['commandSet']],
+            'executeIndex': execute_index,
+            'source': scenario.get('source', SEARCH_SOURCE),
+            'type': RecommendType.Scenario,
+            'reason': scenario.get('description') or scenario['scenario']
+        })
+    return recommends
+
+
+def _to_search_scenarios(recommends):
+    """convert the recommended scenarios to the format of the search service, to search them offline later"""
+    return [{'scenario': recommend['scenario'],
+             'description': recommend.get('reason') or recommend['scenario'],
+             'commandSet': [dict(command, command='az ' + re.sub(r'^az ', '', command['command']))
+                            for command in recommend.get('nextCommandSet', [])],
+             'source': recommend.get('source')}
+            for recommend in recommends or [] if recommend.get('type') == RecommendType.Scenario]
+
+
 def send_feedback(option_idx, latest_commands, processed_exception=None, recommends=None, accepted_recommend=None,
                   api_version=None, request_type=RecommendType.All):
     # initialize feedback data
@@ -43,11 +43,14 @@ class MatchRule(int, Enum):
 
 
 class SearchThread(threading.Thread):
-    def __init__(self, cli_ctx, keywords, search_path, executing_command, on_prepared_callback):
+    def __init__(self, cli_ctx, keywords, search_path, executing_command, on_prepared_callback, local_search=None,
+                 online=True):
         super().__init__()
         self.cli_ctx = cli_ctx
         self.keywords = keywords
         self.on_prepared_callback = on_prepared_callback
+        self.local_search = local_search
+        self.online = online
         # maintain a copy of the command history to insert commands executed in the searched scenario
         self.command_history = search_path.get_cmd_history(25)
         if executing_command:
@@ -57,14 +60,32 @@ class SearchThread(threading.Thread):
         self.api_version = None
 
     def run(self, scope=SearchScope.Scenario, match_rule=MatchRule.All) -> None:
-        try:
-            self.result, self.api_version = online_search(keyword=self.keywords, scope=scope,
-                                                          match_rule=match_rule,
-                                                          top=self.cli_ctx.config.getint('next', 'num_limit',
-                                                                                         fallback=5))
-            self.result = search_result_to_scenario_list(self.result)
-        except ScenarioSearchError:
-            self.result = "Connection Error. Please check your network connection."
+        top = self.cli_ctx.config.getint('next', 'num_limit', fallback=5)
+        if self.online:
+            try:
+                results, self.api_version = online_search(keyword=self.keywords, scope=scope,
+                                                          match_rule=match_rule, top=top)
+                if self.local_search:
+                    self.local_search.add_scenarios(results)
+                self.result = search_result_to_scenario_list(results)
+                return
+            except ScenarioSearchError:
+                if not self.local_search:
+                    self.result = "Connection Error. Please check your network connection."
+                    return
+        if not self.local_search:
+            self.result = []
+            return
+        # there are few scenarios to search from offline, the commands are searched along with them
+        self.result = search_result_to_scenario_list(offline_search(self.local_search, self.keywords,
+                                                                    SearchScope.All, match_rule, top))
+
+
+def offline_search(search, keyword, scope=SearchScope.All, match_rule=MatchRule.All, top=5):
+    """Search related e2e scenarios and commands without network, the results are in the format of `online_search`"""
+    kinds = {SearchScope.Scenario: ('scenario',), SearchScope.Command: ('command',)}.get(scope, ('scenario', 'command'))
+    return search.search(keyword, kinds=kinds, require_all=match_rule == MatchRule.And,
+                         coverage_first=match_rule != MatchRule.Or, top=top)
 
 
 # copied from azext_scenario_guide.requests.search_online: https://github.com/Azure/azure-cli-extensions/blob/7365e1ba3cc858b075cbc98aeb4e5ce5c91db745/src/scenario-guide/azext_scenario_guide/requests.py#L13
@@ -79,7 +100,7 @@ def online_search(keyword, scope=SearchScope.All, match_rule=MatchRule.All, top=
         "top_num": top,
     }
     try:
-        response = requests.post(url, json.dumps(payload))
+        response = requests.post(url, json.dumps(payload), timeout=2)
         response.raise_for_status()
     except requests.ConnectionError as e:
         raise ScenarioSearchError(f'Network Error: {e}') from e
@@ -174,7 +195,10 @@ def search_result_to_scenario_list(search_results):
         scenario = {'scenario': raw_scenario['description'], 'nextCommandSet': raw_scenario['commandSet'],
                     'source': raw_scenario['source'], 'type': 5, 'executeIndex': range(len(raw_scenario['commandSet'])),
                     'score': raw_scenario['score'], 'reason': raw_scenario['description'],
-                    'highlights': raw_scenario['highlights'], 'description': raw_scenario['description']}
+                    'highlights': dict(raw_scenario['highlights']), 'description': raw_scenario['description']}
+        # the highlighted commands are displayed as those of `nextCommandSet`
+        if 'commandSet/command' in scenario['highlights']:
+            scenario['highlights']['nextCommandSet/command'] = scenario['highlights'].pop('commandSet/command')
         # update command list: az group list => group list
         commands = []
         for command in scenario['nextCommandSet']:
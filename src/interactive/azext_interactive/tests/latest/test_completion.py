@@ -4,6 +4,8 @@
 # --------------------------------------------------------------------------------------------
 
 import os
+import shutil
+import tempfile
 import unittest
 from unittest import mock
 
@@ -19,10 +21,13 @@ TEST_DIR = os.path.abspath(os.path.join(os.path.abspath(__file__), '..'))
 
 
 class CompletionTest(unittest.TestCase):
-    def __init__(self, methodName):
-        super(CompletionTest, self).__init__(methodName)
+    def setUp(self):
+        # the shell writes the index of the help dump next to it, so it is given a copy of the test cache
+        config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, config_dir, ignore_errors=True)
+        shutil.copytree(os.path.join(TEST_DIR, 'cache'), os.path.join(config_dir, 'cache'))
         with mock.patch.object(Configuration, 'get_help_files', lambda _: 'help_dump_test.json'):
-            with mock.patch.object(Configuration, 'get_config_dir', lambda _: TEST_DIR):
+            with mock.patch.object(Configuration, 'get_config_dir', lambda _: config_dir):
                 shell_ctx = AzInteractiveShell(DummyCli(), None)
                 self.completer = shell_ctx.completer
                 self.shell_ctx = shell_ctx
@@ -3,8 +3,28 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import json
+import os
+import shutil
+import tempfile
 import unittest
-from azext_interactive.azclishell.gather_commands import add_new_lines as nl
+from unittest import mock
+
+from azext_interactive.azclishell.command_index import get_index_path
+from azext_interactive.azclishell.gather_commands import add_new_lines as nl, GatherCommands
+
+TEST_DIR = os.path.abspath(os.path.join(os.path.abspath(__file__), '..'))
+
+
+class MockConfig(object):
+    def __init__(self, config_dir):
+        self.config_dir = config_dir
+
+    def get_help_files(self):  # pylint: disable=no-self-use
+        return 'help_dump_test.json'
+
+    def get_config_dir(self):
+        return self.config_dir
 
 
 class GatherTest(unittest.TestCase):
@@ -56,5 +76,69 @@ class GatherTest(unittest.TestCase):
         )
 
 
+@mock.patch('azext_interactive.azclishell.gather_commands._get_window_columns', lambda: 1000)
+class GatherFromIndexTest(unittest.TestCase):
+    def setUp(self):
+        config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, config_dir)
+        os.makedirs(os.path.join(config_dir, 'cache'))
+        self.help_path = os.path.join(config_dir, 'cache', 'help_dump_test.json')
+        shutil.copy(os.path.join(TEST_DIR, 'cache', 'help_dump_test.json'), self.help_path)
+        with open(self.help_path) as help_file:
+            self.data = json.load(help_file)
+        self.config = MockConfig(config_dir)
+
+    def test_gather_commands(self):
+        commands = GatherCommands(self.config)
+        self.assertTrue(os.path.exists(get_index_path(self.help_path)))
+
+        self.assertEqual(sorted(commands.descrip), sorted(list(self.data) + ['quit', 'exit']))
+        self.assertEqual(commands.descrip['vm create'], self.data['vm create']['help'])
+        self.assertEqual(commands.descrip['quit'], 'Exits the program')
+        self.assertEqual(list(commands.command_tree.children), ['quit', 'exit', 'storage', 'vm', 'vmss'])
+        self.assertEqual(list(commands.command_tree.get_child('storage').get_child('account').children),
+                         ['create', 'check-name'])
+        self.assertEqual(len(commands.completable), len(set(commands.completable)))
+        self.assertEqual(set(commands.completable),
+                         {'quit', 'exit'} | {word for command in self.data for word in command.split()})
+        self.assertEqual(set(commands.get_all_subcommands()), set(commands.completable))
+
+        parameters = self.data['vm create']['parameters']
+        self.assertIn('--name', commands.completable_param)
+        self.assertNotIn('--cmd', commands.completable_param)
+        self.assertEqual(commands.param_descript['vm create -n'],
+                         parameters['--name']['required'] + ' ' + parameters['--name']['help'])
+        self.assertNotIn('vm create --cmd', commands.param_descript)
+        self.assertEqual(commands.command_param_info['vm create']['-n'], {'--name', '-n'})
+        self.assertNotIn('vm', commands.command_param_info)
+        for command, entry in self.data.items():
+            if entry.get('examples'):
+                self.assertEqual(commands.command_example[command],
+                                 [[name.strip(), text.strip()] for name, text in entry['examples']])
+
+    def test_descriptions_are_wrapped_when_read(self):
+        commands = GatherCommands(self.config)
+        description = self.data['vm create']['help']
+        with mock.patch('azext_interactive.azclishell.gather_commands._get_window_columns', lambda: 40):
+            self.assertEqual(commands.descrip['vm create'], nl(description, line_min=20))
+
+    def test_index_is_rebuilt_when_outdated(self):
+        GatherCommands(self.config)
+        # an up to date index is used without reading the help dump
+        with mock.patch('json.load', side_effect=AssertionError('the help dump was read')):
+            self.assertIn('vm create', GatherCommands(self.config).descrip)
+
+        self.data['vm delete'] = {'help': 'Delete a VM.', 'parameters': {}, 'examples': ''}
+        with open(self.help_path, 'w') as help_file:
+            json.dump(self.data, help_file)
+        commands = GatherCommands(self.config)
+        self.assertEqual(commands.descrip['vm delete'], 'Delete a VM.')
+        self.assertEqual(commands.command_example['vm delete'], [])
+
+        with open(get_index_path(self.help_path), 'wb') as index_file:
+            index_file.write(b'AZCI\xff')
+        self.assertIn('vm delete', GatherCommands(self.config).descrip)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,143 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from azext_interactive.azclishell.command_index import CommandIndex, build_command_index
+from azext_interactive.azclishell.local_search import LocalSearch, SearchIndex
+from azext_interactive.azclishell.recommendation import RecommendType, get_local_recommendations
+from azext_interactive.azclishell.scenario_search import (MatchRule, SearchScope, offline_search,
+                                                           search_result_to_scenario_list)
+
+COMMANDS = {
+    'vm': {'help': 'Manage Linux or Windows virtual machines.'},
+    'vm create': {'help': 'Create an Azure Virtual Machine.', 'parameters': {},
+                  'examples': [['Create a VM from an image.', 'az vm create -n MyVm -g MyGroup --image Ubuntu2204']]},
+    'vm delete': {'help': 'Delete a VM.', 'parameters': {}, 'examples': ''},
+    'vm show': {'help': 'Get the details of a VM.', 'parameters': {}, 'examples': ''},
+    'cosmosdb create': {'help': 'Creates a new Azure Cosmos DB database account for MongoDB.', 'parameters': {},
+                        'examples': ''},
+    'webapp create': {'help': 'Create a web app.', 'parameters': {}, 'examples': ''},
+}
+
+SCENARIOS = [{
+    'scenario': 'Connect an app to a MongoDB database',
+    'description': 'Create a web app and connect it to a Cosmos DB for MongoDB account',
+    'commandSet': [{'command': 'az webapp create', 'arguments': ['-n'], 'reason': 'Create the web app'},
+                   {'command': 'az cosmosdb create', 'arguments': ['-n'], 'reason': 'Create the database account'},
+                   {'command': 'az webapp config appsettings set', 'arguments': [], 'reason': 'Set the connection'}],
+    'source': 'corpus',
+}]
+
+
+def command_index(data):
+    return CommandIndex(build_command_index(data))
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.add('vm', {'name': 'vm create', 'description': 'Create an Azure Virtual Machine'})
+        self.index.add('app', {'name': 'webapp create', 'description': 'Create a web app'})
+        self.index.add('mongo', {'name': 'cosmosdb create', 'description': 'Create a database account for MongoDB'})
+
+    def search(self, query, **kwargs):
+        return [key for key, _, _ in self.index.search(query, **kwargs)]
+
+    def test_ranking_and_match_rules(self):
+        self.assertEqual(self.search('virtual machine'), ['vm'])
+        self.assertEqual(self.search('create web app')[0], 'app')
+        self.assertEqual(self.search('web machine', require_all=True), [])
+        self.assertEqual(sorted(self.search('web machine')), ['app', 'vm'])
+        self.assertEqual(self.search('the virtual machine for a'), ['vm'])
+
+    def test_prefix_and_typo(self):
+        self.assertEqual(self.search('mong'), ['mongo'])
+        self.assertEqual(self.search('mongdb'), ['mongo'])
+        self.assertEqual(self.search('virtaul'), ['vm'])
+        _, _, terms = self.index.search('mong')[0]
+        self.assertEqual(terms, {'mongodb'})
+
+    def test_remove(self):
+        self.index.remove('mongo')
+        self.assertEqual(self.search('mongodb'), [])
+        self.assertEqual(len(self.index), 2)
+
+
+class LocalSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.corpus_path = os.path.join(self.folder, 'scenarios.json')
+        self.search = LocalSearch(self.corpus_path)
+        self.search.update_commands(command_index(COMMANDS))
+
+    def test_commands_are_updated_incrementally(self):
+        self.assertEqual(self.search.search('virtual machine')[0]['commandSet'][0]['command'], 'az vm create')
+
+        data = dict(COMMANDS)
+        del data['webapp create']
+        data['vm show'] = {'help': 'Show the details of a virtual machine.', 'parameters': {}, 'examples': ''}
+        data['vm start'] = {'help': 'Start a stopped VM.', 'parameters': {}, 'examples': ''}
+        self.search.update_commands(command_index(data))
+        with mock.patch.object(SearchIndex, 'add', side_effect=SearchIndex.add, autospec=True) as add:
+            self.assertEqual(self.search.search('web app'), [])
+        self.assertEqual(sorted(call[0][1][1] for call in add.call_args_list), ['vm show', 'vm start'])
+        # groups are not searched, they cannot be run
+        self.assertEqual([r['commandSet'][0]['command'] for r in self.search.search('virtual', top=10)],
+                         ['az vm show', 'az vm create'])
+
+    def test_results_in_the_format_of_the_search_service(self):
+        self.search.add_scenarios(SCENARIOS)
+        for _ in range(2):
+            results = search_result_to_scenario_list(
+                offline_search(self.search, 'mongo database', SearchScope.All, MatchRule.All, 5))
+            self.assertEqual([r['scenario'] for r in results],
+                             [SCENARIOS[0]['description'], COMMANDS['cosmosdb create']['help']])
+            scenario = results[0]
+            self.assertEqual([c['command'] for c in scenario['nextCommandSet']],
+                             ['webapp create', 'cosmosdb create', 'webapp config appsettings set'])
+            self.assertEqual(list(scenario['executeIndex']), [0, 1, 2])
+            self.assertEqual(scenario['source'], 'corpus')
+            self.assertIn('<em>MongoDB</em>', scenario['highlights']['description'][0])
+
+        command = results[1]
+        self.assertEqual(command['nextCommandSet'], [{'command': 'cosmosdb create', 'arguments': [],
+                                                      'reason': COMMANDS['cosmosdb create']['help']}])
+        self.assertEqual(command['highlights']['description'],
+                         ['Creates a new Azure Cosmos DB <em>database</em> account for <em>MongoDB</em>.'])
+        self.assertNotIn('nextCommandSet/command', command['highlights'])
+
+        results = offline_search(self.search, 'vm machine', SearchScope.Command, MatchRule.And, 5)
+        self.assertEqual(results[0]['commandSet'][0]['arguments'], ['-n', '-g', '--image'])
+        self.assertEqual(offline_search(self.search, 'vm machine', SearchScope.Scenario, MatchRule.Or, 5), [])
+
+    def test_corpus_is_saved(self):
+        self.search.add_scenarios(SCENARIOS)
+        search = LocalSearch(self.corpus_path)
+        self.assertEqual(search.search('mongodb', kinds=('scenario',))[0]['scenario'], SCENARIOS[0]['scenario'])
+
+    def test_local_recommendations(self):
+        self.search.add_scenarios(SCENARIOS)
+        recommends = get_local_recommendations(self.search, [{'command': 'webapp create'}], 5)
+        self.assertEqual(recommends[0], {'command': 'cosmosdb create', 'reason': 'Create the database account',
+                                         'source': 'local', 'type': RecommendType.Command})
+        scenario = recommends[-1]
+        self.assertEqual(scenario['type'], RecommendType.Scenario)
+        self.assertEqual(scenario['nextCommandSet'][0]['command'], 'webapp create')
+        self.assertEqual(scenario['executeIndex'], [1, 2])
+
+        # without scenarios, the commands of the same group are recommended
+        recommends = get_local_recommendations(self.search, [{'command': 'vm create'}], 5)
+        self.assertEqual(sorted(r['command'] for r in recommends), ['vm delete', 'vm show'])
+        self.assertEqual(get_local_recommendations(self.search, [], 5), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Benchmark for gathering the command table when `az interactive` starts.
+
+Dumps a synthetic command table from a fixed seed, shaped like the one of the CLI with many extensions
+installed: nested groups, commands sharing common parameters, long descriptions and examples. Each start is
+timed in a fresh process, imports included:
+
+    legacy        the previous implementation, which parsed the JSON help dump, deduplicated words with list
+                  lookups and wrapped every description up front
+    first start   no index yet, it is built from the JSON help dump and written next to it
+    index         the index written when the command table was dumped is memory mapped
+
+Both implementations must gather the same commands, words and parameters. The nested scan of the previous
+get_all_subcommands takes minutes on a large table, it is only timed with --legacy-subcommands.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --commands 20000 --json
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from azext_interactive.azclishell.command_index import get_index_path  # noqa: E402
+from azext_interactive.azclishell.command_tree import CommandBranch  # noqa: E402
+from azext_interactive.azclishell.gather_commands import (  # noqa: E402
+    GatherCommands, TOLERANCE, add_new_lines, _get_window_columns)
+
+HELP_FILE = "help_dump.json"
+VERBS = ["create", "delete", "show", "list", "update", "wait", "start", "stop", "restart", "show-status"]
+COMMON_PARAMS = [["--resource-group", "-g"], ["--name", "-n"], ["--location", "-l"], ["--tags"], ["--ids"],
+                 ["--subscription"], ["--no-wait"], ["--yes", "-y"]]
+WORDS = ("the of resource group name virtual machine storage account network value to a is for with when "
+         "default configure specified existing identity property update create list format is used").split()
+
+
+def sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def make_help_dump(commands, seed):
+    """A table of `commands` commands in groups of up to 10 verbs, nested up to 3 levels."""
+    rng = random.Random(seed)
+    data = {}
+    top_level = ["group{}".format(i) for i in range(max(1, commands // 60))]
+    count = 0
+    while count < commands:
+        group = [rng.choice(top_level)] + ["sub{}".format(rng.randrange(12)) for _ in range(rng.randrange(3))]
+        for depth in range(1, len(group) + 1):
+            data.setdefault(" ".join(group[:depth]), {"help": sentence(rng, 8)})
+        for verb in rng.sample(VERBS, rng.randrange(3, len(VERBS))):
+            parameters = {}
+            names = COMMON_PARAMS[:rng.randrange(2, len(COMMON_PARAMS))]
+            names += [["--{}-{}".format(rng.choice(WORDS), rng.choice(WORDS))] for _ in range(rng.randrange(12))]
+            for name in names:
+                parameters[name[0]] = {"name": name, "required": "[REQUIRED]" if rng.random() < 0.2 else "",
+                                       "help": "==SUPPRESS==" if rng.random() < 0.05 else sentence(rng, 30)}
+            examples = [[sentence(rng, 6), "az {} {} -g MyResourceGroup -n MyName".format(" ".join(group), verb)]
+                        for _ in range(rng.randrange(3))]
+            command = " ".join(group + [verb])
+            count += command not in data
+            data[command] = {"help": sentence(rng, 20), "parameters": parameters, "examples": examples or ""}
+    return data
+
+
+class MockConfig(object):
+    def __init__(self, config_dir):
+        self.config_dir = config_dir
+
+    def get_help_files(self):  # pylint: disable=no-self-use
+        return HELP_FILE
+
+    def get_config_dir(self):
+        return self.config_dir
+
+
+def legacy_gather_from_files(self, config):
+    command_file = config.get_help_files()
+    cache_path = os.path.join(config.get_config_dir(), 'cache')
+    cols = _get_window_columns()
+
+    with open(os.path.join(cache_path, command_file), 'r') as help_file:
+        data = json.load(help_file)
+    self.add_exit()
+    for command in data:
+        branch = self.command_tree
+        for word in command.split():
+            if word not in self.completable:
+                self.completable.append(word)
+            if not branch.has_child(word):
+                branch.add_child(CommandBranch(word))
+            branch = branch.get_child(word)
+
+        self.descrip[command] = add_new_lines(data[command]['help'], line_min=int(cols) - 2 * TOLERANCE)
+        if 'examples' in data[command]:
+            self.command_example[command] = [
+                [add_new_lines(example[0], line_min=int(cols) - 2 * TOLERANCE),
+                 add_new_lines(example[1], line_min=int(cols) - 2 * TOLERANCE)]
+                for example in data[command]['examples']]
+
+        command_params = data[command].get('parameters', {})
+        for param in command_params:
+            if '==SUPPRESS==' not in command_params[param]['help']:
+                param_aliases = set()
+                for par in command_params[param]['name']:
+                    param_aliases.add(par)
+                    self.param_descript[command + " " + par] = add_new_lines(
+                        command_params[param]['required'] + " " + command_params[param]['help'],
+                        line_min=int(cols) - 2 * TOLERANCE)
+                    if par not in self.completable_param:
+                        self.completable_param.append(par)
+                param_doubles = self.command_param_info.get(command, {})
+                for alias in param_aliases:
+                    param_doubles[alias] = param_aliases
+                self.command_param_info[command] = param_doubles
+
+
+def legacy_get_all_subcommands(self):
+    subcommands = []
+    for command in self.descrip:
+        for word in command.split():
+            for kid in self.command_tree.children:
+                if word != kid and word not in subcommands:
+                    subcommands.append(word)
+    return subcommands
+
+
+def gather(variant, config_dir, subcommands):
+    """Runs in a fresh process, returns the seconds taken to be ready for the first prompt."""
+    if variant == "legacy":
+        GatherCommands._gather_from_files = legacy_gather_from_files  # pylint: disable=protected-access
+        if subcommands:
+            GatherCommands.get_all_subcommands = legacy_get_all_subcommands
+    start = time.perf_counter()
+    commands = GatherCommands(MockConfig(config_dir))
+    if subcommands or variant != "legacy":
+        commands.get_all_subcommands()
+    return time.perf_counter() - start
+
+
+def start_process(variant, config_dir, subcommands):
+    if variant == "first start":
+        os.remove(get_index_path(os.path.join(config_dir, "cache", HELP_FILE)))
+    start = time.perf_counter()
+    output = subprocess.check_output([sys.executable, __file__, "--gather", variant, "--config-dir", config_dir] +
+                                     (["--legacy-subcommands"] if subcommands else []))
+    return {"seconds": time.perf_counter() - start, "gather seconds": json.loads(output)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commands", type=int, default=10000, help="number of commands in the synthetic table")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic table")
+    parser.add_argument("--repeat", type=int, default=3, help="number of starts timed, the fastest is kept")
+    parser.add_argument("--legacy-subcommands", action="store_true",
+                        help="also time the previous get_all_subcommands")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--gather", help=argparse.SUPPRESS)
+    parser.add_argument("--config-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.gather:
+        print(json.dumps(gather(args.gather, args.config_dir, args.legacy_subcommands)))
+        return
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        os.makedirs(os.path.join(config_dir, "cache"))
+        help_path = os.path.join(config_dir, "cache", HELP_FILE)
+        with open(help_path, "w") as help_file:
+            json.dump(make_help_dump(args.commands, args.seed), help_file)
+
+        with mock.patch.object(GatherCommands, "_gather_from_files", legacy_gather_from_files):
+            legacy = GatherCommands(MockConfig(config_dir))
+        current = GatherCommands(MockConfig(config_dir))
+        if (set(legacy.descrip) != set(current.descrip) or legacy.completable != current.completable or
+                legacy.completable_param != current.completable_param or
+                set(legacy.param_descript) != set(current.param_descript)):
+            raise SystemExit("The commands gathered from the index are not the ones of the help dump")
+
+        results = {"commands": args.commands, "help dump bytes": os.path.getsize(help_path),
+                   "index bytes": os.path.getsize(get_index_path(help_path))}
+        for variant in ("legacy", "first start", "index"):
+            runs = [start_process(variant, config_dir, args.legacy_subcommands) for _ in range(args.repeat)]
+            results[variant] = min(runs, key=lambda run: run["seconds"])
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print("{} commands, help dump {} bytes, index {} bytes".format(
+            args.commands, results["help dump bytes"], results["index bytes"]))
+        for variant in ("legacy", "first start", "index"):
+            print("{:<12} {:>8.3f} s process {:>8.3f} s gathering".format(
+                variant, results[variant]["seconds"], results[variant]["gather seconds"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -41,6 +41,14 @@ helps['graph query'] = """
         - name: --allow-partial-scopes -a
           type: bool
           short-summary: Indicates if query should succeed when only partial number of subscription underneath can be processed by server.
+        - name: --stream
+          type: bool
+          short-summary: Query all the subscriptions or management groups and write each row to stdout as a JSON line as the pages arrive.
+          long-summary: >
+            The subscriptions are queried in batches of 1000 and the management groups in batches of 10, several batches at a time,
+            waiting when the quota of requests of the user is about to run out. The skip tokens are followed until the last page.
+            Rows come in the order of the pages received, and aggregations such as summarize are computed for each batch.
+            The output format is ignored.
     examples:
         - name: Query resources requesting a subset of resource fields.
           text: >
@@ -60,6 +68,9 @@ helps['graph query'] = """
         - name: Query with the skip token.
           text: >
             az graph query -q "where type =~ "Microsoft.Compute" | project name, tags" --skip-token skip_token_value_from_previous_query_response
+        - name: Write all the virtual machines of all the accessible subscriptions to a file, one JSON object per line.
+          text: >
+            az graph query -q "where type =~ 'Microsoft.Compute/virtualMachines' | project id, name, location" --stream > vms.ndjson
 """
 
 
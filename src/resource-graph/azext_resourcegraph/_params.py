@@ -42,6 +42,8 @@ def load_arguments(self, _):
         c.argument('allow_partial_scopes', options_list=['--allow-partial-scopes', '-a'],
                    arg_type=get_three_state_flag(), required=False, default=False,
                    help='Indicates if query should succeed when only partial number of subscription underneath can be processed by server.')
+        c.argument('stream', options_list=['--stream'], arg_type=get_three_state_flag(), required=False, default=False,
+                   help='Query all the subscriptions or management groups, in concurrent batches of the size allowed, following the skip tokens, and write each row to stdout as a JSON line as the pages arrive.')
 
     with self.argument_context('graph shared-query') as c:
         c.argument('graph_query', options_list=['--graph-query', '--q', '-q'],
@@ -23,6 +23,13 @@ def validate_query_args(namespace):
         recommendation = 'Try to pass --subscriptions param only or --management-groups param only.'
         raise InvalidArgumentValueError(error_msg, recommendation)
 
+    if namespace.stream:
+        if namespace.first is not None or namespace.skip is not None or namespace.skip_token is not None:
+            error_msg = '--first, --skip and --skip-token cannot be used with --stream.'
+            recommendation = 'All the pages of the query are written with --stream, use "| limit N" to get fewer rows.'
+            raise InvalidArgumentValueError(error_msg, recommendation)
+        return
+
     if namespace.first is not None:
         namespace.first = min(namespace.first, __ROWS_PER_PAGE)
     elif namespace.skip_token is None:
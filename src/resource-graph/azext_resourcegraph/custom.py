@@ -7,7 +7,12 @@
 
 import json
 import os
+import queue
+import sys
+import threading
+import time
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 import requests
@@ -27,17 +32,27 @@ from .vendored_sdks.resourcegraph.models import \
 
 __SUBSCRIPTION_LIMIT = 1000
 __MANAGEMENT_GROUP_LIMIT = 10
+__ROWS_PER_PAGE = 1000
+__STREAM_WORKERS = 4
+__STREAM_QUEUED_PAGES = 8
+__QUOTA_REMAINING_HEADER = 'x-ms-user-quota-remaining'
+__QUOTA_RESETS_AFTER_HEADER = 'x-ms-user-quota-resets-after'
 __logger = get_logger(__name__)
 
 
-def execute_query(client, graph_query, first, skip, subscriptions, management_groups, allow_partial_scopes, skip_token):
-    # type: (ResourceGraphClient, str, int, int, list[str], list[str], bool, str) -> object
+def execute_query(client, graph_query, first, skip, subscriptions, management_groups, allow_partial_scopes, skip_token,
+                  stream=False):
+    # type: (ResourceGraphClient, str, int, int, list[str], list[str], bool, str, bool) -> object
+    if stream:
+        _stream_query(client, graph_query, subscriptions, management_groups, allow_partial_scopes)
+        return None
+
     mgs_list = management_groups
     if mgs_list is not None and len(mgs_list) > __MANAGEMENT_GROUP_LIMIT:
         mgs_list = mgs_list[:__MANAGEMENT_GROUP_LIMIT]
         warning_message = "The query included more management groups than allowed. "\
                           "Only the first {0} management groups were included for the results. "\
-                          "To use more than {0} management groups, "\
+                          "To use more than {0} management groups, use --stream or "\
                           "see the docs for examples: "\
                           "https://aka.ms/arg-error-toomanysubs".format(__MANAGEMENT_GROUP_LIMIT)
         __logger.warning(warning_message)
@@ -49,7 +64,7 @@ def execute_query(client, graph_query, first, skip, subscriptions, management_gr
             subs_list = subs_list[:__SUBSCRIPTION_LIMIT]
             warning_message = "The query included more subscriptions than allowed. "\
                               "Only the first {0} subscriptions were included for the results. "\
-                              "To use more than {0} subscriptions, "\
+                              "To use more than {0} subscriptions, use --stream or "\
                               "see the docs for examples: "\
                               "https://aka.ms/arg-error-toomanysubs".format(__SUBSCRIPTION_LIMIT)
             __logger.warning(warning_message)
@@ -82,10 +97,7 @@ def execute_query(client, graph_query, first, skip, subscriptions, management_gr
                              "see the docs for an example: https://aka.ms/arg-results-truncated")
 
     except HttpResponseError as ex:
-        if ex.model.error.code == 'BadRequest':
-            raise BadRequestError(json.dumps(_to_dict(ex.model.error), indent=4)) from ex
-
-        raise AzureInternalError(json.dumps(_to_dict(ex.model.error), indent=4)) from ex
+        raise _to_query_error(ex) from ex
 
     result_dict = dict()
     result_dict['data'] = response.data
@@ -109,6 +121,146 @@ def create_shared_query(client, resource_group_name,
                                                properties=graph_shared_query)
 
 
+def _stream_query(client, graph_query, subscriptions, management_groups, allow_partial_scopes,
+                  output=None, workers=None):
+    # type: (ResourceGraphClient, str, list[str], list[str], bool, object, int) -> int
+    """
+    Run the query over all the subscriptions or management groups, in batches of the size the service accepts,
+    following the skip tokens. The batches are queried concurrently and the rows are written to output as JSON lines
+    as the pages arrive, the queries waiting while too many pages are not written yet. Returns the number of rows.
+    """
+    output = output or sys.stdout
+    workers = workers or __STREAM_WORKERS
+    if management_groups is not None:
+        scopes = [{'management_groups': batch} for batch in _batches(management_groups, __MANAGEMENT_GROUP_LIMIT)]
+    else:
+        scopes = [{'subscriptions': batch}
+                  for batch in _batches(subscriptions or _get_cached_subscriptions(), __SUBSCRIPTION_LIMIT)]
+
+    pages = queue.Queue(maxsize=__STREAM_QUEUED_PAGES)
+    stop = threading.Event()
+    truncated = threading.Event()
+    throttle = _QuotaThrottle(reserve=workers)
+
+    def query_scope(scope):
+        skip_token = None
+        while not stop.is_set():
+            throttle.wait(stop)
+            request = QueryRequest(
+                query=graph_query,
+                options=QueryRequestOptions(
+                    top=__ROWS_PER_PAGE,
+                    skip_token=skip_token,
+                    result_format=ResultFormat.object_array,
+                    allow_partial_scopes=allow_partial_scopes),
+                **scope)
+            response, headers = client.resources(
+                request, cls=lambda pipeline_response, deserialized, _: (deserialized,
+                                                                         pipeline_response.http_response.headers))
+            throttle.update(headers)
+            if response.result_truncated == ResultTruncated.true and not response.skip_token:
+                truncated.set()
+            _put_page(pages, response.data or [], stop)
+            skip_token = response.skip_token
+            if not skip_token:
+                return
+
+    def run(scope):
+        try:
+            query_scope(scope)
+        except Exception as ex:
+            _put_page(pages, ex, stop)
+        else:
+            _put_page(pages, None, stop)
+
+    rows = 0
+    with ThreadPoolExecutor(max_workers=min(workers, len(scopes))) as executor:
+        try:
+            for scope in scopes:
+                executor.submit(run, scope)
+            for _ in scopes:
+                page = pages.get()
+                while page is not None:
+                    if isinstance(page, HttpResponseError) and page.model is not None:
+                        raise _to_query_error(page) from page
+                    if isinstance(page, Exception):
+                        raise page
+                    for row in page:
+                        output.write(json.dumps(row) + '\n')
+                    output.flush()
+                    rows += len(page)
+                    page = pages.get()
+        finally:
+            stop.set()
+
+    if truncated.is_set():
+        __logger.warning("Unable to paginate the results of the query. "
+                         "Some resources may be missing from the results. "
+                         "To rewrite the query and enable paging, "
+                         "see the docs for an example: https://aka.ms/arg-results-truncated")
+    return rows
+
+
+class _QuotaThrottle:
+    """
+    Holds the requests back until the quota of the user resets, once the quota left is less than the number of
+    requests that can be in flight.
+    """
+
+    def __init__(self, reserve):
+        self._reserve = reserve
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self, stop):
+        while not stop.is_set():
+            with self._lock:
+                delay = self._resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            stop.wait(delay)
+
+    def update(self, headers):
+        quota = _get_quota(headers)
+        if quota is not None and quota[0] < self._reserve:
+            with self._lock:
+                self._resume_at = max(self._resume_at, time.monotonic() + quota[1])
+
+
+def _get_quota(headers):
+    # type: (dict) -> tuple
+    """The number of requests left and the seconds before the quota resets, from the headers of a response."""
+    remaining = headers.get(__QUOTA_REMAINING_HEADER)
+    resets_after = headers.get(__QUOTA_RESETS_AFTER_HEADER)
+    if remaining is None or resets_after is None:
+        return None
+    try:
+        hours, minutes, seconds = resets_after.split(':')
+        return int(remaining), timedelta(hours=int(hours), minutes=int(minutes), seconds=float(seconds)).total_seconds()
+    except ValueError:
+        return None
+
+
+def _put_page(pages, page, stop):
+    while not stop.is_set():
+        try:
+            pages.put(page, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def _batches(items, size):
+    return [items[i:i + size] for i in range(0, max(len(items), 1), size)]
+
+
+def _to_query_error(ex):
+    if ex.model.error.code == 'BadRequest':
+        return BadRequestError(json.dumps(_to_dict(ex.model.error), indent=4))
+
+    return AzureInternalError(json.dumps(_to_dict(ex.model.error), indent=4))
+
+
 def _get_cached_subscriptions():
     # type: () -> list[str]
 
@@ -0,0 +1,134 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import json
+import threading
+import time
+import unittest
+from argparse import Namespace
+from unittest import mock
+
+from azure.cli.core.azclierror import BadRequestError, InvalidArgumentValueError
+from azure.core.exceptions import HttpResponseError
+
+from azext_resourcegraph._validators import validate_query_args
+from azext_resourcegraph.custom import _QuotaThrottle, _get_quota, _stream_query
+from azext_resourcegraph.vendored_sdks.resourcegraph.models import Error, ErrorResponse, QueryResponse
+
+
+class FakeClient:
+    """Returns `pages` pages of `rows` rows for every batch of scopes, the first scope naming the batch."""
+
+    def __init__(self, pages, rows, headers=None, fail=None):
+        self.pages = pages
+        self.rows = rows
+        self.headers = headers or {}
+        self.fail = fail
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def resources(self, query, cls):
+        with self.lock:
+            self.requests.append(query)
+        batch = (query.subscriptions or query.management_groups)[0]
+        if batch == self.fail:
+            raise HttpResponseError(response=None, model=ErrorResponse(error=Error(code='BadRequest', message='bad')))
+        page = int(query.options.skip_token or 0)
+        data = [{'batch': batch, 'page': page, 'row': i} for i in range(self.rows)]
+        skip_token = str(page + 1) if page + 1 < self.pages else None
+        response = QueryResponse(total_records=self.pages * self.rows, count=self.rows, result_truncated='false',
+                                 data=data, skip_token=skip_token)
+        return cls(mock.Mock(http_response=mock.Mock(headers=self.headers)), response, {})
+
+
+class StreamQueryTest(unittest.TestCase):
+
+    def test_subscriptions_in_batches(self):
+        subscriptions = ['{:04}'.format(i) for i in range(2400)]
+        client = FakeClient(pages=3, rows=5)
+        output = io.StringIO()
+        rows = _stream_query(client, 'project id', subscriptions, None, False, output=output)
+
+        self.assertEqual(rows, 3 * 3 * 5)
+        self.assertEqual(sorted(len(r.subscriptions) for r in client.requests), [400] * 3 + [1000] * 6)
+        self.assertTrue(all(r.options.top == 1000 and r.options.result_format == 'objectArray'
+                            for r in client.requests))
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(len(lines), rows)
+        for batch in ['0000', '1000', '2000']:
+            # the pages of a batch are written in order
+            self.assertEqual([(line['page'], line['row']) for line in lines if line['batch'] == batch],
+                             [(page, row) for page in range(3) for row in range(5)])
+
+    def test_management_groups_in_batches(self):
+        client = FakeClient(pages=1, rows=2)
+        rows = _stream_query(client, 'project id', None, ['mg{}'.format(i) for i in range(25)], True,
+                             output=io.StringIO())
+        self.assertEqual(rows, 6)
+        self.assertEqual(sorted(len(r.management_groups) for r in client.requests), [5, 10, 10])
+        self.assertTrue(all(r.subscriptions is None and r.options.allow_partial_scopes for r in client.requests))
+
+    def test_error_stops_the_query(self):
+        subscriptions = ['{:04}'.format(i) for i in range(3000)]
+        client = FakeClient(pages=1000, rows=1, fail='2000')
+        with self.assertRaises(BadRequestError):
+            _stream_query(client, 'project id', subscriptions, None, False, output=io.StringIO())
+        self.assertLess(len(client.requests), 1000)
+
+    def test_pages_read_ahead_are_bounded(self):
+        written = threading.Event()
+        release = threading.Event()
+
+        class SlowOutput(io.StringIO):
+            def write(self, text):
+                written.set()
+                release.wait()
+                return super().write(text)
+
+        client = FakeClient(pages=100, rows=1)
+        output = SlowOutput()
+        subscriptions = ['{:04}'.format(i) for i in range(4000)]
+        query = threading.Thread(target=_stream_query, args=(client, 'project id', subscriptions, None, False, output))
+        query.start()
+        written.wait()
+        time.sleep(0.3)
+        # the pages queued, one page for each query and the page being written
+        self.assertLessEqual(len(client.requests), 8 + 4 + 1)
+        release.set()
+        query.join()
+        self.assertEqual(len(client.requests), 4 * 100)
+        self.assertEqual(len(output.getvalue().splitlines()), 4 * 100)
+
+    def test_quota(self):
+        self.assertEqual(_get_quota({'x-ms-user-quota-remaining': '3', 'x-ms-user-quota-resets-after': '00:00:04.5'}),
+                         (3, 4.5))
+        self.assertIsNone(_get_quota({'x-ms-user-quota-remaining': '3'}))
+        self.assertIsNone(_get_quota({'x-ms-user-quota-remaining': '3', 'x-ms-user-quota-resets-after': 'soon'}))
+
+        stop = threading.Event()
+        throttle = _QuotaThrottle(reserve=2)
+        throttle.update({'x-ms-user-quota-remaining': '2', 'x-ms-user-quota-resets-after': '00:00:05'})
+        start = time.monotonic()
+        throttle.wait(stop)
+        throttle.update({'x-ms-user-quota-remaining': '1', 'x-ms-user-quota-resets-after': '00:00:00.2'})
+        throttle.wait(stop)
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_stream_arguments(self):
+        namespace = Namespace(first=None, skip=None, skip_token=None, subscriptions=None, management_groups=None,
+                              stream=True)
+        validate_query_args(namespace)
+        self.assertIsNone(namespace.first)
+        self.assertIsNone(namespace.skip)
+
+        namespace.first = 10
+        with self.assertRaises(InvalidArgumentValueError):
+            validate_query_args(namespace)
+
+
+if __name__ == '__main__':
+    unittest.main()
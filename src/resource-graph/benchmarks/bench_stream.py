@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Benchmark for az graph query --stream.
+
+Queries a simulated Resource Graph, answering each request after a fixed latency with pages of synthetic rows, for
+all the subscriptions of a tenant. Times and measures the peak memory traced of:
+
+    paged    calling execute_query for each batch of 1000 subscriptions and again with each skip token, keeping
+             all the rows before writing them, which is what a script paging with --skip-token does
+    stream   _stream_query, writing the rows as JSON lines to a null output
+
+    python benchmarks/bench_stream.py
+    python benchmarks/bench_stream.py --subscriptions 2400 --pages 20 --latency 0.05 --json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from azext_resourcegraph.custom import execute_query, _stream_query  # noqa: E402
+from azext_resourcegraph.vendored_sdks.resourcegraph.models import QueryResponse  # noqa: E402
+
+
+class SimulatedClient:
+    """Answers after `latency` seconds with `pages` pages of rows for every batch, of 1000 rows unless asked."""
+
+    def __init__(self, pages, latency):
+        self.pages = pages
+        self.latency = latency
+
+    def resources(self, query, cls=None):
+        time.sleep(self.latency)
+        page = int(query.options.skip_token or 0)
+        data = [{"id": "/subscriptions/{}/resourceGroups/rg/providers/Microsoft.Compute/virtualMachines/vm{}-{}"
+                       .format(query.subscriptions[0], page, i), "location": "westus", "tags": {"env": "test"}}
+                for i in range(query.options.top or 1000)]
+        response = QueryResponse(total_records=self.pages * len(data), count=len(data), result_truncated="false",
+                                 data=data, skip_token=str(page + 1) if page + 1 < self.pages else None)
+        if cls:
+            return cls(_Response(), response, {})
+        return response
+
+
+class _Response:  # pylint: disable=too-few-public-methods
+    class http_response:  # pylint: disable=invalid-name, too-few-public-methods
+        headers = {"x-ms-user-quota-remaining": "100", "x-ms-user-quota-resets-after": "00:00:05"}
+
+
+class NullOutput:
+    def __init__(self):
+        self.lines = 0
+
+    def write(self, text):
+        self.lines += text.count("\n")
+
+    def flush(self):
+        pass
+
+
+def paged(client, subscriptions):
+    rows = []
+    for i in range(0, len(subscriptions), 1000):
+        skip_token = None
+        while True:
+            result = execute_query(client, "project id, location, tags", 1000 if skip_token is None else None,
+                                   0 if skip_token is None else None, subscriptions[i:i + 1000], None, False,
+                                   skip_token)
+            rows.extend(result["data"])
+            skip_token = result["skip_token"]
+            if not skip_token:
+                break
+    output = NullOutput()
+    for row in rows:
+        output.write(json.dumps(row) + "\n")
+    return output.lines
+
+
+def stream(client, subscriptions):
+    output = NullOutput()
+    _stream_query(client, "project id, location, tags", subscriptions, None, False, output=output)
+    return output.lines
+
+
+def measure(func, client, subscriptions, repeat):
+    runs = []
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        rows = func(client, subscriptions)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        runs.append({"rows": rows, "seconds": seconds, "peak MB": peak / 2 ** 20})
+    return min(runs, key=lambda run: run["seconds"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscriptions", type=int, default=2400, help="number of subscriptions of the tenant")
+    parser.add_argument("--pages", type=int, default=10, help="number of pages of 1000 rows for each batch")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds the service takes to answer")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs timed, the fastest is kept")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    client = SimulatedClient(args.pages, args.latency)
+    subscriptions = ["{:08x}-0000-0000-0000-000000000000".format(i) for i in range(args.subscriptions)]
+    results = {"subscriptions": args.subscriptions,
+               "paged": measure(paged, client, subscriptions, args.repeat),
+               "stream": measure(stream, client, subscriptions, args.repeat)}
+    if results["paged"]["rows"] != results["stream"]["rows"]:
+        raise SystemExit("The stream did not write the rows of all the pages")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print("{} subscriptions, {} rows".format(args.subscriptions, results["stream"]["rows"]))
+    for name in ("paged", "stream"):
+        print("{:<7} {:>8.2f} s   peak {:>8.1f} MB".format(name, results[name]["seconds"], results[name]["peak MB"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Parser of the --condition of scheduled queries.
+
+It accepts the language of grammar/scheduled_query/ScheduleQueryCondition.g4 and returns what
+ScheduleQueryConditionValidator returns for the same text: the tokens are those of the ANTLR lexer
+(longest match, ties going to the rule defined first) and the value of each part of the condition is
+taken from the same tokens as the text of the matching grammar rule.
+"""
+
+import re
+
+from azure.cli.core.azclierror import InvalidArgumentValueError
+
+CONDITION_USAGE = 'usage error: --condition {avg,min,max,total,count} ["METRIC COLUMN" from]\n' \
+                  '                         "QUERY_PLACEHOLDER" {=,!=,>,>=,<,<=} THRESHOLD\n' \
+                  '                         [resource id RESOURCEID]\n' \
+                  '                         [where DIMENSION {includes,excludes} VALUE [or VALUE ...]\n' \
+                  '                         [and   DIMENSION {includes,excludes} VALUE [or VALUE ...] ...]]\n' \
+                  '                         [at least MinTimeToFail violations out of EvaluationPeriod ' \
+                  'aggregated points]'
+
+OP_CONVERSION = {
+    '=': 'Equal',
+    '!=': 'NotEqual',
+    '>': 'GreaterThan',
+    '>=': 'GreaterThanOrEqual',
+    '<': 'LessThan',
+    '<=': 'LessThanOrEqual'
+}
+
+AGG_CONVERSION = {
+    'avg': 'Average',
+    'min': 'Minimum',
+    'max': 'Maximum',
+    'total': 'Total',
+    'count': 'Count'
+}
+
+DIM_OP_CONVERSION = {
+    'includes': 'Include',
+    'excludes': 'Exclude'
+}
+
+# Token types. The literals of the grammar are their own type.
+WHERE = 'WHERE'
+COMESFROM = 'COMESFROM'
+RESOURCE = 'RESOURCE'
+COLUMN = 'COLUMN'
+AT = 'AT'
+LEAST = 'LEAST'
+OUT = 'OUT'
+OF = 'OF'
+VIOLATIONS = 'VIOLATIONS'
+AGGREGATED = 'AGGREGATED'
+POINTS = 'POINTS'
+AND = 'AND'
+INCLUDES = 'INCLUDES'
+EXCLUDES = 'EXCLUDES'
+OR = 'OR'
+OPERATOR = 'OPERATOR'
+NUMBER = 'NUMBER'
+QUOTE = 'QUOTE'
+WHITESPACE = 'WHITESPACE'
+NEWLINE = 'NEWLINE'
+WORD = 'WORD'
+EOF = 'EOF'
+
+KEYWORDS = {
+    'where': WHERE,
+    'from': COMESFROM,
+    'resource': RESOURCE,
+    'id': COLUMN,
+    'at': AT,
+    'least': LEAST,
+    'out': OUT,
+    'of': OF,
+    'violations': VIOLATIONS,
+    'aggregated': AGGREGATED,
+    'points': POINTS,
+    'and': AND,
+    'includes': INCLUDES,
+    'excludes': EXCLUDES,
+    'or': OR
+}
+
+# The tokens each rule of the grammar is made of
+METRIC_TOKENS = frozenset([WORD, WHITESPACE, '.', '/', '_', '\\', ':', '%', '-', ',', '|'])
+RESOURCE_ID_TOKENS = METRIC_TOKENS
+QUERY_TOKENS = frozenset([WORD, WHITESPACE, NUMBER, OPERATOR, AND, OR, '&', '.', '/', '(', ')', '_', '\\', ':',
+                          '%', '-', ',', '|', '==', '\\"', "\\'"])
+DIM_VALUE_TOKENS = frozenset([NUMBER, WORD, '-', '.', '*', WHITESPACE, ':', '~', ',', '|', '%', '_'])
+
+DESCRIPTIONS = {
+    WORD: 'a word',
+    NUMBER: 'a number',
+    QUOTE: 'a quote',
+    WHITESPACE: 'a space',
+    OPERATOR: 'one of =, !=, >, >=, <, <=',
+    EOF: 'the end of the condition'
+}
+
+_WORD = re.compile(r'[A-Za-z0-9_]+')
+_NUMBER = re.compile(r'[0-9]+(?:[.,][0-9]+)?')
+_WHITESPACE = re.compile(r'[ \t]+')
+_NEWLINE = re.compile(r'(?:\r?\n|\r)+')
+_SINGLE_LITERALS = frozenset('/._\\:%-,|&()*~')
+
+
+class Token:  # pylint: disable=too-few-public-methods
+
+    __slots__ = ('type', 'text', 'start')
+
+    def __init__(self, token_type, text, start):
+        self.type = token_type
+        self.text = text
+        self.start = start
+
+
+def _description(token_type):
+    if token_type in DESCRIPTIONS:
+        return DESCRIPTIONS[token_type]
+    return '"{}"'.format(token_type.lower() if token_type in KEYWORDS.values() else token_type)
+
+
+def tokenize(text):
+    """ Split a condition in the tokens of the ANTLR lexer, ending with an EOF token. """
+    tokens = []
+    pos = 0
+    length = len(text)
+    while pos < length:
+        char = text[pos]
+        match = None
+        if char in ' \t':
+            match = _WHITESPACE.match(text, pos)
+            token_type = WHITESPACE
+        elif char in '\r\n':
+            match = _NEWLINE.match(text, pos)
+            token_type = NEWLINE
+        elif char in '"\'':
+            token_type, end = QUOTE, pos + 1
+        elif char == '\\':
+            token_type = text[pos:pos + 2] if text[pos + 1:pos + 2] in ('"', "'") else '\\'
+            end = pos + len(token_type)
+        elif char == '=':
+            token_type = '==' if text[pos + 1:pos + 2] == '=' else OPERATOR
+            end = pos + (2 if token_type == '==' else 1)
+        elif char in '<>!':
+            end = pos + 2 if text[pos + 1:pos + 2] == '=' else pos + 1
+            if end == pos + 1 and char == '!':
+                raise _syntax_error(text, pos, 'unexpected character "!"')
+            token_type = OPERATOR
+        else:
+            match = _WORD.match(text, pos)
+            if match:
+                # the longest match wins, a number, the '_' literal or a keyword win a tie with a word
+                number = _NUMBER.match(text, pos)
+                end = match.end()
+                if number and number.end() >= end:
+                    token_type, end = NUMBER, number.end()
+                elif end - pos == 1 and char == '_':
+                    token_type = '_'
+                else:
+                    token_type = KEYWORDS.get(match.group().lower(), WORD)
+                match = None
+            elif char in _SINGLE_LITERALS:
+                token_type, end = char, pos + 1
+            else:
+                raise _syntax_error(text, pos, 'unexpected character "{}"'.format(char))
+        if match:
+            end = match.end()
+        tokens.append(Token(token_type, text[pos:end], pos))
+        pos = end
+    tokens.append(Token(EOF, '', length))
+    return tokens
+
+
+def _syntax_error(text, pos, message):
+    return InvalidArgumentValueError('--condition: {} at position {}\n    {}\n    {}^\n{}'.format(
+        message, pos + 1, re.sub(r'\s', ' ', text), ' ' * pos, CONDITION_USAGE))
+
+
+class ConditionParser:
+    """ Recursive descent parser of a condition, following the rules of the grammar. """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.index = 0
+
+    def peek(self, offset=0):
+        return self.tokens[min(self.index + offset, len(self.tokens) - 1)]
+
+    def error(self, expected, token=None):
+        token = token or self.peek()
+        found = 'the end of the condition' if token.type == EOF else '"{}"'.format(token.text)
+        return _syntax_error(self.text, token.start, 'expected {}, found {}'.format(expected, found))
+
+    def expect(self, *token_types):
+        token = self.peek()
+        if token.type not in token_types:
+            raise self.error(' or '.join(_description(t) for t in token_types))
+        self.index += 1
+        return token
+
+    def span(self, start, end):
+        return ''.join(token.text for token in self.tokens[start:end])
+
+    def run(self, allowed, stop_after_space, expected):
+        """
+        Consume the tokens of a rule made of `allowed` tokens. Unless they are allowed, spaces are part of the
+        rule only when the token following them is: if it is in `stop_after_space`, they separate the rule
+        from what follows it.
+        """
+        start = self.index
+        while True:
+            token = self.peek()
+            if token.type == WHITESPACE and WHITESPACE not in allowed:
+                following = self.peek(1).type
+                if following in stop_after_space:
+                    break
+                if following not in allowed and following not in (EOF, NEWLINE):
+                    raise self.error(expected, self.peek(1))
+            elif token.type not in allowed:
+                break
+            self.index += 1
+        if self.index == start:
+            raise self.error(expected)
+        return self.span(start, self.index)
+
+    def parse(self):
+        """ Parse the whole condition, returns the parameters of the Condition model. """
+        parameters = {}
+        aggregation = self.expect(WORD)
+        self.expect(WHITESPACE)
+        if aggregation.text not in AGG_CONVERSION:
+            raise _syntax_error(self.text, aggregation.start, 'expected one of {}, found "{}"'.format(
+                ', '.join(AGG_CONVERSION), aggregation.text))
+        parameters['time_aggregation'] = AGG_CONVERSION[aggregation.text]
+
+        if self.has_metric():
+            parameters['metric_measure_column'] = self.metric().strip()
+        parameters['query'] = self.query()
+        self.expect(WHITESPACE)
+        parameters['operator'] = OP_CONVERSION[self.expect(OPERATOR).text]
+        self.expect(WHITESPACE)
+        parameters['threshold'] = self.expect(NUMBER).text
+
+        if self.peek().type == WHITESPACE and self.peek(1).type == RESOURCE:
+            self.index += 1
+            parameters['resource_id_column'] = self.resource_column().strip()
+        if self.peek().type == WHITESPACE and self.peek(1).type == WHERE:
+            self.index += 1
+            parameters['dimensions'] = self.dimensions()
+        if self.peek().type == WHITESPACE and self.peek(1).type == AT:
+            self.index += 1
+            parameters['failing_periods'] = self.falling_period()
+        while self.peek().type == NEWLINE:
+            self.index += 1
+        if self.peek().type != EOF:
+            token = self.peek(1) if self.peek().type == WHITESPACE else self.peek()
+            if token.type == WHERE:
+                raise self.error('the dimensions in a single where, separated by "and"', token)
+            raise self.error('resource id, where, at least or the end of the condition', token)
+        return parameters
+
+    def has_metric(self):
+        """ Whether the condition starts with a metric column, followed by from. """
+        if self.peek().type != QUOTE:
+            return True
+        closing = self.index + 1
+        while self.tokens[closing].type not in (QUOTE, EOF):
+            closing += 1
+        following = [token.type for token in self.tokens[closing:closing + 3]]
+        return following == [QUOTE, WHITESPACE, COMESFROM]
+
+    def metric(self):
+        quoted = self.peek().type == QUOTE
+        if quoted:
+            self.index += 1
+            metric = self.run(METRIC_TOKENS, (), 'the metric column')
+            self.expect(QUOTE)
+        else:
+            metric = self.run(METRIC_TOKENS - {WHITESPACE}, (COMESFROM,), 'a quoted query or metric column')
+        self.expect(WHITESPACE)
+        self.expect(COMESFROM)
+        self.expect(WHITESPACE)
+        return metric
+
+    def query(self):
+        self.expect(QUOTE)
+        start = self.index
+        while self.peek().type != QUOTE:
+            token = self.peek()
+            if token.type == WHERE:
+                self.index += 1
+                self.expect(WHITESPACE)
+            elif token.type in QUERY_TOKENS:
+                self.index += 1
+            elif token.type == EOF:
+                raise self.error('the closing quote of the query')
+            else:
+                raise self.error('the query, which cannot contain "{}"'.format(token.text))
+        if self.index == start:
+            raise self.error('the query')
+        query = self.span(start, self.index).strip()
+        self.expect(QUOTE)
+        return query.replace("\\\"", "\"").replace("\\\'", "\'")
+
+    def resource_column(self):
+        self.expect(RESOURCE)
+        self.expect(WHITESPACE)
+        self.expect(COLUMN)
+        self.expect(WHITESPACE)
+        return self.run(RESOURCE_ID_TOKENS - {WHITESPACE}, (WHERE, AT), 'the resource id column')
+
+    def dimensions(self):
+        self.expect(WHERE)
+        self.expect(WHITESPACE)
+        dimensions = [self.dimension()]
+        while self.peek().type in (AND, ','):
+            self.index += 1
+            self.expect(WHITESPACE)
+            dimensions.append(self.dimension())
+        return dimensions
+
+    def dimension(self):
+        name = self.expect(WORD).text
+        self.expect(WHITESPACE)
+        operator = self.expect(INCLUDES, EXCLUDES).text
+        self.expect(WHITESPACE)
+        return {'name': name, 'operator': DIM_OP_CONVERSION[operator.lower()], 'values': self.dim_values()}
+
+    def dim_values(self):
+        start = end = self.index
+        while self.tokens[end].type in DIM_VALUE_TOKENS or self.tokens[end].type == OR:
+            end += 1
+        following = self.tokens[end].type
+        if following in (INCLUDES, EXCLUDES):
+            # the values are followed by ", NAME includes", the next dimension
+            end -= 4
+            if end <= start or [t.type for t in self.tokens[end:end + 4]] != [',', WHITESPACE, WORD, WHITESPACE]:
+                error = self.error('a value, or ", DIMENSION {includes,excludes}"', self.tokens[max(end, start)])
+                raise error
+        elif following in (WHERE, AT) and end > start and self.tokens[end - 1].type == WHITESPACE:
+            end -= 1
+        elif following not in (AND, EOF, NEWLINE):
+            raise self.error('a value, "or", "and", at least or the end of the condition', self.tokens[end])
+        if end == start:
+            raise self.error('a value')
+
+        # a value, then values each following an "or" or "," and a space
+        expect_value = True
+        for index in range(start, end):
+            token = self.tokens[index]
+            if token.type == OR:
+                if expect_value or index + 1 == end or self.tokens[index + 1].type != WHITESPACE:
+                    raise self.error('a value', token if expect_value else self.tokens[index + 1])
+                expect_value = True
+            elif token.type != WHITESPACE or not expect_value:
+                expect_value = False
+        if expect_value:
+            raise self.error('a value', self.tokens[end])
+        self.index = end
+        values = self.span(start, end).strip().split(' ')
+        return [x for x in values if x not in ['', 'or']]
+
+    def falling_period(self):
+        self.expect(AT)
+        self.expect(WHITESPACE)
+        self.expect(LEAST)
+        self.expect(WHITESPACE)
+        min_times = self.periods()
+        self.expect(WHITESPACE)
+        self.expect(VIOLATIONS)
+        self.expect(WHITESPACE)
+        self.expect(OUT)
+        self.expect(WHITESPACE)
+        self.expect(OF)
+        self.expect(WHITESPACE)
+        evaluation_period = self.periods()
+        self.expect(WHITESPACE)
+        self.expect(AGGREGATED)
+        self.expect(WHITESPACE)
+        self.expect(POINTS)
+        return {'min_failing_periods_to_alert': min_times, 'number_of_evaluation_periods': evaluation_period}
+
+    def periods(self):
+        token = self.expect(NUMBER)
+        try:
+            return int(float(token.text))
+        except ValueError:
+            error = self.error('a number of periods', token)
+            raise error from None
+
+
+def parse_condition(text):
+    """
+    Parse a condition into the Condition model.
+
+    :raises InvalidArgumentValueError: if the condition does not follow the usage, with the position of the error.
+    """
+    from azext_scheduled_query.vendored_sdks.azure_mgmt_scheduled_query.models import (
+        Condition, ConditionFailingPeriods, Dimension)
+
+    parameters = ConditionParser(text).parse()
+    parameters['dimensions'] = [Dimension(**dim) for dim in parameters.get('dimensions', [])]
+    if 'failing_periods' in parameters:
+        parameters['failing_periods'] = ConditionFailingPeriods(**parameters['failing_periods'])
+    return Condition(**parameters)
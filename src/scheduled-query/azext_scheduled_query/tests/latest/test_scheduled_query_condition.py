@@ -0,0 +1,81 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import unittest
+from argparse import Namespace
+
+from azure.cli.core.azclierror import InvalidArgumentValueError
+
+from azext_scheduled_query._actions import ScheduleQueryConditionAction
+from azext_scheduled_query._condition_parser import parse_condition, tokenize
+
+TEST_DIR = os.path.abspath(os.path.dirname(__file__))
+
+
+def _as_dict(model):
+    if isinstance(model, list):
+        return [_as_dict(item) for item in model]
+    if hasattr(model, '__dict__'):
+        return {key: _as_dict(value) for key, value in vars(model).items()
+                if key != 'additional_properties' and value is not None and value != []}
+    return model
+
+
+class ScheduledQueryConditionParserTest(unittest.TestCase):
+
+    def assert_error(self, condition, message, position):
+        with self.assertRaises(InvalidArgumentValueError) as cm:
+            parse_condition(condition)
+        lines = str(cm.exception).split('\n')
+        self.assertEqual(lines[0], '--condition: {} at position {}'.format(message, position))
+        self.assertEqual(lines[1], '    ' + condition)
+        self.assertEqual(lines[2], ' ' * (3 + position) + '^')
+        self.assertTrue(lines[3].startswith('usage error: --condition'))
+
+    def test_condition_corpus(self):
+        # Conditions with the result of the ANTLR parser generated from grammar/scheduled_query, None where it
+        # reports a syntax error
+        with open(os.path.join(TEST_DIR, 'condition_corpus.json')) as corpus_file:
+            corpus = json.load(corpus_file)
+        for case in corpus:
+            with self.subTest(condition=case['condition']):
+                if case['expected'] is None:
+                    with self.assertRaises(InvalidArgumentValueError):
+                        parse_condition(case['condition'])
+                else:
+                    self.assertEqual(_as_dict(parse_condition(case['condition'])), case['expected'])
+
+    def test_condition_action(self):
+        ns = Namespace()
+        action = ScheduleQueryConditionAction('--condition', 'condition')
+        for condition in ['avg "Perf" > 90 where ApiName includes GetBlob or PutBlob',
+                          'count "Heartbeat" < 1 at least 1 violations out of 5 aggregated points']:
+            action(None, ns, condition.split(), '--condition')
+        self.assertEqual([c.query for c in ns.condition], ['Perf', 'Heartbeat'])
+        self.assertEqual(ns.condition[0].dimensions[0].values, ['GetBlob', 'PutBlob'])
+        self.assertEqual(ns.condition[1].failing_periods.number_of_evaluation_periods, 5)
+
+    def test_tokenize(self):
+        self.assertEqual([(t.type, t.text) for t in tokenize('AVG "a\\"b" >= 1.5 Resource ID x_1')],
+                         [('WORD', 'AVG'), ('WHITESPACE', ' '), ('QUOTE', '"'), ('WORD', 'a'), ('\\"', '\\"'),
+                          ('WORD', 'b'), ('QUOTE', '"'), ('WHITESPACE', ' '), ('OPERATOR', '>='), ('WHITESPACE', ' '),
+                          ('NUMBER', '1.5'), ('WHITESPACE', ' '), ('RESOURCE', 'Resource'), ('WHITESPACE', ' '),
+                          ('COLUMN', 'ID'), ('WHITESPACE', ' '), ('WORD', 'x_1'), ('EOF', '')])
+
+    def test_condition_errors(self):
+        self.assert_error('avg "Perf" > x', 'expected a number, found "x"', 14)
+        self.assert_error('avg "Perf" >', 'expected a space, found the end of the condition', 13)
+        self.assert_error('avg "Perf" > 1 where a includes b where c includes d',
+                          'expected the dimensions in a single where, separated by "and", found "where"', 35)
+        # The ANTLR validator failed on these conditions without telling what is wrong
+        self.assert_error('Avg "Perf" > 1', 'expected one of avg, min, max, total, count, found "Avg"', 1)
+        self.assert_error('avg "Perf" > 1 at least 1,5 violations out of 5 aggregated points',
+                          'expected a number of periods, found "1,5"', 25)
+
+
+if __name__ == '__main__':
+    unittest.main()
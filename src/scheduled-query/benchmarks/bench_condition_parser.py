@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Benchmark for the parsing of --condition.
+
+Times, for the parser generated by ANTLR from grammar/scheduled_query and for the native parser:
+
+    import   importing the parser in a new process, which every command using --condition pays
+    parse    parsing the conditions of tests/latest/condition_corpus.json that the ANTLR parser accepts
+
+The ANTLR parser needs the antlr4-python3-runtime it was generated with (4.9.3); when it cannot be loaded only the
+native parser is timed. The results of both parsers are compared before timing.
+
+    python benchmarks/bench_condition_parser.py
+    python benchmarks/bench_condition_parser.py --repeat 10 --json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+# pylint: disable=wrong-import-position
+from azext_scheduled_query._condition_parser import parse_condition  # noqa: E402
+
+CORPUS_PATH = os.path.join(ROOT, "azext_scheduled_query", "tests", "latest", "condition_corpus.json")
+ANTLR_IMPORT = "import antlr4; from azext_scheduled_query.grammar.scheduled_query import " \
+               "ScheduleQueryConditionLexer, ScheduleQueryConditionParser, ScheduleQueryConditionValidator"
+NATIVE_IMPORT = "from azext_scheduled_query._condition_parser import parse_condition"
+
+
+def load_antlr_parser():
+    try:
+        import antlr4
+        from azext_scheduled_query.grammar.scheduled_query import (
+            ScheduleQueryConditionLexer, ScheduleQueryConditionParser, ScheduleQueryConditionValidator)
+        ScheduleQueryConditionParser(antlr4.CommonTokenStream(ScheduleQueryConditionLexer(antlr4.InputStream(""))))
+    except Exception as ex:  # pylint: disable=broad-except
+        return None, "{}: {}".format(type(ex).__name__, ex)
+
+    def antlr_parse_condition(text):
+        parser = ScheduleQueryConditionParser(
+            antlr4.CommonTokenStream(ScheduleQueryConditionLexer(antlr4.InputStream(text))))
+        parser.removeErrorListeners()
+        validator = ScheduleQueryConditionValidator()
+        antlr4.ParseTreeWalker().walk(validator, parser.expression())
+        return validator.result()
+    return antlr_parse_condition, None
+
+
+def as_dict(model):
+    if isinstance(model, list):
+        return [as_dict(item) for item in model]
+    if hasattr(model, "__dict__"):
+        return {key: as_dict(value) for key, value in vars(model).items() if key != "additional_properties"}
+    return model
+
+
+def time_import(statement, repeat):
+    """Seconds to import in a new process, less the start of the interpreter."""
+    def run(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+        return time.perf_counter() - start
+    return min(run(statement) for _ in range(repeat)) - min(run("pass") for _ in range(repeat))
+
+
+def time_parse(parse, conditions, repeat):
+    """Seconds per condition."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for condition in conditions:
+            parse(condition)
+        times.append(time.perf_counter() - start)
+    return min(times) / len(conditions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="number of runs timed, the fastest is kept")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH) as corpus_file:
+        conditions = [case["condition"] for case in json.load(corpus_file) if case["expected"] is not None]
+    results = {"conditions": len(conditions),
+               "native": {"import seconds": time_import(NATIVE_IMPORT, args.repeat),
+                          "parse seconds": time_parse(parse_condition, conditions, args.repeat)}}
+
+    antlr_parse_condition, reason = load_antlr_parser()
+    if antlr_parse_condition:
+        for condition in conditions:
+            if as_dict(antlr_parse_condition(condition)) != as_dict(parse_condition(condition)):
+                raise SystemExit("The native parser does not return what the ANTLR parser returns for {!r}"
+                                 .format(condition))
+        results["antlr"] = {"import seconds": time_import(ANTLR_IMPORT, args.repeat),
+                            "parse seconds": time_parse(antlr_parse_condition, conditions, args.repeat)}
+    else:
+        results["antlr"] = {"unavailable": reason}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print("{} conditions".format(len(conditions)))
+    for name in ("antlr", "native"):
+        if "unavailable" in results[name]:
+            print("{:<7} unavailable, {}".format(name, results[name]["unavailable"]))
+        else:
+            print("{:<7} import {:>8.2f} ms   parse {:>8.3f} ms per condition".format(
+                name, results[name]["import seconds"] * 1000, results[name]["parse seconds"] * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,19 +5,141 @@
 
 # pylint: disable=wrong-import-order
 import os
-from re import L
-import tempfile
-import uuid
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from random import uniform
+import requests
 from azure.cli.core.azclierror import InvalidArgumentValueError
 from azure.cli.core.profiles import ResourceType, get_sdk
+from knack.log import get_logger
 from ._utils import (get_azure_files_info, _pack_source_code)
 
+logger = get_logger(__name__)
+
+UPLOAD_RANGE_SIZE = 4 * 1024 * 1024  # the largest range Azure Files accepts in one request
+UPLOAD_MAX_WORKERS = 8
+UPLOAD_RANGE_MAX_ATTEMPTS = 5
+# size a streamed archive is created with, doubled whenever the archive outgrows it
+UPLOAD_STREAM_INITIAL_SIZE = 64 * 1024 * 1024
+
 
 class Empty:
     def upload_and_build(self, **_):
         pass
 
 
+def _is_retryable(error):
+    status_code = getattr(error, 'status_code', None)
+    if status_code is not None:
+        # a missing file or an expired upload url will not get better
+        return status_code >= 500 or status_code in (408, 429)
+    # the storage SDK raises the errors of requests as an AzureException, which keeps them as its context
+    while error is not None:
+        if isinstance(error, (ConnectionError, TimeoutError, requests.exceptions.ConnectionError,
+                              requests.exceptions.Timeout)):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class _RangeUploader:
+    '''
+    Writes ranges of a file in a file share from a pool of threads. A range that fails is retried on its own with
+    an exponential backoff, so a flaky connection does not restart the whole upload.
+    '''
+    def __init__(self, file_service, share_name, file_name, max_workers=UPLOAD_MAX_WORKERS):
+        self.file_service = file_service
+        self.share_name = share_name
+        self.file_name = file_name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._futures = []
+        self._failed = threading.Event()
+        # bounds the ranges read but not written yet
+        self._slots = threading.BoundedSemaphore(max_workers * 2)
+
+    def _write(self, start, read):
+        try:
+            if self._failed.is_set():
+                return
+            data = read()
+            for attempt in range(1, UPLOAD_RANGE_MAX_ATTEMPTS + 1):
+                try:
+                    self.file_service.update_range(self.share_name, None, self.file_name, data,
+                                                   start, start + len(data) - 1)
+                    return
+                except Exception as e:  # pylint: disable=broad-except
+                    if attempt == UPLOAD_RANGE_MAX_ATTEMPTS or not _is_retryable(e):
+                        # the ranges not started yet are skipped
+                        self._failed.set()
+                        raise
+                    delay = min(2 ** attempt, 30) * uniform(0.5, 1)
+                    logger.info("Failed to upload bytes %d-%d, retrying in %.1fs: %s",
+                                start, start + len(data) - 1, delay, e)
+                    time.sleep(delay)
+        finally:
+            self._slots.release()
+
+    def submit(self, start, read):
+        '''
+        Writes the bytes returned by read() at start. Blocks while too many ranges are waiting to be written.
+        '''
+        self._slots.acquire()  # pylint: disable=consider-using-with
+        self._futures.append(self._executor.submit(self._write, start, read))
+        # stop reading as soon as a range could not be written
+        for future in [f for f in self._futures if f.done()]:
+            future.result()
+            self._futures.remove(future)
+
+    def wait(self):
+        try:
+            for future in self._futures:
+                future.result()
+        except BaseException:
+            self._failed.set()
+            raise
+        finally:
+            self._executor.shutdown(wait=True)
+
+
+class _StreamingUpload:
+    '''
+    File-like object uploading what is written to it range by range, while it is being written.
+    '''
+    def __init__(self, uploader):
+        self.uploader = uploader
+        self.offset = 0
+        self.remote_size = UPLOAD_STREAM_INITIAL_SIZE
+        self._buffer = bytearray()
+        uploader.file_service.create_file(uploader.share_name, None, uploader.file_name, self.remote_size)
+
+    def _submit(self, data):
+        end = self.offset + len(data)
+        if end > self.remote_size:
+            self.remote_size = max(end, self.remote_size * 2)
+            self.uploader.file_service.resize_file(self.uploader.share_name, None, self.uploader.file_name,
+                                                   self.remote_size)
+        self.uploader.submit(self.offset, lambda: data)
+        self.offset = end
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= UPLOAD_RANGE_SIZE:
+            self._submit(bytes(self._buffer[:UPLOAD_RANGE_SIZE]))
+            del self._buffer[:UPLOAD_RANGE_SIZE]
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def finish(self):
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer = bytearray()
+        self.uploader.wait()
+        self.uploader.file_service.resize_file(self.uploader.share_name, None, self.uploader.file_name, self.offset)
+
+
 class FileUpload:
     '''
     Upload a file in local file system to upload url
@@ -40,10 +162,30 @@ class FileUpload:
         else:
             raise InvalidArgumentValueError('Unexpected artifact file type, must be one of .zip, .tar.gz, .tar, .jar, .war.')
 
-    def _upload(self, artifact_path):
+    def _get_file_service(self):
         FileService = get_sdk(self.cli_ctx, ResourceType.DATA_STORAGE, 'file#FileService')
-        file_service = FileService(self.account_name, sas_token=self.sas_token, endpoint_suffix=self.endpoint_suffix)
-        file_service.create_file_from_path(self.share_name, None, self.relative_name, artifact_path)
+        return FileService(self.account_name, sas_token=self.sas_token, endpoint_suffix=self.endpoint_suffix)
+
+    def _upload(self, artifact_path):
+        # the upload url only grants writes, so the file is created and written without reading it first
+        file_service = self._get_file_service()
+        size = os.path.getsize(artifact_path)
+        file_service.create_file(self.share_name, None, self.relative_name, size)
+
+        def read(start, length):
+            def _read():
+                with open(artifact_path, 'rb') as f:
+                    f.seek(start)
+                    return f.read(length)
+            return _read
+
+        uploader = _RangeUploader(file_service, self.share_name, self.relative_name)
+        try:
+            for start in range(0, size, UPLOAD_RANGE_SIZE):
+                end = min(start + UPLOAD_RANGE_SIZE, size) - 1
+                uploader.submit(start, read(start, end - start + 1))
+        finally:
+            uploader.wait()
 
 
 class FolderUpload(FileUpload):
@@ -53,13 +195,17 @@ class FolderUpload(FileUpload):
     def upload_and_build(self, source_path, **kwargs):
         if not source_path:
             raise InvalidArgumentValueError('--source-path is not set.')
-        artifact_path = self._compress_folder(source_path)
-        self._upload(artifact_path)
+        self._upload_folder(source_path)
 
-    def _compress_folder(self, folder):
-        file_path = os.path.join(tempfile.gettempdir(), 'build_archive_{}.tar.gz'.format(uuid.uuid4().hex))
-        _pack_source_code(os.path.abspath(folder), file_path)
-        return file_path
+    def _upload_folder(self, folder):
+        # the archive is uploaded while it is being compressed, without writing it to a temporary file
+        uploader = _RangeUploader(self._get_file_service(), self.share_name, self.relative_name)
+        stream = _StreamingUpload(uploader)
+        try:
+            _pack_source_code(os.path.abspath(folder), fileobj=stream)
+            stream.finish()
+        finally:
+            uploader.wait()
 
 
 def uploader_selector(cli_ctx, source_path=None, artifact_path=None, upload_url=None, **_):
@@ -369,6 +369,10 @@ helps['spring app log'] = """
 helps['spring app logs'] = """
     type: command
     short-summary: Show logs of an app instance, logs will be streamed when setting '-f/--follow'.
+    long-summary: With '--all-instances', the logs of all the instances are streamed at once. When following them, a stream that drops is reconnected.
+    examples:
+    - name: Stream the logs of all the instances of an app in the order of their timestamps.
+      text: az spring app logs -n MyApp -s MyService -g MyResourceGroup --all-instances --timestamp-order -f
 """
 
 helps['spring app connect'] = """
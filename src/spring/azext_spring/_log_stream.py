@@ -3,6 +3,37 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+# pylint: disable=bare-except, broad-except, logging-format-interpolation, redefined-builtin, too-few-public-methods
+
+import functools
+import heapq
+import json
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib import parse
+
+import requests
+from azure.cli.core.azclierror import InvalidArgumentValueError
+from knack.log import get_logger
+from knack.util import CLIError
+
+logger = get_logger(__name__)
+
+# how many times in a row a dropped log stream is reconnected before giving up on the instance
+LOG_RECONNECT_MAX_ATTEMPTS = 5
+LOG_RECONNECT_MAX_DELAY = 30
+# how many lines are held back at most to print the lines of all instances in timestamp order
+LOG_REORDER_BUFFER_SIZE = 1000
+# how many seconds a line is held back at most waiting for earlier lines from other instances
+LOG_REORDER_DELAY = 2
+
+_LOG_TIMESTAMP_REGEX = re.compile(r'^\s*(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2}:\d{2})(?:[.,](\d+))?')
+
 
 class LogStream:
     def __init__(self, client, resource_group, service):
@@ -11,3 +42,313 @@ class LogStream:
 
         resource = client.services.get(resource_group, service)
         self.base_url = resource.properties.fqdn
+
+
+def build_log_formatter(format_json):
+    '''
+    Build the log line formatter based on the format_json argument.
+    '''
+    logger_seg_regex = re.compile(r'([^\.])[^\.]+\.')
+
+    def build_log_shortener(length):
+        if length <= 0:
+            raise InvalidArgumentValueError('Logger length in `logger{length}` should be positive')
+
+        def shortener(record):
+            '''
+            Try shorten the logger property to the specified length before feeding it to the formatter.
+            '''
+            logger_name = record.get('logger', None)
+            if logger_name is None:
+                return record
+
+            # first, try to shorten the package name to one letter, e.g.,
+            #     org.springframework.cloud.netflix.eureka.config.DiscoveryClientOptionalArgsConfiguration
+            # to: o.s.c.n.e.c.DiscoveryClientOptionalArgsConfiguration
+            while len(logger_name) > length:
+                logger_name, count = logger_seg_regex.subn(r'\1.', logger_name, 1)
+                if count < 1:
+                    break
+
+            # then, cut off the leading packages if necessary
+            logger_name = logger_name[-length:]
+            record['logger'] = logger_name
+            return record
+
+        return shortener
+
+    def identity(o):
+        return o
+
+    if format_json is None or len(format_json) == 0:
+        return identity
+
+    logger_regex = re.compile(r'\blogger\{(\d+)\}')
+    match = logger_regex.search(format_json)
+    pre_processor = identity
+    if match:
+        length = int(match[1])
+        pre_processor = build_log_shortener(length)
+        format_json = logger_regex.sub('logger', format_json, 1)
+
+    first_exception = True
+
+    def format_line(line):
+        nonlocal first_exception
+        try:
+            log_record = json.loads(line)
+            # Add n=\n so that in Windows CMD it's easy to specify customized format with line ending
+            # e.g., "{timestamp} {message}{n}"
+            # (Windows CMD does not escape \n in string literal.)
+            return format_json.format_map(pre_processor(defaultdict(str, n="\n", **log_record)))
+        except:
+            if first_exception:
+                # enable this format error logging only with --verbose
+                logger.info("Failed to format log line '{}'".format(line), exc_info=sys.exc_info())
+                first_exception = False
+            return line
+
+    return format_line
+
+
+def iter_log_lines(response, limit=2 ** 20, chunk_size=None):
+    '''
+    Returns a line iterator from the response content. If no line ending was found and the buffered content size is
+    larger than the limit, the buffer will be yielded directly.
+    '''
+    buffer = []
+    total = 0
+    for content in response.iter_content(chunk_size=chunk_size):
+        if not content:
+            if len(buffer) > 0:
+                yield b''.join(buffer)
+            break
+
+        start = 0
+        while start < len(content):
+            line_end = content.find(b'\n', start)
+            should_print = False
+            if line_end < 0:
+                next = (content if start == 0 else content[start:])
+                buffer.append(next)
+                total += len(next)
+                start = len(content)
+                should_print = total >= limit
+            else:
+                buffer.append(content[start:line_end + 1])
+                start = line_end + 1
+                should_print = True
+
+            if should_print:
+                yield b''.join(buffer)
+                buffer.clear()
+                total = 0
+
+
+def decode_log_line(line):
+    std_encoding = sys.stdout.encoding or 'utf-8'
+    return (line.decode(encoding='utf-8', errors='replace')
+            .encode(std_encoding, errors='replace')
+            .decode(std_encoding, errors='replace'))
+
+
+def get_log_failure_reason(response):
+    failure_reason = response.reason
+    if response.content:
+        if isinstance(response.content, bytes):
+            failure_reason = "{}:{}".format(failure_reason, response.content.decode('utf-8'))
+        else:
+            failure_reason = "{}:{}".format(failure_reason, response.content)
+    return failure_reason
+
+
+def get_log_timestamp(line):
+    '''
+    Returns a sortable key of the timestamp a log line starts with, or the timestamp property of a JSON log line.
+    '''
+    if line.startswith('{'):
+        try:
+            line = str(json.loads(line).get('timestamp', ''))
+        except (ValueError, AttributeError):
+            return None
+    match = _LOG_TIMESTAMP_REGEX.match(line)
+    if not match:
+        return None
+    return "{} {}.{:<09}".format(match[1], match[2], match[3] or '')
+
+
+class _RetryableLogStreamError(Exception):
+    pass
+
+
+class InstanceLogTailer:  # pylint: disable=too-many-instance-attributes
+    '''
+    Streams the logs of several app instances at once over a shared HTTP session and prints their lines as they
+    arrive, each prefixed with the name of its instance.
+
+    With `timestamp_order`, lines are held back in a bounded buffer for about LOG_REORDER_DELAY seconds so that
+    the lines of all instances are printed in the order of their timestamps. When following the logs, a stream
+    that drops is reconnected with an exponential backoff, asking only for the lines logged since it dropped and
+    skipping those up to the last timestamp already received.
+    '''
+
+    def __init__(self, get_url, instances, auth, format_json=None, follow=False, timestamp_order=False,
+                 session=None, out=None):
+        self.get_url = get_url
+        self.instances = list(instances)
+        self.auth = auth
+        self.follow = follow
+        self.timestamp_order = timestamp_order
+        self.out = out or sys.stdout
+        self.errors = []
+        self._formatter = build_log_formatter(format_json)
+        self._session = session or self._create_session(len(self.instances))
+        self._lines = queue.Queue()
+        self._stopped = threading.Event()
+        self._buffer = []
+        self._sequence = 0
+        self._last_timestamps = {}
+        self._last_received = {}
+        # the last timestamp received from each instance and how many lines carried it
+        self._resume_points = {}
+        width = max(len(instance) for instance in self.instances)
+        self._prefixes = {instance: "[{:<{}}] ".format(instance, width) for instance in self.instances}
+
+    @staticmethod
+    def _create_session(connections):
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=connections)
+        session.mount('https://', adapter)
+        return session
+
+    def _stream(self, instance, since):
+        # a reconnected stream repeats the lines logged during the second before it dropped, skip those received
+        resume_timestamp, resume_count = self._resume_points.get(instance, (None, 0)) if since else (None, 0)
+        skipped = 0
+        with self._session.get(self.get_url(instance, since), stream=True, auth=self.auth) as response:
+            if response.status_code != 200:
+                error = CLIError("Failed to connect to the server with status code '{}' and reason '{}'".format(
+                    response.status_code, get_log_failure_reason(response)))
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise _RetryableLogStreamError(error)
+                raise error
+            for line in iter_log_lines(response):
+                if self._stopped.is_set():
+                    return
+                timestamp = get_log_timestamp(line.decode('utf-8', errors='replace'))
+                if resume_timestamp is not None:
+                    if timestamp is None or timestamp < resume_timestamp or \
+                            (timestamp == resume_timestamp and skipped < resume_count):
+                        if timestamp == resume_timestamp:
+                            skipped += 1
+                        continue
+                    resume_timestamp = None
+                if timestamp is not None:
+                    last_timestamp, count = self._resume_points.get(instance, (None, 0))
+                    self._resume_points[instance] = (timestamp, count + 1 if timestamp == last_timestamp else 1)
+                self._last_received[instance] = time.time()
+                self._lines.put((instance, line, timestamp, self._last_received[instance]))
+
+    def _tail(self, instance):
+        attempts = 0
+        since = None
+        try:
+            while not self._stopped.is_set():
+                started = time.time()
+                try:
+                    self._stream(instance, since)
+                    if not self.follow:
+                        return
+                    error = "the log stream ended"
+                except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                        requests.exceptions.Timeout, _RetryableLogStreamError) as e:
+                    if not self.follow:
+                        raise
+                    error = e
+                # a stream that stayed up for a while is not counted as a failed attempt
+                attempts = 1 if time.time() - started > LOG_RECONNECT_MAX_DELAY else attempts + 1
+                if attempts > LOG_RECONNECT_MAX_ATTEMPTS:
+                    raise CLIError("Gave up reconnecting to the logs of instance '{}': {}".format(instance, error))
+                delay = min(LOG_RECONNECT_MAX_DELAY, 2 ** (attempts - 1)) * random.uniform(0.5, 1)
+                logger.warning("Reconnecting to the logs of instance '%s' in %.1fs: %s", instance, delay, error)
+                self._stopped.wait(delay)
+                if instance in self._last_received:
+                    since = int(time.time() - self._last_received[instance]) + 1
+        except Exception as e:
+            logger.error("Failed to stream the logs of instance '%s': %s", instance, e)
+            self.errors.append((instance, e))
+        finally:
+            self._lines.put((instance, None, None, None))
+
+    def _print(self, instance, line):
+        text = self._formatter(decode_log_line(line))
+        prefix = self._prefixes[instance]
+        print(''.join(prefix + part for part in text.splitlines(True)), end='', file=self.out)
+
+    def _add(self, instance, line, timestamp, received):
+        if not self.timestamp_order:
+            self._print(instance, line)
+            return
+        # lines without a timestamp, such as those of a stack trace, stay after the line before them
+        if timestamp is None:
+            timestamp = self._last_timestamps.get(instance, '')
+        self._last_timestamps[instance] = timestamp
+        self._sequence += 1
+        heapq.heappush(self._buffer, (timestamp, self._sequence, instance, line, received))
+        self._flush()
+
+    def _flush(self, everything=False):
+        deadline = time.time() - LOG_REORDER_DELAY
+        while self._buffer and (everything or len(self._buffer) > LOG_REORDER_BUFFER_SIZE or
+                                self._buffer[0][4] <= deadline):
+            _, _, instance, line, _ = heapq.heappop(self._buffer)
+            self._print(instance, line)
+
+    def run(self):
+        '''
+        Streams the logs until every stream has ended, or forever when following them. Returns the (instance, error)
+        of the instances whose logs could not be streamed.
+        '''
+        threads = [threading.Thread(target=self._tail, args=(instance,), daemon=True) for instance in self.instances]
+        for thread in threads:
+            thread.start()
+        remaining = len(threads)
+        try:
+            while remaining:
+                try:
+                    # wake up regularly so that ctrl+c can stop the command and held back lines get printed
+                    instance, line, timestamp, received = self._lines.get(timeout=0.5)
+                except queue.Empty:
+                    self._flush()
+                    continue
+                if line is None:
+                    remaining -= 1
+                else:
+                    self._add(instance, line, timestamp, received)
+            self._flush(everything=True)
+        finally:
+            self._stopped.set()
+        return self.errors
+
+
+def get_log_streaming_url(url_format, params, instance, since_seconds=None):
+    '''
+    Returns the url streaming the logs of an instance, or only those logged during the last `since_seconds`.
+    '''
+    params = dict(params)
+    if since_seconds:
+        # a dropped stream is reconnected from where it stopped, without the last lines logged before that
+        params.pop("tailLines", None)
+        params["sinceSeconds"] = since_seconds
+    return url_format.format(instance) + "?{}".format(parse.urlencode(params))
+
+
+def tail_instance_logs(url_format, params, instances, auth, format_json=None, follow=False, timestamp_order=False):
+    '''
+    Streams the logs of several app instances at once. Fails only when the logs of none of them could be streamed.
+    '''
+    tailer = InstanceLogTailer(functools.partial(get_log_streaming_url, url_format, params), instances, auth,
+                               format_json, follow=follow, timestamp_order=timestamp_order)
+    errors = tailer.run()
+    if len(errors) == len(instances):
+        raise errors[0][1]
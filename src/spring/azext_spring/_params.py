@@ -9,7 +9,9 @@ from azure.cli.core.commands.parameters import get_enum_type, get_three_state_fl
 from azure.cli.core.commands.parameters import (name_type, get_location_type, resource_group_name_type)
 from ._validators import (validate_env, validate_cosmos_type, validate_resource_id, validate_location,
                           validate_name, validate_app_name, validate_deployment_name, validate_log_lines,
-                          validate_log_limit, validate_log_since, validate_sku, normalize_sku, validate_jvm_options,
+                          validate_log_limit, validate_log_since, validate_log_all_instances,
+                          validate_log_timestamp_order, validate_sku,
+                          normalize_sku, validate_jvm_options,
                           validate_vnet, validate_vnet_required_parameters, validate_node_resource_group,
                           validate_tracing_parameters_asc_create, validate_tracing_parameters_asc_update,
                           validate_app_insights_parameters, validate_instance_count, validate_java_agent_parameters,
@@ -415,6 +417,10 @@ def load_arguments(self, _):
             '--deployment', '-d'], help='Name of an existing deployment of the app. Default to the production deployment if not specified.', validator=fulfill_deployment_param)
         c.argument('format_json', nargs='?', const='{timestamp} {level:>5} [{thread:>15.15}] {logger{39}:<40.40}: {message}\n{stackTrace}',
                    help='Format JSON logs if structured log is enabled')
+        c.argument('all_instances', action='store_true', is_preview=True, validator=validate_log_all_instances,
+                   help='Show the logs of all the instances of the deployment at once, each line prefixed with the name of its instance.')
+        c.argument('timestamp_order', action='store_true', is_preview=True, validator=validate_log_timestamp_order,
+                   help='With --all-instances, print the lines of all the instances in the order of their timestamps. Lines are held back for a few seconds to be sorted.')
 
     with self.argument_context('spring app logs') as c:
         prepare_logs_argument(c)
@@ -7,6 +7,7 @@
 
 import time
 import colorama   # pylint: disable=import-error
+from collections import deque
 from io import BytesIO
 from random import uniform
 from knack.util import CLIError
@@ -19,6 +20,7 @@ from ._utils import get_blob_info
 logger = get_logger(__name__)
 
 DEFAULT_CHUNK_SIZE = 1024 * 4
+MAX_CHUNK_SIZE = 1024 * 1024 * 4
 DEFAULT_LOG_TIMEOUT_IN_SEC = 60 * 30  # 30 minutes
 
 
@@ -75,10 +77,9 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
     if not no_format:
         colorama.init()
 
-    stream = BytesIO()
+    lines = _LogLineSplitter()
     metadata = {}
     start = 0
-    end = byte_size - 1
     available = 0
     sleep_time = 1
     max_sleep_time = 15
@@ -104,6 +105,11 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
                 container_name=container_name, blob_name=blob_name)
         return None
 
+    def flush_remaining():
+        remaining = lines.flush()
+        if remaining:
+            logger_level_func(remaining.decode('utf-8', errors='ignore'))
+
     # Try to get the initial properties so there's no waiting.
     # If the storage call fails, we'll just sleep and try again after.
     try:
@@ -122,43 +128,29 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
             consecutive_sleep_in_sec = 0
 
             try:
-                old_byte_size = len(stream.getvalue())
+                stream = BytesIO()
                 blob_service.get_blob_to_stream(
                     container_name=container_name,
                     blob_name=blob_name,
                     start_range=start,
-                    end_range=end,
+                    end_range=start + byte_size - 1,
                     stream=stream)
 
-                curr_bytes = stream.getvalue()
-                new_byte_size = len(curr_bytes)
-                amount_read = new_byte_size - old_byte_size
+                amount_read = stream.tell()
                 start += amount_read
-                end = start + byte_size - 1
-
-                # Only scan what's newly read. If nothing is read, default to 0.
-                min_scan_range = max(new_byte_size - amount_read - 1, 0)
-                for i in range(new_byte_size - 1, min_scan_range, -1):
-                    if curr_bytes[i - 1:i + 1] == b'\r\n':
-                        flush = curr_bytes[:i]  # won't logger.warning \n
-                        stream = BytesIO()
-                        stream.write(curr_bytes[i + 1:])
-                        logger_level_func(flush.decode('utf-8', errors='ignore'))
-                        break
-                    if curr_bytes[i:i + 1] == b'\n':
-                        flush = curr_bytes[:i + 1]  # won't logger.warning \n
-                        stream = BytesIO()
-                        stream.write(curr_bytes[i + 1:])
-                        logger_level_func(flush.decode('utf-8', errors='ignore'))
-                        break
+                # a full range means the build is ahead of us: read more at once until we catch up
+                if amount_read >= byte_size:
+                    byte_size = min(byte_size * 2, MAX_CHUNK_SIZE)
+
+                flush = lines.feed(stream.getvalue())
+                if flush:
+                    logger_level_func(flush.decode('utf-8', errors='ignore'))
 
             except AzureHttpError as ae:
                 if ae.status_code != 404:
                     raise CLIError(ae)
             except KeyboardInterrupt:
-                curr_bytes = stream.getvalue()
-                if curr_bytes:
-                    logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
+                flush_remaining()
                 return
 
         try:
@@ -170,8 +162,7 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
             if ae.status_code != 404:
                 raise CLIError(ae)
         except KeyboardInterrupt:
-            if curr_bytes:
-                logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
+            flush_remaining()
             return
         except Exception as err:
             raise CLIError(err)
@@ -179,10 +170,7 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
         if consecutive_sleep_in_sec > timeout_in_seconds:
             # Flush anything remaining in the buffer - this would be the case
             # if the file has expired and we weren't able to detect any \r\n
-            curr_bytes = stream.getvalue()
-            if curr_bytes:
-                logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
-
+            flush_remaining()
             return
 
         # If no new data available but not complete, sleep before trying to process additional data.
@@ -201,10 +189,7 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
     # One final check to see if there's anything in the buffer to flush
     # E.g., metadata has been set and start == available, but the log file
     # didn't end in \r\n, so we were unable to flush out the final contents.
-    curr_bytes = stream.getvalue()
-
-    if curr_bytes:
-        logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
+    flush_remaining()
 
     build_status = _get_run_status(metadata).lower()
     logger_level_func("Log status was: {}".format(build_status))
@@ -218,6 +203,43 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
             raise CLIError("Run was canceled")
 
 
+class _LogLineSplitter:
+    '''
+    Splits the log read so far into the complete lines, which can be logged, and the last incomplete line, which is
+    kept until the rest of it is read. Each byte is only scanned and copied once, however long the incomplete line.
+    '''
+
+    def __init__(self):
+        self._pending = deque()
+
+    def feed(self, data):
+        '''
+        Returns everything up to the last line break read so far, or None if no line break was read since the last
+        call. A trailing \r\n is returned without its \n.
+        '''
+        line_end = data.rfind(b'\n')
+        view = memoryview(data)
+        if line_end < 0:
+            if data:
+                self._pending.append(view)
+            return None
+        self._pending.append(view[:line_end + 1])
+        flush = self.flush()
+        if line_end + 1 < len(data):
+            self._pending.append(view[line_end + 1:])
+        if flush.endswith(b'\r\n'):
+            flush = flush[:-1]
+        return flush
+
+    def flush(self):
+        '''
+        Returns everything read and not returned yet.
+        '''
+        flush = b''.join(self._pending)
+        self._pending.clear()
+        return flush
+
+
 def _blob_is_not_complete(metadata):
     if not metadata:
         return True
@@ -220,6 +220,16 @@ def validate_log_since(namespace):
             raise InvalidArgumentValueError("--since can not be more than 1h")
 
 
+def validate_log_timestamp_order(namespace):
+    if namespace.timestamp_order and not namespace.all_instances:
+        raise InvalidArgumentValueError("--timestamp-order can only be used with --all-instances")
+
+
+def validate_log_all_instances(namespace):
+    if namespace.all_instances and namespace.instance:
+        raise InvalidArgumentValueError("--all-instances cannot be used with -i/--instance")
+
+
 def validate_jvm_options(namespace):
     if namespace.jvm_options is not None:
         namespace.jvm_options = namespace.jvm_options.strip('\'')
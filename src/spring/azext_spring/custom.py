@@ -6,7 +6,6 @@
 # pylint: disable=unused-argument, logging-format-interpolation, protected-access, wrong-import-order, too-many-lines
 import logging
 import requests
-import re
 import os
 import time
 from azure.cli.core._profile import Profile
@@ -29,13 +28,12 @@ from azure.cli.core.util import sdk_no_wait
 from azure.mgmt.applicationinsights import ApplicationInsightsManagementClient
 from azure.cli.core.commands import cached_put
 from ._resource_quantity import validate_cpu, validate_memory
-from six.moves.urllib import parse
 from threading import Thread
 import sys
 import json
 import base64
-from collections import defaultdict
-from ._log_stream import LogStream
+from ._log_stream import (LogStream, build_log_formatter, decode_log_line, get_log_failure_reason,
+                          get_log_streaming_url, iter_log_lines, tail_instance_logs)
 from ._build_service import _update_default_build_agent_pool
 
 logger = get_logger(__name__)
@@ -489,49 +487,59 @@ def app_get_build_log(cmd, client, resource_group, service, name, deployment=Non
 
 
 def app_tail_log(cmd, client, resource_group, service, name,
-                 deployment=None, instance=None, follow=False, lines=50, since=None, limit=2048, format_json=None):
+                 deployment=None, instance=None, follow=False, lines=50, since=None, limit=2048, format_json=None,
+                 all_instances=False, timestamp_order=False):
     app_tail_log_internal(cmd, client, resource_group, service, name, deployment, instance, follow, lines, since, limit,
-                          format_json, get_app_log=_get_app_log)
+                          format_json, get_app_log=_get_app_log, all_instances=all_instances,
+                          timestamp_order=timestamp_order)
+
+
+def _get_log_instances(deployment, name, instance, all_instances):
+    if instance:
+        return [instance]
+    if not deployment.properties.instances:
+        raise CLIError("No instances found for deployment '{0}' in app '{1}'".format(
+            deployment.name, name))
+    instances = [temp_instance.name for temp_instance in deployment.properties.instances]
+    if len(instances) > 1 and not all_instances:
+        logger.warning("Multiple app instances found:")
+        for temp_instance in instances:
+            logger.warning("{}".format(temp_instance))
+        logger.warning("Please use '-i/--instance' parameter to specify the instance name, "
+                       "or '--all-instances' to show the logs of all of them")
+        return None
+    return instances
 
 
 def app_tail_log_internal(cmd, client, resource_group, service, name,
                           deployment=None, instance=None, follow=False, lines=50, since=None, limit=2048,
-                          format_json=None, timeout=None, get_app_log=None):
-    if not instance:
-        if not deployment.properties.instances:
-            raise CLIError("No instances found for deployment '{0}' in app '{1}'".format(
-                deployment.name, name))
-        instances = deployment.properties.instances
-        if len(instances) > 1:
-            logger.warning("Multiple app instances found:")
-            for temp_instance in instances:
-                logger.warning("{}".format(temp_instance.name))
-            logger.warning("Please use '-i/--instance' parameter to specify the instance name")
-            return None
-        instance = instances[0].name
+                          format_json=None, timeout=None, get_app_log=None, all_instances=False,
+                          timestamp_order=False):
+    instances = _get_log_instances(deployment, name, instance, all_instances)
+    if not instances:
+        return None
 
     resource = client.services.get(resource_group, service)
     if resource.sku.tier.upper() == 'STANDARDGEN2':
         profile = Profile(cli_ctx=cmd.cli_ctx)
         creds, _, tenant = profile.get_raw_token()
-        token = creds[1]
         subscriptionId = get_subscription_id(cmd.cli_ctx)
         hostname = get_proxy_api_endpoint(cmd.cli_ctx, resource)
-        streaming_url = "https://{}/proxy/logstream/subscriptions/{}/resourceGroups/{}/providers/Microsoft.AppPlatform/Spring/{}/apps/{}/deployments/{}/instances/{}".format(
-            hostname, subscriptionId, resource_group, service, name, deployment.name, instance)
+        streaming_url_format = "https://{}/proxy/logstream/subscriptions/{}/resourceGroups/{}/providers/Microsoft.AppPlatform/Spring/{}/apps/{}/deployments/{}/instances/".format(
+            hostname, subscriptionId, resource_group, service, name, deployment.name) + "{}"
         params = {}
         params["tailLines"] = lines
         params["tenantId"] = tenant
         if follow:
             params["follow"] = True
         format_json = None
-        auth = BearerAuth(token)
+        auth = BearerAuth(creds[1])
     else:
         log_stream = LogStream(client, resource_group, service)
         if not log_stream:
             raise CLIError("To use the log streaming feature, please enable the test endpoint by running 'az spring test-endpoint enable -n {0} -g {1}'".format(service, resource_group))
-        streaming_url = "https://{0}/api/logstream/apps/{1}/instances/{2}".format(
-            log_stream.base_url, name, instance)
+        streaming_url_format = "https://{0}/api/logstream/apps/{1}/instances/".format(
+            log_stream.base_url, name) + "{}"
         params = {}
         params["tailLines"] = lines
         params["limitBytes"] = limit
@@ -541,10 +549,14 @@ def app_tail_log_internal(cmd, client, resource_group, service, name,
             params["follow"] = True
         auth = HTTPBasicAuth("primary", log_stream.primary_key)
 
+    if len(instances) > 1:
+        tail_instance_logs(streaming_url_format, params, instances, auth, format_json, follow=follow,
+                           timestamp_order=timestamp_order)
+        return None
+
     exceptions = []
-    streaming_url += "?{}".format(parse.urlencode(params)) if params else ""
     t = Thread(target=get_app_log, args=(
-        streaming_url, auth, format_json, exceptions))
+        get_log_streaming_url(streaming_url_format, params, instances[0]), auth, format_json, exceptions))
     t.daemon = True
     t.start()
 
@@ -1146,128 +1158,17 @@ def _get_redis_primary_key(cli_ctx, resource_id):
     return keys.primary_key
 
 
-# pylint: disable=bare-except, too-many-statements
 def _get_app_log(url, auth, format_json, exceptions, chunk_size=None, stderr=False):
-    logger_seg_regex = re.compile(r'([^\.])[^\.]+\.')
-
-    def build_log_shortener(length):
-        if length <= 0:
-            raise InvalidArgumentValueError('Logger length in `logger{length}` should be positive')
-
-        def shortener(record):
-            '''
-            Try shorten the logger property to the specified length before feeding it to the formatter.
-            '''
-            logger_name = record.get('logger', None)
-            if logger_name is None:
-                return record
-
-            # first, try to shorten the package name to one letter, e.g.,
-            #     org.springframework.cloud.netflix.eureka.config.DiscoveryClientOptionalArgsConfiguration
-            # to: o.s.c.n.e.c.DiscoveryClientOptionalArgsConfiguration
-            while len(logger_name) > length:
-                logger_name, count = logger_seg_regex.subn(r'\1.', logger_name, 1)
-                if count < 1:
-                    break
-
-            # then, cut off the leading packages if necessary
-            logger_name = logger_name[-length:]
-            record['logger'] = logger_name
-            return record
-
-        return shortener
-
-    def build_formatter():
-        '''
-        Build the log line formatter based on the format_json argument.
-        '''
-        nonlocal format_json
-
-        def identity(o):
-            return o
-
-        if format_json is None or len(format_json) == 0:
-            return identity
-
-        logger_regex = re.compile(r'\blogger\{(\d+)\}')
-        match = logger_regex.search(format_json)
-        pre_processor = identity
-        if match:
-            length = int(match[1])
-            pre_processor = build_log_shortener(length)
-            format_json = logger_regex.sub('logger', format_json, 1)
-
-        first_exception = True
-
-        def format_line(line):
-            nonlocal first_exception
-            try:
-                log_record = json.loads(line)
-                # Add n=\n so that in Windows CMD it's easy to specify customized format with line ending
-                # e.g., "{timestamp} {message}{n}"
-                # (Windows CMD does not escape \n in string literal.)
-                return format_json.format_map(pre_processor(defaultdict(str, n="\n", **log_record)))
-            except:
-                if first_exception:
-                    # enable this format error logging only with --verbose
-                    logger.info("Failed to format log line '{}'".format(line), exc_info=sys.exc_info())
-                    first_exception = False
-                return line
-
-        return format_line
-
-    def iter_lines(response, limit=2 ** 20, chunk_size=None):
-        '''
-        Returns a line iterator from the response content. If no line ending was found and the buffered content size is
-        larger than the limit, the buffer will be yielded directly.
-        '''
-        buffer = []
-        total = 0
-        for content in response.iter_content(chunk_size=chunk_size):
-            if not content:
-                if len(buffer) > 0:
-                    yield b''.join(buffer)
-                break
-
-            start = 0
-            while start < len(content):
-                line_end = content.find(b'\n', start)
-                should_print = False
-                if line_end < 0:
-                    next = (content if start == 0 else content[start:])
-                    buffer.append(next)
-                    total += len(next)
-                    start = len(content)
-                    should_print = total >= limit
-                else:
-                    buffer.append(content[start:line_end + 1])
-                    start = line_end + 1
-                    should_print = True
-
-                if should_print:
-                    yield b''.join(buffer)
-                    buffer.clear()
-                    total = 0
-
     with requests.get(url, stream=True, auth=auth) as response:
         try:
             if response.status_code != 200:
-                failure_reason = response.reason
-                if response.content:
-                    if isinstance(response.content, bytes):
-                        failure_reason = "{}:{}".format(failure_reason, response.content.decode('utf-8'))
-                    else:
-                        failure_reason = "{}:{}".format(failure_reason, response.content)
                 raise CLIError("Failed to connect to the server with status code '{}' and reason '{}'".format(
-                    response.status_code, failure_reason))
-            std_encoding = sys.stdout.encoding
+                    response.status_code, get_log_failure_reason(response)))
 
-            formatter = build_formatter()
+            formatter = build_log_formatter(format_json)
 
-            for line in iter_lines(response, chunk_size=chunk_size):
-                decoded = (line.decode(encoding='utf-8', errors='replace')
-                           .encode(std_encoding, errors='replace')
-                           .decode(std_encoding, errors='replace'))
+            for line in iter_log_lines(response, chunk_size=chunk_size):
+                decoded = decode_log_line(line)
                 if stderr:
                     print(formatter(decoded), end='', file=sys.stderr)
                 else:
@@ -0,0 +1,163 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import threading
+import unittest
+from argparse import Namespace
+from unittest import mock
+
+import requests
+from azure.cli.core.azclierror import InvalidArgumentValueError
+
+from ..._log_stream import InstanceLogTailer, get_log_streaming_url, get_log_timestamp, tail_instance_logs
+from ..._validators import validate_log_all_instances, validate_log_timestamp_order
+
+
+class FakeResponse:
+    def __init__(self, status_code, chunks, error=None):
+        self.status_code = status_code
+        self.reason = 'reason'
+        self.content = b''
+        self.chunks = chunks
+        self.error = error
+
+    def iter_content(self, chunk_size=None):
+        for chunk in self.chunks:
+            yield chunk
+        if self.error:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.urls = []
+        self.lock = threading.Lock()
+
+    def get(self, url, stream, auth):
+        with self.lock:
+            self.urls.append(url)
+            return self.responses[url.split('?')[0]].pop(0)
+
+
+def get_url(instance, since=None):
+    return instance + ('?since={}'.format(since) if since else '')
+
+
+class TestInstanceLogTailer(unittest.TestCase):
+    def tail(self, responses, **kwargs):
+        out = io.StringIO()
+        session = FakeSession(responses)
+        tailer = InstanceLogTailer(get_url, list(responses), None, session=session, out=out, **kwargs)
+        errors = tailer.run()
+        return out.getvalue().splitlines(), errors, session
+
+    def test_lines_are_prefixed_with_their_instance(self):
+        lines, errors, _ = self.tail({
+            'app-1': [FakeResponse(200, [b'one\ntw', b'o\n'])],
+            'app-22': [FakeResponse(200, [b'three\n'])],
+        })
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(lines), ['[app-1 ] one', '[app-1 ] two', '[app-22] three'])
+
+    def test_lines_in_timestamp_order(self):
+        lines, _, _ = self.tail({
+            'a': [FakeResponse(200, [b'2024-01-01 10:00:01.500 INFO second\n', b'  at stack.trace\n',
+                                     b'2024-01-01 10:00:03 INFO fourth\n'])],
+            'b': [FakeResponse(200, [b'{"timestamp": "2024-01-01T10:00:01.2Z", "message": "first"}\n',
+                                     b'2024-01-01 10:00:02,000 INFO third\n'])],
+        }, timestamp_order=True)
+        self.assertEqual(lines, ['[b] {"timestamp": "2024-01-01T10:00:01.2Z", "message": "first"}',
+                                 '[a] 2024-01-01 10:00:01.500 INFO second', '[a]   at stack.trace',
+                                 '[b] 2024-01-01 10:00:02,000 INFO third', '[a] 2024-01-01 10:00:03 INFO fourth'])
+
+    @mock.patch('azext_spring._log_stream.random.uniform', return_value=0)
+    def test_dropped_stream_is_reconnected(self, _):
+        class Tailer(InstanceLogTailer):
+            # the second connection ends the stream so that the test finishes
+            def _stream(self, instance, since):
+                super()._stream(instance, since)
+                if since:
+                    self._stopped.set()
+
+        out = io.StringIO()
+        session = FakeSession({
+            'a': [FakeResponse(200, [b'one\n'], error=requests.exceptions.ChunkedEncodingError()),
+                  FakeResponse(503, []), FakeResponse(200, [b'two\n'])],
+        })
+        errors = Tailer(get_url, ['a'], None, follow=True, session=session, out=out).run()
+        self.assertEqual(errors, [])
+        self.assertEqual(out.getvalue().splitlines(), ['[a] one', '[a] two'])
+        self.assertEqual(session.urls, ['a', 'a?since=1', 'a?since=1'])
+
+    @mock.patch('azext_spring._log_stream.random.uniform', return_value=0)
+    def test_reconnected_stream_skips_lines_received(self, _):
+        class Tailer(InstanceLogTailer):
+            def _stream(self, instance, since):
+                super()._stream(instance, since)
+                if since:
+                    self._stopped.set()
+
+        out = io.StringIO()
+        session = FakeSession({
+            'a': [FakeResponse(200, [b'2024-01-01 10:00:00 one\n', b'2024-01-01 10:00:01 two\n', b'  at trace\n',
+                                     b'2024-01-01 10:00:01 three\n'], error=requests.exceptions.ConnectionError()),
+                  FakeResponse(200, [b'2024-01-01 10:00:01 two\n', b'  at trace\n', b'2024-01-01 10:00:01 three\n',
+                                     b'2024-01-01 10:00:01 four\n', b'  at trace\n', b'2024-01-01 10:00:02 five\n'])],
+        })
+        errors = Tailer(get_url, ['a'], None, follow=True, session=session, out=out).run()
+        self.assertEqual(errors, [])
+        self.assertEqual(out.getvalue().splitlines(), [
+            '[a] 2024-01-01 10:00:00 one', '[a] 2024-01-01 10:00:01 two', '[a]   at trace',
+            '[a] 2024-01-01 10:00:01 three', '[a] 2024-01-01 10:00:01 four', '[a]   at trace',
+            '[a] 2024-01-01 10:00:02 five'])
+
+    def test_timestamp_order_needs_all_instances(self):
+        validate_log_timestamp_order(Namespace(timestamp_order=True, all_instances=True))
+        validate_log_timestamp_order(Namespace(timestamp_order=False, all_instances=False))
+        with self.assertRaises(InvalidArgumentValueError):
+            validate_log_timestamp_order(Namespace(timestamp_order=True, all_instances=False))
+
+    def test_all_instances_excludes_instance(self):
+        validate_log_all_instances(Namespace(all_instances=True, instance=None))
+        validate_log_all_instances(Namespace(all_instances=False, instance='a'))
+        with self.assertRaises(InvalidArgumentValueError):
+            validate_log_all_instances(Namespace(all_instances=True, instance='a'))
+
+    def test_get_log_streaming_url(self):
+        params = {'tailLines': 50, 'follow': True}
+        self.assertEqual(get_log_streaming_url('https://host/instances/{}', params, 'a'),
+                         'https://host/instances/a?tailLines=50&follow=True')
+        self.assertEqual(get_log_streaming_url('https://host/instances/{}', params, 'a', since_seconds=3),
+                         'https://host/instances/a?follow=True&sinceSeconds=3')
+        self.assertEqual(params, {'tailLines': 50, 'follow': True})
+
+    def test_tail_instance_logs_fails_when_no_instance_could_be_streamed(self):
+        with mock.patch.object(InstanceLogTailer, 'run', return_value=[('a', KeyError('a'))]):
+            tail_instance_logs('{}', {}, ['a', 'b'], None)
+        with mock.patch.object(InstanceLogTailer, 'run', return_value=[('a', KeyError('a')), ('b', KeyError('b'))]):
+            with self.assertRaises(KeyError):
+                tail_instance_logs('{}', {}, ['a', 'b'], None)
+
+    def test_failed_instance_does_not_stop_others(self):
+        lines, errors, _ = self.tail({
+            'a': [FakeResponse(404, [])],
+            'b': [FakeResponse(200, [b'line\n'])],
+        }, follow=False)
+        self.assertEqual(lines, ['[b] line'])
+        self.assertEqual([instance for instance, _ in errors], ['a'])
+
+    def test_get_log_timestamp(self):
+        self.assertEqual(get_log_timestamp('2024-01-01T10:00:01.5Z x'), '2024-01-01 10:00:01.500000000')
+        self.assertEqual(get_log_timestamp('2024-01-01 10:00:01 x'), '2024-01-01 10:00:01.000000000')
+        self.assertIsNone(get_log_timestamp('at stack.trace'))
+        self.assertIsNone(get_log_timestamp('{"message": "no timestamp"}'))
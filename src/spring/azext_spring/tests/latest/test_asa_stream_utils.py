@@ -0,0 +1,61 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+from types import SimpleNamespace
+
+from ..._stream_utils import _stream_logs, _LogLineSplitter, DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE
+
+
+class FakeAppendBlobService:
+    '''An append blob that grows by one piece each time its properties are read.'''
+
+    def __init__(self, pieces):
+        self.pieces = list(pieces)
+        self.content = b''
+        self.ranges = []
+
+    def exists(self, container_name, blob_name):
+        return True
+
+    def get_blob_properties(self, container_name, blob_name):
+        if self.pieces:
+            self.content += self.pieces.pop(0)
+        metadata = {} if self.pieces else {'__complete_status': 'Succeeded'}
+        return SimpleNamespace(metadata=metadata, properties=SimpleNamespace(content_length=len(self.content)))
+
+    def get_blob_to_stream(self, container_name, blob_name, start_range, end_range, stream):
+        self.ranges.append(end_range - start_range + 1)
+        stream.write(self.content[start_range:end_range + 1])
+
+
+class TestStreamLogs(unittest.TestCase):
+    def stream(self, pieces):
+        logged = []
+        service = FakeAppendBlobService(pieces)
+        _stream_logs(True, DEFAULT_CHUNK_SIZE, 60, service, 'container', 'blob', True, logged.append)
+        return logged, service
+
+    def test_lines_are_logged_when_complete(self):
+        logged, _ = self.stream([b'[INFO] Scanning', b' for projects...\n[INFO] Build', b'ing app\r\n', b'done'])
+        self.assertEqual(logged, ['[INFO] Scanning for projects...\n', '[INFO] Building app\r', 'done',
+                                  'Log status was: succeeded'])
+
+    def test_range_grows_while_behind(self):
+        line = b'x' * 99 + b'\n'
+        logged, service = self.stream([line * 100000])
+        self.assertEqual(''.join(logged[:-1]), (line * 100000).decode())
+        self.assertEqual(service.ranges[:3], [DEFAULT_CHUNK_SIZE, DEFAULT_CHUNK_SIZE * 2, DEFAULT_CHUNK_SIZE * 4])
+        self.assertEqual(max(service.ranges), MAX_CHUNK_SIZE)
+
+    def test_splitter_keeps_incomplete_line(self):
+        splitter = _LogLineSplitter()
+        self.assertIsNone(splitter.feed(b'no line break'))
+        self.assertIsNone(splitter.feed(b''))
+        self.assertEqual(splitter.feed(b' yet\nnext'), b'no line break yet\n')
+        self.assertEqual(splitter.feed(b'\r\n'), b'next\r')
+        self.assertEqual(splitter.feed(b'last'), None)
+        self.assertEqual(splitter.flush(), b'last')
+        self.assertEqual(splitter.flush(), b'')
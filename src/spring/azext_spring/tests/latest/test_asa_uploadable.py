@@ -0,0 +1,137 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import unittest
+from io import BytesIO
+from types import SimpleNamespace
+from unittest import mock
+
+import requests
+
+from ..._deployment_uploadable_factory import FileUpload, FolderUpload, _is_retryable
+
+UPLOAD_URL = 'https://account.file.core.windows.net/share/resources/app.jar?sv=2021&sig=x'
+
+
+class FakeHttpError(Exception):
+    def __init__(self, status_code):
+        super().__init__(status_code)
+        self.status_code = status_code
+
+
+class FakeFileService:
+    '''
+    A single file in a file share reached with a write-only SAS, as the upload url of a deployment is. Reading the
+    file fails, and range uploads can be made to fail.
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.content = None
+        self.ranges = []
+        self.failures = {}
+        self.calls = []
+
+    def __getattr__(self, name):
+        # exists, get_file_properties, list_ranges, ... need the read permission
+        def read(*args, **kwargs):
+            self.calls.append(name)
+            raise FakeHttpError(403)
+        return read
+
+    def create_file(self, share_name, directory_name, file_name, content_length):
+        self.calls.append('create_file')
+        self.content = bytearray(content_length)
+        self.ranges = []
+
+    def resize_file(self, share_name, directory_name, file_name, content_length):
+        self.calls.append('resize_file')
+        del self.content[content_length:]
+        self.content.extend(bytes(content_length - len(self.content)))
+
+    def update_range(self, share_name, directory_name, file_name, data, start_range, end_range):
+        with self.lock:
+            self.calls.append('update_range')
+            if self.failures.get(start_range):
+                self.failures[start_range] -= 1
+                raise FakeHttpError(503)
+        assert end_range < len(self.content) and len(data) == end_range - start_range + 1
+        self.content[start_range:end_range + 1] = data
+        with self.lock:
+            self.ranges.append((start_range, end_range))
+
+
+class TestUploadable(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.artifact = os.path.join(self.folder, 'app.jar')
+        with open(self.artifact, 'wb') as f:
+            f.write(os.urandom(10 * 1024 + 123))
+        self.service = FakeFileService()
+
+        def get_sdk(cli_ctx, resource_type, name):
+            if name == 'file#FileService':
+                return lambda *args, **kwargs: self.service
+            return SimpleNamespace
+        for target, value in [('get_sdk', get_sdk), ('ResourceType', SimpleNamespace(DATA_STORAGE=None)),
+                              ('UPLOAD_RANGE_SIZE', 1024), ('UPLOAD_STREAM_INITIAL_SIZE', 4096),
+                              ('time.sleep', lambda _: None)]:
+            patcher = mock.patch('azext_spring._deployment_uploadable_factory.' + target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def read_artifact(self):
+        with open(self.artifact, 'rb') as f:
+            return f.read()
+
+    def test_upload_in_ranges_with_retry(self):
+        self.service.failures = {2048: 2, 5120: 1}
+        FileUpload(UPLOAD_URL, None).upload_and_build(self.artifact)
+        self.assertEqual(bytes(self.service.content), self.read_artifact())
+        self.assertEqual(len(self.service.ranges), 11)
+
+    def test_upload_only_writes(self):
+        FileUpload(UPLOAD_URL, None).upload_and_build(self.artifact)
+        # the file is created, then written range by range, without any request that needs to read it
+        self.assertEqual(self.service.calls, ['create_file'] + ['update_range'] * 11)
+
+    def test_failed_range_stops_the_upload(self):
+        self.service.failures = {3072: 10}
+        with self.assertRaises(FakeHttpError):
+            FileUpload(UPLOAD_URL, None).upload_and_build(self.artifact)
+        self.assertNotIn((3072, 4095), set(self.service.ranges))
+
+    def test_is_retryable(self):
+        self.assertTrue(_is_retryable(FakeHttpError(503)))
+        self.assertTrue(_is_retryable(FakeHttpError(429)))
+        self.assertFalse(_is_retryable(FakeHttpError(404)))
+        self.assertFalse(_is_retryable(ValueError('not a status code')))
+        self.assertTrue(_is_retryable(requests.exceptions.ReadTimeout()))
+        # what the storage SDK raises when the connection drops
+        wrapped = Exception('reset')
+        wrapped.__context__ = requests.exceptions.ConnectionError('reset')
+        self.assertTrue(_is_retryable(wrapped))
+
+    def test_folder_is_compressed_while_uploaded(self):
+        source = os.path.join(self.folder, 'source')
+        os.makedirs(os.path.join(source, 'src'))
+        for i in range(20):
+            with open(os.path.join(source, 'src', 'f{}.java'.format(i)), 'wb') as f:
+                f.write(os.urandom(1024))
+        with mock.patch('azext_spring._utils.logger'):
+            FolderUpload(UPLOAD_URL, None).upload_and_build(source)
+
+        with tarfile.open(fileobj=BytesIO(bytes(self.service.content)), mode='r:gz') as tar:
+            names = sorted(m.name for m in tar.getmembers() if m.isfile())
+        self.assertEqual(names, sorted('src/f{}.java'.format(i) for i in range(20)))
+        # the file was grown past its initial size, then cut to the size of the archive
+        self.assertGreater(len(self.service.content), 4096)
+        self.assertEqual(set(self.service.calls), {'create_file', 'resize_file', 'update_range'})
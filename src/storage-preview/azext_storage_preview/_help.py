@@ -530,6 +530,10 @@ parameters:
   - name: --max-connections
     type: integer
     short-summary: The maximum number of parallel connections to use. Default value is 1.
+  - name: --max-workers
+    type: integer
+    short-summary: The maximum number of directories listed and of files downloaded at the same time. Default value is 8.
+    long-summary: Files whose local copy has the same size and last modified time as the file in the share are not downloaded again.
   - name: --snapshot
     type: string
     short-summary: A string that represents the snapshot version, if applicable.
@@ -685,6 +689,10 @@ parameters:
   - name: --max-connections
     type: integer
     short-summary: The maximum number of parallel connections to use. Default value is 1.
+  - name: --max-workers
+    type: integer
+    short-summary: The maximum number of files uploaded at the same time. Default value is 8.
+    long-summary: If the upload is interrupted, running the same command again skips the files that were already uploaded and have not changed since.
   - name: --validate-content
     type: bool
     short-summary: If set, calculates an MD5 hash for each range of the file for validation.
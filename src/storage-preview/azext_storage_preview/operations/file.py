@@ -8,13 +8,17 @@ Commands for storage file share operations
 """
 
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from knack.log import get_logger
 
-from azure.cli.command_modules.storage.util import (filter_none, collect_blobs, collect_files_track2,
-                                                    guess_content_type)
+from azure.cli.command_modules.storage.util import filter_none, collect_files_track2, guess_content_type
 from azure.cli.core.profiles import get_sdk
 from azure.core.exceptions import HttpResponseError, ResourceNotFoundError, ResourceExistsError
 from ..profiles import CUSTOM_DATA_STORAGE_FILESHARE, CUSTOM_DATA_STORAGE_BLOB
+from ..util import (BATCH_MAX_WORKERS, ByteBudget, collect_blobs, crawl_files_remotely, get_batch_journal,
+                    get_parent_directories, log_batch_throughput)
 
 logger = get_logger(__name__)
 
@@ -99,9 +103,10 @@ def storage_file_upload(client, local_file_path, content_settings=None,
     return response
 
 
+# pylint: disable=too-many-locals, too-many-statements
 def storage_file_upload_batch(cmd, client, destination, source, destination_path=None, pattern=None, dryrun=False,
                               validate_content=False, content_settings=None, max_connections=1, metadata=None,
-                              progress_callback=None):
+                              progress_callback=None, max_workers=BATCH_MAX_WORKERS):
     """ Upload local files to Azure Storage File Share in batch """
 
     from azure.cli.command_modules.storage.util import glob_files_locally, normalize_blob_file_path
@@ -126,26 +131,64 @@ def storage_file_upload_batch(cmd, client, destination, source, destination_path
             res.append({'File': file, 'Type': guessed_type})
         return res
 
-    # TODO: Performance improvement
-    # 1. Upload files in parallel
-    def _upload_action(src, dst2):
-        dst2 = normalize_blob_file_path(destination_path, dst2)
-        dir_name = os.path.dirname(dst2)
-        file_name = os.path.basename(dst2)
-
-        _make_directory_in_files_share(client, destination, dir_name, V2=True)
-
-        logger.warning('uploading %s', src)
-        storage_file_upload(client.get_file_client(dst2), src, content_settings, metadata, validate_content,
-                            progress_callback, max_connections)
-
-        args = {
-            'directory_name': dir_name,
-            'file_name': file_name
-        }
-        return create_file_url(client, **args)
+    # an interrupted run of the same batch left the files it uploaded in its journal
+    # keyed on the share and not on its url, which carries the SAS token
+    journal = get_batch_journal(cmd.cli_ctx, 'file-upload', client.account_name, client.share_name,
+                                destination_path, os.path.abspath(source), pattern)
+    uploaded = journal.load()
+    pending = []
+    results = []
+    for src, dst in source_files:
+        dst = normalize_blob_file_path(destination_path, dst)
+        results.append(client.get_file_client(dst).url)
+        st = os.stat(src)
+        if uploaded.get(dst) != (st.st_size, st.st_mtime_ns):
+            pending.append((src, dst, st.st_size, st.st_mtime_ns))
+    if len(pending) < len(source_files):
+        logger.warning('Resuming an interrupted upload: %d of %d files were already uploaded.',
+                       len(source_files) - len(pending), len(source_files))
+
+    budget = ByteBudget()
+    existing_dirs = set()
+    failed = threading.Event()
+    start = time.perf_counter()
+
+    def _make_directory_action(dir_name):
+        _make_directory_in_files_share(client, destination, dir_name, existing_dirs, V2=True)
+
+    def _upload_action(src, dst, size, mtime):
+        if failed.is_set():
+            return
+        budget.acquire(size)
+        try:
+            logger.warning('uploading %s', src)
+            storage_file_upload(client.get_file_client(dst), src, content_settings, metadata, validate_content,
+                                progress_callback, max_connections)
+        finally:
+            budget.release(size)
+        journal.record(dst, size, mtime)
 
-    return list(_upload_action(src, dst) for src, dst in source_files)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                # every directory is created once, parents first, before the files that go in it are uploaded
+                for level in get_parent_directories(dst for _, dst, _, _ in pending):
+                    list(executor.map(_make_directory_action, level))
+
+                futures = [executor.submit(_upload_action, *item) for item in pending]
+                for future in futures:
+                    future.result()
+            except BaseException:
+                # let the uploads in progress finish, and skip the ones not started yet
+                failed.set()
+                raise
+    finally:
+        journal.close()
+
+    journal.remove()
+    log_batch_throughput(logger, 'Uploaded', len(pending), sum(item[2] for item in pending),
+                         time.perf_counter() - start)
+    return results
 
 
 def download_file(client, destination_path=None, timeout=None, max_connections=2, open_mode='wb', **kwargs):
@@ -160,6 +203,12 @@ def download_file(client, destination_path=None, timeout=None, max_connections=2
         destination_path = os.path.join(destination_path, file_name) \
             if destination_path else file_name
 
+    _download_file_to_path(client, destination_path, timeout=timeout, max_connections=max_connections,
+                           open_mode=open_mode, **kwargs)
+    return client.get_file_properties()
+
+
+def _download_file_to_path(client, destination_path, timeout=None, max_connections=2, open_mode='wb', **kwargs):
     kwargs['progress_hook'] = kwargs.pop("progress_callback", None)
 
     with open(destination_path, open_mode) as stream:
@@ -171,18 +220,17 @@ def download_file(client, destination_path=None, timeout=None, max_connections=2
         download = client.download_file(offset=start_range, length=length, timeout=timeout,
                                         max_concurrency=max_connections, **kwargs)
         download.readinto(stream)
-    return client.get_file_properties()
+    return download
 
 
 def storage_file_download_batch(client, source, destination, pattern=None, dryrun=False, validate_content=False,
-                                max_connections=1, progress_callback=None):
+                                max_connections=1, progress_callback=None, max_workers=BATCH_MAX_WORKERS):
     """
     Download files from file share to local directory in batch
     """
 
-    from azure.cli.command_modules.storage.util import glob_files_remotely_track2
-
-    source_files = glob_files_remotely_track2(client, source, pattern, is_share_client=True)
+    # the share is listed by a pool of its own, and each file is downloaded as soon as its directory is listed
+    source_files = crawl_files_remotely(client, pattern, max_workers=max_workers)
 
     if dryrun:
         source_files_list = list(source_files)
@@ -195,21 +243,62 @@ def storage_file_download_batch(client, source, destination, pattern=None, dryru
         logger.warning('      total %d', len(source_files_list))
         logger.warning(' operations')
         for f in source_files_list:
-            logger.warning('  - %s/%s => %s', f[0], f[1], os.path.join(destination, *f))
+            logger.warning('  - %s/%s => %s', f[0], f[1], os.path.join(destination, f[0], f[1]))
 
         return []
 
-    def _download_action(pair):
-        path = os.path.join(*pair)
-        local_path = os.path.join(destination, *pair)
-        file_client = client.get_file_client(path)
-
-        download_file(file_client, destination_path=local_path, max_connections=max_connections,
-                      progress_callback=progress_callback, validate_content=validate_content)
-
-        return file_client.url.replace('%5C', '/')
-
-    return list(_download_action(f) for f in source_files)
+    def _is_up_to_date(local_path, properties):
+        # a downloaded file is given the last modified time of the remote one
+        try:
+            st = os.stat(local_path)
+        except OSError:
+            return False
+        last_modified = properties.get('last_modified')
+        return last_modified is not None and st.st_size == properties.get('size') and \
+            int(st.st_mtime) == int(last_modified.timestamp())
+
+    def _download_action(file_client, local_path):
+        if failed.is_set():
+            return 0
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        download = _download_file_to_path(file_client, local_path, max_connections=max_connections,
+                                          progress_callback=progress_callback, validate_content=validate_content)
+        last_modified = download.properties.last_modified
+        if last_modified is not None:
+            os.utime(local_path, (last_modified.timestamp(), last_modified.timestamp()))
+        return download.properties.size
+
+    results = []
+    downloaded = []
+    skipped = 0
+    failed = threading.Event()
+    # bounds the files listed but not downloaded yet, so the listing does not run far ahead of the downloads
+    slots = threading.BoundedSemaphore(max_workers * 2)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for current_dir, name, properties in source_files:
+                local_path = os.path.join(destination, current_dir, name)
+                file_client = client.get_file_client(os.path.join(current_dir, name))
+                results.append(file_client.url.replace('%5C', '/'))
+                if _is_up_to_date(local_path, properties):
+                    skipped += 1
+                    continue
+                slots.acquire()  # pylint: disable=consider-using-with
+                future = executor.submit(_download_action, file_client, local_path)
+                future.add_done_callback(lambda _: slots.release())
+                downloaded.append(future)
+            total_bytes = sum(future.result() for future in downloaded)
+        except BaseException:
+            # let the downloads in progress finish, and skip the ones not started yet
+            failed.set()
+            source_files.close()
+            raise
+
+    if skipped:
+        logger.warning('Skipped %d files that are already up to date in %s.', skipped, destination)
+    log_batch_throughput(logger, 'Downloaded', len(downloaded), total_bytes, time.perf_counter() - start)
+    return results
 
 
 def storage_file_copy(client, copy_source, **kwargs):
@@ -389,7 +478,7 @@ def _make_directory_in_files_share(file_service, file_share, directory_path, exi
         p = os.path.dirname(p)
 
     for dir_name in reversed(parents):
-        if existing_dirs and (dir_name in existing_dirs):
+        if existing_dirs is not None and (dir_name in existing_dirs):
             continue
 
         try:
@@ -403,8 +492,9 @@ def _make_directory_in_files_share(file_service, file_share, directory_path, exi
             from knack.util import CLIError
             raise CLIError('Failed to create directory {}'.format(dir_name))
 
-        if existing_dirs:
-            existing_dirs.add(directory_path)
+        # only added once created, so a directory found in the cache always exists
+        if existing_dirs is not None:
+            existing_dirs.add(dir_name)
 
 
 def _file_share_exists(client, resource_group_name, account_name, share_name):
@@ -0,0 +1,202 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from azure.core.exceptions import ResourceExistsError
+
+from ...operations.file import storage_file_upload_batch, storage_file_download_batch
+from ...util import ByteBudget, BatchJournal, get_parent_directories
+
+
+class FakeFileClient(object):
+    def __init__(self, share, path):
+        self.share = share
+        self.path = path
+        self.url = share.url + '/' + path
+
+    def upload_file(self, data, length, **_):
+        with self.share.lock:
+            if self.path in self.share.fail_on:
+                raise ValueError('upload of {} failed'.format(self.path))
+            parent = os.path.dirname(self.path)
+            if parent and parent not in self.share.directories:
+                raise ValueError('parent directory of {} does not exist'.format(self.path))
+        self.share.files[self.path] = data.read(length)
+        self.share.last_modified[self.path] = datetime.now(timezone.utc).replace(microsecond=0)
+        return {}
+
+    def download_file(self, **_):
+        with self.share.lock:
+            self.share.download_calls.append(self.path)
+        data = self.share.files[self.path]
+        properties = SimpleNamespace(size=len(data), last_modified=self.share.last_modified[self.path])
+        return SimpleNamespace(properties=properties, readinto=lambda stream: stream.write(data))
+
+
+class FakeShareClient(object):
+    """In-memory share that checks directories are created before the files that go in them."""
+
+    def __init__(self):
+        self.account_name = 'account'
+        self.share_name = 'share'
+        self.url = 'https://account.file.core.windows.net/share?sig=first'
+        self.lock = threading.Lock()
+        self.directories = set()
+        self.create_directory_calls = []
+        self.files = {}
+        self.last_modified = {}
+        self.download_calls = []
+        self.list_calls = []
+        self.fail_on = set()
+
+    def create_directory(self, directory_name):
+        with self.lock:
+            self.create_directory_calls.append(directory_name)
+            if os.path.dirname(directory_name) and os.path.dirname(directory_name) not in self.directories:
+                raise ValueError('parent directory of {} does not exist'.format(directory_name))
+            if directory_name in self.directories:
+                raise ResourceExistsError('exists')
+            self.directories.add(directory_name)
+
+    def get_file_client(self, path):
+        return FakeFileClient(self, path)
+
+    def list_directories_and_files(self, directory_name, include=None):
+        self.list_calls.append(directory_name)
+        prefix = directory_name + '/' if directory_name else ''
+        names = {}
+        for path in self.files:
+            if path.startswith(prefix):
+                name, _, rest = path[len(prefix):].partition('/')
+                names[name] = bool(rest)
+        for name, is_directory in sorted(names.items()):
+            if is_directory:
+                yield {'name': name, 'is_directory': True}
+            else:
+                yield {'name': name, 'is_directory': False, 'size': len(self.files[prefix + name]),
+                       'last_modified': self.last_modified[prefix + name] if include else None}
+
+
+class StorageFileBatchTests(unittest.TestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        self.addCleanup(shutil.rmtree, self.config_dir)
+        self.paths = ['a.txt'] + ['d{}/e{}/f{}.txt'.format(i % 3, i % 2, i) for i in range(20)]
+        for path in self.paths:
+            full_path = os.path.join(self.source, *path.split('/'))
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, 'w') as f:
+                f.write(path)
+        self.cmd = mock.MagicMock()
+        self.cmd.cli_ctx.config.config_dir = self.config_dir
+        self.share = FakeShareClient()
+        mock.patch('azext_storage_preview.operations.file.logger').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def upload(self, **kwargs):
+        return storage_file_upload_batch(self.cmd, self.share, 'share', self.source, max_workers=4, **kwargs)
+
+    def test_upload_creates_each_directory_once(self):
+        results = self.upload(destination_path='root')
+        self.assertEqual(sorted(self.share.files), sorted('root/' + p for p in self.paths))
+        self.assertEqual(len(results), len(self.paths))
+        self.assertEqual(len(self.share.create_directory_calls), len(set(self.share.create_directory_calls)))
+        self.assertEqual(len(self.share.create_directory_calls), 1 + 3 + 6)
+        # the journal is only kept while the batch is incomplete
+        self.assertFalse(os.listdir(os.path.join(self.config_dir, 'storage', 'batch_journals')))
+
+    def test_interrupted_upload_resumes(self):
+        self.share.fail_on.add('d1/e1/f1.txt')
+        with self.assertRaises(ValueError):
+            self.upload()
+        uploaded_before = set(self.share.files)
+        self.assertNotIn('d1/e1/f1.txt', uploaded_before)
+
+        self.share.fail_on.clear()
+        self.share.files.clear()
+        # the journal is found again with another SAS token
+        self.share.url = 'https://account.file.core.windows.net/share?sig=second'
+        # a file changed since the interrupted run is uploaded again
+        changed = self.paths[-1]
+        with open(os.path.join(self.source, *changed.split('/')), 'w') as f:
+            f.write('changed')
+        self.upload()
+        self.assertEqual(set(self.share.files), set(self.paths) - uploaded_before | {changed, 'd1/e1/f1.txt'})
+
+    def test_download_skips_up_to_date_files(self):
+        self.upload()
+        destination = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, destination)
+
+        results = storage_file_download_batch(self.share, 'share', destination, max_workers=4)
+        self.assertEqual(len(results), len(self.paths))
+        self.assertEqual(sorted(self.share.download_calls), sorted(self.paths))
+        for path in self.paths:
+            with open(os.path.join(destination, *path.split('/'))) as f:
+                self.assertEqual(f.read(), path)
+        # every directory is listed once
+        self.assertEqual(sorted(self.share.list_calls), sorted(set(self.share.list_calls)))
+        self.assertEqual(len(self.share.list_calls), 1 + 3 + 6)
+
+        del self.share.download_calls[:]
+        changed = self.paths[3]
+        self.share.files[changed] = b'changed remotely'
+        storage_file_download_batch(self.share, 'share', destination, max_workers=4)
+        self.assertEqual(self.share.download_calls, [changed])
+
+        del self.share.download_calls[:]
+        storage_file_download_batch(self.share, 'share', destination, pattern='d0/*', max_workers=4)
+        self.assertEqual(self.share.download_calls, [])
+        results = storage_file_download_batch(self.share, 'share', destination, pattern='d0/*', dryrun=True)
+        self.assertEqual(results, [])
+
+    def test_byte_budget(self):
+        budget = ByteBudget(limit=100)
+        budget.acquire(60)
+        acquired = threading.Event()
+
+        def _acquire():
+            budget.acquire(60)
+            acquired.set()
+
+        thread = threading.Thread(target=_acquire)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        budget.release(60)
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+        budget.release(60)
+        # larger than the whole budget, but nothing else is in flight
+        budget.acquire(1000)
+        self.assertEqual(budget.in_flight, 1000)
+
+    def test_journal_ignores_torn_lines(self):
+        journal = BatchJournal(os.path.join(self.config_dir, 'journal.jsonl'))
+        journal.record('a', 1, 2)
+        journal.record('b', 3, 4)
+        journal.close()
+        with open(journal.path, 'a') as f:
+            f.write('{"name": "c", "si')
+        self.assertEqual(journal.load(), {'a': (1, 2), 'b': (3, 4)})
+        journal.remove()
+        self.assertEqual(journal.load(), {})
+
+    def test_parent_directories(self):
+        self.assertEqual(get_parent_directories(['a/b/c.txt', 'a/d.txt', 'e/f.txt', 'g.txt']),
+                         [['a', 'e'], ['a/b']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+from types import SimpleNamespace
+
+from ...util import collect_blobs, _compile_pattern, _match_path
+
+BLOB_NAMES = ['logs/2023/12/31.gz', 'logs/2024/01/01.gz', 'logs/2024/01/01.txt', 'logs/2024/02.gz',
+              'logs/2024a.gz', 'logs/[x].gz', 'data/a.csv', 'data/b.csv', 'readme.md']
+
+
+class FakeBlobService(object):
+    """A BlobServiceClient with a single container."""
+    def __init__(self, names):
+        self.names = sorted(names)
+        self.prefixes = []
+        self.listed = 0
+
+    def get_container_client(self, container):
+        return self
+
+    def get_blob_client(self, name):
+        return SimpleNamespace(exists=lambda: name in self.names)
+
+    def list_blobs(self, name_starts_with=None):
+        self.prefixes.append(name_starts_with)
+        for name in self.names:
+            if not name_starts_with or name.startswith(name_starts_with):
+                self.listed += 1
+                yield SimpleNamespace(name=name)
+
+
+class StorageUtilTests(unittest.TestCase):
+    def test_collect_blobs_lists_prefix_only(self):
+        service = FakeBlobService(BLOB_NAMES)
+        self.assertEqual(list(collect_blobs(service, 'container', 'logs/2024/*.gz')),
+                         ['logs/2024/01/01.gz', 'logs/2024/02.gz'])
+        self.assertEqual(service.prefixes, ['logs/2024/'])
+        self.assertEqual(service.listed, 3)
+
+        self.assertEqual(list(collect_blobs(service, 'container', '*.csv')), ['data/a.csv', 'data/b.csv'])
+        self.assertEqual(service.prefixes[-1], None)
+        self.assertEqual(collect_blobs(service, 'container', 'readme.md'), ['readme.md'])
+        self.assertEqual(collect_blobs(service, 'container', 'missing.md'), [])
+
+    def test_collect_blobs_is_lazy(self):
+        service = FakeBlobService(BLOB_NAMES)
+        blobs = collect_blobs(service, 'container', 'logs/*')
+        self.assertEqual(next(blobs), 'logs/2023/12/31.gz')
+        self.assertEqual(service.listed, 1)
+
+    def test_compiled_pattern_matches_like_fnmatch(self):
+        patterns = ['logs/2024/*.gz', 'logs/202?/*', 'logs/[x].gz', 'logs/[!2]*', 'logs/2024[a]*', '*', '*/b.csv',
+                    'data/?.csv', 'logs/2024/01/01.*', 'logs/[']
+        for pattern in patterns:
+            prefix, match = _compile_pattern(pattern)
+            for name in BLOB_NAMES:
+                self.assertEqual(match(name), _match_path(name, pattern), (pattern, name))
+                if match(name):
+                    self.assertTrue(name.startswith(prefix), (pattern, name))
+
+
+if __name__ == '__main__':
+    unittest.main()
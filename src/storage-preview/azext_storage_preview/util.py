@@ -4,14 +4,24 @@
 # --------------------------------------------------------------------------------------------
 
 
+import hashlib
+import json
 import os
+import threading
 from datetime import datetime
 from .profiles import CUSTOM_DATA_STORAGE_FILESHARE, CUSTOM_DATA_STORAGE_BLOB
 
+# number of files transferred at once by the batch commands
+BATCH_MAX_WORKERS = 8
+# how many bytes of the files being transferred at once by the batch commands may be in flight
+BATCH_MAX_BYTES_IN_FLIGHT = 256 * 1024 * 1024
+
 
 def collect_blobs(blob_service, container, pattern=None):
     """
     List the blobs in the given blob container, filter the blob by comparing their path to the given pattern.
+    Only the blobs starting with the part of the pattern before its first wildcard are listed, and the names
+    are yielded as they are listed. blob_service is a BlobServiceClient.
     """
     if not blob_service:
         raise ValueError('missing parameter blob_service')
@@ -19,21 +29,18 @@ def collect_blobs(blob_service, container, pattern=None):
     if not container:
         raise ValueError('missing parameter container')
 
+    container_client = blob_service.get_container_client(container)
     if not _pattern_has_wildcards(pattern):
-        return [pattern] if blob_service.exists(container, pattern) else []
+        return [pattern] if container_client.get_blob_client(pattern).exists() else []
 
-    results = []
-    for blob in blob_service.list_blobs(container):
-        try:
-            blob_name = blob.name.encode(
-                'utf-8') if isinstance(blob.name, unicode) else blob.name
-        except NameError:
-            blob_name = blob.name
+    return _glob_blobs_remotely(container_client, pattern)
 
-        if not pattern or _match_path(blob_name, pattern):
-            results.append(blob_name)
 
-    return results
+def _glob_blobs_remotely(container_client, pattern):
+    prefix, match = _compile_pattern(pattern)
+    for blob in container_client.list_blobs(name_starts_with=prefix or None):
+        if match(blob.name):
+            yield blob.name
 
 
 def collect_files(cmd, file_service, share, pattern=None):
@@ -101,6 +108,36 @@ def glob_files_remotely(cmd, client, share_name, pattern):
                 queue.appendleft(os.path.join(current_dir, f.name))
 
 
+def crawl_files_remotely(client, pattern=None, max_workers=BATCH_MAX_WORKERS):
+    """
+    List the files in the given share client recursively, listing up to `max_workers` directories at once.
+    Returns an iterable of tuple (dir, name, properties), yielded as soon as the directory of each file is
+    listed and in no particular order. The properties include the size and last modified time of the file.
+    """
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+    def _list(directory):
+        return directory, list(client.list_directories_and_files(directory, include=['timestamps']))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(_list, "")}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    current_dir, items = future.result()
+                    for f in items:
+                        if f['is_directory']:
+                            new_path = normalize_blob_file_path(current_dir, f['name'])
+                            pending.add(executor.submit(_list, new_path))
+                        elif not pattern or _match_path(os.path.join(current_dir, f['name']), pattern):
+                            yield current_dir, f['name'], f
+        finally:
+            # the caller stopped early or a listing failed: the directories not listed yet are not needed
+            for future in pending:
+                future.cancel()
+
+
 def create_short_lived_blob_sas(cmd, account_name, account_key, container, blob):
     from datetime import datetime, timedelta
     if cmd.supported_api_version(min_api='2017-04-17'):
@@ -180,6 +217,24 @@ def _match_path(path, pattern):
     return fnmatch(path, pattern)
 
 
+def _compile_pattern(pattern):
+    """
+    Split a pattern into the literal prefix every matching path starts with and a function that tells whether a
+    path matches the whole pattern, with the same rules as _match_path.
+    """
+    import re
+    from fnmatch import translate
+
+    if not pattern:
+        return '', lambda path: True
+    # fnmatch ignores case where paths do, so no prefix can be relied on there
+    if os.path.normcase('A/') != 'A/':
+        return '', lambda path: _match_path(path, pattern)
+    prefix = re.match(r'[^*?[]*', pattern).group()
+    regex = re.compile(translate(pattern))
+    return prefix, lambda path: regex.match(path) is not None
+
+
 def guess_content_type(file_path, original, settings_class):
     if original.content_encoding or original.content_type:
         return original
@@ -283,3 +338,103 @@ def create_short_lived_share_sas_track2(cmd, account_name, account_key, share):
     expiry = (datetime.utcnow() + timedelta(days=1)).strftime('%Y-%m-%dT%H:%M:%SZ')
     return t_generate_share_sas(account_name, share, account_key, permission='r', expiry=expiry,
                                 protocol='https')
+
+
+class ByteBudget:
+    """Bounds the number of bytes in flight across threads. A request larger than the whole budget is
+    let through once nothing else is in flight, so a single huge file never blocks forever."""
+
+    def __init__(self, limit=BATCH_MAX_BYTES_IN_FLIGHT):
+        self.limit = limit
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size):
+        with self._condition:
+            self._condition.wait_for(lambda: self.in_flight == 0 or self.in_flight + size <= self.limit)
+            self.in_flight += size
+
+    def release(self, size):
+        with self._condition:
+            self.in_flight -= size
+            self._condition.notify_all()
+
+
+class BatchJournal:
+    """Records the files a batch command has transferred, one JSON line per file, so that running the
+    same batch again after an interruption skips the files that were already transferred. A file is
+    only skipped if its size and modification time are still the ones recorded. The journal is removed
+    once the batch completes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stream = None
+
+    def load(self):
+        entries = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        entries[entry['name']] = (entry['size'], entry['mtime'])
+                    except (ValueError, KeyError, TypeError):
+                        # the last line may have been cut short by the interruption
+                        continue
+        except OSError:
+            pass
+        return entries
+
+    def record(self, name, size, mtime):
+        line = json.dumps({'name': name, 'size': size, 'mtime': mtime}) + '\n'
+        with self._lock:
+            if self._stream is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._stream = open(self.path, 'a', encoding='utf-8')
+            self._stream.write(line)
+            self._stream.flush()
+
+    def close(self):
+        with self._lock:
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+
+    def remove(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def get_batch_journal(cli_ctx, operation, *parts):
+    """Journal of the batch `operation` identified by `parts`, such as the source and destination."""
+    key = hashlib.sha256('\0'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+    return BatchJournal(os.path.join(cli_ctx.config.config_dir, 'storage', 'batch_journals',
+                                     '{}-{}.jsonl'.format(operation, key[:32])))
+
+
+def get_parent_directories(paths):
+    """All the directories the given '/' separated paths are in, grouped by depth so that each group
+    only contains directories whose parents are in the previous groups."""
+    levels = []
+    seen = set()
+    for path in paths:
+        parts = path.split('/')[:-1]
+        for depth in range(1, len(parts) + 1):
+            directory = '/'.join(parts[:depth])
+            if directory in seen:
+                continue
+            seen.add(directory)
+            while len(levels) < depth:
+                levels.append([])
+            levels[depth - 1].append(directory)
+    return levels
+
+
+def log_batch_throughput(logger, action, count, total_bytes, seconds):
+    seconds = max(seconds, 1e-6)
+    logger.warning('%s %d files (%.1f MB) in %.1fs: %.1f files/s, %.1f MB/s', action, count,
+                   total_bytes / 1024 / 1024, seconds, count / seconds, total_bytes / 1024 / 1024 / seconds)